@@ -0,0 +1,9 @@
+import time
+
+from dotenv import load_dotenv
+
+# Reference point for cold-start timing (see app.main)
+IMPORT_STARTED = time.perf_counter()
+
+# Load environment variables from .env file before any module reads its settings
+load_dotenv()
@@ -1,9 +1,87 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app import IMPORT_STARTED
 from app.routes import tickets, replies, health
+from app.routes import metrics as metrics_routes
+from app.services.semantic_cache import semantic_cache, SEMANTIC_CACHE_SNAPSHOT
+from app.services.llm_providers import get_provider, drain_providers, close_providers
+from app.services.openai_client import gpt_model
+from app.services.response_store import get_response_store, close_response_store
+from app.services.traffic_recorder import TrafficRecorderMiddleware, close_recorder
+from app.services.metrics import metrics
+from app.services.rule_engine import get_rules
+from app.services.executor import close_executor
+from app.services.tenancy import TenantMiddleware
+from app.services.usage import UsageMiddleware
+from app.services.admission import AdmissionMiddleware
+from app.services.ingestion import close_batcher
+from app.services.refinement import close_refinements
 
-app = FastAPI(title="AI Support Intelligence")
+logger = logging.getLogger(__name__)
+
+# Seconds allowed for finishing refinements and webhook batches on shutdown, before
+# LLM_DRAIN_TIMEOUT. Keep GRACEFUL_TIMEOUT + this + LLM_DRAIN_TIMEOUT below the
+# container stop grace period (docker-compose.yml stop_grace_period).
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "10"))
+
+
+def _warm_up() -> None:
+    # Builds the SDK client / local model off the event loop once the app is serving
+    get_provider(gpt_model)[0].open()
+    get_rules()
+    if get_response_store() is not None:
+        get_response_store().conn
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Per-worker resources are created after the process is forked, so each worker
+    # owns its connection pool and caches. Expensive ones are warmed up in the
+    # background (and otherwise built lazily on first use) to keep cold start short.
+    started = time.perf_counter()
+    if SEMANTIC_CACHE_SNAPSHOT:
+        semantic_cache.restore(SEMANTIC_CACHE_SNAPSHOT)
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up))
+    lifespan_seconds = round(time.perf_counter() - started, 4)
+    metrics.set_gauge("startup_import_seconds", IMPORT_SECONDS)
+    metrics.set_gauge("startup_lifespan_seconds", lifespan_seconds)
+    logger.info("Startup: import %.3fs, lifespan %.3fs", IMPORT_SECONDS, lifespan_seconds)
+    yield
+    await asyncio.gather(warm_up, return_exceptions=True)
+    try:
+        async with asyncio.timeout(SHUTDOWN_DRAIN_TIMEOUT):
+            # Finish fast-mode refinements (and their callbacks) before the webhook client closes
+            await close_refinements()
+            # Analyze and deliver webhook tickets already acknowledged
+            await close_batcher()
+    except TimeoutError:
+        logger.warning("Shutdown drain exceeded %.0fs, abandoning pending refinements and webhooks",
+                       SHUTDOWN_DRAIN_TIMEOUT)
+    # Let pending LLM calls finish before closing their clients
+    await drain_providers()
+    if SEMANTIC_CACHE_SNAPSHOT:
+        semantic_cache.snapshot(SEMANTIC_CACHE_SNAPSHOT)
+    await close_providers()
+    close_response_store()
+    close_recorder()
+    close_executor()
+
+
+app = FastAPI(title="AI Support Intelligence", lifespan=lifespan)
+app.add_middleware(TrafficRecorderMiddleware)
+app.add_middleware(TenantMiddleware)
+app.add_middleware(UsageMiddleware)
+# Outermost: shed requests are neither recorded nor charged to a tenant
+app.add_middleware(AdmissionMiddleware)
 
 app.include_router(health.router)
+app.include_router(metrics_routes.router)
 app.include_router(tickets.router, prefix="/tickets")
 app.include_router(replies.router, prefix="/replies")
 
+IMPORT_SECONDS = round(time.perf_counter() - IMPORT_STARTED, 4)
+
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
-from typing import Dict, List
+from typing import Dict, List, Optional
 from enum import Enum
 
+# Hard ceiling for free-text ticket fields. Long histories are compressed to the
+# LLM token budget by app.services.context_budget before prompting.
+MAX_TICKET_TEXT_LENGTH = 20000
 
 class RiskLabel(str, Enum):
     LOW = "LOW"
@@ -12,8 +15,8 @@ class Ticket(BaseModel):
     id: str
     customer: str
     channel: str
-    last_message: str = Field(..., max_length=255)
-    conversation_summary: str = Field(..., max_length=255)
+    last_message: str = Field(..., max_length=MAX_TICKET_TEXT_LENGTH)
+    conversation_summary: str = Field(..., max_length=MAX_TICKET_TEXT_LENGTH)
     sla_hours_open: int
     language: str = "en-US"  # pt-BR | en-US
     
@@ -46,9 +49,12 @@ class TicketResult(BaseModel):
     debug_signals: List[str]
     risk_breakdown: Dict[str, int]
     language: str = "en-US"  # pt-BR | en-US
+    degraded: bool = False  # heuristic-only result (LLM skipped under overload)
+    provisional: bool = False  # heuristic result; the LLM-refined one follows (mode=fast/stream)
 
 class TicketAnalyzeResponse(BaseModel):
     results: List[TicketResult]
+    result_id: Optional[str] = None  # fetch refined results at GET /tickets/results/{result_id}
 
     class Config:
         json_schema_extra = {
@@ -78,6 +84,10 @@ class AIAnalysis(BaseModel):
     signals: List[str] = []
     
     
+class TicketIngestResponse(BaseModel):
+    ticket_id: str
+    status: str = "accepted"  # results follow by callback
+
 class ReplySuggestionRequest(BaseModel):
     ticket_id: str
     customer: str
@@ -110,6 +120,7 @@ class ReplySuggestionResponse(BaseModel):
     subject: str = ""
     next_steps: List[str] = []
     do_not_say: List[str] = []
+    source: str = "llm"  # llm | template (approved reply, no LLM call) | fallback
 
     class Config:
         json_schema_extra = {
@@ -123,3 +134,11 @@ class ReplySuggestionResponse(BaseModel):
                 "do_not_say": ["We can't help", "Wait longer"]
             }
         }
+
+class ReplyApprovalRequest(BaseModel):
+    ticket: ReplySuggestionRequest
+    reply: ReplySuggestionResponse  # as approved (and possibly edited) by the agent
+
+class ReplyApprovalResponse(BaseModel):
+    template_id: str
+    templates: int  # approved replies currently indexed
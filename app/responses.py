@@ -0,0 +1,42 @@
+import os
+from pydantic import BaseModel
+from fastapi.encoders import jsonable_encoder
+from pydantic_core import to_json
+from starlette.responses import JSONResponse, Response
+
+# Serialize already-validated response models straight to JSON bytes with
+# pydantic-core's Rust encoder instead of FastAPI's response_model round trip
+# (re-validation + jsonable_encoder + stdlib json).
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "true").lower() == "true"
+
+
+class PydanticJSONResponse(Response):
+    """JSON response for Pydantic models (or lists/dicts of them) without re-validation."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return to_json(content)
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: dict | None = None):
+    """
+    Return a fast JSON response for a validated model, or the model itself.
+
+    When FAST_JSON_RESPONSES is disabled the model is returned unchanged and goes
+    through FastAPI's default response_model serialization, or, when a status code
+    or headers are given, is encoded the default way into a JSONResponse carrying them.
+
+    Args:
+        model (BaseModel): Response model instance.
+        status_code (int): HTTP status of the response.
+        headers (dict | None): Extra response headers.
+
+    Returns:
+        PydanticJSONResponse | JSONResponse | BaseModel: The response to return from an endpoint.
+    """
+    if not FAST_JSON_RESPONSES:
+        if status_code == 200 and not headers:
+            return model
+        return JSONResponse(jsonable_encoder(model), status_code=status_code, headers=headers)
+    return PydanticJSONResponse(model, status_code=status_code, headers=headers)
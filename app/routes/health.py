@@ -1,7 +1,7 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
 from datetime import datetime
-from app.services.openai_client import client
+from app.services.openai_client import check_llm_available
 
 router = APIRouter()
 
@@ -47,15 +47,8 @@ async def health_check():
             "openai_available": true
         }
     """
-    openai_available = False
-    
-    # Check OpenAI API availability
-    try:
-        # Make a lightweight API call to verify connectivity
-        client.models.list()
-        openai_available = True
-    except Exception:
-        openai_available = False
+    # Check OpenAI API availability (lightweight async call, does not block the loop)
+    openai_available = await check_llm_available()
     
     return HealthResponse(
         status="healthy" if openai_available else "degraded",
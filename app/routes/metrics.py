@@ -0,0 +1,49 @@
+from fastapi import APIRouter, HTTPException, Query
+from app.services.metrics import metrics
+from app.services.usage import GROUP_KEYS, usage_ledger
+
+router = APIRouter()
+
+
+@router.get(
+    "/metrics",
+    summary="Service metrics",
+    description="Returns in-process counters, gauges and latency summaries (e.g. per-tier LLM latency and escalation rate).",
+)
+async def metrics_endpoint():
+    """
+    Expose the in-process metrics registry as JSON.
+
+    Returns:
+        dict: {"counters": {...}, "gauges": {...}, "latencies": {...}}
+    """
+    return metrics.snapshot()
+
+
+@router.get(
+    "/usage",
+    summary="LLM token usage and cost",
+    description="Rolling aggregate of LLM token usage and estimated cost per endpoint, model, prompt version and tenant, "
+                "plus the most expensive tickets.",
+)
+async def usage_endpoint(
+    group_by: str = Query(",".join(GROUP_KEYS), description=f"Comma-separated dimensions among {', '.join(GROUP_KEYS)}"),
+    top: int = Query(10, ge=0, le=1000, description="Most expensive tickets to list"),
+):
+    """
+    Expose the usage ledger of this worker over the last USAGE_WINDOW_SECONDS.
+
+    Args:
+        group_by (str): Dimensions of the groups (empty for totals only).
+        top (int): Number of tickets in top_tickets.
+
+    Returns:
+        dict: {"window_seconds", "totals", "groups", "top_tickets"}
+
+    Raises:
+        HTTPException: 422 if group_by names an unknown dimension.
+    """
+    try:
+        return usage_ledger.snapshot(tuple(key.strip() for key in group_by.split(",") if key.strip()), top)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
@@ -1,6 +1,10 @@
-from fastapi import APIRouter
-from app.models import ReplySuggestionRequest, ReplySuggestionResponse
+from fastapi import APIRouter, Header, HTTPException
+from app.models import ReplyApprovalRequest, ReplyApprovalResponse, ReplySuggestionRequest, ReplySuggestionResponse
 from app.services.reply_suggester import suggest_reply_with_llm
+from app.services.reply_templates import TemplateRejected, reply_templates
+from app.services.tenancy import TENANT_HEADER, configured_tenant
+from app.services.admission import degraded_request
+from app.responses import model_response
 
 router = APIRouter()
 
@@ -43,13 +47,58 @@ async def suggest_reply_endpoint(payload: ReplySuggestionRequest):
             "do_not_say": ["We can't help", "Wait longer"]
         }
     """
+    if degraded_request.get():
+        # Shed under overload: answer with the safe fallback without calling the LLM
+        return model_response(_fallback_reply(payload))
     try:
         response = await suggest_reply_with_llm(payload)
-        return response
+        return model_response(response)
     except Exception as e:
         # Fallback safe reply
-        return ReplySuggestionResponse(
-            ticket_id=payload.ticket_id,
-            suggested_reply="Thank you for reaching out. We will get back to you shortly.",
-            confidence=0
-        )
+        return model_response(_fallback_reply(payload))
+
+
+def _fallback_reply(payload: ReplySuggestionRequest) -> ReplySuggestionResponse:
+    return ReplySuggestionResponse(
+        ticket_id=payload.ticket_id,
+        suggested_reply="Thank you for reaching out. We will get back to you shortly.",
+        confidence=0,
+        source="fallback",
+    )
+
+
+@router.post(
+    "/approve",
+    response_model=ReplyApprovalResponse,
+    summary="Approve a reply as a template",
+    description="Indexes an agent-approved reply so similar tickets can reuse it or get it as an example."
+)
+async def approve_reply_endpoint(payload: ReplyApprovalRequest,
+                                 api_key: str | None = Header(None, alias=TENANT_HEADER)):
+    """
+    Index an approved reply for the caller's tenant by risk label, tone, language and channel.
+
+    LOW-risk tickets of the same tenant similar enough to it are answered from it
+    without an LLM call; other tickets of that tenant get it as a few-shot example.
+    Only callers with an API key listed in TENANT_API_KEYS may approve replies, and
+    the reply must use {customer} / {ticket_id} instead of the ticket's own values.
+
+    Args:
+        payload (ReplyApprovalRequest): The ticket and the reply as approved.
+        api_key (str | None): Tenant API key (TENANT_HEADER).
+
+    Returns:
+        ReplyApprovalResponse: Id of the new template and the number indexed.
+
+    Raises:
+        HTTPException: 403 without a configured API key, 422 if the reply names the
+        ticket's customer or id.
+    """
+    tenant = configured_tenant(api_key)
+    if tenant is None:
+        raise HTTPException(status_code=403, detail="Approving replies requires an API key listed in TENANT_API_KEYS")
+    try:
+        template_id = reply_templates.approve(payload.ticket, payload.reply, tenant)
+    except TemplateRejected as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return ReplyApprovalResponse(template_id=template_id, templates=len(reply_templates))
@@ -1,6 +1,14 @@
-from fastapi import APIRouter
-from app.models import TicketAnalyzeRequest, TicketAnalyzeResponse
-from app.services.risk_orchestrator import analyze_one_ticket
+from typing import Literal
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from app.models import Ticket, TicketAnalyzeRequest, TicketAnalyzeResponse, TicketIngestResponse
+from app.services.risk_orchestrator import assess_tickets
+from app.services.ingestion import (
+    WEBHOOK_CALLBACK_URL, CallbackNotAllowed, IngestionBacklogFull, get_batcher, validate_callback_url,
+)
+from app.services.refinement import REFINE_MAX_WAIT_SECONDS, RefinementJob, get_refinements
+from app.responses import model_response
 
 router = APIRouter()
 
@@ -10,16 +18,29 @@ router = APIRouter()
     summary="Analyze support tickets for risk classification.",
     description="Returns risk label, score, reason, and suggested action for each ticket."
 )
-async def analyze_ticket_endpoint(payload: TicketAnalyzeRequest):
+async def analyze_ticket_endpoint(payload: TicketAnalyzeRequest, mode: Literal["full", "fast", "stream"] = "full",
+                                  callback_url: str | None = None):
     """
     Analyze support tickets for risk classification.
 
+    With mode=fast the heuristic results are returned right away, flagged
+    provisional, with a result_id. The LLM-refined results can then be fetched at
+    GET /tickets/results/{result_id} or are POSTed to callback_url when ready.
+    mode=stream answers with NDJSON: the provisional response first, then one
+    refined TicketResult per line as each lands.
+
     Args:
         payload (TicketAnalyzeRequest): List of tickets to analyze.
+        mode (str): "full" (wait for the LLM), "fast" or "stream".
+        callback_url (str | None): mode=fast only: where to POST the refined results
+            (must pass validate_callback_url).
 
     Returns:
         TicketAnalyzeResponse: List of results with risk label, score, reason, and suggested action.
 
+    Raises:
+        HTTPException: 400 if callback_url is not an allowed target.
+
     Example Request:
         {
             "tickets": [
@@ -51,7 +72,98 @@ async def analyze_ticket_endpoint(payload: TicketAnalyzeRequest):
             ]
         }
     """
-    results = []
-    for t in payload.tickets:
-        results.append(await analyze_one_ticket(t))
-    return TicketAnalyzeResponse(results=results)
+    if mode == "fast":
+        if callback_url:
+            await _check_callback(callback_url)
+        job = await get_refinements().start(payload.tickets, callback_url)
+        return model_response(job.response())
+    if mode == "stream":
+        job = await get_refinements().start(payload.tickets)
+        return StreamingResponse(_stream(job), media_type="application/x-ndjson")
+    # Internal assessments are converted to TicketResult only here, at the API boundary
+    results = [a.to_result() for a in await assess_tickets(payload.tickets)]
+    # Results are validated TicketResult objects already: skip re-validation
+    return model_response(TicketAnalyzeResponse.model_construct(results=results))
+
+
+async def _check_callback(callback_url: str) -> None:
+    try:
+        await validate_callback_url(callback_url)
+    except CallbackNotAllowed as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _stream(job: RefinementJob):
+    yield to_json(job.response()) + b"\n"
+    async for result in job.updates():
+        yield to_json(result.to_result()) + b"\n"
+
+
+@router.get(
+    "/results/{result_id}",
+    response_model=TicketAnalyzeResponse,
+    summary="Fetch the results of a fast-mode analysis.",
+    description="Returns the latest results of a mode=fast request; provisional ones are still being refined."
+)
+async def get_results_endpoint(result_id: str, wait: float = 0):
+    """
+    Fetch the results of a /tickets/analyze?mode=fast request.
+
+    Any worker can answer when REFINE_STORE_PATH is set (the multi-worker launcher
+    sets it); otherwise only the worker that issued the result_id knows it.
+
+    Args:
+        result_id (str): The result_id returned by the fast request.
+        wait (float): Seconds to wait for the refinement to finish (long poll,
+            capped at REFINE_MAX_WAIT_SECONDS).
+
+    Returns:
+        TicketAnalyzeResponse: Refined results, or provisional ones still in progress.
+
+    Raises:
+        HTTPException: 404 for an unknown or expired result id.
+    """
+    response = await get_refinements().fetch(result_id, min(max(wait, 0), REFINE_MAX_WAIT_SECONDS))
+    if response is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired result_id")
+    return model_response(response)
+
+
+@router.post(
+    "/ingest",
+    response_model=TicketIngestResponse,
+    status_code=202,
+    summary="Accept a single ticket from a webhook for batched analysis.",
+    description="Acknowledges immediately; results are POSTed to the callback URL in micro-batches."
+)
+async def ingest_ticket_endpoint(ticket: Ticket, callback_url: str | None = None):
+    """
+    Accept one ticket pushed by a helpdesk webhook.
+
+    The ticket joins a micro-batch (WEBHOOK_BATCH_SIZE tickets or WEBHOOK_BATCH_WINDOW_MS)
+    that runs through the same pipeline as /tickets/analyze. The batch's results are
+    POSTed to the callback URL as a TicketAnalyzeResponse body.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
+        callback_url (str | None): Where to deliver results (default: WEBHOOK_CALLBACK_URL;
+            any other URL must pass validate_callback_url).
+
+    Returns:
+        TicketIngestResponse: 202 acknowledgement.
+
+    Raises:
+        HTTPException: 400 without a callback URL or with a disallowed one, 429 when
+        the ingestion backlog is full.
+    """
+    if callback_url:
+        await _check_callback(callback_url)
+    callback_url = callback_url or WEBHOOK_CALLBACK_URL
+    if not callback_url:
+        raise HTTPException(status_code=400, detail="callback_url is required (or set WEBHOOK_CALLBACK_URL)")
+    try:
+        get_batcher().add(ticket, callback_url)
+    except IngestionBacklogFull:
+        raise HTTPException(status_code=429, detail="Ingestion backlog full, retry later",
+                            headers={"Retry-After": "1"})
+    return model_response(TicketIngestResponse(ticket_id=ticket.id), status_code=202)
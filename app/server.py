@@ -0,0 +1,119 @@
+"""
+Production launcher: multi-process uvicorn sized to the container's CPUs.
+
+Usage:
+    python -m app.server [--workers N] [--host 0.0.0.0] [--port 8000]
+
+Each worker is a separate process with its own event loop, provider connection
+pools and caches (created in the app lifespan, see app.main). uvloop and httptools
+are used when installed. On SIGTERM uvicorn stops accepting connections, waits up to
+GRACEFUL_TIMEOUT seconds for in-flight requests, then the lifespan drains pending
+LLM calls before closing clients.
+"""
+import argparse
+import importlib.util
+import os
+import sys
+import tempfile
+import uvicorn
+
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+KEEPALIVE_TIMEOUT = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+# Restart a worker after this many requests to bound memory growth (0 = never)
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0"))
+# cgroup v2 "quota period" file, and the cgroup v1 quota / period files
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, encoding="ascii") as f:
+            return f.read().strip()
+    except (OSError, ValueError):
+        return None
+
+
+def cpu_quota() -> float | None:
+    """
+    CPU time the container may use, in CPUs, from the cgroup CFS quota.
+
+    Returns:
+        float | None: quota / period (e.g. 0.5 on a half-CPU plan), or None when
+        no quota is set or the cgroup files are unreadable.
+    """
+    cpu_max = _read(CGROUP_CPU_MAX)
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+    else:
+        quota, period = _read(CGROUP_V1_QUOTA), _read(CGROUP_V1_PERIOD)
+    try:
+        quota_us, period_us = int(quota), int(period or 100_000)
+    except (TypeError, ValueError):
+        return None  # "max" (v2), missing files
+    if quota_us <= 0 or period_us <= 0:
+        return None  # -1 (v1): unlimited
+    return quota_us / period_us
+
+
+def cpu_count() -> int:
+    """
+    CPUs usable by this process: its affinity set, capped by the cgroup CPU quota.
+
+    A fractional quota rounds down (at least 1), so a container limited to 0.5 or
+    1.5 CPUs runs one worker rather than several processes fighting over the quota.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return cpus
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or cpu_count())
+
+
+def _has(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def server_options(workers: int, host: str, port: int) -> dict:
+    """Build uvicorn.run keyword arguments for the production profile."""
+    return {
+        "host": host,
+        "port": port,
+        "workers": workers,
+        "loop": "uvloop" if _has("uvloop") else "asyncio",
+        "http": "httptools" if _has("httptools") else "h11",
+        "lifespan": "on",
+        "proxy_headers": True,
+        "access_log": os.getenv("ACCESS_LOG", "false").lower() == "true",
+        "timeout_keep_alive": KEEPALIVE_TIMEOUT,
+        "timeout_graceful_shutdown": GRACEFUL_TIMEOUT,
+        "limit_max_requests": MAX_REQUESTS or None,
+        "backlog": 2048,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the API with multiple worker processes.")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    args = parser.parse_args(argv)
+
+    workers = max(1, args.workers)
+    if workers > 1 and not os.getenv("REFINE_STORE_PATH"):
+        # Fast-mode results must be readable from every worker, not just the one that made them
+        os.environ["REFINE_STORE_PATH"] = os.path.join(tempfile.gettempdir(), f"refinements-{os.getpid()}.sqlite")
+    uvicorn.run("app.main:app", **server_options(workers, args.host, args.port))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
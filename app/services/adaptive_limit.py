@@ -0,0 +1,189 @@
+import asyncio
+import os
+import time
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import Hashable
+from contextlib import asynccontextmanager
+from app.services.metrics import metrics
+
+# Adaptive in-flight limit for upstream LLM calls (per provider, per event loop).
+# The limit grows by ~1 per round trip while latency stays near the observed
+# no-load latency and shrinks multiplicatively on errors or latency inflation.
+LLM_ADAPTIVE_LIMIT = os.getenv("LLM_ADAPTIVE_LIMIT", "true").lower() == "true"
+LLM_LIMIT_INITIAL = int(os.getenv("LLM_LIMIT_INITIAL", "8"))
+LLM_LIMIT_MIN = int(os.getenv("LLM_LIMIT_MIN", "1"))
+LLM_LIMIT_MAX = int(os.getenv("LLM_LIMIT_MAX") or os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Latency above this multiple of the no-load latency counts as congestion
+LLM_LIMIT_LATENCY_TOLERANCE = float(os.getenv("LLM_LIMIT_LATENCY_TOLERANCE", "2.0"))
+LATENCY_BACKOFF = 0.9
+ERROR_BACKOFF = 0.5
+# Samples used to estimate the no-load latency (windowed minimum)
+_BASELINE_WINDOW = 200
+# Workloads (model, prompt version) with their own no-load latency, least recently seen dropped
+_MAX_WORKLOADS = 64
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter driven by observed latency and errors.
+
+    - Additive increase: each successful call completing while at least half the
+      limit is in use adds 1/limit, i.e. under +1 per round trip of a full window.
+    - Multiplicative decrease: an error multiplies the limit by ERROR_BACKOFF, a call
+      slower than latency_tolerance x the no-load latency by LATENCY_BACKOFF. At most
+      one decrease per observed round trip, so one burst of slow calls that were all
+      in flight together counts once.
+
+    The no-load latency is the minimum of the last samples of the same workload
+    (model and prompt version as passed by adaptive_slot): the limit is shared by
+    every call to the provider, but a bigger model or a longer prompt is compared
+    with its own baseline, so mixing it with fast calls does not read as congestion.
+    Calls over the limit wait in FIFO order.
+
+    Args:
+        name (str): Provider name used in metric labels.
+        initial (int): Starting limit.
+        min_limit (int): Lowest limit.
+        max_limit (int): Highest limit.
+        latency_tolerance (float): Congestion threshold as a multiple of no-load latency.
+    """
+
+    def __init__(self, name: str, initial: int = LLM_LIMIT_INITIAL, min_limit: int = LLM_LIMIT_MIN,
+                 max_limit: int = LLM_LIMIT_MAX, latency_tolerance: float = LLM_LIMIT_LATENCY_TOLERANCE):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future] = deque()
+        self._samples: OrderedDict[Hashable, deque[float]] = OrderedDict()
+        self._last_decrease = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def baseline(self, workload: Hashable = ()) -> float | None:
+        """No-load latency of a workload, None until one of its calls succeeded."""
+        samples = self._samples.get(workload)
+        return min(samples) if samples else None
+
+    def _record_sample(self, workload: Hashable, latency: float) -> None:
+        samples = self._samples.get(workload)
+        if samples is None:
+            samples = self._samples[workload] = deque(maxlen=_BASELINE_WINDOW)
+            while len(self._samples) > _MAX_WORKLOADS:
+                self._samples.popitem(last=False)
+        else:
+            self._samples.move_to_end(workload)
+        samples.append(latency)
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_concurrency_limit", round(self.limit, 2), provider=self.name)
+        metrics.set_gauge("llm_in_flight", self.in_flight, provider=self.name)
+        metrics.set_gauge("llm_queue_depth", self.queue_depth, provider=self.name)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    async def acquire(self) -> None:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                self._wake()
+            raise
+        self._publish()
+
+    def release(self, latency: float, error: bool = False, workload: Hashable = (),
+                cancelled: bool = False) -> None:
+        """Record the outcome of one call (compared with its workload's baseline) and adjust the limit."""
+        # Only grow a limit that is actually used (at least half of it in flight)
+        saturated = self.in_flight * 2 >= self.limit or bool(self._waiters)
+        self.in_flight -= 1
+        if cancelled:
+            # The call was abandoned before the upstream answered: its latency says nothing
+            self._wake()
+            self._publish()
+            return
+        now = time.monotonic()
+        baseline = self.baseline(workload)
+        congested = baseline is not None and latency > baseline * self.latency_tolerance
+        if not error:
+            self._record_sample(workload, latency)
+
+        if error or congested:
+            # One decrease per round trip: calls issued before the last cut are stale signals
+            if now - self._last_decrease >= (baseline or latency):
+                self.limit = max(self.min_limit, self.limit * (ERROR_BACKOFF if error else LATENCY_BACKOFF))
+                self._last_decrease = now
+                metrics.inc("llm_limit_decreases", provider=self.name, reason="error" if error else "latency")
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+        self._publish()
+
+
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, AdaptiveLimiter]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_limiter(name: str, max_limit: int = LLM_LIMIT_MAX) -> AdaptiveLimiter:
+    """Return the limiter of a provider on the running event loop (created with max_limit)."""
+    loop = asyncio.get_running_loop()
+    per_loop = _limiters.setdefault(loop, {})
+    limiter = per_loop.get(name)
+    if limiter is None:
+        limiter = per_loop[name] = AdaptiveLimiter(name, max_limit=max_limit)
+    return limiter
+
+
+@asynccontextmanager
+async def adaptive_slot(name: str, max_limit: int = LLM_LIMIT_MAX,
+                        ignored_errors: tuple[type[BaseException], ...] = (), workload: Hashable = ()):
+    """
+    Hold an adaptive-limit slot around one upstream call.
+
+    Any exception other than ignored_errors counts as an overload signal (timeouts,
+    429s, 5xx, connection errors). A cancelled call only frees its slot.
+
+    Args:
+        name (str): Provider name.
+        max_limit (int): Upper bound of the limit (the provider's hard cap).
+        ignored_errors: Exception types that say nothing about upstream load.
+        workload (Hashable): Calls with comparable no-load latency, e.g. (model, prompt_version).
+    """
+    if not LLM_ADAPTIVE_LIMIT:
+        yield
+        return
+    limiter = get_limiter(name, min(max_limit, LLM_LIMIT_MAX))
+    await limiter.acquire()
+    start = time.perf_counter()
+    error = cancelled = False
+    try:
+        yield
+    except ignored_errors:
+        raise
+    except Exception:
+        error = True
+        raise
+    except BaseException:
+        cancelled = True
+        raise
+    finally:
+        limiter.release(time.perf_counter() - start, error=error, workload=workload, cancelled=cancelled)
@@ -0,0 +1,273 @@
+import asyncio
+import heapq
+import itertools
+import json
+import math
+import os
+import time
+import weakref
+from contextvars import ContextVar
+from app.services.metrics import metrics
+
+# Admission control at the API edge (per worker process). At most
+# ADMISSION_MAX_IN_FLIGHT requests to the guarded paths run at once (0 = disabled);
+# the rest queue by priority. A request that would wait longer than
+# ADMISSION_MAX_WAIT_MS is shed: rejected with 429 + Retry-After, or degraded
+# to heuristic-only results, depending on ADMISSION_POLICY.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "64"))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
+# Shedding action per "path" or "path:priority", most specific wins:
+# "/tickets/analyze=degrade,/tickets/analyze:low=reject"
+ADMISSION_POLICY = os.getenv("ADMISSION_POLICY", "/tickets/analyze=degrade,/tickets/analyze:low=reject")
+ADMISSION_DEFAULT_ACTION = os.getenv("ADMISSION_DEFAULT_ACTION", "reject")
+ADMISSION_PRIORITY_HEADER = os.getenv("ADMISSION_PRIORITY_HEADER", "x-priority")
+ADMISSION_PATHS = ("/tickets/analyze", "/replies/suggest-reply")
+
+PRIORITIES = {"high": 0, "normal": 1, "low": 2}
+SHED_ACTIONS = ("reject", "degrade")
+
+# Set for requests admitted in degraded mode: endpoints skip LLM calls
+degraded_request: ContextVar[bool] = ContextVar("degraded_request", default=False)
+
+
+def parse_policy(raw: str) -> dict[str, str]:
+    """
+    Parse ADMISSION_POLICY into {"path" | "path:priority": action}.
+
+    Raises:
+        ValueError: If an action or priority is unknown.
+    """
+    policy = {}
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        key, action = (part.strip() for part in item.split("=", 1))
+        path, _, priority = key.partition(":")
+        if action not in SHED_ACTIONS:
+            raise ValueError(f"Unknown admission action '{action}' for '{key}' (expected reject or degrade)")
+        if priority and priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority '{priority}' in admission policy '{key}'")
+        policy[key] = action
+    return policy
+
+
+_POLICY = parse_policy(ADMISSION_POLICY)
+
+
+def shed_action(path: str, priority: str, policy: dict[str, str] | None = None) -> str:
+    """Action taken when a request to `path` with `priority` cannot be admitted."""
+    policy = _POLICY if policy is None else policy
+    return policy.get(f"{path}:{priority}") or policy.get(path) or ADMISSION_DEFAULT_ACTION
+
+
+class AdmissionController:
+    """
+    In-flight cap with a priority queue bounded by expected wait.
+
+    Waiting requests are served by priority (high, normal, low), then arrival. A
+    request is shed on arrival if the expected wait (queue ahead of it x mean
+    service time / capacity) already exceeds max_wait, and after max_wait if it is
+    still queued, so overload turns into fast rejections instead of timeouts.
+
+    Args:
+        capacity (int): Requests allowed in flight.
+        max_wait (float): Longest queue wait in seconds.
+    """
+
+    def __init__(self, capacity: int = ADMISSION_MAX_IN_FLIGHT, max_wait: float = ADMISSION_MAX_WAIT_MS / 1000):
+        self.capacity = max(1, capacity)
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.service_time = 0.0  # EWMA of admitted request durations
+        self._waiters: list[tuple] = []
+        self._seq = itertools.count()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self, rank: int = len(PRIORITIES)) -> float:
+        """Seconds a new request of priority rank would wait, from queue depth and service time."""
+        ahead = sum(1 for entry in self._waiters if entry[0] <= rank and not entry[2].done())
+        if self.in_flight < self.capacity and not ahead:
+            return 0.0
+        return (ahead + 1) * self.service_time / self.capacity
+
+    def retry_after(self) -> int:
+        """Whole seconds until the current queue should have drained (at least 1)."""
+        return max(1, math.ceil(self.expected_wait()))
+
+    def _publish(self) -> None:
+        metrics.set_gauge("admission_in_flight", self.in_flight)
+        metrics.set_gauge("admission_queue_depth", self.queue_depth)
+
+    def _dispatch(self) -> None:
+        while self._waiters and self.in_flight < self.capacity:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+        self._publish()
+
+    async def admit(self, priority: str = "normal") -> bool:
+        """
+        Wait for an in-flight slot.
+
+        Returns:
+            bool: True if admitted (call release() when done), False if shed.
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES["normal"])
+        if self.in_flight < self.capacity and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return True
+        if self.expected_wait(rank) > self.max_wait:
+            return False
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (rank, next(self._seq), future))
+        self._publish()
+        waited = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            return False
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(None)
+            raise
+        finally:
+            metrics.observe("admission_queue_wait", time.perf_counter() - waited, priority=priority)
+            self._publish()
+        return True
+
+    def release(self, duration: float | None) -> None:
+        """Free a slot; duration (seconds) updates the service-time estimate."""
+        self.in_flight -= 1
+        if duration is not None:
+            self.service_time = duration if not self.service_time else 0.8 * self.service_time + 0.2 * duration
+        self._dispatch()
+
+
+class AdmissionSlot:
+    """
+    In-flight slot of an admitted request.
+
+    The middleware releases it when the response is sent, unless the endpoint called
+    hold(): work that outlives the response (fast-mode refinement) then keeps the
+    slot and calls release() when it finishes.
+    """
+
+    __slots__ = ("controller", "started", "held", "_released")
+
+    def __init__(self, controller: AdmissionController):
+        self.controller = controller
+        self.started = time.perf_counter()
+        self.held = False
+        self._released = False
+
+    def hold(self) -> "AdmissionSlot":
+        self.held = True
+        return self
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.controller.release(time.perf_counter() - self.started)
+
+
+# Slot of the admitted request being served (None on unguarded paths)
+current_admission: ContextVar[AdmissionSlot | None] = ContextVar("current_admission", default=None)
+
+
+_controllers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AdmissionController]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the controller of the running event loop."""
+    loop = asyncio.get_running_loop()
+    controller = _controllers.get(loop)
+    if controller is None:
+        controller = _controllers[loop] = AdmissionController()
+    return controller
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying admission control to ADMISSION_PATHS.
+
+    The request priority comes from the ADMISSION_PRIORITY_HEADER header
+    (high | normal | low, default normal). Degraded requests run with
+    degraded_request set and carry an "X-Degraded: true" response header. An
+    admitted request's slot is bound to current_admission, so background work it
+    starts can hold the slot until that work is done.
+
+    Args:
+        app: Wrapped ASGI app.
+        policy (dict[str, str] | None): Shedding actions (default: ADMISSION_POLICY).
+        enabled (bool): Apply admission control (default: ADMISSION_MAX_IN_FLIGHT > 0).
+        controller (AdmissionController | None): Fixed controller (default: one per event loop).
+    """
+
+    def __init__(self, app, policy: dict[str, str] | None = None, enabled: bool = ADMISSION_MAX_IN_FLIGHT > 0,
+                 controller: AdmissionController | None = None):
+        self.app = app
+        self.policy = policy
+        self.enabled = enabled
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"] not in ADMISSION_PATHS:
+            await self.app(scope, receive, send)
+            return
+        header = ADMISSION_PRIORITY_HEADER.lower().encode("latin-1")
+        priority = next((v.decode("latin-1").lower() for k, v in scope["headers"] if k == header), "normal")
+        if priority not in PRIORITIES:
+            priority = "normal"
+
+        controller = self.controller or get_admission_controller()
+        if await controller.admit(priority):
+            metrics.inc("admission_admitted", path=scope["path"], priority=priority)
+            slot = AdmissionSlot(controller)
+            token = current_admission.set(slot)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_admission.reset(token)
+                if not slot.held:
+                    slot.release()
+            return
+
+        action = shed_action(scope["path"], priority, self.policy)
+        metrics.inc("admission_shed", path=scope["path"], priority=priority, action=action)
+        if action == "degrade":
+            await self._degraded(scope, receive, send)
+        else:
+            await self._reject(send, controller.retry_after())
+
+    async def _degraded(self, scope, receive, send):
+        async def send_flagged(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-degraded", b"true")]}
+            await send(message)
+
+        token = degraded_request.set(True)
+        try:
+            await self.app(scope, receive, send_flagged)
+        finally:
+            degraded_request.reset(token)
+
+    @staticmethod
+    async def _reject(send, retry_after: int):
+        body = json.dumps({"detail": "Server overloaded, retry later"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(retry_after).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,58 @@
+import sys
+from dataclasses import dataclass, field
+from app.models import RiskLabel, TicketResult
+
+BREAKDOWN_KEYS = ("escalation", "churn", "sla", "sentiment")
+
+
+def intern_signal(signal: str) -> str:
+    """Intern a signal drawn from a bounded vocabulary so repeats share one object."""
+    return sys.intern(signal)
+
+
+@dataclass(slots=True)
+class RiskAssessment:
+    """
+    Internal, allocation-light result passed between pipeline stages.
+
+    The breakdown is stored as four int slots instead of a dict and heuristic
+    signals are interned strings. Convert with to_result() only at the API boundary.
+    """
+
+    id: str
+    risk_score: int = 0
+    risk_label: RiskLabel = RiskLabel.LOW
+    reason: str = ""
+    suggested_action: str = ""
+    escalation: int = 0
+    churn: int = 0
+    sla: int = 0
+    sentiment: int = 0
+    signals: list[str] = field(default_factory=list)
+    language: str = "en-US"
+    degraded: bool = False
+    provisional: bool = False
+
+    @property
+    def breakdown(self) -> dict[str, int]:
+        return {
+            "escalation": self.escalation,
+            "churn": self.churn,
+            "sla": self.sla,
+            "sentiment": self.sentiment,
+        }
+
+    def to_result(self) -> TicketResult:
+        """Build the public TicketResult (fields are already valid, so validation is skipped)."""
+        return TicketResult.model_construct(
+            id=self.id,
+            risk_score=self.risk_score,
+            risk_label=self.risk_label,
+            reason=self.reason,
+            suggested_action=self.suggested_action,
+            debug_signals=list(self.signals),
+            risk_breakdown=self.breakdown,
+            language=self.language,
+            degraded=self.degraded,
+            provisional=self.provisional,
+        )
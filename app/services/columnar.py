@@ -0,0 +1,257 @@
+import csv
+import gzip
+from typing import Iterable, Iterator
+from pydantic import TypeAdapter
+from app.models import RiskLabel, Ticket
+from app.services.assessment import BREAKDOWN_KEYS, RiskAssessment, intern_signal
+
+# Parquet / Arrow support needs the optional pyarrow package; CSV works without it
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the environment
+    pa = pq = None
+
+COLUMNAR_BATCH_SIZE = 10_000
+
+TICKET_COLUMNS = ("id", "customer", "channel", "last_message", "conversation_summary", "sla_hours_open", "language")
+# risk_breakdown is flattened into one integer column per component
+RESULT_COLUMNS = ("id", "risk_score", "risk_label", "reason", "suggested_action", *BREAKDOWN_KEYS,
+                  "debug_signals", "language", "degraded")
+# Separator of debug_signals inside a CSV cell
+CSV_SIGNAL_SEPARATOR = "|"
+
+_TICKETS = TypeAdapter(list[Ticket])
+
+
+def columnar_format(path: str) -> str:
+    """
+    Format of a file from its extension: "parquet", "arrow" (IPC stream) or "csv" (".csv" or ".csv.gz").
+
+    Raises:
+        ValueError: On an unknown extension.
+        RuntimeError: For Parquet/Arrow when pyarrow is not installed.
+    """
+    lowered = path.lower()
+    if lowered.endswith((".csv", ".csv.gz")):
+        return "csv"
+    for fmt, suffixes in (("parquet", (".parquet", ".pq")), ("arrow", (".arrow", ".arrows"))):
+        if lowered.endswith(suffixes):
+            if pa is None:
+                raise RuntimeError(f"{fmt} files need pyarrow (pip install pyarrow); use .csv instead")
+            return fmt
+    raise ValueError(f"Unsupported file type: {path} (expected .parquet, .arrow, .csv or .csv.gz)")
+
+
+def _open_text(path: str, mode: str):
+    if path.lower().endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def read_tickets(path: str, batch_size: int = COLUMNAR_BATCH_SIZE) -> Iterator[list[Ticket]]:
+    """
+    Stream tickets from a Parquet, Arrow or CSV file in batches.
+
+    Columns are the Ticket fields (language is optional). Only one batch is held in
+    memory at a time.
+
+    Args:
+        path (str): Input file.
+        batch_size (int): Tickets per yielded batch.
+
+    Yields:
+        list[Ticket]: Validated tickets.
+
+    Raises:
+        pydantic.ValidationError: If a row is not a valid ticket.
+    """
+    fmt = columnar_format(path)
+    if fmt == "csv":
+        with _open_text(path, "r") as fh:
+            rows = []
+            for row in csv.DictReader(fh):
+                if not row.get("language"):
+                    row.pop("language", None)
+                rows.append(row)
+                if len(rows) >= batch_size:
+                    yield _TICKETS.validate_python(rows)
+                    rows = []
+            if rows:
+                yield _TICKETS.validate_python(rows)
+        return
+
+    columns = None
+    for batch in _arrow_batches(path, fmt, batch_size):
+        if columns is None:
+            columns = [c for c in TICKET_COLUMNS if c in batch.schema.names]
+        yield _TICKETS.validate_python(batch.select(columns).to_pylist())
+
+
+def _arrow_batches(path: str, fmt: str, batch_size: int, nested: bool = False):
+    if fmt == "parquet":
+        parquet = pq.ParquetFile(path)
+        if not nested:
+            yield from parquet.iter_batches(batch_size=batch_size)
+            return
+        # Arrow cannot stream list<dictionary> columns across row-group boundaries:
+        # read one row group (one ResultWriter.write() batch) at a time instead
+        for index in range(parquet.num_row_groups):
+            yield from parquet.read_row_group(index).to_batches(max_chunksize=batch_size)
+        return
+    with pa.memory_map(path) as source:
+        for batch in pa.ipc.open_stream(source):
+            # Re-chunk so batch_size holds whatever the writer used
+            for offset in range(0, batch.num_rows, batch_size):
+                yield batch.slice(offset, batch_size)
+
+
+def result_schema():
+    """Arrow schema of exported results (strings repeated across rows are dictionary-encoded)."""
+    label = pa.dictionary(pa.int8(), pa.string())
+    text = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("id", pa.string()),
+        ("risk_score", pa.int16()),
+        ("risk_label", label),
+        ("reason", text),
+        ("suggested_action", text),
+        *((key, pa.int16()) for key in BREAKDOWN_KEYS),
+        ("debug_signals", pa.list_(text)),
+        ("language", label),
+        ("degraded", pa.bool_()),
+    ])
+
+
+class ResultWriter:
+    """
+    Streams RiskAssessment batches to a Parquet, Arrow IPC stream or CSV file.
+
+    Each write() becomes one row group / record batch / block of CSV rows, so
+    memory is bounded by the batch size. Assessments are read attribute by
+    attribute, without building TicketResult models. In Parquet and Arrow,
+    debug_signals is a list of dictionary-encoded strings; in CSV it is one
+    "|"-joined text cell.
+
+    Args:
+        path (str): Output file (format from the extension, see columnar_format).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.format = columnar_format(path)
+        self.rows = 0
+        self._sink = None
+        self._writer = None
+
+    def __enter__(self) -> "ResultWriter":
+        if self.format == "csv":
+            self._sink = _open_text(self.path, "w")
+            self._writer = csv.writer(self._sink)
+            self._writer.writerow(RESULT_COLUMNS)
+        elif self.format == "parquet":
+            self._writer = pq.ParquetWriter(self.path, result_schema(), compression="zstd")
+        else:
+            self._sink = pa.OSFile(self.path, "wb")
+            self._writer = pa.ipc.new_stream(self._sink, result_schema(),
+                                             options=pa.ipc.IpcWriteOptions(compression="zstd"))
+        return self
+
+    def write(self, assessments: Iterable[RiskAssessment]) -> None:
+        assessments = list(assessments)
+        if self.format == "csv":
+            self._writer.writerows(
+                (a.id, a.risk_score, a.risk_label.value, a.reason, a.suggested_action,
+                 a.escalation, a.churn, a.sla, a.sentiment,
+                 CSV_SIGNAL_SEPARATOR.join(a.signals), a.language, int(a.degraded))
+                for a in assessments
+            )
+        else:
+            self._writer.write_batch(_record_batch(assessments))
+        self.rows += len(assessments)
+
+    def __exit__(self, *exc) -> None:
+        if self.format != "csv":
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+
+def _record_batch(assessments: list[RiskAssessment]):
+    schema = result_schema()
+    offsets = [0]
+    signals: list[str] = []
+    for a in assessments:
+        signals.extend(a.signals)
+        offsets.append(len(signals))
+
+    def encoded(values, field: str):
+        return pa.array(values, type=pa.string()).dictionary_encode().cast(schema.field(field).type)
+
+    columns = {
+        "id": pa.array([a.id for a in assessments], type=pa.string()),
+        "risk_score": pa.array([a.risk_score for a in assessments], type=pa.int16()),
+        "risk_label": encoded([a.risk_label.value for a in assessments], "risk_label"),
+        "reason": encoded([a.reason for a in assessments], "reason"),
+        "suggested_action": encoded([a.suggested_action for a in assessments], "suggested_action"),
+        **{key: pa.array([getattr(a, key) for a in assessments], type=pa.int16()) for key in BREAKDOWN_KEYS},
+        "debug_signals": pa.ListArray.from_arrays(
+            pa.array(offsets, type=pa.int32()),
+            pa.array(signals, type=pa.string()).dictionary_encode().cast(schema.field("debug_signals").type.value_type),
+        ),
+        "language": encoded([a.language for a in assessments], "language"),
+        "degraded": pa.array([a.degraded for a in assessments], type=pa.bool_()),
+    }
+    return pa.record_batch([columns[name] for name in schema.names], schema=schema)
+
+
+def read_results(path: str, batch_size: int = COLUMNAR_BATCH_SIZE) -> Iterator[list[RiskAssessment]]:
+    """
+    Stream results written by ResultWriter back as RiskAssessment batches.
+
+    Args:
+        path (str): File written by ResultWriter.
+        batch_size (int): Results per yielded batch.
+
+    Yields:
+        list[RiskAssessment]: Results; call to_result() for the API model.
+    """
+    fmt = columnar_format(path)
+    if fmt == "csv":
+        with _open_text(path, "r") as fh:
+            batch = []
+            for row in csv.DictReader(fh):
+                signals = row["debug_signals"]
+                batch.append(RiskAssessment(
+                    id=row["id"],
+                    risk_score=int(row["risk_score"]),
+                    risk_label=RiskLabel(row["risk_label"]),
+                    reason=row["reason"],
+                    suggested_action=row["suggested_action"],
+                    **{key: int(row[key]) for key in BREAKDOWN_KEYS},
+                    signals=[intern_signal(s) for s in signals.split(CSV_SIGNAL_SEPARATOR)] if signals else [],
+                    language=row["language"],
+                    degraded=row["degraded"] == "1",
+                ))
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        return
+
+    for record_batch in _arrow_batches(path, fmt, batch_size, nested=True):
+        yield [
+            RiskAssessment(
+                id=row["id"],
+                risk_score=row["risk_score"],
+                risk_label=RiskLabel(row["risk_label"]),
+                reason=row["reason"],
+                suggested_action=row["suggested_action"],
+                **{key: row[key] for key in BREAKDOWN_KEYS},
+                signals=row["debug_signals"],
+                language=row["language"],
+                degraded=row["degraded"],
+            )
+            for row in record_batch.to_pylist()
+        ]
@@ -0,0 +1,141 @@
+import math
+import os
+import re
+from app.models import Ticket
+from app.services.risk_analyzer import find_risk_keywords
+
+# Total prompt tokens allowed for the free-text ticket fields.
+INPUT_TOKEN_BUDGET = int(os.getenv("LLM_INPUT_TOKEN_BUDGET", "600"))
+# Share of the budget reserved for the latest customer message.
+LAST_MESSAGE_SHARE = 0.5
+# Average characters per BPE token for long words (conservative for pt-BR/en-US).
+_CHARS_PER_TOKEN = 4
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+|\n+")
+_ELLIPSIS = " [...] "
+
+
+def count_tokens(text: str) -> int:
+    """
+    Approximate the number of LLM tokens in a text without calling a tokenizer.
+
+    Every punctuation mark counts as one token and every word counts as one token
+    per started block of 4 characters, which slightly over-estimates BPE counts so
+    the budget is never exceeded upstream.
+
+    Args:
+        text (str): Text to measure.
+
+    Returns:
+        int: Estimated token count.
+    """
+    return sum(math.ceil(len(tok) / _CHARS_PER_TOKEN) for tok in _TOKEN_RE.findall(text))
+
+
+def _split_sentences(text: str) -> list[str]:
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def _truncate_tokens(text: str, budget: int, keep_tail: bool = False) -> str:
+    """Hard-cut a text to the budget, keeping its head (or tail)."""
+    tokens = list(_TOKEN_RE.finditer(text))
+    if keep_tail:
+        tokens.reverse()
+    used = 0
+    cut = None
+    for tok in tokens:
+        used += math.ceil(len(tok.group()) / _CHARS_PER_TOKEN)
+        if used > budget:
+            break
+        cut = tok
+    if cut is None:
+        return ""
+    return text[cut.start():].strip() if keep_tail else text[:cut.end()].strip()
+
+
+def compress_text(text: str, budget: int, keep_tail: bool = False, language: str | None = None) -> str:
+    """
+    Compress a text to a token budget with extractive heuristics.
+
+    Sentences containing risk keywords (escalation, churn, negative tone) are kept
+    first, then the most recent sentences (or the opening ones when keep_tail is
+    False and the text has no risk signal). Selected sentences keep their original
+    order; gaps are marked with "[...]".
+
+    Args:
+        text (str): Text to compress.
+        budget (int): Maximum number of tokens (see count_tokens).
+        keep_tail (bool): Prefer the end of the text when filling the budget.
+        language (str | None): Language whose risk lexicon is used (None = all lexicons).
+
+    Returns:
+        str: The text itself if it already fits, otherwise an extract within budget.
+    """
+    if budget <= 0:
+        return ""
+    if count_tokens(text) <= budget:
+        return text
+
+    sentences = _split_sentences(text)
+    costs = [count_tokens(s) for s in sentences]
+    last = len(sentences) - 1
+
+    def priority(i: int) -> tuple:
+        risk = 1 if find_risk_keywords(sentences[i], language) else 0
+        recency = i if keep_tail else last - i
+        return (risk, recency)
+
+    selected: set[int] = set()
+    used = 0
+    for i in sorted(range(len(sentences)), key=priority, reverse=True):
+        # Reserve room for the gap markers between kept sentences
+        cost = costs[i] + count_tokens(_ELLIPSIS)
+        if used + cost <= budget:
+            selected.add(i)
+            used += cost
+
+    if not selected:
+        # A single sentence is larger than the budget: cut it directly
+        return _truncate_tokens(text, budget, keep_tail=keep_tail)
+
+    parts: list[str] = []
+    previous = -1
+    for i in sorted(selected):
+        if parts and i != previous + 1:
+            parts.append(_ELLIPSIS.strip())
+        parts.append(sentences[i])
+        previous = i
+    return " ".join(parts)
+
+
+def prepare_ticket(ticket: Ticket, budget: int = INPUT_TOKEN_BUDGET) -> Ticket:
+    """
+    Fit a ticket's free-text fields into the LLM input token budget.
+
+    The latest message keeps its tail (newest content) and the conversation summary
+    keeps risk-bearing sentences first. Budget left unused by one field is given to
+    the other.
+
+    Args:
+        ticket (Ticket): Ticket as received by the API (may be long).
+        budget (int): Token budget for last_message + conversation_summary.
+
+    Returns:
+        Ticket: The same ticket if it fits, otherwise a compressed copy.
+    """
+    message_tokens = count_tokens(ticket.last_message)
+    summary_tokens = count_tokens(ticket.conversation_summary)
+    if message_tokens + summary_tokens <= budget:
+        return ticket
+
+    message_budget = max(int(budget * LAST_MESSAGE_SHARE), budget - summary_tokens)
+    last_message = compress_text(ticket.last_message, message_budget, keep_tail=True,
+                                 language=ticket.language)
+    summary_budget = budget - count_tokens(last_message)
+    conversation_summary = compress_text(ticket.conversation_summary, summary_budget, language=ticket.language)
+
+    return ticket.model_copy(update={
+        "last_message": last_message,
+        "conversation_summary": conversation_summary,
+    })
@@ -0,0 +1,193 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+from app.services.metrics import metrics
+
+# Where CPU-bound pipeline stages (heuristics, normalization, token counting) run:
+# "inline" on the event loop, "thread" in a thread pool (keeps the loop responsive)
+# or "process" in a process pool (scales across cores, pays pickling per batch).
+CPU_EXECUTOR = os.getenv("CPU_EXECUTOR", "thread")
+CPU_EXECUTOR_WORKERS = int(os.getenv("CPU_EXECUTOR_WORKERS") or os.cpu_count() or 1)
+# Items submitted one by one are grouped into batches of up to CPU_BATCH_SIZE,
+# waiting at most CPU_BATCH_WINDOW_MS for more to arrive, to amortize IPC
+CPU_BATCH_SIZE = int(os.getenv("CPU_BATCH_SIZE", "32"))
+CPU_BATCH_WINDOW_MS = float(os.getenv("CPU_BATCH_WINDOW_MS", "1"))
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def _run_batch(fn: Callable, items: list) -> tuple[list, float]:
+    """Run fn over a batch inside the worker and return results with compute seconds."""
+    start = time.perf_counter()
+    results = [fn(item) for item in items]
+    return results, time.perf_counter() - start
+
+
+def _run_batched(fn: Callable, items: list) -> tuple[list, float]:
+    """Run a batch function (list in, list out) inside the worker and return results with compute seconds."""
+    start = time.perf_counter()
+    results = fn(items)
+    return results, time.perf_counter() - start
+
+
+class _PendingBatch:
+    __slots__ = ("fn", "items", "futures", "handle")
+
+    def __init__(self, fn: Callable):
+        self.fn = fn
+        self.items: list = []
+        self.futures: list[asyncio.Future] = []
+        self.handle: asyncio.TimerHandle | None = None
+
+
+class StageExecutor:
+    """
+    Runs CPU-bound pipeline stages off the event loop.
+
+    Stage functions must be module-level (picklable) and take a single item. Each
+    dispatched batch records, per stage: items, batches, compute seconds inside the
+    worker and overhead seconds (queueing + IPC), plus end-to-end batch latency.
+
+    Args:
+        mode (str): "inline", "thread" or "process".
+        workers (int): Pool size for thread/process modes.
+        batch_size (int): Maximum items per dispatched batch.
+        batch_window_ms (float): How long submit() waits to fill a batch.
+    """
+
+    def __init__(self, mode: str = CPU_EXECUTOR, workers: int = CPU_EXECUTOR_WORKERS,
+                 batch_size: int = CPU_BATCH_SIZE, batch_window_ms: float = CPU_BATCH_WINDOW_MS):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}' (expected one of {', '.join(EXECUTOR_MODES)})")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window_ms / 1000
+        self._pool: Executor | None = None
+        self._pending: dict[tuple, _PendingBatch] = {}
+
+    @property
+    def pool(self) -> Executor | None:
+        if self._pool is None and self.mode != "inline":
+            if self.mode == "process":
+                # spawn: workers must not inherit the parent's event loop and client threads
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="cpu-stage")
+        return self._pool
+
+    def _record(self, stage: str, items: int, compute: float, wall: float) -> None:
+        metrics.inc("stage_items", items, stage=stage)
+        metrics.inc("stage_batches", stage=stage)
+        metrics.inc("stage_compute_seconds", compute, stage=stage)
+        metrics.inc("stage_overhead_seconds", max(0.0, wall - compute), stage=stage)
+        metrics.observe("stage_batch_latency", wall, stage=stage)
+
+    async def _dispatch(self, stage: str, fn: Callable, items: list, batched: bool = False) -> list:
+        start = time.perf_counter()
+        runner = _run_batched if batched else _run_batch
+        if self.mode == "inline":
+            results, compute = runner(fn, items)
+        else:
+            loop = asyncio.get_running_loop()
+            results, compute = await loop.run_in_executor(self.pool, runner, fn, items)
+        self._record(stage, len(items), compute, time.perf_counter() - start)
+        return results
+
+    async def map(self, stage: str, fn: Callable, items: list, batched: bool = False) -> list:
+        """
+        Run fn over items in batches of batch_size, spread across the pool.
+
+        Args:
+            stage (str): Stage name used in metrics.
+            fn (Callable): Module-level function applied to each item, or with
+                batched=True to each batch (a list, returning one result per item).
+            items (list): Inputs.
+            batched (bool): Call fn once per batch instead of once per item.
+
+        Returns:
+            list: Results in input order.
+        """
+        if not items:
+            return []
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        batches = await asyncio.gather(*(self._dispatch(stage, fn, chunk, batched) for chunk in chunks))
+        return [result for batch in batches for result in batch]
+
+    async def submit(self, stage: str, fn: Callable, item: Any) -> Any:
+        """
+        Run fn(item), grouped with other submissions of the same stage into one batch.
+
+        Concurrent callers (e.g. one coroutine per ticket) share a dispatch, so the
+        per-batch IPC cost is paid once per batch instead of once per ticket.
+        """
+        if self.mode == "inline":
+            return (await self._dispatch(stage, fn, [item]))[0]
+
+        loop = asyncio.get_running_loop()
+        key = (loop, stage, fn)
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = _PendingBatch(fn)
+            batch.handle = loop.call_later(self.batch_window, self._flush, key)
+        future = loop.create_future()
+        batch.items.append(item)
+        batch.futures.append(future)
+        if len(batch.items) >= self.batch_size:
+            batch.handle.cancel()
+            self._flush(key)
+        return await future
+
+    def _flush(self, key: tuple) -> None:
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        task = asyncio.ensure_future(self._dispatch(key[1], batch.fn, batch.items))
+        task.add_done_callback(lambda t: self._resolve(t, batch.futures))
+
+    @staticmethod
+    def _resolve(task: asyncio.Task, futures: list[asyncio.Future]) -> None:
+        error = asyncio.CancelledError() if task.cancelled() else task.exception()
+        for i, future in enumerate(futures):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(task.result()[i])
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+
+_executor: StageExecutor | None = None
+
+
+def get_executor() -> StageExecutor:
+    """Return the process-wide stage executor (pool started on first use)."""
+    global _executor
+    if _executor is None:
+        _executor = StageExecutor()
+    return _executor
+
+
+def close_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+
+
+async def run_stage(stage: str, fn: Callable, item: Any) -> Any:
+    """Run one CPU-bound stage for one item on the configured executor (micro-batched)."""
+    return await get_executor().submit(stage, fn, item)
+
+
+async def map_stage(stage: str, fn: Callable, items: list, batched: bool = False) -> list:
+    """Run one CPU-bound stage over many items on the configured executor, in batches."""
+    return await get_executor().map(stage, fn, items, batched)
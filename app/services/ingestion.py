@@ -0,0 +1,308 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+import weakref
+import httpx
+from pydantic_core import to_json
+from app.models import Ticket, TicketAnalyzeResponse
+from app.services.metrics import metrics
+from app.services.risk_orchestrator import assess_tickets
+from app.services.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+# Tickets pushed one by one (helpdesk webhooks) are grouped into micro-batches of
+# up to WEBHOOK_BATCH_SIZE tickets or WEBHOOK_BATCH_WINDOW_MS, analyzed together and
+# their results POSTed to the callback URL.
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "50"))
+WEBHOOK_BATCH_WINDOW_MS = float(os.getenv("WEBHOOK_BATCH_WINDOW_MS", "200"))
+# Callback used when the webhook does not pass ?callback_url=
+WEBHOOK_CALLBACK_URL = os.getenv("WEBHOOK_CALLBACK_URL")
+# Hosts a caller may pass as ?callback_url= ("hooks.acme.com,*.globex.io"). Empty =
+# only WEBHOOK_CALLBACK_URL. Private, loopback and link-local addresses are refused
+# unless listed exactly.
+WEBHOOK_CALLBACK_ALLOWLIST = os.getenv("WEBHOOK_CALLBACK_ALLOWLIST", "")
+# Accepted but not yet delivered tickets per worker; over this, ingestion answers 429
+WEBHOOK_MAX_PENDING = int(os.getenv("WEBHOOK_MAX_PENDING", "10000"))
+WEBHOOK_DELIVERY_RETRIES = int(os.getenv("WEBHOOK_DELIVERY_RETRIES", "5"))
+WEBHOOK_RETRY_BACKOFF_SECONDS = float(os.getenv("WEBHOOK_RETRY_BACKOFF_SECONDS", "0.5"))
+WEBHOOK_DELIVERY_TIMEOUT = float(os.getenv("WEBHOOK_DELIVERY_TIMEOUT", "10"))
+
+
+class IngestionBacklogFull(Exception):
+    """Raised when a worker already holds WEBHOOK_MAX_PENDING undelivered tickets."""
+
+
+class CallbackNotAllowed(ValueError):
+    """Raised when a caller-supplied callback URL is not an allowed public target."""
+
+
+_ALLOWLIST = tuple(host.strip().lower() for host in WEBHOOK_CALLBACK_ALLOWLIST.split(",") if host.strip())
+
+
+def _host_allowed(host: str, allowlist: tuple[str, ...]) -> bool:
+    return any(host == entry or (entry.startswith("*.") and host.endswith(entry[1:])) for entry in allowlist)
+
+
+def _is_public(address: str) -> bool:
+    return ipaddress.ip_address(address.split("%", 1)[0]).is_global
+
+
+async def _resolve(host: str, port: int) -> list[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    return [info[4][0] for info in infos]
+
+
+async def validate_callback_url(url: str, allowlist: tuple[str, ...] | None = None) -> str:
+    """
+    Check a callback URL supplied by an API caller before results are POSTed to it.
+
+    WEBHOOK_CALLBACK_URL is always accepted. Any other URL must be http(s), its host
+    must match WEBHOOK_CALLBACK_ALLOWLIST and every address it resolves to must be
+    public (no private, loopback, link-local or reserved targets), unless the host
+    is an exact allowlist entry.
+
+    Args:
+        url (str): Callback URL from the request.
+        allowlist (tuple[str, ...] | None): Allowed hosts (default: WEBHOOK_CALLBACK_ALLOWLIST).
+
+    Returns:
+        str: The URL, unchanged.
+
+    Raises:
+        CallbackNotAllowed: If the URL may not be called.
+    """
+    if WEBHOOK_CALLBACK_URL and url == WEBHOOK_CALLBACK_URL:
+        return url
+    allowlist = _ALLOWLIST if allowlist is None else allowlist
+    try:
+        parsed = httpx.URL(url)
+    except httpx.InvalidURL:
+        raise CallbackNotAllowed("callback_url is not a valid URL") from None
+    host = (parsed.host or "").lower()
+    if parsed.scheme not in ("http", "https") or not host:
+        raise CallbackNotAllowed("callback_url must be an http(s) URL")
+    if not _host_allowed(host, allowlist):
+        raise CallbackNotAllowed(f"callback_url host {host!r} is not in WEBHOOK_CALLBACK_ALLOWLIST")
+    if host in allowlist:
+        return url
+    await _public_address(host, parsed.port or (443 if parsed.scheme == "https" else 80))
+    return url
+
+
+async def _public_address(host: str, port: int) -> str:
+    """Resolve host and return its first address, refusing it if any address is not public."""
+    try:
+        addresses = await _resolve(host, port)
+    except (OSError, UnicodeError):
+        raise CallbackNotAllowed(f"callback_url host {host!r} does not resolve") from None
+    if not addresses or not all(_is_public(address) for address in addresses):
+        metrics.inc("webhook_callbacks_refused")
+        raise CallbackNotAllowed(f"callback_url host {host!r} resolves to a non-public address")
+    return addresses[0]
+
+
+class PublicCallbackTransport(httpx.AsyncBaseTransport):
+    """
+    Delivery transport that re-checks callback hosts when it connects.
+
+    validate_callback_url() resolves the host when the callback is submitted, but a
+    host can resolve differently by delivery time (DNS rebinding). This transport
+    resolves it again, refuses non-public addresses with CallbackNotAllowed and
+    connects to the address it checked, keeping the original Host header and TLS
+    server name. The WEBHOOK_CALLBACK_URL host and exact allowlist entries are
+    trusted and connected to as usual.
+
+    Args:
+        transport (httpx.AsyncBaseTransport | None): Transport doing the I/O (default: httpx's).
+        allowlist (tuple[str, ...] | None): Allowed hosts (default: WEBHOOK_CALLBACK_ALLOWLIST).
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None,
+                 allowlist: tuple[str, ...] | None = None):
+        self._transport = transport or httpx.AsyncHTTPTransport()
+        self._trusted = set(_ALLOWLIST if allowlist is None else allowlist)
+        if WEBHOOK_CALLBACK_URL:
+            self._trusted.add((httpx.URL(WEBHOOK_CALLBACK_URL).host or "").lower())
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host.lower()
+        if host not in self._trusted:
+            address = await _public_address(host, request.url.port or (443 if request.url.scheme == "https" else 80))
+            # The Host header was set from the original URL; TLS verifies the certificate against the SNI name
+            request.url = request.url.copy_with(host=address.split("%", 1)[0])
+            request.extensions = {**request.extensions, "sni_hostname": host}
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class _Batch:
+    __slots__ = ("tickets", "accepted", "handle")
+
+    def __init__(self):
+        self.tickets: list[Ticket] = []
+        self.accepted: list[float] = []
+        self.handle: asyncio.TimerHandle | None = None
+
+
+class MicroBatcher:
+    """
+    Groups single webhook tickets into batches and delivers their results by callback.
+
+    Batches are keyed by (tenant, callback URL), so each batch is analyzed under its
+    tenant and delivered in one POST of a TicketAnalyzeResponse body. A batch is
+    flushed when it reaches batch_size or batch_window after its first ticket.
+    Deliveries that fail (connection error, 429 or 5xx) are retried with
+    exponential backoff up to `retries` times. The default client connects through
+    PublicCallbackTransport, so callback hosts are re-checked at delivery time.
+
+    Args:
+        batch_size (int): Tickets per batch.
+        batch_window_ms (float): Longest wait for a batch to fill.
+        max_pending (int): Undelivered tickets allowed before add() refuses more.
+        retries (int): Delivery retries after the first attempt.
+        backoff (float): First retry delay in seconds (doubles per attempt).
+        client (httpx.AsyncClient | None): Delivery client (default: one owned by the batcher).
+    """
+
+    def __init__(self, batch_size: int = WEBHOOK_BATCH_SIZE, batch_window_ms: float = WEBHOOK_BATCH_WINDOW_MS,
+                 max_pending: int = WEBHOOK_MAX_PENDING, retries: int = WEBHOOK_DELIVERY_RETRIES,
+                 backoff: float = WEBHOOK_RETRY_BACKOFF_SECONDS, client: httpx.AsyncClient | None = None):
+        self.batch_size = max(1, batch_size)
+        self.batch_window = batch_window_ms / 1000
+        self.max_pending = max_pending
+        self.retries = retries
+        self.backoff = backoff
+        self.pending = 0
+        self._client = client
+        self._owns_client = client is None
+        self._batches: dict[tuple[str | None, str], _Batch] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=WEBHOOK_DELIVERY_TIMEOUT, transport=PublicCallbackTransport())
+        return self._client
+
+    def add(self, ticket: Ticket, callback_url: str) -> None:
+        """
+        Accept one ticket for batched analysis; returns immediately.
+
+        Raises:
+            IngestionBacklogFull: If max_pending tickets are already waiting.
+        """
+        if self.pending >= self.max_pending:
+            metrics.inc("webhook_rejected")
+            raise IngestionBacklogFull(f"{self.pending} tickets awaiting delivery")
+        key = (current_tenant.get(), callback_url)
+        batch = self._batches.get(key)
+        if batch is None:
+            batch = self._batches[key] = _Batch()
+            batch.handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush, key)
+        batch.tickets.append(ticket)
+        batch.accepted.append(time.perf_counter())
+        self.pending += 1
+        metrics.inc("webhook_accepted")
+        metrics.set_gauge("webhook_pending", self.pending)
+        if len(batch.tickets) >= self.batch_size:
+            batch.handle.cancel()
+            self._flush(key)
+
+    def _flush(self, key: tuple[str | None, str]) -> None:
+        batch = self._batches.pop(key, None)
+        if batch is None:
+            return
+        task = asyncio.get_running_loop().create_task(self._process(key, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _process(self, key: tuple[str | None, str], batch: _Batch) -> None:
+        tenant, callback_url = key
+        token = current_tenant.set(tenant)
+        try:
+            metrics.inc("webhook_batches")
+            metrics.inc("webhook_batched_tickets", len(batch.tickets))
+            try:
+                results = [a.to_result() for a in await assess_tickets(batch.tickets)]
+            except Exception:
+                logger.exception("Webhook batch of %d tickets failed", len(batch.tickets))
+                metrics.inc("webhook_deliveries", status="failed")
+                return
+            body = to_json(TicketAnalyzeResponse.model_construct(results=results))
+            if await self.deliver(callback_url, body):
+                now = time.perf_counter()
+                for accepted in batch.accepted:
+                    metrics.observe("webhook_end_to_end", now - accepted)
+        finally:
+            current_tenant.reset(token)
+            self.pending -= len(batch.tickets)
+            metrics.set_gauge("webhook_pending", self.pending)
+
+    async def deliver(self, callback_url: str, body: bytes) -> bool:
+        """
+        POST a result payload to a callback URL, retrying transient failures.
+
+        Returns:
+            bool: True if the receiver answered 2xx, False after the last retry
+            (or on a non-retryable 4xx, or a host now resolving to a non-public address).
+        """
+        for attempt in range(self.retries + 1):
+            if attempt:
+                metrics.inc("webhook_deliveries", status="retry")
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = await self.client.post(callback_url, content=body,
+                                                  headers={"content-type": "application/json"})
+            except CallbackNotAllowed as e:
+                logger.warning("Webhook delivery to %s refused: %s", callback_url, e)
+                break
+            except httpx.HTTPError as e:
+                logger.warning("Webhook delivery to %s failed: %s", callback_url, e)
+                continue
+            if response.is_success:
+                metrics.inc("webhook_deliveries", status="ok")
+                return True
+            if response.status_code != 429 and response.status_code < 500:
+                break
+        logger.error("Giving up webhook delivery to %s", callback_url)
+        metrics.inc("webhook_deliveries", status="failed")
+        return False
+
+    async def drain(self) -> None:
+        """Flush every open batch and wait for all analyses and deliveries to finish."""
+        for key, batch in list(self._batches.items()):
+            batch.handle.cancel()
+            self._flush(key)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def close(self) -> None:
+        await self.drain()
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_batchers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, MicroBatcher]" = weakref.WeakKeyDictionary()
+
+
+def get_batcher() -> MicroBatcher:
+    """Return the micro-batcher of the running event loop."""
+    loop = asyncio.get_running_loop()
+    batcher = _batchers.get(loop)
+    if batcher is None:
+        batcher = _batchers[loop] = MicroBatcher()
+    return batcher
+
+
+async def close_batcher() -> None:
+    """Deliver everything still pending on this loop (called on shutdown)."""
+    batcher = _batchers.pop(asyncio.get_running_loop(), None)
+    if batcher is not None:
+        await batcher.close()
@@ -1,6 +1,12 @@
 import json
 from app.models import Ticket, AIAnalysis, RiskLabel
-from app.services.openai_client import openai_chat
+from app.services.openai_client import openai_chat, gpt_model
+from app.services.context_budget import prepare_ticket
+from app.services.semantic_cache import semantic_cache, SEMANTIC_CACHE_ENABLED
+from app.services.usage import ticket_usage
+
+# Bump whenever SYSTEM_PROMPT or _build_user_prompt changes (invalidates stored responses)
+PROMPT_VERSION = "risk-triage-v1"
 
 SYSTEM_PROMPT = """
 You are a customer support risk triage engine.
@@ -36,11 +42,22 @@ def _build_user_prompt(ticket: Ticket) -> str:
     - signals (array of short strings, in {ticket.language})
     """
     
-async def analyze_with_llm(ticket: Ticket) -> AIAnalysis:
-    raw = await openai_chat(
-        system=SYSTEM_PROMPT,
-        user=_build_user_prompt(ticket),
-    )
+async def analyze_with_llm(ticket: Ticket, model: str | None = None) -> AIAnalysis:
+    # Long histories are compressed to the configured token budget first
+    ticket = prepare_ticket(ticket)
+    # Near-duplicate tickets reuse a previous answer from the same model and SLA bucket
+    if SEMANTIC_CACHE_ENABLED:
+        cached = semantic_cache.lookup(ticket, model or gpt_model)
+        if cached is not None:
+            return cached
+    kwargs = {"model": model} if model else {}
+    with ticket_usage(ticket.id):
+        raw = await openai_chat(
+            system=SYSTEM_PROMPT,
+            user=_build_user_prompt(ticket),
+            prompt_version=PROMPT_VERSION,
+            **kwargs,
+        )
 
     try:
         data = json.loads(raw)
@@ -62,4 +79,6 @@ async def analyze_with_llm(ticket: Ticket) -> AIAnalysis:
         except ValueError:
             raise ValueError(f"Invalid risk_label: {analysis.risk_label}. Must be one of: LOW, MEDIUM, HIGH")
 
+    if SEMANTIC_CACHE_ENABLED:
+        semantic_cache.store(ticket, model or gpt_model, analysis)
     return analysis
\ No newline at end of file
@@ -0,0 +1,395 @@
+import asyncio
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from app.services.usage import report_call_usage
+
+# Provider selection. "openai" talks to any OpenAI-compatible HTTP endpoint
+# (api.openai.com, vLLM, Ollama, LM Studio...) and "local" runs the in-process
+# classifier. A model name can also pick a provider explicitly with a prefix,
+# e.g. CHEAP_MODEL=local:risk-nb.
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Per-attempt timeout of upstream HTTP calls, in seconds (the SDK default is 600)
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "600"))
+# Seconds to wait for in-flight LLM calls on shutdown before closing clients
+LLM_DRAIN_TIMEOUT = float(os.getenv("LLM_DRAIN_TIMEOUT", "30"))
+LOCAL_MODEL_PATH = os.getenv("LOCAL_MODEL_PATH")
+LOCAL_TRAINING_DATA = os.getenv(
+    "LOCAL_TRAINING_DATA",
+    str(Path(__file__).resolve().parent.parent / "data" / "labelled_tickets.jsonl"),
+)
+LOCAL_MAX_CONCURRENCY = int(os.getenv("LOCAL_MAX_CONCURRENCY", str(os.cpu_count() or 1)))
+
+
+class UnsupportedTaskError(Exception):
+    """Raised when a provider cannot serve the requested prompt (e.g. reply generation on the local classifier)."""
+
+
+class LLMProvider:
+    """
+    Base class for chat-completion backends.
+
+    Subclasses implement _chat(). Every call goes through a per-event-loop
+    semaphore sized by max_concurrency, so each backend declares and enforces
+    how many requests it accepts in parallel. Remote backends (adaptive_limit) also
+    get an adaptive in-flight limit below that cap, see adaptive_limit.
+    """
+
+    name = "base"
+    adaptive_limit = True
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self._semaphore: asyncio.Semaphore | None = None
+        self._loop = None
+        # Guards lazy client/model construction: warm-up builds it in a worker
+        # thread while requests on the event loop may already need it
+        self._open_lock = threading.Lock()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    async def chat(self, system: str, user: str, model: str, temperature: float = 0.2) -> str:
+        """
+        Run one chat completion within the provider's concurrency limit.
+
+        Args:
+            system (str): System prompt.
+            user (str): User prompt.
+            model (str): Model identifier understood by the backend.
+            temperature (float): Sampling temperature.
+
+        Returns:
+            str: The assistant's response text.
+        """
+        async with self._get_semaphore():
+            self.in_flight += 1
+            try:
+                return await self._chat(system, user, model, temperature)
+            finally:
+                self.in_flight -= 1
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        raise NotImplementedError
+
+    def open(self) -> None:
+        """Eagerly build clients/models (warm-up after startup in each worker)."""
+
+    async def health_check(self) -> bool:
+        """Return True if the backend is reachable."""
+        return True
+
+    async def aclose(self) -> None:
+        """Release network resources held by the provider."""
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Async client for OpenAI or any self-hosted server exposing /v1/chat/completions."""
+
+    name = "openai"
+
+    def __init__(self, base_url: str | None = None, api_key: str | None = None,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, http_client=None,
+                 max_retries: int = LLM_MAX_RETRIES, timeout: float = LLM_REQUEST_TIMEOUT):
+        super().__init__(max_concurrency)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self._http_client = http_client
+        self._client = None
+
+    @property
+    def client(self):
+        # Built on first use so importing the app does not construct the SDK client
+        if self._client is None:
+            with self._open_lock:
+                if self._client is None:
+                    from openai import AsyncOpenAI
+                    self._client = AsyncOpenAI(
+                        api_key=self.api_key or os.getenv("OPENAI_API_KEY") or "not-set",
+                        base_url=self.base_url,
+                        max_retries=self.max_retries,
+                        timeout=self.timeout,
+                        http_client=self._http_client,
+                    )
+        return self._client
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        response = await self.client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": user}
+            ],
+            temperature=temperature,
+        )
+        if response.usage is not None:
+            report_call_usage(response.usage.prompt_tokens, response.usage.completion_tokens)
+        return response.choices[0].message.content
+
+    def open(self) -> None:
+        self.client
+
+    async def health_check(self) -> bool:
+        # Lightweight authenticated call, same as the previous sync health probe
+        await self.client.models.list()
+        return True
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_LABELS = ("LOW", "MEDIUM", "HIGH")
+_LABEL_SCORES = {"LOW": 15, "MEDIUM": 50, "HIGH": 85}
+_LABEL_ACTIONS = {
+    "LOW": "Standard response flow.",
+    "MEDIUM": "Reply today with a concrete next step and monitor for escalation or churn.",
+    "HIGH": "Escalate to senior support and respond within 30 minutes with a clear plan.",
+}
+
+
+def _tokenize(text: str) -> list[str]:
+    words = _WORD_RE.findall(text.lower())
+    return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+
+class NaiveBayesRiskClassifier:
+    """
+    Multinomial naive Bayes over word unigrams and bigrams.
+
+    Small enough to train on a few thousand labelled tickets at startup and to
+    score a ticket in well under a millisecond on one CPU core.
+    """
+
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.class_counts: dict[str, int] = {}
+        self.token_counts: dict[str, dict[str, int]] = {}
+        self.totals: dict[str, int] = {}
+        self.vocabulary: set[str] = set()
+
+    def fit(self, texts: list[str], labels: list[str]) -> "NaiveBayesRiskClassifier":
+        self.class_counts = dict(Counter(labels))
+        self.token_counts = {label: Counter() for label in self.class_counts}
+        for text, label in zip(texts, labels):
+            self.token_counts[label].update(_tokenize(text))
+        self.totals = {label: sum(c.values()) for label, c in self.token_counts.items()}
+        self.vocabulary = {tok for c in self.token_counts.values() for tok in c}
+        return self
+
+    def predict_proba(self, text: str) -> dict[str, float]:
+        tokens = [t for t in _tokenize(text) if t in self.vocabulary]
+        n_docs = sum(self.class_counts.values())
+        vocab_size = len(self.vocabulary)
+        log_probs = {}
+        for label, count in self.class_counts.items():
+            counts = self.token_counts[label]
+            denom = self.totals[label] + self.alpha * vocab_size
+            lp = math.log(count / n_docs)
+            for tok in tokens:
+                lp += math.log((counts.get(tok, 0) + self.alpha) / denom)
+            log_probs[label] = lp
+        peak = max(log_probs.values())
+        exp = {label: math.exp(lp - peak) for label, lp in log_probs.items()}
+        norm = sum(exp.values())
+        return {label: v / norm for label, v in exp.items()}
+
+    def top_tokens(self, text: str, label: str, limit: int = 3) -> list[str]:
+        """Return the words of the text that most support the given label."""
+        counts = self.token_counts.get(label, {})
+        words = {t for t in _tokenize(text) if "_" not in t and counts.get(t)}
+        return sorted(words, key=lambda t: counts[t], reverse=True)[:limit]
+
+    def to_dict(self) -> dict:
+        return {
+            "alpha": self.alpha,
+            "class_counts": self.class_counts,
+            "token_counts": {k: dict(v) for k, v in self.token_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "NaiveBayesRiskClassifier":
+        model = cls(alpha=data.get("alpha", 1.0))
+        model.class_counts = data["class_counts"]
+        model.token_counts = data["token_counts"]
+        model.totals = {label: sum(c.values()) for label, c in model.token_counts.items()}
+        model.vocabulary = {tok for c in model.token_counts.values() for tok in c}
+        return model
+
+    def save(self, path: str) -> None:
+        Path(path).write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str) -> "NaiveBayesRiskClassifier":
+        return cls.from_dict(json.loads(Path(path).read_text(encoding="utf-8")))
+
+    @classmethod
+    def train_from_jsonl(cls, path: str) -> "NaiveBayesRiskClassifier":
+        """Train on a JSONL file of tickets with last_message, conversation_summary and risk_label."""
+        texts, labels = [], []
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                texts.append(f"{row.get('last_message', '')} {row.get('conversation_summary', '')}")
+                labels.append(row["risk_label"])
+        return cls().fit(texts, labels)
+
+
+_PROMPT_FIELD_RE = {
+    "last_message": re.compile(r'last_message: "(.*?)"\n', re.DOTALL),
+    "conversation_summary": re.compile(r'conversation_summary: "(.*?)"\n', re.DOTALL),
+}
+
+
+class LocalClassifierProvider(LLMProvider):
+    """
+    CPU-only in-process backend answering risk triage prompts with a local classifier.
+
+    It understands the prompt built by llm_engine and returns the same JSON contract
+    as the remote models. Other prompts (e.g. reply generation) raise
+    UnsupportedTaskError so callers fall back as they would on an upstream error.
+    """
+
+    name = "local"
+    adaptive_limit = False
+
+    def __init__(self, model: NaiveBayesRiskClassifier | None = None,
+                 max_concurrency: int = LOCAL_MAX_CONCURRENCY):
+        super().__init__(max_concurrency)
+        self._model = model
+
+    @property
+    def model(self) -> NaiveBayesRiskClassifier:
+        if self._model is None:
+            with self._open_lock:
+                if self._model is None:
+                    if LOCAL_MODEL_PATH and Path(LOCAL_MODEL_PATH).exists():
+                        self._model = NaiveBayesRiskClassifier.load(LOCAL_MODEL_PATH)
+                    else:
+                        self._model = NaiveBayesRiskClassifier.train_from_jsonl(LOCAL_TRAINING_DATA)
+        return self._model
+
+    def open(self) -> None:
+        self.model
+
+    def classify(self, text: str) -> dict:
+        """Return an AIAnalysis-shaped dict for the given ticket text."""
+        proba = self.model.predict_proba(text)
+        label = max(_LABELS, key=lambda lb: proba.get(lb, 0.0))
+        # Expected score under the predicted distribution keeps the score consistent with the label
+        score = round(sum(_LABEL_SCORES[lb] * p for lb, p in proba.items()))
+        return {
+            "risk_score": score,
+            "risk_label": label,
+            "reason": f"Local classifier predicted {label} risk.",
+            "suggested_action": _LABEL_ACTIONS[label],
+            "confidence": round(proba[label] * 100),
+            "signals": self.model.top_tokens(text, label),
+        }
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        fields = {name: rx.search(user) for name, rx in _PROMPT_FIELD_RE.items()}
+        if not all(fields.values()):
+            raise UnsupportedTaskError("Local classifier only serves risk triage prompts")
+        text = " ".join(m.group(1) for m in fields.values())
+        return json.dumps(self.classify(text))
+
+
+_providers: dict[str, LLMProvider] = {}
+# Built-in providers are created on first use, possibly from the warm-up thread
+# and a request at the same time; only one instance may win
+_providers_lock = threading.Lock()
+
+
+def register_provider(name: str, provider: LLMProvider | None) -> LLMProvider | None:
+    """
+    Register (or replace) a provider under a name usable as a model prefix.
+
+    Args:
+        name (str): Provider name ("openai", "local" or a custom prefix).
+        provider (LLMProvider | None): The provider, or None to unregister.
+
+    Returns:
+        LLMProvider | None: The provider previously registered under that name.
+    """
+    previous = _providers.pop(name, None)
+    if provider is not None:
+        _providers[name] = provider
+    return previous
+
+
+def _build_provider(name: str) -> LLMProvider:
+    if name == "local":
+        return LocalClassifierProvider()
+    if name == "openai":
+        return OpenAICompatibleProvider(base_url=LLM_BASE_URL)
+    raise ValueError(f"Unknown LLM provider: {name}")
+
+
+def get_provider(model: str) -> tuple[LLMProvider, str]:
+    """
+    Resolve the provider serving a model name.
+
+    A "name:model" prefix selects a registered provider (created on first use for
+    the built-in "openai" and "local"); otherwise LLM_PROVIDER is used.
+
+    Args:
+        model (str): Model identifier, optionally prefixed with a provider name.
+
+    Returns:
+        tuple[LLMProvider, str]: The provider and the model name without prefix.
+    """
+    name, sep, bare = model.partition(":")
+    if not sep or (name not in _providers and name not in ("openai", "local")):
+        name, bare = LLM_PROVIDER, model
+    provider = _providers.get(name)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(name)
+            if provider is None:
+                provider = _providers[name] = _build_provider(name)
+    return provider, bare
+
+
+async def drain_providers(timeout: float = LLM_DRAIN_TIMEOUT) -> bool:
+    """
+    Wait until no provider has in-flight calls.
+
+    Args:
+        timeout (float): Maximum seconds to wait.
+
+    Returns:
+        bool: True if every call finished, False if the timeout expired first.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while any(p.in_flight for p in _providers.values()):
+        if loop.time() >= deadline:
+            return False
+        await asyncio.sleep(0.05)
+    return True
+
+
+async def close_providers() -> None:
+    """Close every instantiated provider (used on application shutdown)."""
+    for provider in list(_providers.values()):
+        await provider.aclose()
+    _providers.clear()
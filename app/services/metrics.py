@@ -0,0 +1,86 @@
+import threading
+from collections import defaultdict, deque
+
+# Number of recent samples kept per latency series for percentiles
+LATENCY_WINDOW = 512
+
+
+def _key(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    rendered = ",".join(f"{k}={labels[k]}" for k in sorted(labels))
+    return f"{name}{{{rendered}}}"
+
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry (counters, gauges and latency series).
+
+    Series are keyed by name plus sorted labels, e.g. llm_requests{tier=cheap}.
+    All operations are thread-safe so they can be used from executor threads.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = defaultdict(float)
+        self._gauges: dict[str, float] = {}
+        self._latencies: dict[str, deque] = {}
+        self._latency_totals: dict[str, list] = {}
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._latencies:
+                self._latencies[key] = deque(maxlen=LATENCY_WINDOW)
+                self._latency_totals[key] = [0, 0.0, 0.0]  # count, total, max
+            self._latencies[key].append(seconds)
+            totals = self._latency_totals[key]
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+
+    def counter(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def gauge(self, name: str, **labels) -> float:
+        with self._lock:
+            return self._gauges.get(_key(name, labels), 0)
+
+    def snapshot(self) -> dict:
+        """Return a JSON-serializable view of every series."""
+        with self._lock:
+            latencies = {}
+            for key, samples in self._latencies.items():
+                count, total, peak = self._latency_totals[key]
+                ordered = sorted(samples)
+                latencies[key] = {
+                    "count": count,
+                    "avg_ms": round(total / count * 1000, 3),
+                    "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+                    "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+                    "max_ms": round(peak * 1000, 3),
+                }
+            return {
+                "counters": dict(self._counters),
+                "gauges": dict(self._gauges),
+                "latencies": latencies,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._latencies.clear()
+            self._latency_totals.clear()
+
+
+metrics = MetricsRegistry()
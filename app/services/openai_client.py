@@ -1,31 +1,105 @@
+import asyncio
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
+import time
+from app.services.adaptive_limit import adaptive_slot
+from app.services.llm_providers import UnsupportedTaskError, get_provider
+from app.services.response_store import get_response_store, ResponseNotRecorded, RESPONSE_STORE_MODE
+from app.services.traffic_recorder import get_recorder
+from app.services.tenancy import ESTIMATED_COMPLETION_TOKENS, resolve_tenant, tenant_slot
+from app.services.context_budget import count_tokens
+from app.services.usage import capture_call_usage, usage_ledger
 
-# Load environment variables from .env file
-load_dotenv()
 gpt_model = os.getenv("GPT_MODEL", "gpt-4o-mini")
-# Initialize OpenAI client with API key from environment variable
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# The OpenAI SDK client is created lazily by the provider on first use (see
+# llm_providers.OpenAICompatibleProvider), not at import time.
 
-async def openai_chat(system: str, user: str, model: str = gpt_model) -> str:
+
+async def check_llm_available(model: str = gpt_model) -> bool:
+    """
+    Check connectivity to the backend serving the given model.
+
+    Args:
+        model (str): Model identifier (default: gpt-4o-mini).
+
+    Returns:
+        bool: True if the backend answered, False otherwise.
     """
-    Call OpenAI chat API with system and user prompts.
+    provider, _ = get_provider(model)
+    try:
+        return await provider.health_check()
+    except Exception:
+        return False
+
+async def openai_chat(system: str, user: str, model: str = gpt_model, prompt_version: str = "v1") -> str:
+    """
+    Call the configured chat backend with system and user prompts.
+    
+    The backend is resolved by llm_providers.get_provider (OpenAI-compatible HTTP
+    endpoint by default, or the local classifier with LLM_PROVIDER=local or a
+    "local:" model prefix). When RESPONSE_STORE_PATH is set, responses are served
+    from and recorded to the on-disk response store (compacted in a worker thread
+    once past its limits). Upstream calls go through the tenant gate (per-tenant
+    concurrency, token budget and fair queuing), then the provider's adaptive
+    limiter, which sizes in-flight calls from observed latency and errors. Token
+    usage (as reported by the backend, else estimated) of every call sent upstream,
+    failed ones included, is recorded to the usage ledger, attributed to the current request, ticket, endpoint, model and prompt
+    version, and corrects the tenant's budget charge.
     
     Args:
         system (str): System prompt for context and behavior.
         user (str): User prompt for the query.
         model (str): Model identifier (default: gpt-4o-mini).
+        prompt_version (str): Version tag of the prompt template, part of the store key.
         
     Returns:
         str: The assistant's response text.
+        
+    Raises:
+        ResponseNotRecorded: In replay mode, if the prompt was never recorded.
+        TenantQuotaExceeded: If the tenant's quota did not free up in time.
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": system},
-            {"role": "user", "content": user}
-        ],
-        temperature=0.2,
-    )
-    return response.choices[0].message.content
+    store = get_response_store()
+    if store is not None and RESPONSE_STORE_MODE != "record":
+        stored = store.get(model, prompt_version, system, user)
+        if stored is not None:
+            return stored
+        if RESPONSE_STORE_MODE == "replay":
+            raise ResponseNotRecorded(f"No recorded response for model={model} prompt_version={prompt_version}")
+
+    provider, model_name = get_provider(model)
+    prompt_tokens = count_tokens(system) + count_tokens(user)
+    tenant = resolve_tenant()
+    async with tenant_slot(tenant, prompt_tokens + ESTIMATED_COMPLETION_TOKENS) as slot:
+        start = time.perf_counter()
+        response = None
+        sent = True
+        try:
+            with capture_call_usage() as usage:
+                if provider.adaptive_limit:
+                    async with adaptive_slot(provider.name, provider.max_concurrency,
+                                             ignored_errors=(UnsupportedTaskError,),
+                                             workload=(model_name, prompt_version)):
+                        response = await provider.chat(system=system, user=user, model=model_name, temperature=0.2)
+                else:
+                    response = await provider.chat(system=system, user=user, model=model_name, temperature=0.2)
+        except UnsupportedTaskError:
+            # Refused by the provider before any model ran: nothing to account
+            sent = False
+            raise
+        finally:
+            # Failed and cancelled calls are accounted too (the prompt was sent upstream)
+            if sent:
+                if usage.reported:
+                    prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+                else:
+                    completion_tokens = count_tokens(response or "")
+                slot.used = prompt_tokens + completion_tokens
+                usage_ledger.record(model, prompt_version, prompt_tokens, completion_tokens, tenant)
+
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record_upstream(model, model_name, system, user, response, time.perf_counter() - start)
+
+    if store is not None and store.put(model, prompt_version, system, user, response):
+        await asyncio.to_thread(store.compact)
+    return response
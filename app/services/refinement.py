@@ -0,0 +1,317 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+from typing import AsyncIterator
+from pydantic_core import to_json
+from app.models import Ticket, TicketAnalyzeResponse
+from app.services.admission import current_admission
+from app.services.assessment import RiskAssessment
+from app.services.ingestion import get_batcher
+from app.services.metrics import metrics
+from app.services.risk_orchestrator import PreparedAssessment, prepare_assessment
+
+logger = logging.getLogger(__name__)
+
+# Fast-then-refine analysis: heuristic results are returned at once (provisional)
+# and the LLM-refined ones are kept here until fetched, streamed or called back.
+REFINE_RESULT_TTL_SECONDS = int(os.getenv("REFINE_RESULT_TTL_SECONDS", "600"))
+# Refinement jobs kept per worker (the oldest are dropped first)
+REFINE_MAX_JOBS = int(os.getenv("REFINE_MAX_JOBS", "10000"))
+# Longest GET /tickets/results/{id}?wait= long poll
+REFINE_MAX_WAIT_SECONDS = float(os.getenv("REFINE_MAX_WAIT_SECONDS", "30"))
+# SQLite file shared by the workers of a host, so results can be fetched from any
+# worker (unset = only from the worker that issued the result_id). app.server sets
+# one when it starts several workers.
+REFINE_STORE_PATH = os.getenv("REFINE_STORE_PATH")
+# Polling interval of long polls on results refined by another worker
+_POLL_SECONDS = 0.2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS refinements (
+    id TEXT PRIMARY KEY,
+    response BLOB NOT NULL,
+    done INTEGER NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class SharedResults:
+    """
+    SQLite table of fast-mode responses, written by the worker that runs the
+    refinement (provisional, then refined) and read by any other worker.
+
+    Args:
+        path (str): Database file, shared by the workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS refinements_created ON refinements (created_at)")
+            self._conn = conn
+        return self._conn
+
+    def put(self, job_id: str, response: bytes, done: bool, ttl_seconds: float) -> None:
+        """Store a job's current response and drop rows older than ttl_seconds."""
+        now = time.time()
+        with self._lock:
+            self.conn.execute("INSERT OR REPLACE INTO refinements VALUES (?, ?, ?, "
+                              "COALESCE((SELECT created_at FROM refinements WHERE id = ?), ?))",
+                              (job_id, response, int(done), job_id, now))
+            self.conn.execute("DELETE FROM refinements WHERE created_at < ?", (now - ttl_seconds,))
+
+    def get(self, job_id: str, ttl_seconds: float) -> tuple[bytes, bool] | None:
+        """Return (response JSON, done) of an unexpired job, or None."""
+        with self._lock:
+            row = self.conn.execute("SELECT response, done FROM refinements WHERE id = ? AND created_at >= ?",
+                                    (job_id, time.time() - ttl_seconds)).fetchone()
+        return (row[0], bool(row[1])) if row else None
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+shared_results = SharedResults(REFINE_STORE_PATH) if REFINE_STORE_PATH else None
+
+
+class RefinementJob:
+    """
+    Results of one fast-mode request, updated in place as LLM refinements land.
+
+    Args:
+        job_id (str): Result id returned to the client.
+        results (list[RiskAssessment]): Provisional results (input order).
+        pending (int): Tickets still waiting for the LLM.
+    """
+
+    def __init__(self, job_id: str, results: list[RiskAssessment], pending: int):
+        self.id = job_id
+        self.results = results
+        self.pending = pending
+        self.created = time.monotonic()
+        self.done = asyncio.Event()
+        self.refined: list[int] = []  # indexes in the order their refinement landed
+        self._listeners: list[asyncio.Queue] = []
+        if not pending:
+            self.done.set()
+
+    def response(self) -> TicketAnalyzeResponse:
+        """Current results; tickets still being refined are flagged provisional."""
+        return TicketAnalyzeResponse.model_construct(results=[a.to_result() for a in self.results],
+                                                     result_id=self.id)
+
+    def update(self, index: int, result: RiskAssessment) -> None:
+        self.results[index] = result
+        self.refined.append(index)
+        self.pending -= 1
+        for queue in self._listeners:
+            queue.put_nowait(index)
+
+    def finish(self) -> None:
+        self.done.set()
+        for queue in self._listeners:
+            queue.put_nowait(None)
+
+    async def updates(self) -> AsyncIterator[RiskAssessment]:
+        """Yield each refined result (those already landed first) until the job is done."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        try:
+            for index in list(self.refined):
+                yield self.results[index]
+            if self.done.is_set():
+                return
+            while (index := await queue.get()) is not None:
+                yield self.results[index]
+        finally:
+            self._listeners.remove(queue)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for every refinement; True when done."""
+        try:
+            await asyncio.wait_for(self.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.done.is_set()
+
+
+class RefinementStore:
+    """
+    Runs the LLM refinement of fast-mode requests in the background and keeps the results.
+
+    start() returns as soon as the heuristic stage is done. The refinement runs
+    through the shared scheduler like a regular request and keeps the request's
+    admission slot until it is done, so fast-mode requests count against
+    ADMISSION_MAX_IN_FLIGHT (and are shed or degraded) like full ones. When it
+    finishes, the refined TicketAnalyzeResponse is POSTed to the callback URL, if
+    any (with the webhook delivery retries). Jobs expire ttl_seconds after they were
+    created and at most max_jobs are kept. With a shared store, the provisional and
+    refined responses are also written there, so fetch() works on every worker.
+
+    Args:
+        ttl_seconds (int): How long results stay fetchable.
+        max_jobs (int): Jobs kept before the oldest are dropped.
+        shared (SharedResults | None): Store shared with the other workers.
+    """
+
+    def __init__(self, ttl_seconds: int = REFINE_RESULT_TTL_SECONDS, max_jobs: int = REFINE_MAX_JOBS,
+                 shared: SharedResults | None = None):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self.shared = shared
+        self._jobs: OrderedDict[str, RefinementJob] = OrderedDict()
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+    async def start(self, tickets: list[Ticket], callback_url: str | None = None) -> RefinementJob:
+        """
+        Compute provisional results and refine them in the background.
+
+        Args:
+            tickets (list[Ticket]): Tickets to analyze.
+            callback_url (str | None): Where to POST the refined results.
+
+        Returns:
+            RefinementJob: Job whose results are provisional until refined.
+        """
+        start = time.perf_counter()
+        prepared = await prepare_assessment(tickets)
+        job = RefinementJob(uuid.uuid4().hex, prepared.provisional(), len(prepared.pending))
+        metrics.observe("refine_provisional_latency", time.perf_counter() - start)
+        self._expire()
+        self._jobs[job.id] = job
+        await self._publish(job)
+        if job.pending:
+            task = asyncio.get_running_loop().create_task(self._refine(job, prepared, callback_url))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            slot = current_admission.get()
+            if slot is not None:
+                # Released even if the task is cancelled before it starts
+                slot.hold()
+                task.add_done_callback(lambda _: slot.release())
+        elif callback_url:
+            await self._deliver(job, callback_url)
+        metrics.inc("refine_jobs")
+        return job
+
+    async def _refine(self, job: RefinementJob, prepared: PreparedAssessment, callback_url: str | None) -> None:
+        start = time.perf_counter()
+        try:
+            await prepared.refine(job.update)
+        except Exception:
+            logger.exception("Refinement of %s failed", job.id)
+            metrics.inc("refine_failures")
+        finally:
+            job.finish()
+            metrics.observe("refine_latency", time.perf_counter() - start)
+        await self._publish(job)
+        if callback_url:
+            await self._deliver(job, callback_url)
+
+    async def _publish(self, job: RefinementJob) -> None:
+        if self.shared is None:
+            return
+        try:
+            await asyncio.to_thread(self.shared.put, job.id, to_json(job.response()), job.done.is_set(),
+                                    self.ttl_seconds)
+        except sqlite3.Error:
+            logger.exception("Could not share the results of %s", job.id)
+            metrics.inc("refine_share_errors")
+
+    async def _deliver(self, job: RefinementJob, callback_url: str) -> None:
+        await get_batcher().deliver(callback_url, to_json(job.response()))
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if now - job.created <= self.ttl_seconds and len(self._jobs) < self.max_jobs:
+                break
+            self._jobs.popitem(last=False)
+            metrics.inc("refine_jobs_expired")
+
+    def get(self, job_id: str) -> RefinementJob | None:
+        job = self._jobs.get(job_id)
+        if job is not None and time.monotonic() - job.created > self.ttl_seconds:
+            return None
+        return job
+
+    async def fetch(self, job_id: str, wait: float = 0) -> TicketAnalyzeResponse | None:
+        """
+        Current results of a job started on this or (with a shared store) another worker.
+
+        Args:
+            job_id (str): Result id returned by the fast request.
+            wait (float): Seconds to wait for the refinement to finish.
+
+        Returns:
+            TicketAnalyzeResponse | None: Results (provisional ones still being
+            refined), or None for an unknown or expired id.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            if wait > 0:
+                await job.wait(wait)
+            return job.response()
+        if self.shared is None:
+            return None
+        deadline = time.monotonic() + wait
+        while True:
+            row = await asyncio.to_thread(self.shared.get, job_id, self.ttl_seconds)
+            if row is None:
+                return None
+            response, done = row
+            remaining = deadline - time.monotonic()
+            if done or remaining <= 0:
+                return TicketAnalyzeResponse.model_validate_json(response)
+            await asyncio.sleep(min(_POLL_SECONDS, remaining))
+
+    async def drain(self) -> None:
+        """Wait for every running refinement (and its callback) to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+_stores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, RefinementStore]" = weakref.WeakKeyDictionary()
+
+
+def get_refinements() -> RefinementStore:
+    """Return the refinement store of the running event loop."""
+    loop = asyncio.get_running_loop()
+    store = _stores.get(loop)
+    if store is None:
+        store = _stores[loop] = RefinementStore(shared=shared_results)
+    return store
+
+
+async def close_refinements() -> None:
+    """Finish running refinements on this loop (called on shutdown)."""
+    store = _stores.pop(asyncio.get_running_loop(), None)
+    if store is not None:
+        await store.drain()
+    if shared_results is not None:
+        shared_results.close()
@@ -1,8 +1,15 @@
-from app.models import ReplySuggestionRequest, ReplySuggestionResponse
+from app.models import ReplySuggestionRequest, ReplySuggestionResponse, RiskLabel
 from app.services.openai_client import openai_chat
+from app.services import reply_templates as templates
+from app.services.usage import ticket_usage
 import json
 from pydantic import ValidationError
 
+# Bump whenever SYSTEM_PROMPT or the user prompt template changes
+PROMPT_VERSION = "reply-v1"
+# Prompt with approved replies to similar tickets appended as examples
+FEW_SHOT_PROMPT_VERSION = "reply-v1-fewshot"
+
 SYSTEM_PROMPT = """You are a customer support assistant that suggests replies to support tickets. 
 Your responses must be in JSON format only, following this schema:
 {
@@ -26,6 +33,10 @@ Adhere to the following guardrails:
 async def suggest_reply_with_llm(request: ReplySuggestionRequest) -> ReplySuggestionResponse:
     """
     Generate a customer support reply suggestion using LLM.
+
+    LOW-risk tickets close to an approved reply of the same risk, tone, language
+    and channel get that reply adapted to the ticket, without an LLM call. Other
+    tickets are generated with the closest approved replies as examples.
     
     Args:
         request (ReplySuggestionRequest): The ticket details and preferences.
@@ -36,6 +47,11 @@ async def suggest_reply_with_llm(request: ReplySuggestionRequest) -> ReplySugges
     Raises:
         Exception: If LLM response cannot be parsed as valid JSON.
     """
+    if templates.REPLY_TEMPLATES_ENABLED and request.risk_label == RiskLabel.LOW:
+        matched = templates.reply_templates.match(request)
+        if matched is not None:
+            return matched
+
     user_prompt = f"""
     Generate a customer support reply based on the following ticket details.
     RESPOND ONLY IN {request.language}:
@@ -51,11 +67,16 @@ async def suggest_reply_with_llm(request: ReplySuggestionRequest) -> ReplySugges
     
     Provide the response strictly in the specified JSON format and in {request.language} only.
     """
+    examples = templates.reply_templates.examples(request) if templates.REPLY_TEMPLATES_ENABLED else []
+    if examples:
+        user_prompt += _few_shot_block(examples)
     
-    response_text = await openai_chat(
-        system=SYSTEM_PROMPT,
-        user=user_prompt,
-    )
+    with ticket_usage(request.ticket_id):
+        response_text = await openai_chat(
+            system=SYSTEM_PROMPT,
+            user=user_prompt,
+            prompt_version=FEW_SHOT_PROMPT_VERSION if examples else PROMPT_VERSION,
+        )
     
     try:
         response_json = json.loads(response_text)
@@ -71,4 +92,14 @@ async def suggest_reply_with_llm(request: ReplySuggestionRequest) -> ReplySugges
             do_not_say=response_json.get("do_not_say", []),
         )
     except (json.JSONDecodeError, ValidationError, KeyError) as e:
-        raise Exception(f"Failed to parse LLM response: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to parse LLM response: {str(e)}")
+
+
+def _few_shot_block(examples: list[dict]) -> str:
+    """Approved replies to similar tickets, formatted for the user prompt."""
+    lines = ["", "    Approved replies to similar tickets (match their style, not their facts):"]
+    for number, example in enumerate(examples, 1):
+        lines.append(f"    Example {number} - Last Message: {example['last_message']}")
+        reply = {"reply_text": example["reply_text"], "subject": example["subject"]}
+        lines.append(f"    Example {number} - Reply: {json.dumps(reply, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,224 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from pathlib import Path
+from app.models import ReplySuggestionRequest, ReplySuggestionResponse, RiskLabel
+from app.services.metrics import metrics
+from app.services.semantic_cache import cosine, embed, guard_signature
+from app.services.tenancy import resolve_tenant
+
+# Approved replies, indexed per tenant by (risk_label, company_tone, language, channel)
+# plus a similarity index over the ticket's last_message. LOW-risk requests are answered
+# from a close enough template (same negations and numbers too, see
+# semantic_cache.guard_signature) without an LLM call; other requests get the closest
+# approved replies as few-shot examples.
+REPLY_TEMPLATES_ENABLED = os.getenv("REPLY_TEMPLATES_ENABLED", "true").lower() == "true"
+# Append-only JSONL file of approved replies, loaded on first use (unset = memory only)
+REPLY_TEMPLATES_PATH = os.getenv("REPLY_TEMPLATES_PATH")
+REPLY_TEMPLATE_THRESHOLD = float(os.getenv("REPLY_TEMPLATE_THRESHOLD", "0.9"))
+REPLY_FEW_SHOT_EXAMPLES = int(os.getenv("REPLY_FEW_SHOT_EXAMPLES", "2"))
+REPLY_FEW_SHOT_THRESHOLD = float(os.getenv("REPLY_FEW_SHOT_THRESHOLD", "0.2"))
+# Most recent approved replies kept per (tenant, risk, tone, language, channel) partition
+REPLY_TEMPLATES_PER_PARTITION = int(os.getenv("REPLY_TEMPLATES_PER_PARTITION", "200"))
+
+# Placeholders the approver writes in the reply, filled in with the new ticket's values
+CUSTOMER_PLACEHOLDER = "{customer}"
+TICKET_PLACEHOLDER = "{ticket_id}"
+# Customer names / ticket ids shorter than this are not checked for in approved text
+# (too likely to be ordinary words or numbers)
+MIN_IDENTIFIER_LENGTH = 3
+
+
+class TemplateRejected(ValueError):
+    """Raised when an approved reply still contains the ticket's own customer name or id."""
+
+
+def _partition(tenant: str, risk_label: RiskLabel | str, tone: str, language: str,
+               channel: str) -> tuple[str, str, str, str, str]:
+    label = risk_label.value if isinstance(risk_label, RiskLabel) else risk_label
+    return (tenant, label, tone.lower(), language.lower(), channel.lower())
+
+
+def _check_generic(text: str, request: ReplySuggestionRequest) -> None:
+    for field, value, placeholder in (("customer", request.customer, CUSTOMER_PLACEHOLDER),
+                                      ("ticket_id", request.ticket_id, TICKET_PLACEHOLDER)):
+        if len(value or "") >= MIN_IDENTIFIER_LENGTH and re.search(rf"(?<!\w){re.escape(value)}(?!\w)", text):
+            raise TemplateRejected(f"Approved text contains the ticket's {field} {value!r}; "
+                                   f"write {placeholder} instead")
+
+
+def _adapt(text: str, request: ReplySuggestionRequest) -> str:
+    return text.replace(CUSTOMER_PLACEHOLDER, request.customer).replace(TICKET_PLACEHOLDER, request.ticket_id)
+
+
+class ReplyTemplateIndex:
+    """
+    Index of approved replies for retrieval by ticket attributes and similarity.
+
+    Each partition holds the most recent per_partition templates (oldest dropped).
+    Lookups scan one partition with the same sparse embeddings as the semantic cache,
+    so a routine reply is served in well under a millisecond. Partitions are per
+    tenant: a tenant's tickets and replies are never served or shown to another one.
+    Approved text is stored as written; only its {customer} and {ticket_id}
+    placeholders are filled in for the new ticket.
+
+    Args:
+        path (str | None): JSONL file that approvals are appended to and loaded from.
+        per_partition (int): Templates kept per (tenant, risk, tone, language, channel).
+    """
+
+    def __init__(self, path: str | None = REPLY_TEMPLATES_PATH, per_partition: int = REPLY_TEMPLATES_PER_PARTITION):
+        self.path = path
+        self.per_partition = per_partition
+        self._lock = threading.Lock()
+        self._partitions: dict[tuple, deque[dict]] = {}
+        self._loaded = path is None
+
+    def __len__(self) -> int:
+        self._load()
+        return sum(len(p) for p in self._partitions.values())
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            target = Path(self.path)
+            if target.exists():
+                with target.open(encoding="utf-8") as fh:
+                    for line in fh:
+                        if line.strip():
+                            self._add(json.loads(line))
+            self._loaded = True
+
+    def _add(self, template: dict) -> None:
+        template["vector"] = embed(template["last_message"])
+        template["guard"] = guard_signature(template["last_message"])
+        partition = self._partitions.setdefault(tuple(template["partition"]), deque(maxlen=self.per_partition))
+        partition.append(template)
+
+    def approve(self, request: ReplySuggestionRequest, reply: ReplySuggestionResponse,
+                tenant: str | None = None) -> str:
+        """
+        Index an approved reply for the ticket it answered.
+
+        Args:
+            request (ReplySuggestionRequest): The ticket the reply was written for.
+            reply (ReplySuggestionResponse): The reply as approved by an agent, with
+                {customer} / {ticket_id} placeholders instead of the ticket's own values.
+            tenant (str | None): Tenant owning the template (default: resolve_tenant).
+
+        Returns:
+            str: Id of the new template.
+
+        Raises:
+            TemplateRejected: If the reply or subject names the ticket's customer or id.
+        """
+        self._load()
+        _check_generic(reply.suggested_reply, request)
+        _check_generic(reply.subject, request)
+        template = {
+            "id": uuid.uuid4().hex,
+            "partition": list(_partition(tenant or resolve_tenant(request.customer), request.risk_label,
+                                         request.company_tone, request.language, request.channel)),
+            "last_message": request.last_message,
+            "reply": reply.suggested_reply,
+            "subject": reply.subject,
+            "next_steps": reply.next_steps,
+            "do_not_say": reply.do_not_say,
+            "confidence": reply.confidence,
+            "approved_at": time.time(),
+        }
+        with self._lock:
+            if self.path:
+                target = Path(self.path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with target.open("a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(template, ensure_ascii=False) + "\n")
+            self._add(template)
+        metrics.inc("reply_templates_approved")
+        return template["id"]
+
+    def search(self, request: ReplySuggestionRequest, k: int = 1, threshold: float = 0.0,
+               any_channel: bool = False, guarded: bool = False) -> list[tuple[float, dict]]:
+        """
+        Return up to k templates of the request's partition by similarity of last_message.
+
+        Only the current tenant's templates (resolve_tenant) are searched.
+
+        Args:
+            request (ReplySuggestionRequest): Ticket needing a reply.
+            k (int): Maximum matches.
+            threshold (float): Minimum cosine similarity.
+            any_channel (bool): Also search the same tenant/risk/tone/language on other channels.
+            guarded (bool): Only templates with the same negation words and numbers.
+
+        Returns:
+            list[tuple[float, dict]]: (similarity, template) pairs, best first.
+        """
+        self._load()
+        wanted = _partition(resolve_tenant(request.customer), request.risk_label, request.company_tone,
+                            request.language, request.channel)
+        vector = embed(request.last_message)
+        guard = guard_signature(request.last_message) if guarded else None
+        with self._lock:
+            partitions = [p for key, p in self._partitions.items()
+                          if key == wanted or (any_channel and key[:4] == wanted[:4])]
+            scored = [(cosine(vector, t["vector"]), t) for p in partitions for t in p
+                      if guard is None or t["guard"] == guard]
+        scored = [pair for pair in scored if pair[0] >= threshold]
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:k]
+
+    def match(self, request: ReplySuggestionRequest,
+              threshold: float = REPLY_TEMPLATE_THRESHOLD) -> ReplySuggestionResponse | None:
+        """
+        Serve a reply from the closest approved template, adapted to the ticket.
+
+        The reply is sent without an LLM call, so the match must be close and carry
+        the same negations and numbers: "I was not charged" never gets the reply
+        approved for "I was charged twice".
+
+        Returns:
+            ReplySuggestionResponse | None: Reply with source "template", or None when
+            no template of the same tenant and partition is similar enough.
+        """
+        found = self.search(request, k=1, threshold=threshold, guarded=True)
+        if not found:
+            metrics.inc("reply_template_misses")
+            return None
+        similarity, template = found[0]
+        metrics.inc("reply_template_hits")
+        return ReplySuggestionResponse(
+            ticket_id=request.ticket_id,
+            suggested_reply=_adapt(template["reply"], request),
+            # An approved reply is only as reliable as its match
+            confidence=round(template["confidence"] * similarity),
+            language=request.language,
+            subject=_adapt(template["subject"], request),
+            next_steps=list(template["next_steps"]),
+            do_not_say=list(template["do_not_say"]),
+            source="template",
+        )
+
+    def examples(self, request: ReplySuggestionRequest, k: int = REPLY_FEW_SHOT_EXAMPLES,
+                 threshold: float = REPLY_FEW_SHOT_THRESHOLD) -> list[dict]:
+        """Closest approved replies (any channel) to use as few-shot examples."""
+        return [
+            {"last_message": t["last_message"], "reply_text": _adapt(t["reply"], request),
+             "subject": _adapt(t["subject"], request)}
+            for _, t in self.search(request, k=k, threshold=threshold, any_channel=True)
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._partitions.clear()
+            self._loaded = self.path is None
+
+
+reply_templates = ReplyTemplateIndex()
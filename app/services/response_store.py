@@ -0,0 +1,241 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from app.services.metrics import metrics
+
+# Disk-backed store of chat completions. Disabled unless RESPONSE_STORE_PATH is set.
+# Modes: "readwrite" serves hits and records misses, "replay" serves hits only and
+# fails on a miss (deterministic offline replay), "record" never serves and only records.
+RESPONSE_STORE_PATH = os.getenv("RESPONSE_STORE_PATH")
+RESPONSE_STORE_MODE = os.getenv("RESPONSE_STORE_MODE", "readwrite")
+RESPONSE_STORE_MAX_ENTRIES = int(os.getenv("RESPONSE_STORE_MAX_ENTRIES", "50000"))
+RESPONSE_STORE_MAX_MB = int(os.getenv("RESPONSE_STORE_MAX_MB", "256"))
+# Compact once the table grows this much past the entry or size limit
+_COMPACT_SLACK = 0.1
+# Bytes a row costs besides its response text: key (table and index), model,
+# prompt version, timestamps and record headers
+_ROW_OVERHEAD = 192
+_ROW_BYTES_SQL = "LENGTH(CAST(response AS BLOB)) + LENGTH(model) + LENGTH(prompt_version) + ?"
+# Rows deleted / free pages returned per lock hold while compacting, so get() and
+# put() on the event loop wait at most one short batch
+_DELETE_BATCH = 200
+_VACUUM_PAGES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+class ResponseNotRecorded(LookupError):
+    """Raised in replay mode when a prompt has no recorded response."""
+
+
+def make_key(model: str, prompt_version: str, system: str, user: str) -> str:
+    """Hash the full request so any prompt or model change yields a new key."""
+    digest = hashlib.sha256()
+    for part in (model, prompt_version, system, user):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class ResponseStore:
+    """
+    SQLite-backed response cache keyed by model, prompt version and input hash.
+
+    The database is opened on first access, so startup cost is zero and lookups use
+    the primary-key index directly instead of loading entries into memory. Least
+    recently used rows are dropped when the store exceeds max_entries or max_mb.
+    """
+
+    def __init__(self, path: str, max_entries: int = RESPONSE_STORE_MAX_ENTRIES,
+                 max_mb: float = RESPONSE_STORE_MAX_MB):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._count: int | None = None
+        self._bytes = 0
+        self._compacting = False
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            # Free pages can then be returned in small steps (new files only)
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _load_totals(self) -> None:
+        """Read the row count and stored bytes once; put() and compact() keep them current."""
+        if self._count is None:
+            self._count, self._bytes = self.conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({_ROW_BYTES_SQL}), 0) FROM responses", (_ROW_OVERHEAD,)
+            ).fetchone()
+
+    def get(self, model: str, prompt_version: str, system: str, user: str) -> str | None:
+        key = make_key(model, prompt_version, system, user)
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                metrics.inc("response_store_misses")
+                return None
+            self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        metrics.inc("response_store_hits")
+        return row[0]
+
+    def put(self, model: str, prompt_version: str, system: str, user: str, response: str) -> bool:
+        """
+        Record a response (replacing any previous one for the same prompt).
+
+        Compaction is left to the caller so it can run off the event loop.
+
+        Returns:
+            bool: True when the store went past its entry or size limit and the caller
+            should run compact(); only one caller is told until compact() has run.
+        """
+        key = make_key(model, prompt_version, system, user)
+        now = time.time()
+        size = len(response.encode("utf-8")) + len(model) + len(prompt_version) + _ROW_OVERHEAD
+        with self._lock:
+            self._load_totals()
+            conn = self.conn
+            conn.execute("INSERT OR IGNORE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                         (key, model, prompt_version, response, now, now))
+            if conn.execute("SELECT changes()").fetchone()[0]:
+                self._count += 1
+                self._bytes += size
+            else:
+                previous = conn.execute(f"SELECT {_ROW_BYTES_SQL} FROM responses WHERE key = ?",
+                                        (_ROW_OVERHEAD, key)).fetchone()[0]
+                conn.execute("UPDATE responses SET response = ?, last_used = ? WHERE key = ?",
+                             (response, now, key))
+                self._bytes += size - previous
+            over = (self._count > self.max_entries * (1 + _COMPACT_SLACK)
+                    or self._bytes > self.max_bytes)
+            if over and not self._compacting:
+                self._compacting = True
+                return True
+        return False
+
+    def size_bytes(self) -> int:
+        """Bytes taken by the stored rows (as tracked by put, not the file size)."""
+        with self._lock:
+            self._load_totals()
+            return self._bytes
+
+    def _oldest(self, excess_rows: int, excess_bytes: int) -> list[tuple[str, float, int]]:
+        """Least recently used rows covering the excess, read on a separate connection (no lock held)."""
+        reader = sqlite3.connect(self.path)
+        try:
+            rows = reader.execute(
+                f"SELECT key, last_used, {_ROW_BYTES_SQL} FROM responses ORDER BY last_used ASC", (_ROW_OVERHEAD,)
+            )
+            oldest, freed = [], 0
+            for row in rows:
+                if len(oldest) >= excess_rows and freed >= excess_bytes:
+                    break
+                oldest.append(row)
+                freed += row[2]
+            return oldest
+        finally:
+            reader.close()
+
+    def compact(self, vacuum: bool = False) -> int:
+        """
+        Drop least recently used rows beyond the entry and size limits.
+
+        Rows go until the store holds at most max_entries rows and, when over the size
+        limit, until it is back under max_bytes minus the compaction slack. The rows
+        are picked on a separate connection and deleted in batches of _DELETE_BATCH,
+        so the store lock (which get() and put() take on the event loop) is only held
+        briefly; a row used again meanwhile is kept. Still blocking overall: from
+        async code run it with asyncio.to_thread.
+
+        Args:
+            vacuum (bool): Also return free pages to the OS, _VACUUM_PAGES at a time
+                (files created with incremental auto-vacuum only).
+
+        Returns:
+            int: Number of rows removed.
+        """
+        removed = 0
+        try:
+            with self._lock:
+                self._load_totals()
+                excess_rows = max(0, self._count - self.max_entries)
+                excess_bytes = 0
+                if self._bytes > self.max_bytes:
+                    excess_bytes = self._bytes - int(self.max_bytes * (1 - _COMPACT_SLACK))
+            doomed = self._oldest(excess_rows, excess_bytes) if excess_rows or excess_bytes else []
+            for start in range(0, len(doomed), _DELETE_BATCH):
+                with self._lock:
+                    conn = self.conn
+                    conn.execute("BEGIN")
+                    for key, last_used, _ in doomed[start:start + _DELETE_BATCH]:
+                        deleted = conn.execute(
+                            f"DELETE FROM responses WHERE key = ? AND last_used <= ? RETURNING {_ROW_BYTES_SQL}",
+                            (key, last_used, _ROW_OVERHEAD),
+                        ).fetchall()
+                        if deleted:
+                            removed += 1
+                            self._count -= 1
+                            self._bytes -= deleted[0][0]
+                    conn.execute("COMMIT")
+            if vacuum:
+                while True:
+                    with self._lock:
+                        conn = self.conn
+                        incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+                        if not incremental or not conn.execute("PRAGMA freelist_count").fetchone()[0]:
+                            break
+                        conn.execute(f"PRAGMA incremental_vacuum({_VACUUM_PAGES})").fetchall()
+        finally:
+            self._compacting = False
+        if removed:
+            metrics.inc("response_store_evictions", removed)
+        return removed
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_store: ResponseStore | None = None
+
+
+def get_response_store() -> ResponseStore | None:
+    """Return the process-wide store, or None when RESPONSE_STORE_PATH is not set."""
+    global _store
+    if RESPONSE_STORE_PATH and _store is None:
+        _store = ResponseStore(RESPONSE_STORE_PATH)
+    return _store
+
+
+def close_response_store() -> None:
+    global _store
+    if _store is not None:
+        _store.close()
+        _store = None
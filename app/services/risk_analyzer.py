@@ -1,90 +1,60 @@
-from app.models import RiskLabel, Ticket, TicketResult, TicketResult
+from app.models import Ticket, TicketResult
+from app.services.assessment import RiskAssessment
+from app.services.rule_engine import get_rules
 
-ESCALATION_KEYWORDS = ["procon", "reclame aqui", "processo", "advogado"]
-CHURN_KEYWORDS = ["cancelar", "não renovo", "nao renovo", "vou sair", "encerrar", "cancelamento"]
-NEGATIVE_WORDS = ["péssimo", "horrível", "ridículo", "absurdo", "irritado", "raiva", "insatisfeito"]
+def find_risk_keywords(text: str, language: str | None = None) -> list[str]:
+    """
+    Return every escalation, churn or negative-tone keyword found in the text.
 
-def _contains_any(text: str, keywords: list[str]) -> list[str]:
-    hits = []
-    for k in keywords:
-        if k in text:
-            hits.append(k)
-    return hits
+    Args:
+        text (str): Free text to scan (case- and accent-insensitive).
+        language (str | None): Ticket language selecting the lexicon (None = all lexicons).
+
+    Returns:
+        list[str]: Matched keywords, empty if the text carries no risk signal.
+    """
+    return get_rules().find_keywords(text, language)
+
+
+def assess_ticket(ticket: Ticket) -> RiskAssessment:
+    """
+    Heuristic risk assessment of a ticket (keywords + SLA aging).
+
+    Keywords, weights, SLA bands, label thresholds and overrides come from the
+    declarative rules file (see rule_engine), reloaded when it changes.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
+
+    Returns:
+        RiskAssessment: Internal result; call to_result() for the API model.
+    """
+    return get_rules().assess(ticket)
+
+
+def assess_tickets_heuristic(tickets: list[Ticket]) -> list[RiskAssessment]:
+    """
+    Heuristic risk assessment of a batch (same results as assess_ticket per ticket).
+
+    Lexicon and table lookups are shared across the batch, see CompiledRules.assess_many.
+
+    Args:
+        tickets (list[Ticket]): The tickets to analyze.
+
+    Returns:
+        list[RiskAssessment]: Results in input order.
+    """
+    return get_rules().assess_many(tickets)
 
 
 def analyze_ticket(ticket: Ticket) -> TicketResult:
+    """
+    Heuristic risk analysis returning the public TicketResult model.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
 
-    debug_signals: list[str] = []
-    breakdown = {"escalation": 0, "churn": 0, "sla": 0, "sentiment": 0}
-
-    text = f"{ticket.last_message.lower()} {ticket.conversation_summary.lower()}"
-
-    escalation_hits = _contains_any(text, ESCALATION_KEYWORDS)
-    if escalation_hits:
-        breakdown["escalation"] = 40
-        debug_signals.append(f"escalation: {', '.join(escalation_hits)}")
-
-    # 2) Churn intent
-    churn_hits = _contains_any(text, CHURN_KEYWORDS)
-    if churn_hits:
-        breakdown["churn"] = 35
-        debug_signals.append(f"churn: {', '.join(churn_hits)}")
-
-    # 3) Sentiment (heuristic)
-    negative_hits = _contains_any(text, NEGATIVE_WORDS)
-    if negative_hits:
-        breakdown["sentiment"] = 15
-        debug_signals.append(f"sentiment: {', '.join(negative_hits)}")
-
-    # 4) SLA
-    if ticket.sla_hours_open >= 48:
-        breakdown["sla"] = 35
-        debug_signals.append("sla: >=48h")
-    elif ticket.sla_hours_open >= 24:
-        breakdown["sla"] = 25
-        debug_signals.append("sla: >=24h")
-    elif ticket.sla_hours_open >= 12:
-        breakdown["sla"] = 15
-        debug_signals.append("sla: >=12h")
-
-    risk_score = min(sum(breakdown.values()), 100)
-
-    override_high = (breakdown["escalation"] > 0 and breakdown["sla"] >= 25)
-
-    # Label
-    if risk_score >= 70 or override_high:
-        risk_label = "HIGH"
-        suggested_action = "Escalate to senior support and respond within 30 minutes with a clear plan."
-    elif risk_score >= 35:
-        risk_label = "MEDIUM"
-        suggested_action = "Reply today with a concrete next step and monitor for escalation or churn."
-    else:
-        risk_label = "LOW"
-        suggested_action = "Standard response flow."
-        
-    reason_parts = []
-    if breakdown["escalation"] > 0:
-        reason_parts.append("customer threatened escalation")
-    if breakdown["churn"] > 0:
-        reason_parts.append("customer signaled cancellation intent")
-    if breakdown["sla"] >= 25:
-        reason_parts.append(f"ticket open for {ticket.sla_hours_open}h")
-    elif breakdown["sla"] > 0:
-        reason_parts.append("ticket aging")
-    if breakdown["sentiment"] > 0:
-        reason_parts.append("negative tone")
-
-    reason = " and ".join(reason_parts).capitalize() + "." if reason_parts else "No critical risk detected."
-    risk_label = RiskLabel(risk_label)
-
-    results = TicketResult(
-            id=ticket.id,
-            risk_score=risk_score,
-            risk_label=risk_label,
-            reason=reason,
-            suggested_action=suggested_action,
-            risk_breakdown=breakdown,
-            debug_signals=debug_signals,
-        )
-
-    return results
+    Returns:
+        TicketResult: Risk score, label, reason, action, signals and breakdown.
+    """
+    return assess_ticket(ticket).to_result()
@@ -1,12 +1,82 @@
-from app.models import Ticket, TicketResult
-from app.services.risk_analyzer import analyze_ticket as analyze_heuristic
+import os
+import time
+from dataclasses import replace
+from typing import Callable
+from app.models import Ticket, TicketResult, AIAnalysis
+from app.services.risk_analyzer import assess_ticket as analyze_heuristic, assess_tickets_heuristic
+from app.services.assessment import RiskAssessment, intern_signal
 from app.services.llm_engine import analyze_with_llm
+from app.services.openai_client import gpt_model
+from app.services.metrics import metrics
+from app.services.executor import map_stage, run_stage
+from app.services.scheduler import get_scheduler
+from app.services.admission import degraded_request
+from app.services.rule_engine import CompiledRules, get_rules
+from app.services.ticket_state import TICKET_STATE_ENABLED, ticket_state
+from app.services.tenancy import INTERACTIVE_MAX_TICKETS, current_tenant, interactive_request, resolve_tenant
 
 MIN_CONFIDENCE = 55
 
-async def analyze_one_ticket(ticket: Ticket) -> TicketResult:
+# Model routing: every ticket goes to the cheap tier first and is re-run on the
+# strong tier only when the cheap answer is unsure or disagrees with the heuristics.
+CHEAP_MODEL = os.getenv("CHEAP_MODEL", gpt_model)
+STRONG_MODEL = os.getenv("STRONG_MODEL", "gpt-4o")
+
+
+async def _run_tier(ticket: Ticket, tier: str, model: str) -> AIAnalysis:
+    start = time.perf_counter()
+    try:
+        return await analyze_with_llm(ticket, model=model)
+    except Exception:
+        metrics.inc("llm_tier_errors", tier=tier)
+        raise
+    finally:
+        metrics.inc("llm_tier_requests", tier=tier)
+        metrics.observe("llm_tier_latency", time.perf_counter() - start, tier=tier)
+
+
+def _needs_escalation(ai: AIAnalysis, baseline: RiskAssessment) -> bool:
+    return ai.confidence < MIN_CONFIDENCE or ai.risk_label != baseline.risk_label
+
+
+async def route_llm_analysis(ticket: Ticket, baseline: RiskAssessment) -> tuple[AIAnalysis, str]:
     """
-    Analyze a single ticket using both heuristic and LLM-based methods.
+    Run the LLM analysis through the cheap -> strong model tiers.
+
+    The strong tier is only called when the cheap answer has confidence below
+    MIN_CONFIDENCE or a risk_label different from the heuristic baseline. If the
+    strong tier fails, the cheap answer is kept.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
+        baseline (RiskAssessment): Heuristic result used as the disagreement reference.
+
+    Returns:
+        tuple[AIAnalysis, str]: The selected analysis and the tier that produced it
+        ("cheap" or "strong").
+
+    Raises:
+        Exception: If the cheap tier fails.
+    """
+    ai = await _run_tier(ticket, "cheap", CHEAP_MODEL)
+    tier = "cheap"
+
+    if STRONG_MODEL and STRONG_MODEL != CHEAP_MODEL and _needs_escalation(ai, baseline):
+        metrics.inc("llm_escalations")
+        try:
+            ai = await _run_tier(ticket, "strong", STRONG_MODEL)
+            tier = "strong"
+        except Exception:
+            pass
+
+    cheap_total = metrics.counter("llm_tier_requests", tier="cheap")
+    metrics.set_gauge("llm_escalation_rate", round(metrics.counter("llm_escalations") / cheap_total, 4))
+    return ai, tier
+
+
+async def refine_with_llm(ticket: Ticket, baseline: RiskAssessment) -> RiskAssessment:
+    """
+    Refine a heuristic baseline with the LLM tiers.
     
     Combines baseline heuristic analysis with LLM analysis. If LLM confidence is below
     the minimum threshold or if baseline detects an escalation signal with HIGH risk,
@@ -15,35 +85,198 @@ async def analyze_one_ticket(ticket: Ticket) -> TicketResult:
     
     Args:
         ticket (Ticket): The ticket to analyze.
+        baseline (RiskAssessment): Heuristic assessment of the ticket (updated in place).
         
     Returns:
-        TicketResult: Analysis result with risk score, label, and reasoning.
+        RiskAssessment: Internal result; convert with to_result() at the API boundary.
         
     Raises:
         Returns baseline result if LLM analysis fails.
     """
-    baseline_resp = analyze_heuristic(ticket)
-    baseline = baseline_resp
-    
+    tenant = current_tenant.set(resolve_tenant(ticket.customer))
     try:
-        ai = await analyze_with_llm(ticket)
+        ai, tier = await route_llm_analysis(ticket, baseline)
         #guardrail: do not let the lmm get  down the score with critical sinal
         if ai.confidence >= MIN_CONFIDENCE:
-            if "escaltion" in " ".join(baseline.debug_signals) and baseline.risk_label == "HIGH": 
+            if "escaltion" in " ".join(baseline.signals) and baseline.risk_label == "HIGH": 
                 return baseline
         
-        return TicketResult(
-                id=ticket.id,
-                risk_score=ai.risk_score,
-                risk_label=ai.risk_label,
-                reason=ai.reason,
-                suggested_action=ai.suggested_action,
-                risk_breakdown=baseline.risk_breakdown,   # mantém breakdown heurístico por enquanto
-                debug_signals=baseline.debug_signals + [f"llm_confidence:{ai.confidence}"] + [f"llm_signal:{s}" for s in ai.signals],
-                language=ticket.language,
-            )
+        # mantém breakdown heurístico por enquanto
+        baseline.signals += [intern_signal(f"llm_tier:{tier}"), f"llm_confidence:{ai.confidence}"]
+        baseline.signals += [f"llm_signal:{s}" for s in ai.signals]
+        baseline.risk_score = ai.risk_score
+        baseline.risk_label = ai.risk_label
+        baseline.reason = ai.reason
+        baseline.suggested_action = ai.suggested_action
+        baseline.language = ticket.language
+        return baseline
         
     except Exception as e:
-        baseline.debug_signals.append(f"llm_error:{type(e).__name__}")
+        baseline.signals.append(intern_signal(f"llm_error:{type(e).__name__}"))
+    finally:
+        current_tenant.reset(tenant)
         
-    return baseline
\ No newline at end of file
+    return baseline
+
+
+async def assess_one_ticket(ticket: Ticket) -> RiskAssessment:
+    """
+    Analyze a single ticket using both heuristic and LLM-based methods.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
+
+    Returns:
+        RiskAssessment: Internal result; convert with to_result() at the API boundary.
+    """
+    # CPU-bound: normalization + lexicon scan run on the stage executor, not the loop
+    baseline = await run_stage("heuristic", analyze_heuristic, ticket)
+    return await refine_with_llm(ticket, baseline)
+
+
+class PreparedAssessment:
+    """
+    A batch whose cheap results are known and whose LLM refinement has not run yet.
+
+    Built by prepare_assessment(). provisional() returns the results available
+    right away; refine() runs the LLM refinement and returns the final results.
+
+    Args:
+        tickets (list[Ticket]): Tickets of the batch.
+        tenants (list[str]): Tenant of each ticket.
+        rules (CompiledRules): Rules behind the baselines.
+        results (list[RiskAssessment | None]): Final results known so far (None = pending).
+        to_refine (list[tuple[int, RiskAssessment]]): (index, baseline) of tickets for the LLM.
+    """
+
+    def __init__(self, tickets: list[Ticket], tenants: list[str], rules: CompiledRules,
+                 results: list[RiskAssessment | None], to_refine: list[tuple[int, RiskAssessment]]):
+        self.tickets = tickets
+        self.tenants = tenants
+        self.rules = rules
+        self.results = results
+        self.to_refine = to_refine
+        # refine_with_llm updates baselines in place: keep copies for the state store
+        self._kept = [replace(baseline, signals=list(baseline.signals)) for _, baseline in to_refine]
+
+    @property
+    def pending(self) -> list[int]:
+        """Indexes of the tickets waiting for LLM refinement."""
+        return [i for i, _ in self.to_refine]
+
+    def provisional(self) -> list[RiskAssessment]:
+        """Results available now; tickets awaiting the LLM get their baseline flagged provisional."""
+        results = list(self.results)
+        for (i, _), kept in zip(self.to_refine, self._kept):
+            results[i] = replace(kept, signals=list(kept.signals), provisional=True)
+        return results
+
+    async def refine(self, on_result: Callable[[int, RiskAssessment], None] | None = None) -> list[RiskAssessment]:
+        """
+        Run the LLM refinement through the shared scheduler.
+
+        Args:
+            on_result (Callable[[int, RiskAssessment], None] | None): Called with the
+                ticket index and final result as each refinement lands.
+
+        Returns:
+            list[RiskAssessment]: Final results in input order.
+        """
+        if not self.to_refine:
+            return self.results
+        tickets = self.tickets
+
+        async def refine_one(ticket: Ticket, baseline: RiskAssessment) -> RiskAssessment:
+            result = await refine_with_llm(ticket, baseline)
+            if on_result is not None:
+                on_result(index[id(baseline)], result)
+            return result
+
+        index = {id(baseline): i for i, baseline in self.to_refine}
+        token = interactive_request.set(len(tickets) <= INTERACTIVE_MAX_TICKETS)
+        try:
+            refined = await get_scheduler().run_batch(
+                [tickets[i] for i in self.pending], [baseline for _, baseline in self.to_refine], refine_one)
+        finally:
+            interactive_request.reset(token)
+        for (i, _), baseline, result in zip(self.to_refine, self._kept, refined):
+            self.results[i] = result
+            # Failed refinements are not remembered, so the next submission retries the LLM
+            if TICKET_STATE_ENABLED and not any(s.startswith("llm_error:") for s in result.signals):
+                ticket_state.put(self.tenants[i], tickets[i], baseline, result, self.rules)
+        return self.results
+
+
+async def prepare_assessment(tickets: list[Ticket]) -> PreparedAssessment:
+    """
+    Run every step of assess_tickets() that does not need the LLM.
+
+    Re-submitted tickets are served from the ticket state store when possible: an
+    unchanged ticket returns its last result, an SLA-only change updates the SLA
+    component and label, and a small text change (heuristic delta under
+    TICKET_STATE_LLM_DELTA) is carried forward without an LLM call. The cheap
+    baseline of the remaining tickets is computed in executor batches. Requests
+    admitted in degraded mode (overload) get the baselines, flagged degraded, and
+    nothing to refine.
+
+    Args:
+        tickets (list[Ticket]): Tickets to analyze.
+
+    Returns:
+        PreparedAssessment: Known results and the tickets left for the LLM.
+    """
+    results: list[RiskAssessment | None] = [None] * len(tickets)
+    rules = get_rules()
+    tenants = [resolve_tenant(ticket.customer) for ticket in tickets]
+    pending = list(range(len(tickets)))
+    if TICKET_STATE_ENABLED:
+        for i in pending:
+            results[i] = ticket_state.lookup(tenants[i], tickets[i], rules)
+        pending = [i for i in pending if results[i] is None]
+
+    baselines = await map_stage("heuristic", assess_tickets_heuristic, [tickets[i] for i in pending], batched=True)
+    if degraded_request.get():
+        for i, baseline in zip(pending, baselines):
+            baseline.degraded = True
+            results[i] = baseline
+        return PreparedAssessment(tickets, tenants, rules, results, [])
+
+    to_refine = []
+    for i, baseline in zip(pending, baselines):
+        reused = ticket_state.reuse(tenants[i], tickets[i], baseline, rules) if TICKET_STATE_ENABLED else None
+        if reused is not None:
+            results[i] = reused
+        else:
+            to_refine.append((i, baseline))
+    return PreparedAssessment(tickets, tenants, rules, results, to_refine)
+
+
+async def assess_tickets(tickets: list[Ticket]) -> list[RiskAssessment]:
+    """
+    Analyze a batch: heuristics for every ticket first, then LLM refinement by priority.
+
+    See prepare_assessment() for the steps that skip the LLM (ticket state, degraded
+    mode). LLM calls are dispatched through the shared priority scheduler, so
+    HIGH-risk / oldest tickets are refined first within this batch and across
+    concurrent requests.
+
+    Args:
+        tickets (list[Ticket]): Tickets to analyze.
+
+    Returns:
+        list[RiskAssessment]: Results in input order.
+    """
+    return await (await prepare_assessment(tickets)).refine()
+
+
+async def analyze_one_ticket(ticket: Ticket) -> TicketResult:
+    """
+    Analyze a single ticket and return the public TicketResult model.
+
+    Args:
+        ticket (Ticket): The ticket to analyze.
+
+    Returns:
+        TicketResult: Analysis result with risk score, label, and reasoning.
+    """
+    return (await assess_one_ticket(ticket)).to_result()
@@ -0,0 +1,510 @@
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, replace
+from pathlib import Path
+from app.models import RiskLabel, Ticket
+from app.services.assessment import BREAKDOWN_KEYS, RiskAssessment, intern_signal
+from app.services.metrics import metrics
+from app.services.text_normalization import normalize
+
+logger = logging.getLogger(__name__)
+
+RISK_RULES_PATH = os.getenv("RISK_RULES_PATH", str(Path(__file__).resolve().parent.parent / "data" / "risk_rules.json"))
+# Seconds between checks of the rules file mtime (0 = check on every call)
+RISK_RULES_RELOAD_INTERVAL = float(os.getenv("RISK_RULES_RELOAD_INTERVAL", "2"))
+# A reload is rejected when scoring a ticket takes longer than this on the examples
+RISK_RULES_MAX_EVAL_US = float(os.getenv("RISK_RULES_MAX_EVAL_US", "500"))
+# SLA ages up to this many hours are resolved by table lookup (older tickets scan the bands)
+SLA_TABLE_HOURS = int(os.getenv("SLA_TABLE_HOURS", "720"))
+
+KEYWORD_CATEGORIES = ("escalation", "churn", "sentiment")
+# Lexicon merged into every language's lexicon (brand names, agencies)
+COMMON_LEXICON = "common"
+_LANGUAGE_RE = re.compile(r"^[a-z]{2,3}(-[a-z0-9]+)*$", re.IGNORECASE)
+_BENCH_ROUNDS = 200
+
+
+class RuleValidationError(ValueError):
+    """Raised when a rules document is malformed or fails its own examples."""
+
+
+@dataclass(frozen=True, slots=True)
+class _Category:
+    name: str
+    weight: int
+    reason: str
+
+
+# (score, signal, reason) of the SLA band matching an age; (0, None, None) below every band
+SlaEntry = tuple[int, str | None, str | None]
+_NO_BAND: SlaEntry = (0, None, None)
+
+# Per-category keyword tuples of one language: ((needle, display), ...) per category,
+# where needle is the normalized keyword prefixed with a space (word-start match).
+Lexicon = tuple[tuple[tuple[str, str], ...], ...]
+
+
+@dataclass(frozen=True, slots=True)
+class _SlaBand:
+    min_hours: int
+    score: int
+    signal: str
+    reason: str
+
+
+class CompiledRules:
+    """
+    Immutable, pre-processed form of a rules document.
+
+    Keywords are normalized (see text_normalization) and deduplicated into one
+    lexicon per language, each already merged with the common lexicon. A plain
+    `in` scan over tuples beats a regex alternation for vocabularies of this size.
+
+    Everything after the keyword scan is a table lookup: the SLA band of each age
+    up to sla_table_hours (reason already formatted), the label and action of every
+    score, and the reason text of every combination of categories and SLA reason.
+    Reasons, actions and signals are interned, so results share one copy of each.
+    """
+
+    __slots__ = ("version", "max_score", "categories", "lexicons", "_by_primary", "_all",
+                 "sla_bands", "labels", "overrides", "default_reason",
+                 "sla_table", "label_table", "reason_table")
+
+    def __init__(self, document: dict):
+        self.version = document.get("version", 0)
+        self.max_score = document.get("max_score", 100)
+        specs = document["categories"]
+        self.categories = tuple(
+            _Category(name=name, weight=spec["weight"], reason=spec.get("reason", name))
+            for name, spec in specs.items()
+        )
+        languages = sorted({lang for spec in specs.values() for lang in spec["keywords"]} - {COMMON_LEXICON})
+        self.lexicons = {
+            lang.lower(): self._lexicon(specs, (COMMON_LEXICON, lang)) for lang in languages
+        }
+        # "pt-PT" falls back to the first lexicon of the same primary language
+        self._by_primary = {}
+        for lang in languages:
+            self._by_primary.setdefault(lang.split("-")[0].lower(), self.lexicons[lang.lower()])
+        # Unknown languages are scanned with every lexicon
+        self._all = self._lexicon(specs, (COMMON_LEXICON, *languages))
+        self.sla_bands = tuple(sorted(
+            (_SlaBand(b["min_hours"], b["score"], intern_signal(b["signal"]), b.get("reason", "ticket aging"))
+             for b in document.get("sla_bands", [])),
+            key=lambda b: b.min_hours, reverse=True,
+        ))
+        self.labels = tuple(sorted(
+            ((l["min_score"], RiskLabel(l["label"]), sys.intern(l["action"])) for l in document["labels"]),
+            key=lambda l: l[0], reverse=True,
+        ))
+        self.overrides = tuple(
+            (RiskLabel(o["label"]), next(a for _, l, a in self.labels if l == o["label"]), tuple(o["when"].items()))
+            for o in document.get("overrides", [])
+        )
+        self.default_reason = sys.intern(document.get("default_reason", "No critical risk detected."))
+
+        # Lookup tables: SLA entry per hour, (label, action) per score, reason per
+        # (category mask, SLA reason)
+        self.sla_table = tuple(self._sla_band(hours) for hours in range(
+            max(SLA_TABLE_HOURS, *(b.min_hours for b in self.sla_bands), 0) + 1))
+        self.label_table = tuple(
+            next((label, action) for min_score, label, action in self.labels if score >= min_score)
+            for score in range(self.max_score + 1)
+        )
+        sla_reasons = {entry[2] for entry in self.sla_table}
+        self.reason_table = {
+            (mask, sla_reason): self._compose_reason(mask, sla_reason)
+            for mask in range(1 << len(self.categories)) for sla_reason in sla_reasons
+        }
+
+    @staticmethod
+    def _lexicon(specs: dict, languages: tuple[str, ...]) -> Lexicon:
+        lexicon = []
+        for spec in specs.values():
+            needles: dict[str, str] = {}
+            for lang in languages:
+                for keyword in spec["keywords"].get(lang, ()):
+                    # Accent/case variants collapse to one needle; the first spelling is displayed
+                    needles.setdefault(normalize(keyword).rstrip(), keyword)
+            lexicon.append(tuple(needles.items()))
+        return tuple(lexicon)
+
+    def _sla_band(self, hours: int) -> SlaEntry:
+        for band in self.sla_bands:
+            if hours >= band.min_hours:
+                return band.score, band.signal, sys.intern(band.reason.format(hours=hours))
+        return _NO_BAND
+
+    def _compose_reason(self, mask: int, sla_reason: str | None) -> str:
+        reasons = {c.name: c.reason for bit, c in enumerate(self.categories) if mask >> bit & 1}
+        if sla_reason is not None:
+            reasons["sla"] = sla_reason
+        reason_parts = [reasons[key] for key in BREAKDOWN_KEYS if key in reasons]
+        return sys.intern(" and ".join(reason_parts).capitalize() + ".") if reason_parts else self.default_reason
+
+    def sla_entry(self, hours: int) -> SlaEntry:
+        """(score, signal, reason) of the SLA band for an age in hours (table lookup when in range)."""
+        if 0 <= hours < len(self.sla_table):
+            return self.sla_table[hours]
+        return self._sla_band(hours)
+
+    def reason_for(self, mask: int, sla_reason: str | None) -> str:
+        """Reason text for a bit mask of hit categories (in self.categories order) and an SLA reason."""
+        reason = self.reason_table.get((mask, sla_reason))
+        return reason if reason is not None else self._compose_reason(mask, sla_reason)
+
+    def lexicon_for(self, language: str | None) -> Lexicon:
+        """Keywords for a ticket language: exact tag, then primary language, then all lexicons."""
+        if not language:
+            return self._all
+        language = language.lower()
+        lexicon = self.lexicons.get(language) or self._by_primary.get(language.split("-")[0])
+        return lexicon or self._all
+
+    def find_keywords(self, text: str, language: str | None = None) -> list[str]:
+        """Return every keyword of any category found in the text (all lexicons if language is None)."""
+        normalized = normalize(text)
+        return [display for needles in self.lexicon_for(language)
+                for needle, display in needles if needle in normalized]
+
+    @staticmethod
+    def _scan(result: RiskAssessment, ticket: Ticket, scan) -> int:
+        """Set the weight and signal of every category with a keyword hit; return their bit mask."""
+        text = normalize(f"{ticket.last_message} {ticket.conversation_summary}")
+        mask = 0
+        for bit, (category, needles) in scan:
+            hits = [display for needle, display in needles if needle in text]
+            if hits:
+                setattr(result, category.name, category.weight)
+                result.signals.append(intern_signal(f"{category.name}: {', '.join(hits)}"))
+                mask |= 1 << bit
+        return mask
+
+    def assess(self, ticket: Ticket) -> RiskAssessment:
+        """
+        Score a ticket with these rules.
+
+        Args:
+            ticket (Ticket): The ticket to analyze.
+
+        Returns:
+            RiskAssessment: Breakdown, score, label, reason, action and signals.
+        """
+        result = RiskAssessment(id=ticket.id)
+        mask = self._scan(result, ticket, enumerate(zip(self.categories, self.lexicon_for(ticket.language))))
+
+        result.sla, sla_signal, sla_reason = self.sla_entry(ticket.sla_hours_open)
+        if sla_signal is not None:
+            result.signals.append(sla_signal)
+
+        result.risk_score = min(result.escalation + result.churn + result.sla + result.sentiment, self.max_score)
+        result.risk_label, result.suggested_action = self.label_for(result)
+        result.reason = self.reason_for(mask, sla_reason)
+        return result
+
+    def assess_many(self, tickets: list[Ticket]) -> list[RiskAssessment]:
+        """
+        Score a batch of tickets with these rules (same results as assess() per ticket).
+
+        The keyword scan is per ticket, but the lexicon is resolved once per language
+        and the table lookups once per distinct (category mask, SLA age) in the batch:
+        SLA entry, score, label, action and reason only depend on that pair.
+        """
+        lexicons: dict[str | None, tuple] = {}
+        outcomes: dict[tuple[int, int], tuple] = {}
+        weights = [(category.name, category.weight) for category in self.categories]
+        results = []
+        for ticket in tickets:
+            scan = lexicons.get(ticket.language)
+            if scan is None:
+                lexicon = self.lexicon_for(ticket.language)
+                scan = lexicons[ticket.language] = tuple(enumerate(zip(self.categories, lexicon)))
+            result = RiskAssessment(id=ticket.id)
+            mask = self._scan(result, ticket, scan)
+
+            key = (mask, ticket.sla_hours_open)
+            outcome = outcomes.get(key)
+            if outcome is None:
+                sla, sla_signal, sla_reason = self.sla_entry(ticket.sla_hours_open)
+                probe = RiskAssessment(id=ticket.id, sla=sla)
+                for bit, (name, weight) in enumerate(weights):
+                    if mask >> bit & 1:
+                        setattr(probe, name, weight)
+                probe.risk_score = min(probe.escalation + probe.churn + sla + probe.sentiment, self.max_score)
+                label, action = self.label_for(probe)
+                outcome = outcomes[key] = (sla, sla_signal, probe.risk_score, label, action,
+                                           self.reason_for(mask, sla_reason))
+            (result.sla, sla_signal, result.risk_score,
+             result.risk_label, result.suggested_action, result.reason) = outcome
+            if sla_signal is not None:
+                result.signals.append(sla_signal)
+            results.append(result)
+        return results
+
+    def label_for(self, assessment: RiskAssessment) -> tuple[RiskLabel, str]:
+        """Label and action for an assessment's score and breakdown (threshold table, then overrides)."""
+        label, action = self.label_table[min(max(assessment.risk_score, 0), self.max_score)]
+        for override_label, override_action, conditions in self.overrides:
+            if all(getattr(assessment, key) >= minimum for key, minimum in conditions):
+                return override_label, override_action
+        return label, action
+
+    def rescore_sla(self, baseline: RiskAssessment, sla_hours_open: int) -> RiskAssessment:
+        """
+        Re-assess a heuristic baseline for a new SLA age without rescanning the text.
+
+        Only the SLA component, its signal and reason, the score and the label change,
+        so the result equals assess() on the same text with the new sla_hours_open.
+
+        Args:
+            baseline (RiskAssessment): Result of assess() under these rules (not modified).
+            sla_hours_open (int): New SLA age in hours.
+
+        Returns:
+            RiskAssessment: Updated copy.
+        """
+        band_signals = {band.signal for band in self.sla_bands}
+        result = replace(baseline, signals=[s for s in baseline.signals if s not in band_signals])
+        mask = sum(1 << bit for bit, c in enumerate(self.categories) if getattr(result, c.name))
+        result.sla, sla_signal, sla_reason = self.sla_entry(sla_hours_open)
+        if sla_signal is not None:
+            result.signals.append(sla_signal)
+        result.risk_score = min(result.escalation + result.churn + result.sla + result.sentiment, self.max_score)
+        result.risk_label, result.suggested_action = self.label_for(result)
+        result.reason = self.reason_for(mask, sla_reason)
+        return result
+
+def validate_rules(document: dict) -> None:
+    """
+    Check the structure of a rules document.
+
+    Raises:
+        RuleValidationError: On the first problem found.
+    """
+    def fail(message: str):
+        raise RuleValidationError(message)
+
+    if not isinstance(document, dict):
+        fail("rules document must be a JSON object")
+    if not isinstance(document.get("max_score", 100), int) or document.get("max_score", 100) < 1:
+        fail("'max_score' must be a positive integer")
+    for key in ("sla_bands", "overrides", "examples"):
+        if not isinstance(document.get(key, []), list) or not all(isinstance(e, dict) for e in document.get(key, [])):
+            fail(f"'{key}' must be a list of objects")
+    if not isinstance(document.get("default_reason", ""), str):
+        fail("'default_reason' must be a string")
+    categories = document.get("categories")
+    if not isinstance(categories, dict) or not categories:
+        fail("'categories' must be a non-empty object")
+    for name, spec in categories.items():
+        if name not in KEYWORD_CATEGORIES:
+            fail(f"unknown category '{name}' (expected one of {', '.join(KEYWORD_CATEGORIES)})")
+        if not isinstance(spec, dict):
+            fail(f"category '{name}' must be an object")
+        if not isinstance(spec.get("reason", ""), str):
+            fail(f"category '{name}': reason must be a string")
+        if not isinstance(spec.get("weight"), int) or not 0 <= spec["weight"] <= 100:
+            fail(f"category '{name}': weight must be an integer in 0..100")
+        keywords = spec.get("keywords")
+        if not isinstance(keywords, dict) or not all(
+            isinstance(words, list) and all(isinstance(k, str) and normalize(k).strip() for k in words)
+            for words in keywords.values()
+        ):
+            fail(f"category '{name}': keywords must map language -> list of non-empty strings")
+        for lang in keywords:
+            if lang != COMMON_LEXICON and not _LANGUAGE_RE.match(lang):
+                fail(f"category '{name}': '{lang}' is not a language tag (e.g. pt-BR) or '{COMMON_LEXICON}'")
+
+    for band in document.get("sla_bands", []):
+        if not all(isinstance(band.get(f), int) and band[f] >= 0 for f in ("min_hours", "score")):
+            fail("sla band: min_hours and score must be non-negative integers")
+        if not isinstance(band.get("signal"), str):
+            fail("sla band: signal is required")
+        if not isinstance(band.get("reason", ""), str):
+            fail("sla band: reason must be a string")
+
+    labels = document.get("labels")
+    if not isinstance(labels, list) or not labels or not all(isinstance(entry, dict) for entry in labels):
+        fail("'labels' must be a non-empty list of objects")
+    for entry in labels:
+        if entry.get("label") not in RiskLabel.__members__:
+            fail(f"unknown label '{entry.get('label')}'")
+        if not isinstance(entry.get("min_score"), int) or not isinstance(entry.get("action"), str):
+            fail(f"label '{entry['label']}': min_score (int) and action (str) are required")
+    if min(entry["min_score"] for entry in labels) != 0:
+        fail("one label must have min_score 0")
+
+    defined = {entry["label"] for entry in labels}
+    for override in document.get("overrides", []):
+        if override.get("label") not in defined:
+            fail(f"override label '{override.get('label')}' is not defined in 'labels'")
+        when = override.get("when")
+        if not isinstance(when, dict) or not when or not set(when) <= set(BREAKDOWN_KEYS):
+            fail(f"override 'when' must map breakdown keys ({', '.join(BREAKDOWN_KEYS)}) to minimums")
+
+    for i, example in enumerate(document.get("examples", [])):
+        if not isinstance(example.get("text"), str) or example.get("label") not in RiskLabel.__members__:
+            fail(f"example {i}: text (str) and label ({', '.join(RiskLabel.__members__)}) are required")
+        if not isinstance(example.get("sla_hours_open", 0), int) or example.get("sla_hours_open", 0) < 0:
+            fail(f"example {i}: sla_hours_open must be a non-negative integer")
+        if not all(isinstance(example.get(key, ""), str) for key in ("summary", "language")):
+            fail(f"example {i}: summary and language must be strings")
+
+
+def _example_ticket(example: dict, index: int) -> Ticket:
+    return Ticket(
+        id=f"RULES-EXAMPLE-{index}",
+        customer="rules",
+        channel="email",
+        last_message=example["text"],
+        conversation_summary=example.get("summary", ""),
+        sla_hours_open=example.get("sla_hours_open", 0),
+        language=example.get("language", "pt-BR"),
+    )
+
+
+def compile_rules(document: dict, max_eval_us: float = RISK_RULES_MAX_EVAL_US) -> tuple[CompiledRules, float]:
+    """
+    Validate, compile, check and benchmark a rules document.
+
+    Every entry of the optional "examples" list must get its expected label, and the
+    mean time to score one example must stay under max_eval_us.
+
+    Args:
+        document (dict): Parsed rules document.
+        max_eval_us (float): Per-ticket scoring budget in microseconds (0 disables the check).
+
+    Returns:
+        tuple[CompiledRules, float]: Compiled rules and measured microseconds per ticket.
+
+    Raises:
+        RuleValidationError: If the document is invalid, an example is mislabelled or
+            scoring is over budget.
+    """
+    validate_rules(document)
+    try:
+        rules = CompiledRules(document)
+        examples = [_example_ticket(e, i) for i, e in enumerate(document.get("examples", []))]
+    except Exception as e:
+        # Anything validate_rules let through (e.g. a bad reason template) rejects the file too
+        raise RuleValidationError(f"cannot compile rules: {type(e).__name__}: {e}") from e
+
+    for example, ticket in zip(document.get("examples", []), examples):
+        label = rules.assess(ticket).risk_label
+        if label != example["label"]:
+            raise RuleValidationError(
+                f"example {ticket.id} ({example['text']!r}) expected {example['label']}, got {label.value}"
+            )
+
+    eval_us = 0.0
+    if examples:
+        start = time.perf_counter()
+        for _ in range(_BENCH_ROUNDS):
+            for ticket in examples:
+                rules.assess(ticket)
+        eval_us = (time.perf_counter() - start) / (_BENCH_ROUNDS * len(examples)) * 1e6
+        if max_eval_us and eval_us > max_eval_us:
+            raise RuleValidationError(f"scoring takes {eval_us:.1f}us per ticket (budget {max_eval_us:.0f}us)")
+    return rules, eval_us
+
+
+def load_rules(path: str) -> tuple[CompiledRules, float]:
+    """Read a rules file and compile it (see compile_rules)."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            document = json.load(fh)
+    except json.JSONDecodeError as e:
+        raise RuleValidationError(f"{path}: invalid JSON: {e}") from e
+    return compile_rules(document)
+
+
+class RuleSet:
+    """
+    Holder for the active CompiledRules with mtime-based hot reload.
+
+    Callers take a reference with current() and score with it, so a reload (a single
+    attribute swap) never changes rules under a request that is already running. An
+    invalid file is logged and ignored and the previous rules stay active.
+
+    Only the first load runs in the caller. Afterwards current() just stats the file
+    (at most once per interval) and a changed file is compiled and benchmarked in a
+    background thread, so requests never pay for a reload.
+    """
+
+    def __init__(self, path: str, reload_interval: float = RISK_RULES_RELOAD_INTERVAL):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._rules: CompiledRules | None = None
+        self._mtime: float | None = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._reloader: threading.Thread | None = None
+
+    def _stat(self) -> float | None:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """
+        Load the file if it changed since the last successful load.
+
+        Returns:
+            bool: True if new rules were installed.
+        """
+        with self._lock:
+            mtime = self._stat()
+            if mtime is None or mtime == self._mtime:
+                return False
+            try:
+                rules, eval_us = load_rules(self.path)
+            except Exception as e:
+                # Remember the bad version so it is not re-parsed on every check
+                self._mtime = mtime
+                metrics.inc("rules_reload_errors")
+                if self._rules is None:
+                    raise
+                logger.error("Keeping risk rules v%s, reload rejected: %s", self._rules.version, e)
+                return False
+            self._rules, self._mtime = rules, mtime
+        metrics.inc("rules_reloads")
+        metrics.set_gauge("rules_version", rules.version)
+        metrics.set_gauge("rules_eval_us", round(eval_us, 3))
+        logger.info("Loaded risk rules v%s from %s (%.1fus/ticket)", rules.version, self.path, eval_us)
+        return True
+
+    def current(self) -> CompiledRules:
+        """Return the active rules, checking the file for changes at most once per interval."""
+        if self._rules is None:
+            self.reload()
+            return self._rules
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.reload_interval
+            mtime = self._stat()
+            reloader = self._reloader
+            if mtime is not None and mtime != self._mtime and (reloader is None or not reloader.is_alive()):
+                self._reloader = threading.Thread(target=self.reload,
+                                                  name="risk-rules-reload", daemon=True)
+                self._reloader.start()
+        return self._rules
+
+    def wait_for_reload(self, timeout: float | None = None) -> None:
+        """Block until a background reload started by current() has finished."""
+        reloader = self._reloader
+        if reloader is not None:
+            reloader.join(timeout)
+
+
+_rule_set = RuleSet(RISK_RULES_PATH)
+
+
+def get_rules() -> CompiledRules:
+    """Return the active compiled risk rules, hot-reloading the rules file when it changes."""
+    return _rule_set.current()
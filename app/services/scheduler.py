@@ -0,0 +1,197 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+import weakref
+from typing import Awaitable, Callable
+from app.models import RiskLabel, Ticket
+from app.services.assessment import RiskAssessment
+from app.services.metrics import metrics
+from app.services.tenancy import TenantGate, get_tenant_gate, queued_call, resolve_tenant
+
+# Shared pool of LLM refinement workers per event loop (across all requests)
+LLM_SCHEDULER_WORKERS = int(os.getenv("LLM_SCHEDULER_WORKERS") or os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+_LABEL_CLASS = {RiskLabel.HIGH: 0, RiskLabel.MEDIUM: 1, RiskLabel.LOW: 2}
+
+Refine = Callable[[Ticket, RiskAssessment], Awaitable[RiskAssessment]]
+
+
+def priority(ticket: Ticket, baseline: RiskAssessment) -> tuple[int, int]:
+    """Sort key of a ticket inside its risk class: higher baseline score, then older SLA first."""
+    return (-baseline.risk_score, -ticket.sla_hours_open)
+
+
+class _Job:
+    __slots__ = ("refine", "ticket", "baseline", "future", "enqueued", "context", "tenant")
+
+    def __init__(self, refine: Refine, ticket: Ticket, baseline: RiskAssessment, future: asyncio.Future):
+        # Workers are shared across requests: run each job in its submitter's context
+        # (tenant, traffic recording), copied per job so jobs cannot leak state
+        self.context = contextvars.copy_context()
+        self.context.run(queued_call.set, True)
+        self.tenant = self.context.run(resolve_tenant, ticket.customer)
+        self.refine = refine
+        self.ticket = ticket
+        self.baseline = baseline
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class PriorityScheduler:
+    """
+    Dispatches LLM refinement jobs from every request through one worker pool.
+
+    Jobs are ordered by (risk class, fairness rank, baseline score, SLA age):
+    every HIGH ticket is refined before any MEDIUM one, and so on. Inside a class,
+    the n-th job of each request gets rank n, so concurrent requests are served
+    round-robin instead of one request's batch blocking the others.
+
+    Dispatch is tenant-aware: jobs are queued per tenant and a worker only takes the
+    best job among tenants the tenant gate would admit now (under their concurrency
+    cap, with token budget left). A tenant at its cap keeps its jobs queued, without
+    the gate's deadline, instead of tying up workers that other tenants could use.
+
+    Args:
+        workers (int): Maximum jobs running at once.
+        gate (TenantGate | None): Gate consulted for tenant eligibility (default: the
+            event loop's gate, the one LLM calls go through).
+    """
+
+    def __init__(self, workers: int = LLM_SCHEDULER_WORKERS, gate: TenantGate | None = None):
+        self.workers = max(1, workers)
+        self._gate = gate
+        self._queues: dict[str, list[tuple]] = {}
+        self._depth = 0
+        self._running: dict[str, int] = {}
+        self._changed: asyncio.Future | None = None
+        self._seq = itertools.count()
+        self._active = 0
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @property
+    def gate(self) -> TenantGate:
+        if self._gate is None:
+            self._gate = get_tenant_gate()
+        return self._gate
+
+    async def run_batch(self, tickets: list[Ticket], baselines: list[RiskAssessment],
+                        refine: Refine) -> list[RiskAssessment]:
+        """
+        Schedule one request's tickets and wait for all of them.
+
+        Args:
+            tickets (list[Ticket]): Tickets of the request.
+            baselines (list[RiskAssessment]): Heuristic baselines (same order).
+            refine (Refine): Coroutine function refining one ticket's baseline.
+
+        Returns:
+            list[RiskAssessment]: Refined results in input order.
+        """
+        loop = asyncio.get_running_loop()
+        futures = [loop.create_future() for _ in tickets]
+        order = sorted(range(len(tickets)), key=lambda i: priority(tickets[i], baselines[i]))
+        ranks: dict[int, int] = {}
+        for i in order:
+            risk_class = _LABEL_CLASS.get(baselines[i].risk_label, len(_LABEL_CLASS))
+            rank = ranks[risk_class] = ranks.get(risk_class, -1) + 1
+            key = (risk_class, rank, *priority(tickets[i], baselines[i]), next(self._seq))
+            job = _Job(refine, tickets[i], baselines[i], futures[i])
+            heapq.heappush(self._queues.setdefault(job.tenant, []), (key, job))
+            self._depth += 1
+        metrics.set_gauge("scheduler_queue_depth", self.depth)
+        self._wake()
+        while self._active < self.workers and self._active < self.depth:
+            self._active += 1
+            task = loop.create_task(self._worker())
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        try:
+            return list(await asyncio.gather(*futures))
+        finally:
+            # A cancelled request leaves its queued jobs to be skipped by the workers
+            for future in futures:
+                future.cancel()
+
+    def _next_job(self) -> tuple[_Job | None, float | None]:
+        """Pop the best job of a tenant the gate admits now, else the seconds until a budget refills."""
+        best, retry_in = None, None
+        for tenant, queue in list(self._queues.items()):
+            while queue and queue[0][1].future.done():
+                heapq.heappop(queue)
+                self._depth -= 1
+            if not queue:
+                del self._queues[tenant]
+                continue
+            if best is not None and queue[0][0] >= best[0][0]:
+                continue
+            wait = self.gate.ready_in(tenant, self._running.get(tenant, 0))
+            if wait == 0:
+                best = queue
+            elif wait is not None:
+                retry_in = wait if retry_in is None else min(retry_in, wait)
+        job = None
+        if best is not None:
+            _, job = heapq.heappop(best)
+            self._depth -= 1
+        metrics.set_gauge("scheduler_queue_depth", self.depth)
+        return job, retry_in
+
+    def _wake(self) -> None:
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._changed = None
+
+    async def _wait(self, timeout: float | None) -> None:
+        """Wait until a job finishes, new jobs arrive, the gate frees a slot or a budget refills."""
+        if self._changed is None:
+            self._changed = asyncio.get_running_loop().create_future()
+        watcher = self.gate.watch()
+        await asyncio.wait((self._changed, watcher), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+    async def _worker(self) -> None:
+        try:
+            while self._depth:
+                job, retry_in = self._next_job()
+                if job is None:
+                    # Every queued tenant is at its cap or out of budget
+                    if self._depth:
+                        await self._wait(retry_in)
+                    continue
+                metrics.observe("scheduler_wait", time.perf_counter() - job.enqueued,
+                                label=job.baseline.risk_label.value)
+                self._running[job.tenant] = self._running.get(job.tenant, 0) + 1
+                try:
+                    result = await asyncio.get_running_loop().create_task(
+                        job.refine(job.ticket, job.baseline), context=job.context)
+                except Exception as e:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                else:
+                    if not job.future.done():
+                        job.future.set_result(result)
+                finally:
+                    self._running[job.tenant] -= 1
+                    if not self._running[job.tenant]:
+                        del self._running[job.tenant]
+                    self._wake()
+        finally:
+            self._active -= 1
+
+
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, PriorityScheduler]" = weakref.WeakKeyDictionary()
+
+
+def get_scheduler() -> PriorityScheduler:
+    """Return the scheduler shared by all requests on the running event loop."""
+    loop = asyncio.get_running_loop()
+    scheduler = _schedulers.get(loop)
+    if scheduler is None:
+        scheduler = _schedulers[loop] = PriorityScheduler()
+    return scheduler
@@ -0,0 +1,268 @@
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from app.models import Ticket, AIAnalysis
+from app.services.metrics import metrics
+from app.services.rule_engine import CompiledRules, get_rules
+from app.services.tenancy import resolve_tenant
+from app.services.text_normalization import fold, tokenize
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# Entries scanned per lookup at most: each (tenant, model, language, rules version,
+# SLA bucket) partition keeps its most recently used entries only
+SEMANTIC_CACHE_PARTITION_SIZE = int(os.getenv("SEMANTIC_CACHE_PARTITION_SIZE", "256"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "86400"))
+SEMANTIC_CACHE_SNAPSHOT = os.getenv("SEMANTIC_CACHE_SNAPSHOT")
+
+# Hashing-vectorizer dimension (feature hashing, no vocabulary to train or store)
+VECTOR_DIM = 2 ** 12
+# Bumped when the entry layout changes (older snapshots are ignored)
+SNAPSHOT_VERSION = 3
+# Negation words (accent-folded; "t" is what "don't" / "can't" tokenize to). A hit
+# needs the same negations and numbers as the cached text: "I do not want to cancel"
+# is close to "I want to cancel" in bag-of-words space but means the opposite.
+NEGATIONS = frozenset({
+    "not", "no", "never", "t", "dont", "cant", "wont", "without", "nor", "neither", "nothing", "nobody", "none",
+    "nao", "nunca", "nem", "sem", "jamais", "nenhum", "nenhuma", "nada", "ninguem",
+    "ni", "sin", "jamas", "ningun", "ninguno", "ninguna", "nadie",
+})
+
+
+def embed(text: str) -> dict[int, float]:
+    """
+    Embed a text as an L2-normalized sparse vector with feature hashing.
+
+    Features are accent-folded words plus character trigrams of each word, so
+    inflections and small rewordings ("cancel" / "cancelling") stay close.
+
+    Args:
+        text (str): Text to embed.
+
+    Returns:
+        dict[int, float]: Sparse vector {bucket: weight}.
+    """
+    vector: dict[int, float] = {}
+    for word in tokenize(fold(text)):
+        features = [f"w:{word}"]
+        padded = f"<{word}>"
+        features += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        for feature in features:
+            bucket = zlib.crc32(feature.encode("utf-8")) % VECTOR_DIM
+            vector[bucket] = vector.get(bucket, 0.0) + 1.0
+    norm = math.sqrt(sum(v * v for v in vector.values()))
+    if norm:
+        for k in vector:
+            vector[k] /= norm
+    return vector
+
+
+def guard_signature(text: str) -> tuple[tuple[str, ...], tuple[str, ...]]:
+    """Negation words and numbers of a text (sorted), which must match for a cache hit."""
+    words = tokenize(fold(text))
+    return (tuple(sorted(w for w in words if w in NEGATIONS)),
+            tuple(sorted(w for w in words if any(c.isdigit() for c in w))))
+
+
+def cosine(a: dict[int, float], b: dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+def sla_bucket(sla_hours_open: int, rules: CompiledRules | None = None) -> int:
+    """Return the min_hours of the risk rules' SLA band the age falls in (0 below every band)."""
+    for band in (rules or get_rules()).sla_bands:
+        if sla_hours_open >= band.min_hours:
+            return band.min_hours
+    return 0
+
+
+class SemanticCache:
+    """
+    In-memory vector index of previous LLM analyses.
+
+    Entries are partitioned by (tenant, model, language, rules version, SLA bucket) so
+    a lookup only scans results that would have been produced for the same tenant
+    under the same conditions. SLA buckets are the active risk rules' SLA bands, and
+    entries written under an older ruleset stop matching once the rules reload. A hit also needs the same negation words and numbers as the cached
+    text (guard_signature). The index is LRU-ordered, bounded by max_entries overall
+    and partition_size per partition (which bounds the scan on the event loop), and
+    expires entries after ttl_seconds.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl_seconds: int = SEMANTIC_CACHE_TTL_SECONDS,
+                 partition_size: int = SEMANTIC_CACHE_PARTITION_SIZE):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.partition_size = max(1, partition_size)
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[int, dict] = OrderedDict()
+        self._partitions: dict[tuple, OrderedDict[int, None]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _partition(ticket: Ticket, model: str) -> tuple:
+        rules = get_rules()
+        return (resolve_tenant(ticket.customer), model, ticket.language, rules.version,
+                sla_bucket(ticket.sla_hours_open, rules))
+
+    @staticmethod
+    def _text(ticket: Ticket) -> str:
+        return f"{ticket.last_message} {ticket.conversation_summary}"
+
+    def _remove(self, entry_id: int) -> None:
+        entry = self._entries.pop(entry_id)
+        partition = self._partitions.get(entry["partition"])
+        if partition is not None:
+            partition.pop(entry_id, None)
+            if not partition:
+                del self._partitions[entry["partition"]]
+
+    def lookup(self, ticket: Ticket, model: str) -> AIAnalysis | None:
+        """
+        Return a cached analysis for a near-duplicate ticket, if any.
+
+        Args:
+            ticket (Ticket): Ticket about to be sent to the LLM.
+            model (str): Model that would serve it.
+
+        Returns:
+            AIAnalysis | None: Copy of the best match above the threshold, else None.
+        """
+        text = self._text(ticket)
+        vector = embed(text)
+        guard = guard_signature(text)
+        now = time.time()
+        best_id, best_score = None, self.threshold
+        with self._lock:
+            for entry_id in list(self._partitions.get(self._partition(ticket, model), ())):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._remove(entry_id)
+                    continue
+                if entry["guard"] != guard:
+                    continue
+                score = cosine(vector, entry["vector"])
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+            if best_id is None:
+                metrics.inc("semantic_cache_misses")
+                return None
+            self._entries.move_to_end(best_id)
+            self._partitions[self._entries[best_id]["partition"]].move_to_end(best_id)
+            analysis = self._entries[best_id]["analysis"]
+        metrics.inc("semantic_cache_hits")
+        return AIAnalysis(**analysis)
+
+    def store(self, ticket: Ticket, model: str, analysis: AIAnalysis) -> None:
+        """Index an analysis, evicting the least recently used entries past partition_size / max_entries."""
+        partition = self._partition(ticket, model)
+        text = self._text(ticket)
+        entry = {
+            "partition": partition,
+            "vector": embed(text),
+            "guard": guard_signature(text),
+            "analysis": analysis.model_dump(mode="json"),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = entry
+            members = self._partitions.setdefault(partition, OrderedDict())
+            members[entry_id] = None
+            while len(members) > self.partition_size:
+                self._remove(next(iter(members)))
+                metrics.inc("semantic_cache_evictions")
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.inc("semantic_cache_evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._partitions.clear()
+
+    def snapshot(self, path: str) -> int:
+        """
+        Write the index to disk atomically (write to a temp file, then rename).
+
+        Each call writes its own temp file, so several workers snapshotting to the
+        same path at shutdown never interleave; the last rename wins.
+
+        Returns:
+            int: Number of entries written.
+        """
+        with self._lock:
+            rows = [
+                {
+                    "partition": list(e["partition"]),
+                    "vector": [[k, v] for k, v in e["vector"].items()],
+                    "guard": [list(part) for part in e["guard"]],
+                    "analysis": e["analysis"],
+                    "created_at": e["created_at"],
+                }
+                for e in self._entries.values()
+            ]
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=target.parent, prefix=f".{target.name}.",
+                                         suffix=".tmp", delete=False) as tmp:
+            json.dump({"dim": VECTOR_DIM, "version": SNAPSHOT_VERSION, "entries": rows}, tmp)
+        try:
+            os.replace(tmp.name, target)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+        return len(rows)
+
+    def restore(self, path: str) -> int:
+        """
+        Load a snapshot written by snapshot(), keeping LRU order.
+
+        Snapshots from a different vector dimension or entry layout are ignored.
+
+        Returns:
+            int: Number of entries loaded.
+        """
+        target = Path(path)
+        if not target.exists():
+            return 0
+        data = json.loads(target.read_text(encoding="utf-8"))
+        if data.get("dim") != VECTOR_DIM or data.get("version") != SNAPSHOT_VERSION:
+            return 0
+        self.clear()
+        with self._lock:
+            for row in data["entries"][-self.max_entries:]:
+                partition = tuple(row["partition"])
+                entry_id = self._next_id
+                self._next_id += 1
+                self._entries[entry_id] = {
+                    "partition": partition,
+                    "vector": {int(k): v for k, v in row["vector"]},
+                    "guard": tuple(tuple(part) for part in row["guard"]),
+                    "analysis": row["analysis"],
+                    "created_at": row["created_at"],
+                }
+                members = self._partitions.setdefault(partition, OrderedDict())
+                members[entry_id] = None
+                while len(members) > self.partition_size:
+                    self._remove(next(iter(members)))
+        return len(self._entries)
+
+
+semantic_cache = SemanticCache()
@@ -0,0 +1,331 @@
+import asyncio
+import hashlib
+import heapq
+import itertools
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from app.services.metrics import metrics
+
+# Tenants are identified by API key (X-API-Key header) when present, else by Ticket.customer.
+# TENANT_API_KEYS maps keys to tenant names: "key1:acme,key2:globex". Unknown keys
+# get a stable anonymous tenant derived from the key hash.
+TENANT_API_KEYS = os.getenv("TENANT_API_KEYS", "")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "x-api-key")
+# Concurrent LLM calls across all tenants (defaults to LLM_MAX_CONCURRENCY)
+TENANT_GATE_CONCURRENCY = int(os.getenv("TENANT_GATE_CONCURRENCY") or os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Concurrent LLM calls per tenant
+TENANT_MAX_CONCURRENCY = int(os.getenv("TENANT_MAX_CONCURRENCY", "4"))
+# Token budget per tenant per minute (0 = unlimited); bursts up to one minute of budget
+TENANT_TOKENS_PER_MINUTE = int(os.getenv("TENANT_TOKENS_PER_MINUTE", "0"))
+# WFQ weights, "acme=3,globex=1" (default 1)
+TENANT_WEIGHTS = os.getenv("TENANT_WEIGHTS", "")
+# Longest a call may wait for its tenant's quota before failing with TenantQuotaExceeded
+TENANT_MAX_WAIT_SECONDS = float(os.getenv("TENANT_MAX_WAIT_SECONDS", "30"))
+# Requests with at most this many tickets are interactive: they do not queue behind
+# their own tenant's bulk backlog
+INTERACTIVE_MAX_TICKETS = int(os.getenv("INTERACTIVE_MAX_TICKETS", "5"))
+# Completion tokens assumed per call when charging the budget up front
+ESTIMATED_COMPLETION_TOKENS = 256
+
+DEFAULT_TENANT = "default"
+
+# Tenant of the API request (from the API key) and of the ticket being processed
+current_tenant: ContextVar[str | None] = ContextVar("current_tenant", default=None)
+interactive_request: ContextVar[bool] = ContextVar("interactive_request", default=True)
+# Set on calls dispatched by the priority scheduler: they already waited for their
+# tenant's turn there, so the gate queues them without the TENANT_MAX_WAIT_SECONDS deadline
+queued_call: ContextVar[bool] = ContextVar("queued_call", default=False)
+
+
+class TenantQuotaExceeded(Exception):
+    """Raised when a tenant's call cannot get a slot or token budget within TENANT_MAX_WAIT_SECONDS."""
+
+
+def _parse_pairs(raw: str, sep: str) -> dict[str, str]:
+    pairs = {}
+    for item in raw.split(","):
+        if sep in item:
+            key, value = item.split(sep, 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+
+_API_KEYS = _parse_pairs(TENANT_API_KEYS, ":")
+_WEIGHTS = {tenant: float(weight) for tenant, weight in _parse_pairs(TENANT_WEIGHTS, "=").items()}
+
+
+def tenant_for_api_key(api_key: str | None) -> str | None:
+    """Map an API key to its tenant name (None when no key was sent)."""
+    if not api_key:
+        return None
+    return _API_KEYS.get(api_key) or f"key-{hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:8]}"
+
+
+def configured_tenant(api_key: str | None) -> str | None:
+    """Tenant of an API key listed in TENANT_API_KEYS (None for a missing or unknown key)."""
+    return _API_KEYS.get(api_key) if api_key else None
+
+
+def resolve_tenant(customer: str | None = None) -> str:
+    """Tenant of the current work: the API key's tenant, else the ticket customer, else "default"."""
+    return current_tenant.get() or customer or DEFAULT_TENANT
+
+
+class _TenantState:
+    __slots__ = ("in_flight", "last_finish", "tokens", "refilled")
+
+    def __init__(self, tokens: float):
+        self.in_flight = 0
+        self.last_finish = 0.0
+        self.tokens = tokens
+        self.refilled = time.monotonic()
+
+
+class TenantSlot:
+    """A held tenant slot; set `used` to the actual tokens of the call to correct the budget charge."""
+
+    __slots__ = ("tenant", "cost", "used")
+
+    def __init__(self, tenant: str, cost: int):
+        self.tenant = tenant
+        self.cost = cost
+        self.used: int | None = None
+
+
+class TenantGate:
+    """
+    Weighted-fair queue with per-tenant concurrency caps and token budgets.
+
+    Each call gets a virtual finish tag start + cost / weight (start-time fair
+    queuing), where start is the later of the gate's virtual time and the finish tag
+    of the tenant's previous call. Slots go to the smallest tag whose tenant is under
+    its concurrency cap and has budget left, so a tenant with a 5k-ticket backlog
+    only delays others by its fair share. Interactive calls start at the gate's
+    virtual time, i.e. they never queue behind their own tenant's backlog.
+
+    Args:
+        capacity (int): Concurrent calls across all tenants.
+        tenant_concurrency (int): Concurrent calls per tenant.
+        tokens_per_minute (int): Per-tenant token budget (0 = unlimited).
+        weights (dict[str, float]): WFQ weight per tenant (default 1).
+        max_wait (float): Seconds a call may wait before TenantQuotaExceeded.
+    """
+
+    def __init__(self, capacity: int = TENANT_GATE_CONCURRENCY, tenant_concurrency: int = TENANT_MAX_CONCURRENCY,
+                 tokens_per_minute: int = TENANT_TOKENS_PER_MINUTE, weights: dict[str, float] | None = None,
+                 max_wait: float = TENANT_MAX_WAIT_SECONDS):
+        self.capacity = max(1, capacity)
+        self.tenant_concurrency = max(1, tenant_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.weights = _WEIGHTS if weights is None else weights
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self._vtime = 0.0
+        self._tenants: dict[str, _TenantState] = {}
+        self._waiters: list[tuple] = []
+        self._seq = itertools.count()
+        self._refill_timer: asyncio.TimerHandle | None = None
+        self._watchers: list[asyncio.Future] = []
+
+    def _state(self, tenant: str) -> _TenantState:
+        state = self._tenants.get(tenant)
+        if state is None:
+            state = self._tenants[tenant] = _TenantState(self.tokens_per_minute)
+        return state
+
+    def _refill(self, state: _TenantState, now: float) -> None:
+        if self.tokens_per_minute:
+            elapsed = now - state.refilled
+            state.tokens = min(self.tokens_per_minute, state.tokens + elapsed * self.tokens_per_minute / 60)
+        state.refilled = now
+
+    def _eligible(self, tenant: str, now: float) -> bool:
+        state = self._state(tenant)
+        if state.in_flight >= self.tenant_concurrency:
+            return False
+        self._refill(state, now)
+        return not self.tokens_per_minute or state.tokens > 0
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        skipped = []
+        while self._waiters and self.in_flight < self.capacity:
+            entry = heapq.heappop(self._waiters)
+            finish, _, tenant, cost, future = entry
+            if future.done():
+                continue
+            if not self._eligible(tenant, now):
+                skipped.append(entry)
+                continue
+            state = self._tenants[tenant]
+            state.in_flight += 1
+            state.tokens -= cost
+            self.in_flight += 1
+            self._vtime = max(self._vtime, finish)
+            future.set_result(None)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+        self._schedule_refill(skipped, now)
+        metrics.set_gauge("tenant_gate_in_flight", self.in_flight)
+        metrics.set_gauge("tenant_gate_queue_depth", len(self._waiters))
+
+    def _schedule_refill(self, skipped: list[tuple], now: float) -> None:
+        # Waiters blocked only by their token budget need a wake-up once it refills
+        if not self.tokens_per_minute or self._refill_timer is not None:
+            return
+        deficits = [-self._tenants[e[2]].tokens for e in skipped
+                    if self._tenants[e[2]].in_flight < self.tenant_concurrency]
+        if deficits:
+            delay = (max(0.0, min(deficits)) + 1) * 60 / self.tokens_per_minute
+            self._refill_timer = asyncio.get_running_loop().call_later(delay, self._on_refill)
+
+    def _on_refill(self) -> None:
+        self._refill_timer = None
+        self._dispatch()
+        self._notify()
+
+    def _notify(self) -> None:
+        watchers, self._watchers = self._watchers, []
+        for watcher in watchers:
+            if not watcher.done():
+                watcher.set_result(None)
+
+    def ready_in(self, tenant: str, running: int = 0) -> float | None:
+        """
+        How soon a new call of a tenant could start, for callers queueing work ahead of the gate.
+
+        Args:
+            tenant (str): Tenant of the call.
+            running (int): Calls of the tenant the caller has already started (counted
+                against the concurrency cap when above the gate's own count).
+
+        Returns:
+            float | None: 0 if it can start now, the seconds until its token budget
+            refills, or None while the tenant is at its concurrency cap (see watch()).
+        """
+        state = self._state(tenant)
+        if max(state.in_flight, running) >= self.tenant_concurrency:
+            return None
+        self._refill(state, time.monotonic())
+        if not self.tokens_per_minute or state.tokens > 0:
+            return 0.0
+        return (1 - state.tokens) * 60 / self.tokens_per_minute
+
+    def watch(self) -> asyncio.Future:
+        """Future resolved at the next release or budget refill."""
+        watcher = asyncio.get_running_loop().create_future()
+        self._watchers.append(watcher)
+        return watcher
+
+    async def acquire(self, tenant: str, cost: int, interactive: bool = False, queued: bool = False) -> None:
+        """
+        Wait for a slot for one call of `cost` tokens.
+
+        Args:
+            tenant (str): Tenant charged for the call.
+            cost (int): Estimated tokens of the call.
+            interactive (bool): Start at the gate's virtual time (skip the tenant's backlog).
+            queued (bool): The call already waited its turn upstream: wait without max_wait.
+
+        Raises:
+            TenantQuotaExceeded: If no slot or budget was granted within max_wait.
+        """
+        state = self._state(tenant)
+        weight = self.weights.get(tenant, 1.0)
+        start = self._vtime if interactive else max(self._vtime, state.last_finish)
+        finish = start + cost / weight
+        if not interactive:
+            state.last_finish = finish
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (finish, next(self._seq), tenant, cost, future))
+        self._dispatch()
+        if future.done():
+            return  # uncontended: granted without yielding to the loop
+        waited = time.perf_counter()
+        try:
+            await asyncio.wait_for(future, timeout=None if queued else self.max_wait)
+        except asyncio.CancelledError:
+            # Granted just as the caller was cancelled: give the slot back
+            if future.done() and not future.cancelled():
+                self.release(tenant, cost)
+            raise
+        except asyncio.TimeoutError:
+            metrics.inc("tenant_quota_rejections", tenant=tenant)
+            self._dispatch()
+            raise TenantQuotaExceeded(f"Tenant '{tenant}' over its LLM quota") from None
+        metrics.observe("tenant_queue_wait", time.perf_counter() - waited, tenant=tenant)
+
+    def tenant_in_flight(self, tenant: str) -> int:
+        state = self._tenants.get(tenant)
+        return state.in_flight if state else 0
+
+    def release(self, tenant: str, cost: int, used: int | None = None) -> None:
+        """Free the tenant's slot; `used` corrects the budget charge when actual usage is known."""
+        state = self._tenants[tenant]
+        state.in_flight -= 1
+        self.in_flight -= 1
+        if used is not None:
+            state.tokens += cost - used
+        self._dispatch()
+        self._notify()
+
+
+_gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, TenantGate]" = weakref.WeakKeyDictionary()
+
+
+def get_tenant_gate() -> TenantGate:
+    """Return the gate of the running event loop (one per worker process in production)."""
+    loop = asyncio.get_running_loop()
+    gate = _gates.get(loop)
+    if gate is None:
+        gate = _gates[loop] = TenantGate()
+    return gate
+
+
+@asynccontextmanager
+async def tenant_slot(tenant: str, cost: int):
+    """
+    Hold a tenant slot around one LLM call and record per-tenant usage.
+
+    Args:
+        tenant (str): Tenant charged for the call.
+        cost (int): Estimated tokens (prompt + expected completion).
+
+    Yields:
+        TenantSlot: Set its `used` once the actual token usage is known.
+    """
+    gate = get_tenant_gate()
+    await gate.acquire(tenant, cost, interactive=interactive_request.get(), queued=queued_call.get())
+    metrics.inc("tenant_llm_requests", tenant=tenant)
+    metrics.inc("tenant_tokens", cost, tenant=tenant)
+    metrics.set_gauge("tenant_in_flight", gate.tenant_in_flight(tenant), tenant=tenant)
+    slot = TenantSlot(tenant, cost)
+    try:
+        yield slot
+    finally:
+        gate.release(tenant, cost, slot.used)
+        if slot.used is not None:
+            metrics.inc("tenant_tokens", slot.used - cost, tenant=tenant)
+        metrics.set_gauge("tenant_in_flight", gate.tenant_in_flight(tenant), tenant=tenant)
+
+
+class TenantMiddleware:
+    """ASGI middleware binding the API key's tenant (if any) to the request context."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = TENANT_HEADER.lower().encode("latin-1")
+        api_key = next((v.decode("latin-1") for k, v in scope["headers"] if k == header), None)
+        token = current_tenant.set(tenant_for_api_key(api_key))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
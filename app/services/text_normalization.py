@@ -0,0 +1,42 @@
+import re
+import unicodedata
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_SEPARATOR_RE = re.compile(r"\W+", re.UNICODE)
+# Combining Diacritical Marks blocks (accents left over after NFKD decomposition)
+_MARKS_RE = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]+")
+
+
+def fold(text: str) -> str:
+    """
+    Unicode-fold a text: compatibility decomposition, accents stripped, casefolded.
+
+    "Não RENOVO" and "nao renovo" both fold to "nao renovo".
+    """
+    if text.isascii():
+        return text.casefold()
+    return _MARKS_RE.sub("", unicodedata.normalize("NFKD", text)).casefold()
+
+
+def tokenize(text: str) -> list[str]:
+    """Split an already folded text into word tokens (punctuation is dropped)."""
+    return _TOKEN_RE.findall(text)
+
+
+def normalize(text: str) -> str:
+    """
+    Fold and tokenize a text into a space-delimited, space-padded string.
+
+    Keywords normalized the same way can then be matched at word starts with a
+    plain substring check: `" " + keyword in normalize(text)`. This matches
+    inflections ("cancel" -> "cancelled") but not words that merely contain the
+    keyword ("issue" does not match "sue").
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        str: Normalized text, e.g. " vou cancelar o contrato ".
+    """
+    # Same tokens as tokenize(), joined in one regex pass instead of findall + join
+    return f" {_SEPARATOR_RE.sub(' ', fold(text)).strip()} "
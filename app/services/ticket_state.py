@@ -0,0 +1,199 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from app.models import Ticket
+from app.services.assessment import RiskAssessment
+from app.services.metrics import metrics
+from app.services.rule_engine import CompiledRules
+
+# Last analysis of each ticket id, so re-submissions of the same ticket (new
+# message, SLA tick) are updated incrementally instead of re-run from scratch.
+TICKET_STATE_ENABLED = os.getenv("TICKET_STATE_ENABLED", "true").lower() == "true"
+TICKET_STATE_MAX_ENTRIES = int(os.getenv("TICKET_STATE_MAX_ENTRIES", "50000"))
+TICKET_STATE_TTL_SECONDS = int(os.getenv("TICKET_STATE_TTL_SECONDS", "86400"))
+# A text change re-runs the LLM only when the heuristic score moves by at least
+# this many points (or the heuristic label changes)
+TICKET_STATE_LLM_DELTA = int(os.getenv("TICKET_STATE_LLM_DELTA", "15"))
+
+
+def text_fingerprint(ticket: Ticket) -> int:
+    """Fingerprint of everything but sla_hours_open that feeds the analysis (in-process only)."""
+    return hash((ticket.last_message, ticket.conversation_summary, ticket.language, ticket.customer, ticket.channel))
+
+
+def carry_forward(previous: RiskAssessment, old_baseline: RiskAssessment, new_baseline: RiskAssessment,
+                  rules: CompiledRules) -> RiskAssessment:
+    """
+    Update a previous (possibly LLM-refined) result for a new heuristic baseline.
+
+    The breakdown and heuristic signals are taken from the new baseline and the
+    score moves by the heuristic score delta. A heuristic-only result is relabeled
+    from the rules and takes the new baseline's reason. An LLM-refined result keeps
+    its signals, reason, label and action; it is only relabeled from the rules when
+    the heuristic label changed or the score moved across a label threshold.
+
+    Args:
+        previous (RiskAssessment): Result returned last time.
+        old_baseline (RiskAssessment): Heuristic baseline behind `previous`.
+        new_baseline (RiskAssessment): Heuristic baseline of the updated ticket.
+        rules (CompiledRules): Rules that produced both baselines.
+
+    Returns:
+        RiskAssessment: New result (inputs are not modified).
+    """
+    old_signals = set(old_baseline.signals)
+    refined = [s for s in previous.signals if s not in old_signals]
+    result = replace(
+        previous,
+        escalation=new_baseline.escalation,
+        churn=new_baseline.churn,
+        sla=new_baseline.sla,
+        sentiment=new_baseline.sentiment,
+        signals=new_baseline.signals + refined,
+        risk_score=max(0, min(rules.max_score,
+                              previous.risk_score + new_baseline.risk_score - old_baseline.risk_score)),
+    )
+    if not refined:
+        result.risk_label, result.suggested_action = rules.label_for(result)
+        result.reason = new_baseline.reason
+        return result
+    crossed = (rules.label_table[min(max(previous.risk_score, 0), rules.max_score)][0]
+               != rules.label_table[result.risk_score][0])
+    if crossed or new_baseline.risk_label != old_baseline.risk_label:
+        result.risk_label, result.suggested_action = rules.label_for(result)
+    return result
+
+
+@dataclass(slots=True)
+class _TicketState:
+    fingerprint: int
+    sla_hours_open: int
+    rules: CompiledRules
+    baseline: RiskAssessment
+    result: RiskAssessment
+    updated_at: float
+
+
+class TicketStateStore:
+    """
+    In-memory store of the last analysis per ticket, keyed by (tenant, ticket id).
+
+    - Same text and SLA age: the stored result is returned as is.
+    - Only sla_hours_open changed: the SLA component, score and label are updated
+      from the stored baseline, with no text scan and no LLM call (lookup()).
+    - Text changed: the caller computes a new baseline; the LLM is re-run only if
+      the heuristic score moved by at least llm_delta or its label changed,
+      otherwise the previous result is carried forward (reuse()).
+
+    Entries are tied to the rules (reload) that produced them, LRU-ordered, bounded
+    by max_entries and expire after ttl_seconds.
+    """
+
+    def __init__(self, max_entries: int = TICKET_STATE_MAX_ENTRIES, ttl_seconds: int = TICKET_STATE_TTL_SECONDS,
+                 llm_delta: int = TICKET_STATE_LLM_DELTA):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.llm_delta = llm_delta
+        self._lock = threading.Lock()
+        self._states: OrderedDict[tuple[str, str], _TicketState] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _get(self, key: tuple[str, str], rules: CompiledRules) -> _TicketState | None:
+        state = self._states.get(key)
+        if state is None:
+            return None
+        if state.rules is not rules or time.time() - state.updated_at > self.ttl_seconds:
+            del self._states[key]
+            return None
+        self._states.move_to_end(key)
+        return state
+
+    def lookup(self, tenant: str, ticket: Ticket, rules: CompiledRules) -> RiskAssessment | None:
+        """
+        Return the result for a ticket whose text did not change since its last analysis.
+
+        Args:
+            tenant (str): Tenant owning the ticket id.
+            ticket (Ticket): Re-submitted ticket.
+            rules (CompiledRules): Current heuristic rules.
+
+        Returns:
+            RiskAssessment | None: Stored or SLA-updated result, None if the ticket is
+            new or its text changed.
+        """
+        fingerprint = text_fingerprint(ticket)
+        with self._lock:
+            state = self._get((tenant, ticket.id), rules)
+            if state is None or state.fingerprint != fingerprint:
+                return None
+            if state.sla_hours_open == ticket.sla_hours_open:
+                metrics.inc("ticket_state", outcome="unchanged")
+                return replace(state.result, signals=list(state.result.signals))
+            baseline = rules.rescore_sla(state.baseline, ticket.sla_hours_open)
+            state.result = carry_forward(state.result, state.baseline, baseline, rules)
+            state.baseline = baseline
+            state.sla_hours_open = ticket.sla_hours_open
+            state.updated_at = time.time()
+            metrics.inc("ticket_state", outcome="sla_only")
+            return replace(state.result, signals=list(state.result.signals))
+
+    def reuse(self, tenant: str, ticket: Ticket, baseline: RiskAssessment,
+              rules: CompiledRules) -> RiskAssessment | None:
+        """
+        Carry the previous result forward when a text change barely moved the heuristics.
+
+        Args:
+            tenant (str): Tenant owning the ticket id.
+            ticket (Ticket): Updated ticket.
+            baseline (RiskAssessment): Its new heuristic baseline.
+            rules (CompiledRules): Rules that produced the baseline.
+
+        Returns:
+            RiskAssessment | None: Updated result (also stored), or None when the LLM
+            should run (new ticket or heuristic delta over the threshold).
+        """
+        with self._lock:
+            state = self._get((tenant, ticket.id), rules)
+            if state is None:
+                metrics.inc("ticket_state", outcome="new")
+                return None
+            delta = abs(baseline.risk_score - state.baseline.risk_score)
+            if delta >= self.llm_delta or baseline.risk_label != state.baseline.risk_label:
+                metrics.inc("ticket_state", outcome="text_refined")
+                return None
+            state.result = carry_forward(state.result, state.baseline, baseline, rules)
+            state.baseline = replace(baseline, signals=list(baseline.signals))
+            state.fingerprint = text_fingerprint(ticket)
+            state.sla_hours_open = ticket.sla_hours_open
+            state.updated_at = time.time()
+            metrics.inc("ticket_state", outcome="text_reused")
+            return replace(state.result, signals=list(state.result.signals))
+
+    def put(self, tenant: str, ticket: Ticket, baseline: RiskAssessment, result: RiskAssessment,
+            rules: CompiledRules) -> None:
+        """Remember a fresh analysis (baseline before LLM refinement and the final result)."""
+        state = _TicketState(
+            fingerprint=text_fingerprint(ticket),
+            sla_hours_open=ticket.sla_hours_open,
+            rules=rules,
+            baseline=baseline,
+            result=replace(result, signals=list(result.signals)),
+            updated_at=time.time(),
+        )
+        with self._lock:
+            self._states[(tenant, ticket.id)] = state
+            self._states.move_to_end((tenant, ticket.id))
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+                metrics.inc("ticket_state_evictions")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+
+
+ticket_state = TicketStateStore()
@@ -0,0 +1,238 @@
+import glob
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from app.services.metrics import metrics
+from app.services.response_store import make_key
+from app.services.tenancy import TENANT_HEADER, tenant_for_api_key
+
+# Opt-in production traffic capture. Nothing is recorded unless TRAFFIC_RECORD_PATH is set.
+# A ".gz" suffix writes a gzip-compressed JSONL log. Each worker process writes its own
+# file, with its pid before the suffix (traffic.jsonl.gz -> traffic.1234.jsonl.gz).
+TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH")
+TRAFFIC_RECORD_SAMPLE_RATE = float(os.getenv("TRAFFIC_RECORD_SAMPLE_RATE", "0.1"))
+# Request headers kept in the log (lower case); the API key is replaced by its tenant
+TRAFFIC_RECORD_HEADERS = os.getenv("TRAFFIC_RECORD_HEADERS",
+                                   f"content-type,x-priority,x-request-id,x-llm-usage,{TENANT_HEADER}")
+# Records waiting for the writer thread; more are dropped (traffic_records_dropped)
+TRAFFIC_RECORD_QUEUE = int(os.getenv("TRAFFIC_RECORD_QUEUE", "10000"))
+RECORDED_PATHS = ("/tickets/analyze", "/replies/suggest-reply")
+REDACTED = "[redacted]"
+_REDACTED_HEADERS = {TENANT_HEADER.lower(), "authorization", "cookie"}
+_RECORDED_HEADERS = {h.strip().lower() for h in TRAFFIC_RECORD_HEADERS.split(",") if h.strip()}
+_SUFFIXES = (".jsonl.gz", ".jsonl", ".gz")
+
+# Id of the sampled API request being served, so upstream calls can be attributed to it
+current_recording: ContextVar[str | None] = ContextVar("current_recording", default=None)
+
+
+def upstream_key(model: str, system: str, user: str) -> str:
+    """Key used to match an upstream exchange at replay time (prompt text + model)."""
+    return make_key(model, "", system, user)
+
+
+def _split_suffix(path: str) -> tuple[str, str]:
+    suffix = next((s for s in _SUFFIXES if path.endswith(s)), "")
+    return path[:len(path) - len(suffix)], suffix
+
+
+def worker_path(path: str, pid: int | None = None) -> str:
+    """Log file of one worker process: the pid goes before the .jsonl / .gz suffix."""
+    stem, suffix = _split_suffix(path)
+    return f"{stem}.{os.getpid() if pid is None else pid}{suffix}"
+
+
+def recording_files(path: str) -> list[str]:
+    """The given log file if it exists, else every worker file written for that TRAFFIC_RECORD_PATH."""
+    if os.path.exists(path):
+        return [path]
+    stem, suffix = _split_suffix(path)
+    return sorted(f for f in glob.glob(f"{glob.escape(stem)}.*{suffix}")
+                  if f[len(stem) + 1:len(f) - len(suffix)].isdigit())
+
+
+def recorded_headers(headers: list[tuple[bytes, bytes]]) -> tuple[dict[str, str], str | None]:
+    """
+    Headers of an ASGI request to keep in the log, with secrets redacted.
+
+    Returns:
+        tuple[dict[str, str], str | None]: Allowlisted headers (API key and credentials
+        replaced by REDACTED) and the tenant of the API key, if one was sent.
+    """
+    kept, tenant = {}, None
+    for key, value in headers:
+        name = key.decode("latin-1").lower()
+        if name not in _RECORDED_HEADERS:
+            continue
+        value = value.decode("latin-1")
+        if name == TENANT_HEADER.lower():
+            tenant = tenant_for_api_key(value)
+        kept[name] = REDACTED if name in _REDACTED_HEADERS else value
+    return kept, tenant
+
+
+class TrafficRecorder:
+    """
+    Append-only JSONL log of sampled API requests and their upstream LLM exchanges.
+
+    Two record types are written, one JSON object per line:
+    - {"type": "request", "id", "ts", "method", "path", "query", "headers", "tenant",
+       "body", "status", "response", "duration_ms"}
+    - {"type": "upstream", "request_id", "ts", "model", "key", "response", "duration_ms"}
+
+    Prompts are not stored, only their hash (key), which keeps the log compact and
+    is enough to serve the recorded responses back to the same build.
+
+    write() only enqueues: a background thread serializes the records and writes
+    them to this process's own file (worker_path), flushing whenever the queue runs
+    empty, so the event loop never waits on disk and workers never interleave
+    writes in one (gzip) file.
+
+    Args:
+        path (str): TRAFFIC_RECORD_PATH; the pid is added (see worker_path).
+        sample_rate (float): Share of requests recorded.
+        max_queue (int): Records buffered for the writer before new ones are dropped.
+    """
+
+    def __init__(self, path: str, sample_rate: float = TRAFFIC_RECORD_SAMPLE_RATE,
+                 max_queue: int = TRAFFIC_RECORD_QUEUE):
+        self.path = worker_path(path)
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._writer: threading.Thread | None = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def write(self, record: dict) -> None:
+        """Queue a record for the writer thread (dropped if the queue is full)."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._run, name="traffic-recorder", daemon=True)
+                self._writer.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            metrics.inc("traffic_records_dropped")
+
+    def _run(self) -> None:
+        opener = gzip.open if self.path.endswith(".gz") else open
+        with opener(self.path, "at", encoding="utf-8") as fh:
+            while True:
+                record = self._queue.get()
+                if record is None:
+                    return
+                fh.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n")
+                if self._queue.empty():
+                    fh.flush()
+
+    def record_upstream(self, model: str, provider_model: str, system: str, user: str,
+                        response: str, duration: float) -> None:
+        """Log an upstream exchange if it belongs to a sampled request."""
+        request_id = current_recording.get()
+        if request_id is None:
+            return
+        self.write({
+            "type": "upstream",
+            "request_id": request_id,
+            "ts": time.time(),
+            "model": model,
+            "key": upstream_key(provider_model, system, user),
+            "response": response,
+            "duration_ms": round(duration * 1000, 3),
+        })
+
+    def close(self) -> None:
+        """Write out the queued records and close the file."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+
+
+_recorder: TrafficRecorder | None = None
+
+
+def get_recorder() -> TrafficRecorder | None:
+    """Return the process-wide recorder, or None when recording is disabled."""
+    global _recorder
+    if TRAFFIC_RECORD_PATH and _recorder is None:
+        _recorder = TrafficRecorder(TRAFFIC_RECORD_PATH)
+    return _recorder
+
+
+def close_recorder() -> None:
+    global _recorder
+    if _recorder is not None:
+        _recorder.close()
+        _recorder = None
+
+
+class TrafficRecorderMiddleware:
+    """
+    ASGI middleware sampling requests to RECORDED_PATHS into the traffic log.
+
+    Implemented at the ASGI level (not BaseHTTPMiddleware) so request and response
+    bodies can be captured without buffering unrelated routes.
+    """
+
+    def __init__(self, app, recorder: TrafficRecorder | None = None):
+        self.app = app
+        self.recorder = recorder
+
+    async def __call__(self, scope, receive, send):
+        recorder = self.recorder or get_recorder()
+        if (scope["type"] != "http" or recorder is None
+                or scope["path"] not in RECORDED_PATHS or not recorder.should_sample()):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = uuid.uuid4().hex
+        headers, tenant = recorded_headers(scope["headers"])
+        request_body = bytearray()
+        response_body = bytearray()
+        status = {"code": 500}
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                request_body.extend(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            elif message["type"] == "http.response.body":
+                response_body.extend(message.get("body", b""))
+            await send(message)
+
+        token = current_recording.set(request_id)
+        ts = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            current_recording.reset(token)
+            recorder.write({
+                "type": "request",
+                "id": request_id,
+                "ts": ts,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "headers": headers,
+                "tenant": tenant,
+                "body": request_body.decode("utf-8", errors="replace"),
+                "status": status["code"],
+                "response": response_body.decode("utf-8", errors="replace"),
+                "duration_ms": round(duration * 1000, 3),
+            })
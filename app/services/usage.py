@@ -0,0 +1,305 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from app.services.metrics import metrics
+
+# Rolling window of GET /usage, in seconds (aggregated in one-minute buckets)
+USAGE_WINDOW_SECONDS = int(os.getenv("USAGE_WINDOW_SECONDS", "3600"))
+# Add X-LLM-* usage headers to every response. Clients can also ask per request
+# with "X-LLM-Usage: true".
+USAGE_HEADERS = os.getenv("USAGE_HEADERS", "false").lower() == "true"
+USAGE_REQUEST_HEADER = os.getenv("USAGE_REQUEST_HEADER", "x-llm-usage")
+# Tickets whose usage is kept for the top_tickets view (least recently charged dropped first)
+USAGE_MAX_TICKETS = int(os.getenv("USAGE_MAX_TICKETS", "10000"))
+# USD per million prompt:completion tokens, "gpt-4o-mini=0.15:0.6,gpt-4o=2.5:10".
+# Models without a price are counted at 0.
+LLM_TOKEN_PRICES = os.getenv("LLM_TOKEN_PRICES", "gpt-4o-mini=0.15:0.6,gpt-4o=2.5:10")
+
+BUCKET_SECONDS = 60
+GROUP_KEYS = ("endpoint", "model", "prompt_version", "tenant")
+BACKGROUND_ENDPOINT = "background"
+
+
+def _parse_prices(raw: str) -> dict[str, tuple[float, float]]:
+    prices = {}
+    for item in raw.split(","):
+        if "=" in item and ":" in item:
+            model, rates = item.split("=", 1)
+            prompt, completion = rates.split(":", 1)
+            prices[model.strip()] = (float(prompt), float(completion))
+    return prices
+
+
+_PRICES = _parse_prices(LLM_TOKEN_PRICES)
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of a call at LLM_TOKEN_PRICES (a "provider:" prefix is ignored)."""
+    prompt_rate, completion_rate = _PRICES.get(model) or _PRICES.get(model.split(":", 1)[-1], (0.0, 0.0))
+    return (prompt_tokens * prompt_rate + completion_tokens * completion_rate) / 1_000_000
+
+
+class CallUsage:
+    """Token usage of one upstream call, filled in by the provider when the backend reports it."""
+
+    __slots__ = ("prompt_tokens", "completion_tokens")
+
+    def __init__(self):
+        self.prompt_tokens: int | None = None
+        self.completion_tokens: int | None = None
+
+    @property
+    def reported(self) -> bool:
+        return self.prompt_tokens is not None
+
+
+class RequestUsage:
+    """Usage accumulated by one API request (all its LLM calls, including background refinement)."""
+
+    __slots__ = ("request_id", "endpoint", "calls", "prompt_tokens", "completion_tokens", "cost")
+
+    def __init__(self, request_id: str, endpoint: str):
+        self.request_id = request_id
+        self.endpoint = endpoint
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+
+    def headers(self) -> list[tuple[bytes, bytes]]:
+        return [
+            (b"x-request-id", self.request_id.encode("latin-1")),
+            (b"x-llm-calls", str(self.calls).encode()),
+            (b"x-llm-prompt-tokens", str(self.prompt_tokens).encode()),
+            (b"x-llm-completion-tokens", str(self.completion_tokens).encode()),
+            (b"x-llm-cost-usd", f"{self.cost:.6f}".encode()),
+        ]
+
+
+# API request being served, ticket being processed and upstream call in progress
+current_request_usage: ContextVar[RequestUsage | None] = ContextVar("current_request_usage", default=None)
+current_ticket: ContextVar[str | None] = ContextVar("current_ticket", default=None)
+_current_call: ContextVar[CallUsage | None] = ContextVar("current_call_usage", default=None)
+
+
+@contextmanager
+def ticket_usage(ticket_id: str):
+    """Attribute the LLM calls made inside the block to a ticket."""
+    token = current_ticket.set(ticket_id)
+    try:
+        yield
+    finally:
+        current_ticket.reset(token)
+
+
+@contextmanager
+def capture_call_usage():
+    """Collect the usage the provider reports for the upstream call made inside the block."""
+    call = CallUsage()
+    token = _current_call.set(call)
+    try:
+        yield call
+    finally:
+        _current_call.reset(token)
+
+
+def report_call_usage(prompt_tokens: int, completion_tokens: int) -> None:
+    """Called by providers with the usage returned by the backend (no-op outside capture_call_usage)."""
+    call = _current_call.get()
+    if call is not None:
+        call.prompt_tokens = prompt_tokens
+        call.completion_tokens = completion_tokens
+
+
+def _new_totals() -> list:
+    return [0, 0, 0, 0.0]  # calls, prompt tokens, completion tokens, cost
+
+
+class UsageLedger:
+    """
+    Rolling per-process aggregate of LLM token usage and cost.
+
+    Calls are summed into one-minute buckets keyed by (endpoint, model,
+    prompt_version, tenant); buckets older than window_seconds are dropped.
+    Per-ticket totals are kept for the most recent max_tickets tickets.
+
+    Args:
+        window_seconds (int): Span of the rolling aggregate.
+        max_tickets (int): Tickets kept for top_tickets.
+    """
+
+    def __init__(self, window_seconds: int = USAGE_WINDOW_SECONDS, max_tickets: int = USAGE_MAX_TICKETS):
+        self.window_seconds = window_seconds
+        self.max_tickets = max_tickets
+        self._lock = threading.Lock()
+        self._buckets: deque[tuple[int, dict]] = deque()
+        self._tickets: OrderedDict[tuple[str, str], dict] = OrderedDict()
+
+    def record(self, model: str, prompt_version: str, prompt_tokens: int, completion_tokens: int,
+               tenant: str, now: float | None = None) -> float:
+        """
+        Account one upstream call to the current request, ticket and endpoint.
+
+        Args:
+            model (str): Model the call was routed to (as configured, e.g. "local:risk-nb").
+            prompt_version (str): Version tag of the prompt template.
+            prompt_tokens (int): Prompt tokens billed.
+            completion_tokens (int): Completion tokens billed.
+            tenant (str): Tenant charged for the call.
+            now (float | None): Timestamp of the call (default: time.time()).
+
+        Returns:
+            float: Estimated cost in USD.
+        """
+        now = time.time() if now is None else now
+        cost = estimate_cost(model, prompt_tokens, completion_tokens)
+        request = current_request_usage.get()
+        endpoint = request.endpoint if request is not None else BACKGROUND_ENDPOINT
+        ticket_id = current_ticket.get()
+
+        labels = {"endpoint": endpoint, "model": model, "prompt_version": prompt_version}
+        metrics.inc("llm_calls", **labels)
+        metrics.inc("llm_tokens", prompt_tokens, kind="prompt", **labels)
+        metrics.inc("llm_tokens", completion_tokens, kind="completion", **labels)
+        metrics.inc("llm_cost_usd", cost, **labels)
+        if request is not None:
+            request.calls += 1
+            request.prompt_tokens += prompt_tokens
+            request.completion_tokens += completion_tokens
+            request.cost += cost
+
+        bucket_start = int(now // BUCKET_SECONDS) * BUCKET_SECONDS
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != bucket_start:
+                self._buckets.append((bucket_start, defaultdict(_new_totals)))
+            self._expire(now)
+            totals = self._buckets[-1][1][(endpoint, model, prompt_version, tenant)]
+            totals[0] += 1
+            totals[1] += prompt_tokens
+            totals[2] += completion_tokens
+            totals[3] += cost
+            if ticket_id is not None:
+                key = (tenant, ticket_id)
+                entry = self._tickets.pop(key, None) or {
+                    "ticket_id": ticket_id, "tenant": tenant, "calls": 0,
+                    "prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0,
+                }
+                entry["request_id"] = request.request_id if request is not None else None
+                entry["last_seen"] = now
+                entry["calls"] += 1
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["cost_usd"] += cost
+                self._tickets[key] = entry
+                while len(self._tickets) > self.max_tickets:
+                    self._tickets.popitem(last=False)
+        return cost
+
+    def _expire(self, now: float) -> None:
+        while self._buckets and self._buckets[0][0] + BUCKET_SECONDS <= now - self.window_seconds:
+            self._buckets.popleft()
+
+    def snapshot(self, group_by: tuple[str, ...] = GROUP_KEYS, top: int = 10, now: float | None = None) -> dict:
+        """
+        Aggregate the calls of the rolling window.
+
+        Args:
+            group_by (tuple[str, ...]): Dimensions of the groups, among GROUP_KEYS.
+            top (int): Number of most expensive tickets to list.
+            now (float | None): Current timestamp (default: time.time()).
+
+        Returns:
+            dict: {"window_seconds", "totals", "groups", "top_tickets"}; groups and
+            tickets are sorted by descending token count.
+
+        Raises:
+            ValueError: If group_by names an unknown dimension.
+        """
+        unknown = [key for key in group_by if key not in GROUP_KEYS]
+        if unknown:
+            raise ValueError(f"Unknown group_by {', '.join(unknown)} (expected {', '.join(GROUP_KEYS)})")
+        now = time.time() if now is None else now
+        indexes = [GROUP_KEYS.index(key) for key in group_by]
+        grouped: dict[tuple, list] = defaultdict(_new_totals)
+        with self._lock:
+            self._expire(now)
+            for _, bucket in self._buckets:
+                for key, totals in bucket.items():
+                    group = grouped[tuple(key[i] for i in indexes)]
+                    for i, value in enumerate(totals):
+                        group[i] += value
+            tickets = [dict(entry) for entry in self._tickets.values()
+                       if entry["last_seen"] > now - self.window_seconds]
+
+        def render(totals: list) -> dict:
+            calls, prompt, completion, cost = totals
+            return {"calls": calls, "prompt_tokens": prompt, "completion_tokens": completion,
+                    "total_tokens": prompt + completion, "cost_usd": round(cost, 6),
+                    "avg_prompt_tokens": round(prompt / calls, 1) if calls else 0.0}
+
+        overall = _new_totals()
+        groups = []
+        for key, totals in grouped.items():
+            for i, value in enumerate(totals):
+                overall[i] += value
+            groups.append({**dict(zip(group_by, key)), **render(totals)})
+        groups.sort(key=lambda g: g["total_tokens"], reverse=True)
+        tickets.sort(key=lambda t: t["prompt_tokens"] + t["completion_tokens"], reverse=True)
+        for entry in tickets:
+            entry["cost_usd"] = round(entry["cost_usd"], 6)
+            del entry["last_seen"]
+        return {"window_seconds": self.window_seconds, "totals": render(overall), "groups": groups,
+                "top_tickets": tickets[:top]}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._tickets.clear()
+
+
+usage_ledger = UsageLedger()
+
+
+class UsageMiddleware:
+    """
+    ASGI middleware attributing the LLM usage of a request to it.
+
+    The request id comes from the X-Request-ID header (generated otherwise). When
+    USAGE_HEADERS is on, or the client sent "X-LLM-Usage: true", the response
+    carries X-Request-ID, X-LLM-Calls, X-LLM-Prompt-Tokens, X-LLM-Completion-Tokens
+    and X-LLM-Cost-USD. Headers only cover calls made before the response started
+    (not the background refinement of mode=fast / mode=stream).
+    """
+
+    def __init__(self, app, headers: bool = USAGE_HEADERS):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        opt_in = USAGE_REQUEST_HEADER.lower().encode("latin-1")
+        request_id = None
+        wants_headers = self.headers
+        for key, value in scope["headers"]:
+            if key == b"x-request-id":
+                request_id = value.decode("latin-1")
+            elif key == opt_in:
+                wants_headers = wants_headers or value.decode("latin-1").lower() in ("1", "true")
+        usage = RequestUsage(request_id or uuid.uuid4().hex, scope["path"])
+
+        async def send_with_usage(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), *usage.headers()]}
+            await send(message)
+
+        token = current_request_usage.set(usage)
+        try:
+            await self.app(scope, receive, send_with_usage if wants_headers else send)
+        finally:
+            current_request_usage.reset(token)
@@ -0,0 +1,73 @@
+"""
+Analyze a file of tickets offline and write the results in a columnar format.
+
+Usage:
+    python -m app.tools.batch_analyze tickets.parquet results.parquet [--batch-size 10000]
+                                      [--heuristic-only]
+
+Input and output formats follow the file extension: .parquet and .arrow (need
+pyarrow), .csv or .csv.gz. Tickets are streamed in batches and each batch is
+written as soon as it is analyzed, so memory stays bounded for million-row files.
+Results have one column per risk_breakdown component; in Parquet/Arrow,
+debug_signals is a dictionary-encoded list column.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from app.services.columnar import COLUMNAR_BATCH_SIZE, ResultWriter, columnar_format, read_tickets
+from app.services.executor import close_executor, map_stage
+from app.services.risk_analyzer import assess_tickets_heuristic
+from app.services.risk_orchestrator import assess_tickets
+
+
+async def analyze_file(source: str, target: str, batch_size: int = COLUMNAR_BATCH_SIZE,
+                       heuristic_only: bool = False) -> int:
+    """
+    Stream tickets from source through the analysis pipeline into target.
+
+    Args:
+        source (str): Ticket file.
+        target (str): Result file.
+        batch_size (int): Tickets per batch.
+        heuristic_only (bool): Skip LLM refinement.
+
+    Returns:
+        int: Number of results written.
+    """
+    with ResultWriter(target) as writer:
+        for tickets in read_tickets(source, batch_size):
+            if heuristic_only:
+                writer.write(await map_stage("heuristic", assess_tickets_heuristic, tickets, batched=True))
+            else:
+                writer.write(await assess_tickets(tickets))
+    return writer.rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="Tickets (.parquet, .arrow, .csv, .csv.gz)")
+    parser.add_argument("target", help="Results (.parquet, .arrow, .csv, .csv.gz)")
+    parser.add_argument("--batch-size", type=int, default=COLUMNAR_BATCH_SIZE)
+    parser.add_argument("--heuristic-only", action="store_true", help="Skip LLM refinement")
+    args = parser.parse_args(argv)
+
+    try:
+        columnar_format(args.source)
+        columnar_format(args.target)
+    except (ValueError, RuntimeError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    start = time.perf_counter()
+    try:
+        rows = asyncio.run(analyze_file(args.source, args.target, args.batch_size, args.heuristic_only))
+    finally:
+        close_executor()
+    elapsed = time.perf_counter() - start
+    print(f"ok: {rows} results -> {args.target} in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f}/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
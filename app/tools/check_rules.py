@@ -0,0 +1,31 @@
+"""
+Validate a risk rules file before deploying it.
+
+Usage:
+    python -m app.tools.check_rules [path/to/risk_rules.json]
+
+Runs the same validation, example checks and scoring benchmark as a hot reload and
+exits non-zero if the running service would reject the file.
+"""
+import argparse
+import sys
+from app.services.rule_engine import RISK_RULES_PATH, RuleValidationError, load_rules
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=RISK_RULES_PATH)
+    args = parser.parse_args(argv)
+
+    try:
+        rules, eval_us = load_rules(args.path)
+    except (OSError, RuleValidationError) as e:
+        print(f"invalid: {e}", file=sys.stderr)
+        return 1
+    keywords = ", ".join(f"{lang}: {sum(len(n) for n in lexicon)}" for lang, lexicon in rules.lexicons.items())
+    print(f"ok: v{rules.version}, keywords ({keywords}), {len(rules.sla_bands)} SLA bands, {eval_us:.1f}us/ticket")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+Deterministic stand-in for an OpenAI-compatible upstream, for tests and local load runs.
+
+Usage:
+    python -m app.tools.fake_upstream [--port 8081] [--latency-ms 300] [--jitter-ms 100]
+                                      [--failure-rate 0.05] [--rate-limit-rate 0.05] [--seed 0]
+
+Then start the API with LLM_BASE_URL=http://localhost:8081/v1. In tests, use
+FakeUpstream().provider() (an OpenAICompatibleProvider talking to the app through
+httpx.ASGITransport, no sockets) or the `fake_upstream` fixture.
+
+Scriptable behavior: per-request latency (+ seeded jitter), random 500s and 429s,
+and a queue of scripted outcomes for the next requests ("ok", "error",
+"rate_limit", "partial" for truncated JSON, "hang" for a call that outlives client
+timeouts). `"stream": true` requests are answered with server-sent event chunks.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable
+import httpx
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.services.llm_providers import OpenAICompatibleProvider, register_provider
+
+OUTCOMES = ("ok", "error", "rate_limit", "partial", "hang")
+
+# Answers to the triage and reply prompts (see llm_engine / reply_suggester)
+TRIAGE_RESPONSE = {
+    "risk_score": 50,
+    "risk_label": "MEDIUM",
+    "reason": "Fake upstream analysis.",
+    "suggested_action": "Reply today with a concrete next step.",
+    "confidence": 90,
+    "signals": ["fake_upstream"],
+}
+REPLY_RESPONSE = {
+    "reply_text": "Thank you for reaching out. We are looking into it.",
+    "subject": "We are on it",
+    "next_steps": ["Follow up tomorrow"],
+    "do_not_say": [],
+    "confidence": 80,
+}
+
+
+def default_responder(system: str, user: str, model: str) -> str:
+    """Fixed JSON answer for the app's reply or triage prompt."""
+    return json.dumps(REPLY_RESPONSE if "reply_text" in system else TRIAGE_RESPONSE)
+
+
+class _TimedASGITransport(httpx.ASGITransport):
+    """ASGITransport that enforces the request's read timeout like a socket would."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        timeout = request.extensions.get("timeout", {}).get("read")
+        try:
+            return await asyncio.wait_for(super().handle_async_request(request), timeout)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("Fake upstream did not answer in time", request=request) from None
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeUpstream:
+    """
+    In-process OpenAI-compatible server (POST /v1/chat/completions, GET /v1/models).
+
+    Every call is recorded in `calls` with its model, outcome and timing, and the
+    peak number of concurrent calls is kept in `max_in_flight`. Random failures use
+    a seeded generator, so a run is reproducible.
+
+    Args:
+        latency (float): Seconds before each answer.
+        jitter (float): Extra uniform random latency in [0, jitter] seconds.
+        failure_rate (float): Share of calls answered 500.
+        rate_limit_rate (float): Share of calls answered 429.
+        responder (Callable[[str, str, str], str] | None): (system, user, model) -> content.
+        retry_after_ms (int): retry-after-ms header of 429 answers.
+        hang_seconds (float): How long a "hang" call sleeps before answering.
+        seed (int): Seed of the failure / jitter generator.
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, failure_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, responder: Callable[[str, str, str], str] | None = None,
+                 retry_after_ms: int = 1, hang_seconds: float = 30.0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder or default_responder
+        self.retry_after_ms = retry_after_ms
+        self.hang_seconds = hang_seconds
+        self.calls: list[dict] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._rng = random.Random(seed)
+        self._script: deque[str] = deque()
+        self.app = FastAPI(title="Fake OpenAI-compatible upstream")
+        self.app.post("/v1/chat/completions")(self._completions)
+        self.app.get("/v1/models")(self._models)
+
+    def script(self, *outcomes: str) -> "FakeUpstream":
+        """Queue the outcomes of the next calls (then back to the random / ok behavior)."""
+        for outcome in outcomes:
+            if outcome not in OUTCOMES:
+                raise ValueError(f"Unknown outcome {outcome!r} (expected one of {', '.join(OUTCOMES)})")
+        self._script.extend(outcomes)
+        return self
+
+    def outcomes(self) -> list[str]:
+        return [call["outcome"] for call in self.calls]
+
+    def provider(self, max_concurrency: int = 16, max_retries: int = 0,
+                 timeout: float = 5.0) -> OpenAICompatibleProvider:
+        """An OpenAI-compatible provider whose HTTP calls are served by this app in-process."""
+        client = httpx.AsyncClient(transport=_TimedASGITransport(app=self.app))
+        return OpenAICompatibleProvider(base_url="http://fake-upstream/v1", api_key="test",
+                                        max_concurrency=max_concurrency, http_client=client,
+                                        max_retries=max_retries, timeout=timeout)
+
+    @asynccontextmanager
+    async def serve(self, name: str = "openai", **provider_kwargs) -> AsyncIterator[OpenAICompatibleProvider]:
+        """Register provider(**provider_kwargs) under a provider name for the duration of the block."""
+        provider = self.provider(**provider_kwargs)
+        previous = register_provider(name, provider)
+        try:
+            yield provider
+        finally:
+            register_provider(name, previous)
+            await provider.aclose()
+
+    def _next_outcome(self) -> str:
+        if self._script:
+            return self._script.popleft()
+        draw = self._rng.random()
+        if draw < self.failure_rate:
+            return "error"
+        if draw < self.failure_rate + self.rate_limit_rate:
+            return "rate_limit"
+        return "ok"
+
+    async def _completions(self, request: Request) -> Response:
+        body = await request.json()
+        outcome = self._next_outcome()
+        call = {"model": body.get("model"), "stream": bool(body.get("stream")), "outcome": outcome,
+                "started": time.perf_counter()}
+        self.calls.append(call)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            delay = self.latency + (self._rng.uniform(0, self.jitter) if self.jitter else 0.0)
+            await asyncio.sleep(self.hang_seconds if outcome == "hang" else delay)
+        finally:
+            self.in_flight -= 1
+            call["finished"] = time.perf_counter()
+
+        if outcome == "error":
+            return JSONResponse({"error": {"message": "fake upstream failure", "type": "server_error"}},
+                                status_code=500)
+        if outcome == "rate_limit":
+            return JSONResponse({"error": {"message": "rate limited", "type": "rate_limit_error"}},
+                                status_code=429, headers={"retry-after-ms": str(self.retry_after_ms)})
+
+        messages = body.get("messages", [])
+        system = next((m["content"] for m in messages if m["role"] == "system"), "")
+        user = next((m["content"] for m in messages if m["role"] == "user"), "")
+        content = self.responder(system, user, body.get("model", ""))
+        if outcome == "partial":
+            content = content[:len(content) // 2]
+        usage = {"prompt_tokens": _tokens(system) + _tokens(user), "completion_tokens": _tokens(content)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if call["stream"]:
+            return StreamingResponse(self._stream(body.get("model", ""), content, outcome == "partial"),
+                                     media_type="text/event-stream")
+        return JSONResponse({
+            "id": f"chatcmpl-fake-{len(self.calls)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def _stream(self, model: str, content: str, truncated: bool):
+        chunk_id = f"chatcmpl-fake-{len(self.calls)}"
+        size = max(1, len(content) // 4)
+        for offset in range(0, len(content), size):
+            yield "data: " + json.dumps({
+                "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[offset:offset + size]}, "finish_reason": None}],
+            }) + "\n\n"
+        if truncated:
+            # Connection dropped mid-answer: no final chunk, no [DONE]
+            return
+        yield "data: " + json.dumps({
+            "id": chunk_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+        }) + "\n\n"
+        yield "data: [DONE]\n\n"
+
+    async def _models(self) -> dict:
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "created": 0,
+                                             "owned_by": "fake-upstream"}]}
+
+
+def main(argv: list[str] | None = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    upstream = FakeUpstream(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                            failure_rate=args.failure_rate, rate_limit_rate=args.rate_limit_rate, seed=args.seed)
+    uvicorn.run(upstream.app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Replay recorded production traffic against a build and report latency/throughput.
+
+Usage:
+    python -m app.tools.replay traffic.jsonl [--speed 2.0] [--target http://host:8000]
+                                             [--upstream-latency 1.0] [--report report.json]
+                                             [--api-keys acme:key1,globex:key2]
+
+By default requests are driven in-process against app.main:app with every upstream
+LLM call served from the recording (with its recorded latency), so results depend
+only on the build under test. With --target the requests go to a running server and
+its upstream is whatever that server is configured with (e.g. RESPONSE_STORE_MODE=replay).
+
+Requests are sent with their recorded query string and headers. API keys are not
+recorded: pass --api-keys to send a key for each recorded tenant.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import sys
+import time
+import httpx
+from app.services.llm_providers import LLMProvider, LLM_PROVIDER, register_provider
+from app.services.tenancy import TENANT_HEADER
+from app.services.traffic_recorder import REDACTED, recording_files, upstream_key
+
+
+class RecordedUpstreamProvider(LLMProvider):
+    """Serves upstream responses from a recording, replaying their original latency."""
+
+    name = "recorded"
+
+    def __init__(self, exchanges: dict[str, dict], latency_scale: float = 1.0):
+        super().__init__(max_concurrency=10_000)
+        self.exchanges = exchanges
+        self.latency_scale = latency_scale
+        self.misses = 0
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        exchange = self.exchanges.get(upstream_key(model, system, user))
+        if exchange is None:
+            self.misses += 1
+            raise LookupError("Upstream exchange not found in recording")
+        if self.latency_scale > 0:
+            await asyncio.sleep(exchange["duration_ms"] / 1000 * self.latency_scale)
+        return exchange["response"]
+
+
+def load_recording(path: str) -> tuple[list[dict], dict[str, dict]]:
+    """
+    Read a traffic log written by TrafficRecorder.
+
+    Args:
+        path (str): A log file, or the TRAFFIC_RECORD_PATH the workers' files were named after.
+
+    Returns:
+        tuple[list[dict], dict[str, dict]]: Request records sorted by timestamp and
+        upstream exchanges keyed by upstream_key.
+    """
+    files = recording_files(path)
+    if not files:
+        raise FileNotFoundError(f"No traffic log at {path}")
+    requests, exchanges = [], {}
+    for name in files:
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(name, "rt", encoding="utf-8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record["type"] == "request":
+                    requests.append(record)
+                elif record["type"] == "upstream":
+                    exchanges[record["key"]] = record
+    requests.sort(key=lambda r: r["ts"])
+    return requests, exchanges
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 3)
+
+
+def _summary(latencies: list[float], span_seconds: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / span_seconds, 3) if span_seconds > 0 else None,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 3) if latencies else 0.0,
+    }
+
+
+def request_headers(record: dict, api_keys: dict[str, str] | None = None) -> dict[str, str]:
+    """Recorded headers without redacted values, plus the API key given for the recorded tenant."""
+    headers = {k: v for k, v in record.get("headers", {}).items() if v != REDACTED}
+    headers.setdefault("content-type", "application/json")
+    tenant = record.get("tenant")
+    if api_keys and tenant in api_keys:
+        headers[TENANT_HEADER] = api_keys[tenant]
+    return headers
+
+
+async def replay(requests: list[dict], client: httpx.AsyncClient, speed: float = 1.0,
+                 api_keys: dict[str, str] | None = None) -> dict:
+    """
+    Re-drive recorded requests at their original inter-arrival times divided by speed.
+
+    Requests are sent open-loop (each at its scheduled time, without waiting for
+    earlier ones) so queueing behaves as in production.
+
+    Args:
+        requests (list[dict]): Request records from load_recording.
+        client (httpx.AsyncClient): Client bound to the build under test.
+        speed (float): Rate multiplier (2.0 = twice the recorded rate; 0 = as fast as possible).
+        api_keys (dict[str, str] | None): API key to send per recorded tenant.
+
+    Returns:
+        dict: Report comparing recorded and replayed latency/throughput, overall and per path.
+    """
+    if not requests:
+        return {"recorded": _summary([], 0), "replayed": _summary([], 0), "paths": {}, "errors": 0}
+
+    origin = requests[0]["ts"]
+    results: list[dict] = [{} for _ in requests]
+    loop_start = time.perf_counter()
+
+    async def fire(i: int, record: dict):
+        if speed > 0:
+            delay = (record["ts"] - origin) / speed - (time.perf_counter() - loop_start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+        start = time.perf_counter()
+        try:
+            query = record.get("query")
+            response = await client.request(
+                record["method"], f"{record['path']}?{query}" if query else record["path"],
+                content=record["body"].encode("utf-8"), headers=request_headers(record, api_keys),
+            )
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        results[i] = {"path": record["path"], "status": status,
+                      "latency_ms": (time.perf_counter() - start) * 1000}
+
+    await asyncio.gather(*(fire(i, r) for i, r in enumerate(requests)))
+    replay_span = time.perf_counter() - loop_start
+
+    last = requests[-1]
+    recorded_span = (last["ts"] + last["duration_ms"] / 1000 - origin)
+    report = {
+        "recorded": _summary([r["duration_ms"] for r in requests], recorded_span),
+        "replayed": _summary([r["latency_ms"] for r in results], replay_span),
+        "errors": sum(1 for r, rec in zip(results, requests) if r["status"] != rec["status"]),
+        "paths": {},
+    }
+    for path in sorted({r["path"] for r in requests}):
+        recorded = [r["duration_ms"] for r in requests if r["path"] == path]
+        replayed = [r["latency_ms"] for r in results if r["path"] == path]
+        report["paths"][path] = {
+            "recorded": _summary(recorded, recorded_span),
+            "replayed": _summary(replayed, replay_span),
+        }
+    return report
+
+
+async def replay_in_process(path: str, speed: float = 1.0, latency_scale: float = 1.0,
+                            api_keys: dict[str, str] | None = None) -> dict:
+    """Replay a recording against app.main:app with the upstream served from the recording."""
+    from app.main import app
+
+    requests, exchanges = load_recording(path)
+    provider = RecordedUpstreamProvider(exchanges, latency_scale=latency_scale)
+    names = {LLM_PROVIDER, "openai", "local"} | {
+        e["model"].partition(":")[0] for e in exchanges.values() if ":" in e["model"]
+    }
+    previous = {name: register_provider(name, provider) for name in names}
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://replay") as client:
+            report = await replay(requests, client, speed=speed, api_keys=api_keys)
+    finally:
+        for name, prev in previous.items():
+            register_provider(name, prev)
+    report["upstream_misses"] = provider.misses
+    return report
+
+
+async def replay_remote(path: str, target: str, speed: float = 1.0,
+                        api_keys: dict[str, str] | None = None) -> dict:
+    requests, _ = load_recording(path)
+    async with httpx.AsyncClient(base_url=target, timeout=60) as client:
+        return await replay(requests, client, speed=speed, api_keys=api_keys)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recording", help="Traffic log written by TRAFFIC_RECORD_PATH")
+    parser.add_argument("--speed", type=float, default=1.0, help="Rate multiplier (0 = as fast as possible)")
+    parser.add_argument("--target", help="Base URL of a running build (default: in-process app)")
+    parser.add_argument("--upstream-latency", type=float, default=1.0,
+                        help="Scale applied to recorded upstream latency (in-process only)")
+    parser.add_argument("--report", help="Write the JSON report to this file")
+    parser.add_argument("--api-keys", default="", help="API key per recorded tenant, \"acme:key1,globex:key2\"")
+    args = parser.parse_args(argv)
+
+    api_keys = dict(item.strip().split(":", 1) for item in args.api_keys.split(",") if ":" in item)
+    if args.target:
+        report = asyncio.run(replay_remote(args.recording, args.target, speed=args.speed, api_keys=api_keys))
+    else:
+        report = asyncio.run(replay_in_process(args.recording, speed=args.speed,
+                                               latency_scale=args.upstream_latency, api_keys=api_keys))
+
+    output = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as fh:
+            fh.write(output)
+    print(output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Local stand-in for a helpdesk callback endpoint, to exercise webhook delivery.
+
+Usage:
+    python -m app.tools.webhook_receiver [--port 9000] [--fail-first 2] [--fail-status 503]
+
+Then ingest with ?callback_url=http://localhost:9000/callback. Received payloads
+are listed at GET /deliveries. In tests, mount WebhookReceiver().app on an
+httpx.ASGITransport instead of running a server.
+"""
+import argparse
+import sys
+from fastapi import FastAPI, Request, Response
+
+
+class WebhookReceiver:
+    """
+    Records callback deliveries, optionally failing the first ones.
+
+    Args:
+        fail_first (int): Number of initial deliveries answered with fail_status.
+        fail_status (int): Status code of failed deliveries.
+    """
+
+    def __init__(self, fail_first: int = 0, fail_status: int = 503):
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.attempts = 0
+        self.deliveries: list[dict] = []
+        self.app = FastAPI(title="Webhook receiver")
+        self.app.post("/callback")(self._callback)
+        self.app.get("/deliveries")(self._list)
+
+    @property
+    def results(self) -> list[dict]:
+        """Every delivered result, in delivery order."""
+        return [result for delivery in self.deliveries for result in delivery["results"]]
+
+    async def _callback(self, request: Request) -> Response:
+        self.attempts += 1
+        if self.attempts <= self.fail_first:
+            return Response(status_code=self.fail_status)
+        self.deliveries.append(await request.json())
+        return Response(status_code=204)
+
+    async def _list(self) -> list[dict]:
+        return self.deliveries
+
+
+def main(argv: list[str] | None = None) -> int:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    args = parser.parse_args(argv)
+
+    receiver = WebhookReceiver(fail_first=args.fail_first, fail_status=args.fail_status)
+    uvicorn.run(receiver.app, host=args.host, port=args.port)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
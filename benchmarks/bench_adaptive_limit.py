@@ -0,0 +1,95 @@
+"""
+Goodput and timeouts against a degrading upstream: fixed concurrency caps vs adaptive limit.
+
+A simulated upstream serves `capacity` calls in parallel at --latency-ms; calls
+beyond that queue inside it, so latency grows with in-flight load, and calls
+slower than --timeout-ms fail. Halfway through the run the upstream capacity
+drops to a quarter. A closed-loop client keeps --clients calls outstanding.
+
+Usage:
+    python -m benchmarks.bench_adaptive_limit [--calls 3000] [--clients 128] [--capacity 32] [--latency-ms 20]
+"""
+import argparse
+import asyncio
+import time
+from app.services.adaptive_limit import AdaptiveLimiter
+
+
+class _Upstream:
+    def __init__(self, capacity: int, latency: float, timeout: float):
+        self.capacity = capacity
+        self.latency = latency
+        self.timeout = timeout
+        self.in_flight = 0
+
+    async def call(self) -> None:
+        self.in_flight += 1
+        try:
+            latency = self.latency * max(1.0, self.in_flight / self.capacity)
+            await asyncio.sleep(min(latency, self.timeout))
+            if latency > self.timeout:
+                raise TimeoutError
+        finally:
+            self.in_flight -= 1
+
+
+async def _run(policy: str, calls: int, clients: int, capacity: int, latency: float,
+               timeout: float) -> tuple[int, int, float]:
+    upstream = _Upstream(capacity, latency, timeout)
+    limiter = AdaptiveLimiter("bench", initial=8, max_limit=clients)
+    fixed = asyncio.Semaphore(int(policy) if policy.isdigit() else clients)
+    remaining = calls
+    ok = failed = 0
+
+    async def one() -> None:
+        nonlocal ok, failed
+        if policy == "adaptive":
+            await limiter.acquire()
+        else:
+            await fixed.acquire()
+        start = time.perf_counter()
+        error = False
+        try:
+            await upstream.call()
+            ok += 1
+        except TimeoutError:
+            failed += 1
+            error = True
+        finally:
+            if policy == "adaptive":
+                limiter.release(time.perf_counter() - start, error=error)
+            else:
+                fixed.release()
+
+    async def client() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            if remaining == calls // 2:
+                upstream.capacity = max(1, capacity // 4)
+            await one()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return ok, failed, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=3000)
+    parser.add_argument("--clients", type=int, default=128)
+    parser.add_argument("--capacity", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--timeout-ms", type=float, default=60)
+    args = parser.parse_args()
+
+    print(f"{'policy':<10} {'ok':>6} {'timeouts':>9} {'goodput/s':>10}")
+    for policy in (str(max(1, args.capacity // 4)), str(args.capacity), str(args.clients), "adaptive"):
+        ok, failed, elapsed = asyncio.run(_run(policy, args.calls, args.clients, args.capacity,
+                                               args.latency_ms / 1000, args.timeout_ms / 1000))
+        name = policy if policy == "adaptive" else f"fixed {policy}"
+        print(f"{name:<10} {ok:>6} {failed:>9} {ok / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Goodput under a 5x traffic spike: no admission control vs reject vs degrade.
+
+Requests arrive at --rate per second (open loop) for --seconds, then at 5x that
+rate for the same time. The simulated backend serves --capacity requests in
+parallel at --latency-ms; beyond that, requests share it and slow down. Clients
+give up after --deadline-ms, but the server still finishes their work. Degraded (heuristic-only) requests cost 1/20 of a
+full one. Goodput counts full answers delivered within the deadline.
+
+Usage:
+    python -m benchmarks.bench_admission [--rate 200] [--seconds 5] [--capacity 16] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import time
+from app.services.admission import AdmissionController, AdmissionMiddleware, degraded_request
+
+
+class _Backend:
+    def __init__(self, capacity: int, latency: float):
+        self.capacity = capacity
+        self.latency = latency
+        self.in_flight = 0
+
+    async def __call__(self, scope, receive, send):
+        cost = 0.05 if degraded_request.get() else 1.0
+        self.in_flight += cost
+        try:
+            await asyncio.sleep(self.latency * cost * max(1.0, self.in_flight / self.capacity))
+        finally:
+            self.in_flight -= cost
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+async def _request(app, deadline: float) -> str:
+    scope = {"type": "http", "path": "/tickets/analyze", "method": "POST", "headers": []}
+    status = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status["code"] = message["status"]
+            status["degraded"] = any(k == b"x-degraded" for k, _ in message["headers"])
+
+    # The server keeps working on requests whose client gave up, as a real one does
+    task = asyncio.ensure_future(app(scope, receive, send))
+    done, _ = await asyncio.wait([task], timeout=deadline)
+    if not done:
+        await task
+        return "timeout"
+    if status["code"] == 429:
+        return "rejected"
+    return "degraded" if status["degraded"] else "ok"
+
+
+async def _run(policy: str, rate: float, seconds: float, capacity: int, latency: float,
+               deadline: float) -> dict[str, int]:
+    backend = _Backend(capacity, latency)
+    app = backend
+    if policy != "none":
+        controller = AdmissionController(capacity=capacity * 2, max_wait=deadline / 4)
+        app = AdmissionMiddleware(backend, policy={"/tickets/analyze": policy}, enabled=True, controller=controller)
+
+    tasks = []
+    for phase_rate in (rate, rate * 5):
+        for _ in range(int(phase_rate * seconds)):
+            tasks.append(asyncio.create_task(_request(app, deadline)))
+            await asyncio.sleep(1 / phase_rate)
+    outcomes = await asyncio.gather(*tasks)
+    return {kind: outcomes.count(kind) for kind in ("ok", "degraded", "rejected", "timeout")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=200)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--deadline-ms", type=float, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'policy':<9} {'ok':>6} {'degraded':>9} {'rejected':>9} {'timeout':>8} {'goodput/s':>10}")
+    for policy in ("none", "reject", "degrade"):
+        counts = asyncio.run(_run(policy, args.rate, args.seconds, args.capacity, args.latency_ms / 1000,
+                                  args.deadline_ms / 1000))
+        goodput = counts["ok"] / (2 * args.seconds)
+        print(f"{policy:<9} {counts['ok']:>6} {counts['degraded']:>9} {counts['rejected']:>9} "
+              f"{counts['timeout']:>8} {goodput:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
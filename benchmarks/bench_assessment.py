@@ -0,0 +1,109 @@
+"""
+Memory, allocations and time per ticket of the heuristic -> LLM merge stage.
+
+The "pydantic" path is the previous pipeline: risk_analyzer built a validated
+TicketResult and the orchestrator built a second one, concatenating debug_signals
+and copying risk_breakdown. The "assessment" path passes one slotted RiskAssessment
+between stages and converts it once at the API boundary.
+
+Time is end to end (heuristic -> merge -> public model) with the LLM stage replaced
+by a fixed AIAnalysis. Memory is what the heuristic stage hands to the next one,
+measured with tracemalloc as retained bytes and live allocations per ticket.
+
+Usage:
+    python -m benchmarks.bench_assessment [--tickets 5000]
+"""
+import argparse
+import time
+import tracemalloc
+from app.models import AIAnalysis, RiskLabel, Ticket, TicketResult
+from app.services.assessment import intern_signal
+from app.services.risk_analyzer import analyze_ticket, assess_ticket
+
+AI = AIAnalysis(
+    risk_score=82, risk_label=RiskLabel.HIGH, confidence=90,
+    reason="Customer threatened escalation.", suggested_action="Escalate now.",
+    signals=["procon", "cancel"],
+)
+
+
+def _tickets(n: int) -> list[Ticket]:
+    return [
+        Ticket(
+            id=f"BENCH-{i}",
+            customer="Bench",
+            channel="email",
+            last_message="Vou cancelar e abrir reclamação no procon, atendimento péssimo.",
+            conversation_summary="Cliente irritado após várias tentativas.",
+            sla_hours_open=i % 72,
+            language="pt-BR",
+        )
+        for i in range(n)
+    ]
+
+
+def pydantic_path(ticket: Ticket) -> TicketResult:
+    baseline = analyze_ticket(ticket)
+    return TicketResult(
+        id=ticket.id,
+        risk_score=AI.risk_score,
+        risk_label=AI.risk_label,
+        reason=AI.reason,
+        suggested_action=AI.suggested_action,
+        risk_breakdown=baseline.risk_breakdown,
+        debug_signals=baseline.debug_signals + ["llm_tier:cheap", f"llm_confidence:{AI.confidence}"]
+        + [f"llm_signal:{s}" for s in AI.signals],
+        language=ticket.language,
+    )
+
+
+def assessment_path(ticket: Ticket) -> TicketResult:
+    result = assess_ticket(ticket)
+    result.signals += [intern_signal("llm_tier:cheap"), f"llm_confidence:{AI.confidence}"]
+    result.signals += [f"llm_signal:{s}" for s in AI.signals]
+    result.risk_score = AI.risk_score
+    result.risk_label = AI.risk_label
+    result.reason = AI.reason
+    result.suggested_action = AI.suggested_action
+    result.language = ticket.language
+    return result.to_result()
+
+
+def _time(fn, tickets: list[Ticket]) -> float:
+    for t in tickets[:100]:
+        fn(t)
+    start = time.perf_counter()
+    for t in tickets:
+        fn(t)
+    return (time.perf_counter() - start) / len(tickets) * 1e6
+
+
+def _retained(fn, tickets: list[Ticket]) -> tuple[float, float]:
+    """Bytes and live allocations per ticket held by the stage output of fn."""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = [fn(t) for t in tickets]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = [s for s in after.compare_to(before, "filename") if s.size_diff > 0]
+    del kept
+    n = len(tickets)
+    return sum(s.size_diff for s in diff) / n, sum(s.count_diff for s in diff) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=5000)
+    args = parser.parse_args()
+
+    tickets = _tickets(args.tickets)
+    assert pydantic_path(tickets[50]).model_dump() == assessment_path(tickets[50]).model_dump()
+
+    print(f"{'path':<12} {'µs/ticket':>10} {'stage bytes':>12} {'stage allocs':>13}")
+    for name, fn, stage in (("pydantic", pydantic_path, analyze_ticket),
+                            ("assessment", assessment_path, assess_ticket)):
+        bytes_per, allocs_per = _retained(stage, tickets)
+        print(f"{name:<12} {_time(fn, tickets):>10.2f} {bytes_per:>12.0f} {allocs_per:>13.1f}")
+
+if __name__ == "__main__":
+    main()
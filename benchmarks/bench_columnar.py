@@ -0,0 +1,72 @@
+"""
+Export time and size of triage results: JSON vs compact CSV vs Parquet vs Arrow.
+
+JSON is the API path (TicketResult models serialized with pydantic-core); the
+columnar paths stream RiskAssessment batches through ResultWriter.
+
+Usage:
+    python -m benchmarks.bench_columnar [--rows 1000000] [--batch-size 10000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from pydantic_core import to_json
+from app.models import RiskLabel
+from app.services.assessment import RiskAssessment
+from app.services.columnar import ResultWriter, pa
+
+SIGNALS = (["escalation: procon", "sla: >=24h"], ["churn: cancelar"], [], ["sla: >=48h", "llm_tier:cheap"])
+REASONS = ("Customer threatened to escalate and ticket open for 30h.", "Customer signaled cancellation intent.",
+           "No critical risk detected.")
+
+
+def _batch(start: int, size: int) -> list[RiskAssessment]:
+    return [
+        RiskAssessment(id=f"TICKET-{i}", risk_score=i % 100, risk_label=(RiskLabel.LOW, RiskLabel.MEDIUM,
+                       RiskLabel.HIGH)[i % 3], reason=REASONS[i % 3], suggested_action="Standard response flow.",
+                       escalation=40 * (i % 2), churn=35 * (i % 3 == 1), sla=25, sentiment=0,
+                       signals=list(SIGNALS[i % 4]), language="pt-BR")
+        for i in range(start, start + size)
+    ]
+
+
+def _export_json(path: str, rows: int, batch_size: int) -> None:
+    with open(path, "wb") as fh:
+        for start in range(0, rows, batch_size):
+            fh.write(to_json([a.to_result() for a in _batch(start, min(batch_size, rows - start))]))
+
+
+def _export(path: str, rows: int, batch_size: int) -> None:
+    with ResultWriter(path) as writer:
+        for start in range(0, rows, batch_size):
+            writer.write(_batch(start, min(batch_size, rows - start)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    # Cost of building the input batches, subtracted from every export
+    start = time.perf_counter()
+    for offset in range(0, args.rows, args.batch_size):
+        _batch(offset, min(args.batch_size, args.rows - offset))
+    build = time.perf_counter() - start
+
+    formats = [("json", ".json"), ("csv", ".csv"), ("csv.gz", ".csv.gz")]
+    if pa is not None:
+        formats += [("parquet", ".parquet"), ("arrow", ".arrow")]
+    print(f"{'format':<8} {'seconds':>8} {'rows/s':>10} {'MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, suffix in formats:
+            path = os.path.join(tmp, f"results{suffix}")
+            start = time.perf_counter()
+            (_export_json if name == "json" else _export)(path, args.rows, args.batch_size)
+            elapsed = max(time.perf_counter() - start - build, 1e-9)
+            print(f"{name:<8} {elapsed:>8.2f} {args.rows / elapsed:>10.0f} {os.path.getsize(path) / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Event-loop responsiveness and throughput of the heuristic stage per executor mode.
+
+Runs the heuristic stage over a batch of long tickets while a probe coroutine
+measures event-loop lag (how late a 1 ms sleep wakes up), which is what concurrent
+LLM I/O on the same loop would experience.
+
+Usage:
+    python -m benchmarks.bench_executor [--tickets 2000] [--modes inline,thread,process]
+"""
+import argparse
+import asyncio
+import time
+from app.models import Ticket
+from app.services.executor import StageExecutor
+from app.services.risk_analyzer import assess_ticket
+from app.server import cpu_count
+
+MESSAGE = "Vou cancelar o contrato, atendimento péssimo e sem resposta há dias. " * 40
+
+
+def _tickets(n: int) -> list[Ticket]:
+    return [
+        Ticket(id=f"BENCH-{i}", customer="Bench", channel="email", last_message=MESSAGE,
+               conversation_summary="Cliente irritado após várias tentativas.", sla_hours_open=i % 72,
+               language="pt-BR")
+        for i in range(n)
+    ]
+
+
+async def _run(mode: str, tickets: list[Ticket]) -> tuple[float, float]:
+    executor = StageExecutor(mode=mode, workers=cpu_count())
+    await executor.map("heuristic", assess_ticket, tickets[:cpu_count()])  # start workers
+    lags: list[float] = []
+    done = asyncio.Event()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - start - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    # One map per chunk, as concurrent requests would submit them
+    chunks = [tickets[i:i + 50] for i in range(0, len(tickets), 50)]
+    await asyncio.gather(*(executor.map("heuristic", assess_ticket, c) for c in chunks))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    executor.shutdown()
+    return len(tickets) / elapsed, max(lags) * 1000 if lags else elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--modes", default="inline,thread,process")
+    args = parser.parse_args()
+
+    tickets = _tickets(args.tickets)
+    print(f"{'mode':<8} {'tickets/s':>10} {'max loop lag ms':>16}")
+    for mode in args.modes.split(","):
+        rate, lag = asyncio.run(_run(mode, tickets))
+        print(f"{mode:<8} {rate:>10.0f} {lag:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Single-ticket webhook pushes: one analysis + callback per ticket vs micro-batched ingestion.
+
+--tickets tickets arrive at --rate per second. "direct" analyzes each ticket on
+arrival and POSTs its own callback; "batched" goes through MicroBatcher. LLM calls
+are simulated with --llm-ms latency; callbacks go to an in-process receiver.
+
+Usage:
+    python -m benchmarks.bench_ingestion [--tickets 2000] [--rate 2000] [--batch-size 50] [--window-ms 200]
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+import httpx
+from app.models import AIAnalysis, RiskLabel, Ticket
+from app.services.ingestion import MicroBatcher
+from app.services.metrics import metrics
+from app.tools.webhook_receiver import WebhookReceiver
+
+CALLBACK = "http://receiver/callback"
+
+
+async def _run(mode: str, tickets: list[Ticket], rate: float, batch_size: int, window_ms: float,
+               llm_ms: float) -> tuple[float, int, int]:
+    async def fake_llm(ticket, model):
+        await asyncio.sleep(llm_ms / 1000)
+        return AIAnalysis(risk_score=50, risk_label=RiskLabel.MEDIUM, reason="LLM", suggested_action="LLM",
+                          confidence=90)
+
+    receiver = WebhookReceiver()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=receiver.app))
+    batcher = MicroBatcher(batch_size=batch_size if mode == "batched" else 1, batch_window_ms=window_ms,
+                           client=client)
+    metrics.reset()
+    start = time.perf_counter()
+    with patch("app.services.risk_orchestrator.analyze_with_llm", fake_llm), \
+            patch("app.services.risk_orchestrator.STRONG_MODEL", ""), \
+            patch("app.services.risk_orchestrator.TICKET_STATE_ENABLED", False):
+        for ticket in tickets:
+            batcher.add(ticket, CALLBACK)
+            await asyncio.sleep(1 / rate)
+        await batcher.drain()
+    elapsed = time.perf_counter() - start
+    await client.aclose()
+    return elapsed, len(receiver.deliveries), int(metrics.counter("stage_batches", stage="heuristic"))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=2000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--window-ms", type=float, default=200)
+    parser.add_argument("--llm-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    tickets = [Ticket(id=f"T-{i}", customer="Acme", channel="email", last_message="Quero cancelar",
+                      conversation_summary="", sla_hours_open=i % 72, language="pt-BR")
+               for i in range(args.tickets)]
+    print(f"{'mode':<8} {'seconds':>8} {'tickets/s':>10} {'callbacks':>10} {'cpu dispatches':>15}")
+    for mode in ("direct", "batched"):
+        elapsed, callbacks, dispatches = asyncio.run(
+            _run(mode, tickets, args.rate, args.batch_size, args.window_ms, args.llm_ms))
+        print(f"{mode:<8} {elapsed:>8.2f} {args.tickets / elapsed:>10.0f} {callbacks:>10} {dispatches:>15}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Encode time of /tickets/analyze responses: FastAPI default path vs fast path.
+
+The default path is what FastAPI does for `response_model=TicketAnalyzeResponse`:
+re-validate the returned object, run jsonable_encoder and json.dumps. The fast path
+(app.responses.PydanticJSONResponse) serializes the already-validated model with
+pydantic-core directly.
+
+Usage:
+    python -m benchmarks.bench_json [--results 1000] [--rounds 50]
+"""
+import argparse
+import json
+import time
+from fastapi.encoders import jsonable_encoder
+from app.models import TicketResult, TicketAnalyzeResponse, RiskLabel
+from app.responses import PydanticJSONResponse
+
+
+def _results(n: int) -> list[TicketResult]:
+    return [
+        TicketResult(
+            id=f"TICKET-{i:06d}",
+            risk_score=75,
+            risk_label=RiskLabel.HIGH,
+            reason="Customer threatened escalation and ticket open for 48h.",
+            suggested_action="Escalate to senior support and respond within 30 minutes with a clear plan.",
+            debug_signals=["escalation: procon", "sla: >=48h", "llm_tier:cheap", "llm_confidence:82"],
+            risk_breakdown={"escalation": 40, "churn": 0, "sla": 35, "sentiment": 0},
+            language="pt-BR",
+        )
+        for i in range(n)
+    ]
+
+
+def default_path(results: list[TicketResult]) -> bytes:
+    response = TicketAnalyzeResponse(results=results)
+    validated = TicketAnalyzeResponse.model_validate(response.model_dump())
+    return json.dumps(jsonable_encoder(validated), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(results: list[TicketResult]) -> bytes:
+    return PydanticJSONResponse(TicketAnalyzeResponse.model_construct(results=results)).body
+
+
+def _time(fn, results, rounds: int) -> float:
+    fn(results)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn(results)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    results = _results(args.results)
+    assert json.loads(default_path(results)) == json.loads(fast_path(results))
+    default_ms = _time(default_path, results, args.rounds)
+    fast_ms = _time(fast_path, results, args.rounds)
+    print(f"{args.results} results, {len(fast_path(results)) / 1024:.0f} KiB")
+    print(f"default (validate + jsonable_encoder + json): {default_ms:8.2f} ms")
+    print(f"fast (pydantic-core to_json):                 {fast_ms:8.2f} ms  ({default_ms / fast_ms:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
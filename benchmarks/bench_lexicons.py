@@ -0,0 +1,64 @@
+"""
+Keyword scan cost per ticket: ticket-language lexicon vs every lexicon.
+
+Each ticket is normalized once (fold + tokenize) and then scanned either with the
+lexicon of its language (the production path) or with all lexicons merged, which is
+what matching without language selection costs.
+
+Usage:
+    python -m benchmarks.bench_lexicons [--tickets 5000]
+"""
+import argparse
+import time
+from app.models import Ticket
+from app.services.rule_engine import get_rules
+from app.services.text_normalization import normalize
+
+MESSAGES = {
+    "pt-BR": "Vou cancelar o contrato, atendimento péssimo e sem resposta há dias.",
+    "en-US": "I have been waiting for days, this is unacceptable and I will cancel.",
+    "es-ES": "Llevo días esperando, es inaceptable y voy a dar de baja el servicio.",
+}
+
+
+def _tickets(n: int) -> list[Ticket]:
+    languages = list(MESSAGES)
+    return [
+        Ticket(id=f"BENCH-{i}", customer="Bench", channel="email",
+               last_message=MESSAGES[languages[i % 3]], conversation_summary="Cliente aguardando retorno.",
+               sla_hours_open=i % 72, language=languages[i % 3])
+        for i in range(n)
+    ]
+
+
+def _scan(tickets: list[Ticket], language_aware: bool) -> float:
+    rules = get_rules()
+    start = time.perf_counter()
+    for ticket in tickets:
+        text = normalize(f"{ticket.last_message} {ticket.conversation_summary}")
+        lexicon = rules.lexicon_for(ticket.language if language_aware else None)
+        for needles in lexicon:
+            [display for needle, display in needles if needle in text]
+    return (time.perf_counter() - start) / len(tickets) * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=5000)
+    args = parser.parse_args()
+
+    tickets = _tickets(args.tickets)
+    _scan(tickets[:100], True)
+    all_us = _scan(tickets, False)
+    lang_us = _scan(tickets, True)
+    start = time.perf_counter()
+    for ticket in tickets:
+        normalize(f"{ticket.last_message} {ticket.conversation_summary}")
+    normalize_us = (time.perf_counter() - start) / len(tickets) * 1e6
+    print(f"normalize only:              {normalize_us:6.2f} us/ticket")
+    print(f"normalize + all lexicons:    {all_us:6.2f} us/ticket")
+    print(f"normalize + ticket language: {lang_us:6.2f} us/ticket  ({all_us / lang_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Time to a first label: waiting for the LLM vs fast-then-refine.
+
+Requests of --tickets tickets are sent --requests at a time through the ASGI app.
+In "full" mode the client waits for the LLM-refined response; in "fast" mode it
+gets provisional heuristic labels first and the refined results with a long poll
+on /tickets/results. The LLM is simulated with --llm-ms latency.
+
+Usage:
+    python -m benchmarks.bench_refinement [--requests 50] [--tickets 5] [--llm-ms 1500]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from unittest.mock import patch
+import httpx
+from app.main import app
+from app.models import AIAnalysis, RiskLabel
+
+
+def _payload(request: int, tickets: int) -> dict:
+    return {"tickets": [
+        {"id": f"R{request}-{i}", "customer": f"Customer {request}", "channel": "email",
+         "last_message": "Vou cancelar se nao resolverem hoje", "conversation_summary": "",
+         "sla_hours_open": 30, "language": "pt-BR"}
+        for i in range(tickets)
+    ]}
+
+
+async def _run(mode: str, requests: int, tickets: int, llm_ms: float) -> tuple[list[float], list[float]]:
+    async def fake_llm(ticket, model):
+        await asyncio.sleep(llm_ms / 1000)
+        return AIAnalysis(risk_score=60, risk_label=RiskLabel.MEDIUM, reason="LLM", suggested_action="LLM",
+                          confidence=90)
+
+    first, final = [], []
+
+    async def one(client: httpx.AsyncClient, n: int) -> None:
+        start = time.perf_counter()
+        response = await client.post(f"/tickets/analyze?mode={mode}", json=_payload(n, tickets))
+        first.append(time.perf_counter() - start)
+        if mode == "fast":
+            await client.get(f"/tickets/results/{response.json()['result_id']}?wait=30")
+        final.append(time.perf_counter() - start)
+
+    with patch("app.services.risk_orchestrator.analyze_with_llm", fake_llm), \
+            patch("app.services.risk_orchestrator.STRONG_MODEL", ""), \
+            patch("app.services.risk_orchestrator.TICKET_STATE_ENABLED", False):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            await asyncio.gather(*(one(client, n) for n in range(requests)))
+    return first, final
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--tickets", type=int, default=5)
+    parser.add_argument("--llm-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'first label p50 ms':>19} {'refined p50 ms':>15}")
+    for mode in ("full", "fast"):
+        first, final = asyncio.run(_run(mode, args.requests, args.tickets, args.llm_ms))
+        print(f"{mode:<6} {statistics.median(first) * 1000:>19.1f} {statistics.median(final) * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
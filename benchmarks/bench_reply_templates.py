@@ -0,0 +1,90 @@
+"""
+Reply suggestions for a stream of tickets: always generate vs approved-reply templates.
+
+A share of --approved tickets has an approved reply first; the rest of the stream
+then asks for suggestions. Routine LOW-risk questions repeat with small rewordings,
+so most of them land on a template. LLM calls are simulated with --llm-ms latency.
+
+Usage:
+    python -m benchmarks.bench_reply_templates [--requests 600] [--approved 40] [--llm-ms 800]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+from unittest.mock import patch
+from app.models import ReplySuggestionRequest, ReplySuggestionResponse, RiskLabel
+from app.services import reply_templates as templates
+from app.services.reply_suggester import suggest_reply_with_llm
+from app.services.tenancy import current_tenant
+
+QUESTIONS = [
+    "How do I reset my password?",
+    "How can I change the email on my account?",
+    "Where can I download my invoice?",
+    "How do I add a new user to my team?",
+    "Can I change my billing date?",
+]
+PREFIXES = ["", "Hi, ", "Hello! ", "Quick question: ", "Please help, "]
+RISKS = [RiskLabel.LOW] * 7 + [RiskLabel.MEDIUM] * 2 + [RiskLabel.HIGH]
+
+
+def _requests(count: int, seed: int = 7) -> list[ReplySuggestionRequest]:
+    rng = random.Random(seed)
+    return [
+        ReplySuggestionRequest(
+            ticket_id=f"T-{n}", customer=f"Customer {n}", channel="email",
+            last_message=rng.choice(PREFIXES) + rng.choice(QUESTIONS), conversation_summary="",
+            risk_label=rng.choice(RISKS), company_tone="friendly", language="en-US",
+        )
+        for n in range(count)
+    ]
+
+
+async def _run(requests: list[ReplySuggestionRequest], approved: int, llm_ms: float,
+               enabled: bool) -> tuple[int, list[float]]:
+    calls = 0
+
+    async def fake_chat(system, user, prompt_version):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(llm_ms / 1000)
+        return json.dumps({"reply_text": "Generated reply", "confidence": 80})
+
+    # All tickets belong to one API-key tenant (templates are per tenant)
+    current_tenant.set("bench")
+    templates.reply_templates.clear()
+    for request in requests[:approved]:
+        templates.reply_templates.approve(request, ReplySuggestionResponse(
+            ticket_id=request.ticket_id, suggested_reply="Hi {customer}, here is how...",
+            confidence=90, language=request.language))
+
+    latencies = []
+    with patch("app.services.reply_suggester.openai_chat", fake_chat), \
+            patch.object(templates, "REPLY_TEMPLATES_ENABLED", enabled):
+        for request in requests[approved:]:
+            start = time.perf_counter()
+            await suggest_reply_with_llm(request)
+            latencies.append(time.perf_counter() - start)
+    return calls, latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--approved", type=int, default=40)
+    parser.add_argument("--llm-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    requests = _requests(args.requests)
+    print(f"{'mode':<10} {'requests':>9} {'llm calls':>10} {'p50 ms':>8} {'mean ms':>8}")
+    for mode, enabled in (("generate", False), ("templates", True)):
+        calls, latencies = asyncio.run(_run(requests, args.approved, args.llm_ms, enabled))
+        print(f"{mode:<10} {len(latencies):>9} {calls:>10} {statistics.median(latencies) * 1000:>8.1f} "
+              f"{statistics.fmean(latencies) * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Scoring after the keyword scan: threshold/band chains vs precomputed lookup tables.
+
+Scores --rows random breakdowns (category hits + SLA age) both ways: the chains
+walk the SLA bands and label thresholds and format the reason for every row; the
+tables index the SLA entry, label/action and reason directly. Also reports
+end-to-end assess_many() throughput on generated tickets.
+
+Usage:
+    python -m benchmarks.bench_rule_tables [--rows 200000]
+"""
+import argparse
+import random
+import time
+from app.models import Ticket
+from app.services.assessment import BREAKDOWN_KEYS
+from app.services.rule_engine import get_rules
+
+TEXTS = ["Alguma novidade?", "Quero cancelar o plano", "Vou abrir reclamação no procon",
+         "Serviço péssimo, quero cancelar", "Obrigado pelo retorno"]
+
+
+def _chains(rules, mask: int, hours: int) -> tuple:
+    reasons = {c.name: c.reason for bit, c in enumerate(rules.categories) if mask >> bit & 1}
+    score = sum(c.weight for bit, c in enumerate(rules.categories) if mask >> bit & 1)
+    for band in rules.sla_bands:
+        if hours >= band.min_hours:
+            score += band.score
+            reasons["sla"] = band.reason.format(hours=hours)
+            break
+    score = min(score, rules.max_score)
+    for min_score, label, action in rules.labels:
+        if score >= min_score:
+            break
+    parts = [reasons[key] for key in BREAKDOWN_KEYS if key in reasons]
+    reason = " and ".join(parts).capitalize() + "." if parts else rules.default_reason
+    return score, label, action, reason
+
+
+def _tables(rules, mask: int, hours: int) -> tuple:
+    sla, _, sla_reason = rules.sla_entry(hours)
+    score = min(sum(c.weight for bit, c in enumerate(rules.categories) if mask >> bit & 1) + sla, rules.max_score)
+    label, action = rules.label_table[score]
+    return score, label, action, rules.reason_for(mask, sla_reason)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    rules = get_rules()
+    rng = random.Random(7)
+    rows = [(rng.randrange(1 << len(rules.categories)), rng.randrange(0, 200)) for _ in range(args.rows)]
+    print(f"{'scoring':<8} {'rows':>9} {'us/row':>8} {'rows/min':>14}")
+    for name, fn in (("chains", _chains), ("tables", _tables)):
+        start = time.perf_counter()
+        for mask, hours in rows:
+            fn(rules, mask, hours)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<8} {args.rows:>9} {elapsed / args.rows * 1e6:>8.2f} {args.rows / elapsed * 60:>14,.0f}")
+
+    tickets = [Ticket(id=f"T-{i}", customer="Acme", channel="email", last_message=rng.choice(TEXTS),
+                      conversation_summary="", sla_hours_open=hours, language="pt-BR")
+               for i, (_, hours) in enumerate(rows[:50_000])]
+    start = time.perf_counter()
+    rules.assess_many(tickets)
+    elapsed = time.perf_counter() - start
+    print(f"\nassess_many: {len(tickets)} tickets, {elapsed / len(tickets) * 1e6:.2f} us/ticket, "
+          f"{len(tickets) / elapsed * 60:,.0f} tickets/min per core")
+
+
+if __name__ == "__main__":
+    main()
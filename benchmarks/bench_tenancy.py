@@ -0,0 +1,59 @@
+"""
+Interactive latency while another tenant runs a bulk sweep: shared FIFO vs tenant gate.
+
+A bulk tenant submits a large burst of LLM calls and an interactive tenant then
+sends single calls at a steady rate. Upstream latency is simulated; only the
+admission policy in front of it differs.
+
+Usage:
+    python -m benchmarks.bench_tenancy [--bulk 500] [--interactive 20] [--capacity 16] [--latency-ms 50]
+"""
+import argparse
+import asyncio
+import time
+from app.services.tenancy import TenantGate
+
+
+async def _run(policy: str, bulk: int, interactive: int, capacity: int, latency: float) -> list[float]:
+    gate = TenantGate(capacity=capacity, tenant_concurrency=max(1, capacity // 2), weights={})
+    fifo = asyncio.Semaphore(capacity)
+
+    async def call(tenant: str) -> float:
+        start = time.perf_counter()
+        if policy == "fifo":
+            async with fifo:
+                await asyncio.sleep(latency)
+        else:
+            await gate.acquire(tenant, 500, interactive=tenant == "interactive")
+            try:
+                await asyncio.sleep(latency)
+            finally:
+                gate.release(tenant, 500)
+        return time.perf_counter() - start
+
+    sweep = [asyncio.create_task(call("bulk")) for _ in range(bulk)]
+    latencies = []
+    for _ in range(interactive):
+        await asyncio.sleep(latency)
+        latencies.append(await call("interactive"))
+    await asyncio.gather(*sweep)
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bulk", type=int, default=500)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--capacity", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args()
+
+    print(f"{'policy':<8} {'interactive p50 ms':>19} {'max ms':>8}")
+    for policy in ("fifo", "gate"):
+        latencies = sorted(asyncio.run(_run(policy, args.bulk, args.interactive, args.capacity,
+                                            args.latency_ms / 1000)))
+        print(f"{policy:<8} {latencies[len(latencies) // 2] * 1000:>19.1f} {latencies[-1] * 1000:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+LLM calls for a helpdesk that re-submits tickets: full re-analysis vs ticket state store.
+
+Each ticket is re-submitted --updates times. Most updates only tick sla_hours_open;
+every --message-every updates one appends a customer message (a quarter of them
+carrying a new churn/escalation keyword). LLM calls are simulated.
+
+Usage:
+    python -m benchmarks.bench_ticket_state [--tickets 200] [--updates 12] [--message-every 4]
+"""
+import argparse
+import asyncio
+import random
+import time
+from unittest.mock import patch
+from app.models import AIAnalysis, RiskLabel, Ticket
+from app.services.risk_orchestrator import assess_tickets
+from app.services.ticket_state import ticket_state
+
+MESSAGES = ["Alguma novidade?", "Ainda aguardo retorno.", "Obrigado, fico no aguardo.",
+            "Vou cancelar se nao resolverem.", "Vou abrir reclamação no procon."]
+
+
+def _submissions(tickets: int, updates: int, message_every: int, seed: int = 7) -> list[list[Ticket]]:
+    rng = random.Random(seed)
+    history = {f"T-{i}": "Problema com a fatura" for i in range(tickets)}
+    rounds = []
+    for update in range(updates):
+        batch = []
+        for ticket_id in history:
+            if update and update % message_every == 0:
+                history[ticket_id] += " " + rng.choice(MESSAGES if rng.random() < 0.25 else MESSAGES[:3])
+            batch.append(Ticket(id=ticket_id, customer="Acme", channel="email", last_message=history[ticket_id],
+                                conversation_summary="", sla_hours_open=update * 4, language="pt-BR"))
+        rounds.append(batch)
+    return rounds
+
+
+async def _run(rounds: list[list[Ticket]], enabled: bool) -> tuple[int, float]:
+    calls = 0
+
+    async def fake_llm(ticket, model):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.001)
+        return AIAnalysis(risk_score=50, risk_label=RiskLabel.MEDIUM, reason="LLM", suggested_action="LLM",
+                          confidence=90)
+
+    ticket_state.clear()
+    start = time.perf_counter()
+    with patch("app.services.risk_orchestrator.analyze_with_llm", fake_llm), \
+            patch("app.services.risk_orchestrator.STRONG_MODEL", ""), \
+            patch("app.services.risk_orchestrator.TICKET_STATE_ENABLED", enabled):
+        for batch in rounds:
+            await assess_tickets(batch)
+    return calls, time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=12)
+    parser.add_argument("--message-every", type=int, default=4)
+    args = parser.parse_args()
+
+    rounds = _submissions(args.tickets, args.updates, args.message_every)
+    print(f"{'mode':<12} {'submissions':>12} {'llm calls':>10} {'seconds':>8}")
+    for mode, enabled in (("full", False), ("incremental", True)):
+        calls, elapsed = asyncio.run(_run(rounds, enabled))
+        print(f"{mode:<12} {args.tickets * args.updates:>12} {calls:>10} {elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cost of usage accounting, and token cost per ticket by conversation length.
+
+First times UsageLedger.record() (metrics, request totals, bucket and per-ticket
+entry) over --calls calls. Then analyzes --tickets tickets per conversation
+summary length through the ASGI app against the fake upstream, and reads the
+prompt / completion tokens and estimated cost back from GET /usage, which is how
+prompt size and context budget settings are tuned for cost.
+
+Usage:
+    python -m benchmarks.bench_usage [--calls 200000] [--tickets 200] [--llm-ms 20]
+"""
+import argparse
+import asyncio
+import time
+from unittest.mock import patch
+import httpx
+from app.main import app
+from app.services.usage import UsageLedger, ticket_usage, usage_ledger
+from app.tools.fake_upstream import FakeUpstream
+
+SUMMARY_SENTENCE = "Cliente relatou cobranca duplicada e pediu estorno, sem retorno ate agora. "
+
+
+def _payload(length: int, tickets: int) -> dict:
+    summary = (SUMMARY_SENTENCE * (length // len(SUMMARY_SENTENCE) + 1))[:length]
+    return {"tickets": [
+        {"id": f"U{length}-{i}", "customer": "Acme", "channel": "email",
+         "last_message": "Fui cobrado duas vezes, quero meu dinheiro de volta", "conversation_summary": summary,
+         "sla_hours_open": 10, "language": "pt-BR"}
+        for i in range(tickets)
+    ]}
+
+
+def _record_overhead(calls: int) -> float:
+    ledger = UsageLedger(max_tickets=10_000)
+    start = time.perf_counter()
+    for i in range(calls):
+        with ticket_usage(f"T-{i}"):
+            ledger.record("gpt-4o-mini", "risk-triage-v1", 350, 60, "acme")
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+async def _by_length(lengths: list[int], tickets: int, llm_ms: float) -> list[dict]:
+    upstream = FakeUpstream(latency=llm_ms / 1000)
+    rows = []
+    with patch("app.services.llm_engine.SEMANTIC_CACHE_ENABLED", False), \
+            patch("app.services.risk_orchestrator.CHEAP_MODEL", "gpt-4o-mini"), \
+            patch("app.services.risk_orchestrator.STRONG_MODEL", ""):
+        async with upstream.serve(max_concurrency=64):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+                for length in lengths:
+                    usage_ledger.clear()
+                    start = time.perf_counter()
+                    await client.post("/tickets/analyze", json=_payload(length, tickets))
+                    elapsed = time.perf_counter() - start
+                    totals = (await client.get("/usage?group_by=")).json()["totals"]
+                    rows.append({"length": length, "elapsed": elapsed, **totals})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200_000)
+    parser.add_argument("--tickets", type=int, default=200)
+    parser.add_argument("--llm-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"UsageLedger.record: {_record_overhead(args.calls):.2f} us/call\n")
+    rows = asyncio.run(_by_length([0, 500, 2000, 8000], args.tickets, args.llm_ms))
+    print(f"{'summary chars':>13} {'prompt tok/ticket':>18} {'compl tok/ticket':>17} {'USD / 1k tickets':>17} {'batch s':>8}")
+    for row in rows:
+        calls = row["calls"] or 1
+        print(f"{row['length']:>13} {row['prompt_tokens'] / calls:>18.1f} {row['completion_tokens'] / calls:>17.1f} "
+              f"{row['cost_usd'] / calls * 1000:>17.4f} {row['elapsed']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput scaling of the production launcher across worker processes.
+
+Starts `python -m app.server` with 1..N workers, drives /tickets/analyze with a
+fixed client concurrency and prints requests/second per worker count. The LLM tier
+is served by the in-process local classifier so the benchmark is CPU-bound, needs
+no network and shows how throughput scales with cores.
+
+Usage:
+    python -m benchmarks.bench_workers [--workers 1,2,4] [--requests 2000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import time
+import httpx
+from app.server import cpu_count
+
+PAYLOAD = {
+    "tickets": [
+        {
+            "id": f"BENCH-{i}",
+            "customer": "Bench",
+            "channel": "email",
+            "last_message": f"Vou cancelar o contrato {i}, atendimento péssimo e sem resposta.",
+            "conversation_summary": "Cliente irritado após várias tentativas sem solução.",
+            "sla_hours_open": i % 72,
+            "language": "pt-BR",
+        }
+        for i in range(10)
+    ]
+}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(base_url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/metrics")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def _drive(base_url: str, total: int, concurrency: int) -> float:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        queue = iter(range(total))
+
+        async def worker():
+            for _ in queue:
+                response = await client.post("/tickets/analyze", json=PAYLOAD)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+def run(workers: int, total: int, concurrency: int) -> float:
+    port = _free_port()
+    env = dict(os.environ,
+               CHEAP_MODEL="local:risk-nb", STRONG_MODEL="local:risk-nb",
+               SEMANTIC_CACHE_ENABLED="false", OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "app.server", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        asyncio.run(_wait_ready(base_url))
+        asyncio.run(_drive(base_url, max(50, total // 10), concurrency))  # warm-up
+        return asyncio.run(_drive(base_url, total, concurrency))
+    finally:
+        proc.terminate()
+        proc.wait(timeout=60)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, cpu_count()})))
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>8} {'req/s':>10} {'speedup':>8}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        rps = run(workers, args.requests, args.concurrency)
+        baseline = baseline or rps
+        print(f"{workers:>8} {rps:>10.1f} {rps / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
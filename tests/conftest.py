@@ -1,6 +1,53 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, PropertyMock, patch
 from app.models import Ticket, RiskLabel
+from app.services.semantic_cache import semantic_cache
+from app.services.ticket_state import ticket_state
+from app.services.reply_templates import reply_templates
+from app.services.usage import usage_ledger
+from app.tools.fake_upstream import FakeUpstream
+
+
+@pytest.fixture(autouse=True)
+def clear_semantic_cache():
+    """Start every test with an empty semantic cache."""
+    semantic_cache.clear()
+    yield
+    semantic_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_ticket_state():
+    """Start every test with no remembered ticket analyses."""
+    ticket_state.clear()
+    yield
+    ticket_state.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_reply_templates():
+    """Start every test with no approved reply templates."""
+    reply_templates.clear()
+    yield
+    reply_templates.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_usage():
+    """Start every test with an empty usage ledger."""
+    usage_ledger.clear()
+    yield
+    usage_ledger.clear()
+
+
+@pytest.fixture
+async def fake_upstream():
+    """Serve the "openai" provider from an in-process fake upstream (no network, no retries)."""
+    upstream = FakeUpstream()
+    # Every call should reach the upstream: no near-duplicate answers from the cache
+    with patch('app.services.llm_engine.SEMANTIC_CACHE_ENABLED', False):
+        async with upstream.serve():
+            yield upstream
 
 
 @pytest.fixture
@@ -61,7 +108,9 @@ def sample_ticket_churn():
 
 @pytest.fixture
 def mock_openai_client():
-    """Mock OpenAI client."""
-    with patch('app.services.openai_client.client') as mock:
-        mock.chat.completions.create = MagicMock()
+    """Mock OpenAI client (the SDK client lazily built by the OpenAI provider)."""
+    mock = MagicMock()
+    mock.chat.completions.create = AsyncMock()
+    with patch('app.services.llm_providers.OpenAICompatibleProvider.client',
+               new_callable=PropertyMock, return_value=mock):
         yield mock
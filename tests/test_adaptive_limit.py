@@ -0,0 +1,187 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.adaptive_limit import AdaptiveLimiter, adaptive_slot, get_limiter
+from app.services.llm_providers import LLMProvider, register_provider
+from app.services.metrics import metrics
+from app.services.openai_client import openai_chat
+
+
+class FlakyProvider(LLMProvider):
+    name = "flaky"
+
+    def __init__(self, fail: bool, adaptive: bool = True):
+        super().__init__(max_concurrency=8)
+        self.fail = fail
+        self.adaptive_limit = adaptive
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        if self.fail:
+            raise TimeoutError("upstream timed out")
+        return "ok"
+
+
+async def _fill(limiter: AdaptiveLimiter, calls: int) -> None:
+    for _ in range(calls):
+        await limiter.acquire()
+
+
+class TestAdaptiveLimiter:
+    """Test limit enforcement and AIMD adjustments."""
+
+    @pytest.mark.asyncio
+    async def test_enforces_limit_and_queues(self):
+        """Test calls over the limit wait in the queue until a slot frees up."""
+        limiter = AdaptiveLimiter("test", initial=2, max_limit=2)
+        await _fill(limiter, 2)
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queue_depth == 1
+        assert metrics.gauge("llm_queue_depth", provider="test") == 1
+
+        limiter.release(0.01)
+        await waiter
+        assert limiter.in_flight == 2
+        assert limiter.queue_depth == 0
+
+    @pytest.mark.asyncio
+    async def test_additive_increase_when_saturated(self):
+        """Test fast calls at the limit raise it by about one per window."""
+        limiter = AdaptiveLimiter("test", initial=4, max_limit=32)
+        for _ in range(3):
+            await _fill(limiter, int(limiter.limit) - limiter.in_flight)
+            for _ in range(int(limiter.limit)):
+                limiter.release(0.01)
+        assert 5 <= limiter.limit < 7
+        assert metrics.gauge("llm_concurrency_limit", provider="test") == round(limiter.limit, 2)
+
+    @pytest.mark.asyncio
+    async def test_no_increase_when_underused(self):
+        """Test the limit does not grow while traffic stays below it."""
+        limiter = AdaptiveLimiter("test", initial=8)
+        for _ in range(50):
+            await limiter.acquire()
+            limiter.release(0.01)
+        assert limiter.limit == 8
+
+    @pytest.mark.asyncio
+    async def test_error_halves_once_per_round_trip(self):
+        """Test a burst of errors from one window cuts the limit once."""
+        limiter = AdaptiveLimiter("test", initial=8)
+        await _fill(limiter, 8)
+        for _ in range(8):
+            limiter.release(10.0, error=True)
+        assert limiter.limit == 4
+        assert metrics.counter("llm_limit_decreases", provider="test", reason="error") == 1
+
+    @pytest.mark.asyncio
+    async def test_latency_inflation_decreases(self):
+        """Test calls much slower than the no-load latency shrink the limit."""
+        limiter = AdaptiveLimiter("test", initial=10, latency_tolerance=2.0)
+        await _fill(limiter, 2)
+        limiter.release(0.001)
+        limiter.release(0.01)
+        assert limiter.limit == 9
+        assert metrics.counter("llm_limit_decreases", provider="test", reason="latency") == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_workload_not_congestion(self):
+        """Test a slower model or prompt is compared with its own no-load latency."""
+        metrics.reset()
+        limiter = AdaptiveLimiter("test", initial=8, max_limit=16, latency_tolerance=2.0)
+        for _ in range(10):
+            await _fill(limiter, int(limiter.limit) - limiter.in_flight)
+            for i in range(int(limiter.limit)):
+                if i % 2:
+                    limiter.release(0.1, workload=("gpt-4o", "v2"))
+                else:
+                    limiter.release(0.01, workload=("gpt-4o-mini", "v1"))
+        assert limiter.limit > 8
+        assert metrics.counter("llm_limit_decreases", provider="test", reason="latency") == 0
+        assert limiter.baseline(("gpt-4o", "v2")) == 0.1
+
+        await limiter.acquire()
+        limiter.release(0.5, workload=("gpt-4o", "v2"))
+        assert metrics.counter("llm_limit_decreases", provider="test", reason="latency") == 1
+
+    @pytest.mark.asyncio
+    async def test_bounds(self):
+        """Test the limit stays within [min_limit, max_limit]."""
+        limiter = AdaptiveLimiter("test", initial=2, min_limit=1, max_limit=3)
+        for _ in range(5):
+            await _fill(limiter, int(limiter.limit) - limiter.in_flight)
+            for _ in range(int(limiter.limit)):
+                limiter.release(0.01)
+        assert limiter.limit == 3
+        limiter._last_decrease = 0.0
+        await limiter.acquire()
+        limiter.release(1.0, error=True)
+        limiter._last_decrease = 0.0
+        await limiter.acquire()
+        limiter.release(1.0, error=True)
+        assert limiter.limit == 1
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter(self):
+        """Test a cancelled waiter does not hold a slot."""
+        limiter = AdaptiveLimiter("test", initial=1)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        limiter.release(0.01)
+        assert limiter.in_flight == 0
+        await limiter.acquire()
+
+    @pytest.mark.asyncio
+    async def test_cancelled_call_not_sampled(self):
+        """Test a call cancelled inside its slot frees it without a latency sample or a decrease."""
+        started = asyncio.Event()
+
+        async def call():
+            async with adaptive_slot("cancelled", workload="w"):
+                started.set()
+                await asyncio.sleep(10)
+
+        limiter = get_limiter("cancelled")
+        limit = limiter.limit
+        task = asyncio.create_task(call())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert limiter.in_flight == 0
+        assert limiter.baseline("w") is None
+        assert limiter.limit == limit
+
+
+class TestOpenAIChatLimit:
+    """Test the limiter wraps upstream calls in openai_chat."""
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_reduce_limit(self):
+        """Test provider errors are fed back as overload signals."""
+        metrics.reset()
+        register_provider("flaky", FlakyProvider(fail=True))
+        try:
+            with patch('app.services.openai_client.get_response_store', return_value=None):
+                with pytest.raises(TimeoutError):
+                    await openai_chat("system", "user", model="flaky:model")
+        finally:
+            register_provider("flaky", None)
+        assert metrics.counter("llm_limit_decreases", provider="flaky", reason="error") == 1
+        assert metrics.gauge("llm_in_flight", provider="flaky") == 0
+
+    @pytest.mark.asyncio
+    async def test_non_adaptive_provider_not_limited(self):
+        """Test providers without adaptive_limit (the local classifier) bypass the limiter."""
+        metrics.reset()
+        register_provider("flaky", FlakyProvider(fail=False, adaptive=False))
+        try:
+            with patch('app.services.openai_client.get_response_store', return_value=None):
+                assert await openai_chat("system", "user", model="flaky:model") == "ok"
+        finally:
+            register_provider("flaky", None)
+        assert "llm_concurrency_limit" not in str(metrics.snapshot())
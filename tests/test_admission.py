@@ -0,0 +1,174 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.admission import (
+    AdmissionController, AdmissionMiddleware, degraded_request, parse_policy, shed_action,
+)
+from app.services.metrics import metrics
+
+
+PAYLOAD = {
+    "tickets": [
+        {
+            "id": "TICKET-001",
+            "customer": "Acme",
+            "channel": "email",
+            "last_message": "Vou cancelar e abrir reclamação no procon",
+            "conversation_summary": "Cliente irritado",
+            "sla_hours_open": 30,
+            "language": "pt-BR"
+        }
+    ]
+}
+
+REPLY_PAYLOAD = {
+    "ticket_id": "TICKET-001",
+    "customer": "Acme",
+    "channel": "email",
+    "last_message": "Where is my refund?",
+    "conversation_summary": "Refund delayed",
+    "risk_label": "HIGH",
+    "company_tone": "formal",
+    "language": "en-US"
+}
+
+
+async def _slow_app(scope, receive, send):
+    await asyncio.sleep(0.02)
+    body = b"degraded" if degraded_request.get() else b"full"
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body})
+
+
+class TestAdmissionController:
+    """Test in-flight cap, priority queue and early shedding."""
+
+    @pytest.mark.asyncio
+    async def test_admits_up_to_capacity_then_queues(self):
+        """Test requests over capacity wait and are admitted when a slot frees up."""
+        controller = AdmissionController(capacity=1, max_wait=1)
+        assert await controller.admit()
+        waiter = asyncio.create_task(controller.admit())
+        await asyncio.sleep(0)
+        assert controller.queue_depth == 1
+        controller.release(0.01)
+        assert await waiter
+        assert controller.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_priority_order(self):
+        """Test high-priority requests leave the queue before earlier low-priority ones."""
+        controller = AdmissionController(capacity=1, max_wait=1)
+        await controller.admit()
+        order = []
+
+        async def request(priority):
+            assert await controller.admit(priority)
+            order.append(priority)
+            controller.release(0.001)
+
+        tasks = [asyncio.create_task(request(p)) for p in ("low", "normal", "high")]
+        await asyncio.sleep(0)
+        controller.release(0.001)
+        await asyncio.gather(*tasks)
+        assert order == ["high", "normal", "low"]
+
+    @pytest.mark.asyncio
+    async def test_sheds_after_max_wait(self):
+        """Test a queued request is shed once it waited max_wait."""
+        controller = AdmissionController(capacity=1, max_wait=0.01)
+        await controller.admit()
+        assert not await controller.admit()
+        assert controller.in_flight == 1
+
+    @pytest.mark.asyncio
+    async def test_sheds_early_on_expected_wait(self):
+        """Test a request is shed on arrival when the queue cannot drain within max_wait."""
+        controller = AdmissionController(capacity=1, max_wait=0.5)
+        controller.service_time = 1.0
+        await controller.admit()
+        start = asyncio.get_running_loop().time()
+        assert not await controller.admit()
+        assert asyncio.get_running_loop().time() - start < 0.1
+        assert controller.retry_after() >= 1
+
+
+class TestAdmissionPolicy:
+    """Test per-endpoint and per-priority shedding actions."""
+
+    def test_most_specific_rule_wins(self):
+        """Test path:priority overrides path, which overrides the default."""
+        policy = parse_policy("/tickets/analyze=degrade,/tickets/analyze:low=reject")
+        assert shed_action("/tickets/analyze", "normal", policy) == "degrade"
+        assert shed_action("/tickets/analyze", "low", policy) == "reject"
+        assert shed_action("/replies/suggest-reply", "high", policy) == "reject"
+
+    @pytest.mark.parametrize("raw", ["/tickets/analyze=drop", "/tickets/analyze:urgent=reject"])
+    def test_invalid_policy(self, raw):
+        """Test unknown actions and priorities are rejected."""
+        with pytest.raises(ValueError):
+            parse_policy(raw)
+
+
+class TestAdmissionMiddleware:
+    """Test shedding at the API edge."""
+
+    @pytest.mark.asyncio
+    async def test_spike_is_shed_not_queued(self):
+        """Test a spike over capacity gets fast 429s while admitted requests complete."""
+        controller = AdmissionController(capacity=2, max_wait=0.01)
+        middleware = AdmissionMiddleware(_slow_app, policy={}, enabled=True, controller=controller)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(*(client.post("/tickets/analyze") for _ in range(10)))
+        statuses = [r.status_code for r in responses]
+        assert statuses.count(200) >= 2
+        assert 429 in statuses
+        rejected = next(r for r in responses if r.status_code == 429)
+        assert int(rejected.headers["retry-after"]) >= 1
+        assert controller.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_unguarded_paths_pass_through(self):
+        """Test health and metrics are never shed."""
+        controller = AdmissionController(capacity=1, max_wait=0)
+        controller.admit = AsyncMock(return_value=False)
+        middleware = AdmissionMiddleware(_slow_app, policy={}, enabled=True, controller=controller)
+        transport = httpx.ASGITransport(app=middleware)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/health")
+        assert response.status_code == 200
+        controller.admit.assert_not_called()
+
+    @pytest.mark.parametrize("path, payload, headers, status", [
+        ("/tickets/analyze", PAYLOAD, {}, 200),
+        ("/tickets/analyze", PAYLOAD, {"X-Priority": "low"}, 429),
+        ("/replies/suggest-reply", REPLY_PAYLOAD, {}, 429),
+    ])
+    def test_default_policy(self, path, payload, headers, status):
+        """Test the default policy degrades ticket analysis and rejects the rest."""
+        metrics.reset()
+        controller = AdmissionController()
+        controller.admit = AsyncMock(return_value=False)
+        with patch('app.services.admission.get_admission_controller', return_value=controller):
+            response = TestClient(app).post(path, json=payload, headers=headers)
+        assert response.status_code == status
+        action = "degrade" if status == 200 else "reject"
+        priority = headers.get("X-Priority", "normal")
+        assert metrics.counter("admission_shed", path=path, priority=priority, action=action) == 1
+
+    def test_degraded_ticket_results(self):
+        """Test degraded requests return heuristic results without calling the LLM."""
+        controller = AdmissionController()
+        controller.admit = AsyncMock(return_value=False)
+        with patch('app.services.admission.get_admission_controller', return_value=controller), \
+                patch('app.services.risk_orchestrator.analyze_with_llm') as llm:
+            response = TestClient(app).post("/tickets/analyze", json=PAYLOAD)
+        llm.assert_not_called()
+        assert response.headers["x-degraded"] == "true"
+        result = response.json()["results"][0]
+        assert result["degraded"] is True
+        assert result["risk_label"] == "HIGH"
@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import patch
+from app.models import AIAnalysis, RiskLabel, TicketResult
+from app.services.assessment import RiskAssessment
+from app.services.risk_analyzer import analyze_ticket, assess_ticket
+from app.services.risk_orchestrator import assess_one_ticket, analyze_one_ticket
+
+
+class TestRiskAssessment:
+    """Test the internal result representation."""
+
+    def test_slotted(self):
+        """Test instances carry no per-instance __dict__."""
+        assessment = RiskAssessment(id="T-1")
+        assert not hasattr(assessment, "__dict__")
+        with pytest.raises(AttributeError):
+            assessment.unknown = 1
+
+    def test_to_result_matches_heuristic_model(self, sample_ticket_high_risk):
+        """Test conversion yields the same TicketResult as the public function."""
+        converted = assess_ticket(sample_ticket_high_risk).to_result()
+        assert isinstance(converted, TicketResult)
+        assert converted == analyze_ticket(sample_ticket_high_risk)
+        assert converted.risk_breakdown == {"escalation": 40, "churn": 0, "sla": 35, "sentiment": 15}
+
+    def test_to_result_copies_signals(self):
+        """Test the public model does not share the internal signal list."""
+        assessment = RiskAssessment(id="T-1", signals=["a"])
+        result = assessment.to_result()
+        assessment.signals.append("b")
+        assert result.debug_signals == ["a"]
+
+    def test_signals_interned(self, sample_ticket_high_risk, sample_ticket_medium_risk):
+        """Test repeated heuristic signals share one string object."""
+        first = assess_ticket(sample_ticket_high_risk)
+        second = assess_ticket(sample_ticket_high_risk.model_copy(update={"id": "T-2"}))
+        assert first.signals[0] is second.signals[0]
+        assert assess_ticket(sample_ticket_medium_risk).signals[-1] is first.signals[-1]
+
+
+class TestAssessOneTicket:
+    """Test the orchestrator merges stages on the internal representation."""
+
+    @pytest.mark.asyncio
+    async def test_llm_result_merged(self, sample_ticket_low_risk):
+        """Test LLM fields are merged into the heuristic assessment."""
+        ai = AIAnalysis(risk_score=20, risk_label=RiskLabel.LOW, confidence=90,
+                        reason="Fine", suggested_action="Reply", signals=["ok"])
+        with patch('app.services.risk_orchestrator.route_llm_analysis', return_value=(ai, "cheap")):
+            assessment = await assess_one_ticket(sample_ticket_low_risk)
+
+        assert isinstance(assessment, RiskAssessment)
+        assert assessment.risk_score == 20
+        assert assessment.reason == "Fine"
+        assert assessment.signals[-3:] == ["llm_tier:cheap", "llm_confidence:90", "llm_signal:ok"]
+
+    @pytest.mark.asyncio
+    async def test_llm_error_keeps_baseline(self, sample_ticket_high_risk):
+        """Test an LLM failure returns the heuristic assessment with an error signal."""
+        with patch('app.services.risk_orchestrator.route_llm_analysis', side_effect=RuntimeError("down")):
+            result = await analyze_one_ticket(sample_ticket_high_risk)
+
+        assert result.risk_label == RiskLabel.HIGH
+        assert result.debug_signals[-1] == "llm_error:RuntimeError"
@@ -0,0 +1,125 @@
+import csv
+import pytest
+from app.models import RiskLabel, Ticket
+from app.services.assessment import RiskAssessment
+from app.services.columnar import ResultWriter, columnar_format, read_results, read_tickets
+from app.tools import batch_analyze
+
+
+def _assessments(count: int) -> list[RiskAssessment]:
+    return [
+        RiskAssessment(id=f"T-{i}", risk_score=70, risk_label=RiskLabel.HIGH, reason="Escalation, aging",
+                       suggested_action="Escalate", escalation=40, sla=25, sentiment=5,
+                       signals=["escalation: procon", "sla: >=24h"] if i % 2 else [], language="pt-BR",
+                       degraded=bool(i % 3 == 0))
+        for i in range(count)
+    ]
+
+
+def _write_ticket_csv(path, count: int, language: str = "pt-BR") -> None:
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(["id", "customer", "channel", "last_message", "conversation_summary", "sla_hours_open",
+                         "language"])
+        for i in range(count):
+            writer.writerow([f"T-{i}", "Acme", "email", "Vou abrir reclamação no procon, absurdo", "", 30, language])
+
+
+class TestCsv:
+    """Test CSV import/export (no optional dependencies)."""
+
+    @pytest.mark.parametrize("suffix", [".csv", ".csv.gz"])
+    def test_results_round_trip(self, tmp_path, suffix):
+        """Test exported results read back identical, in bounded batches."""
+        path = str(tmp_path / f"results{suffix}")
+        with ResultWriter(path) as writer:
+            writer.write(_assessments(5))
+            writer.write(_assessments(10)[5:])
+        assert writer.rows == 10
+        batches = list(read_results(path, batch_size=4))
+        assert [len(b) for b in batches] == [4, 4, 2]
+        assert [r for b in batches for r in b] == _assessments(10)
+
+    def test_breakdown_flattened(self, tmp_path):
+        """Test risk_breakdown is one column per component and signals one cell."""
+        path = str(tmp_path / "results.csv")
+        with ResultWriter(path) as writer:
+            writer.write(_assessments(2))
+        with open(path, encoding="utf-8") as fh:
+            row = list(csv.DictReader(fh))[1]
+        assert (row["escalation"], row["churn"], row["sla"], row["sentiment"]) == ("40", "0", "25", "5")
+        assert row["debug_signals"] == "escalation: procon|sla: >=24h"
+        assert "risk_breakdown" not in row
+
+    def test_read_tickets(self, tmp_path):
+        """Test tickets stream in batches and a blank language falls back to the default."""
+        path = tmp_path / "tickets.csv"
+        _write_ticket_csv(path, 5, language="")
+        batches = list(read_tickets(str(path), batch_size=2))
+        assert [len(b) for b in batches] == [2, 2, 1]
+        assert batches[0][0] == Ticket(id="T-0", customer="Acme", channel="email",
+                                       last_message="Vou abrir reclamação no procon, absurdo",
+                                       conversation_summary="", sla_hours_open=30)
+
+    def test_unsupported_format(self):
+        """Test unknown extensions are rejected."""
+        with pytest.raises(ValueError):
+            columnar_format("results.json")
+
+
+class TestArrow:
+    """Test Parquet and Arrow IPC import/export."""
+
+    @pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+    def test_results_round_trip(self, tmp_path, suffix):
+        """Test exported results read back identical."""
+        pytest.importorskip("pyarrow")
+        path = str(tmp_path / f"results{suffix}")
+        with ResultWriter(path) as writer:
+            writer.write(_assessments(6))
+            writer.write(_assessments(9)[6:])
+        assert [r for b in read_results(path, batch_size=4) for r in b] == _assessments(9)
+
+    def test_signals_dictionary_encoded(self, tmp_path):
+        """Test debug_signals and repeated strings are dictionary-encoded in Parquet."""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+        path = str(tmp_path / "results.parquet")
+        with ResultWriter(path) as writer:
+            writer.write(_assessments(4))
+        schema = pq.read_schema(path)
+        assert pa.types.is_dictionary(schema.field("debug_signals").type.value_type)
+        assert pa.types.is_dictionary(schema.field("risk_label").type)
+        assert schema.field("sla").type == pa.int16()
+
+    def test_read_tickets_parquet(self, tmp_path):
+        """Test tickets are read from Parquet, ignoring extra columns."""
+        pa = pytest.importorskip("pyarrow")
+        import pyarrow.parquet as pq
+        path = str(tmp_path / "tickets.parquet")
+        pq.write_table(pa.table({
+            "id": ["T-1", "T-2"], "customer": ["Acme"] * 2, "channel": ["email"] * 2,
+            "last_message": ["Quero cancelar"] * 2, "conversation_summary": [""] * 2,
+            "sla_hours_open": [1, 50], "language": ["pt-BR"] * 2, "extra": [1, 2],
+        }), path)
+        tickets = [t for b in read_tickets(path) for t in b]
+        assert [t.sla_hours_open for t in tickets] == [1, 50]
+
+
+class TestBatchAnalyzeTool:
+    """Test the offline batch CLI."""
+
+    def test_heuristic_only(self, tmp_path, capsys):
+        """Test a ticket file is analyzed into a result file."""
+        source, target = tmp_path / "tickets.csv", tmp_path / "results.csv"
+        _write_ticket_csv(source, 3)
+        assert batch_analyze.main([str(source), str(target), "--heuristic-only", "--batch-size", "2"]) == 0
+        results = [r for b in read_results(str(target)) for r in b]
+        assert [r.id for r in results] == ["T-0", "T-1", "T-2"]
+        assert all(r.risk_label == RiskLabel.HIGH for r in results)
+        assert "3 results" in capsys.readouterr().out
+
+    def test_bad_extension(self, tmp_path, capsys):
+        """Test an unsupported output format fails before any work."""
+        assert batch_analyze.main([str(tmp_path / "tickets.csv"), str(tmp_path / "out.json")]) == 1
+        assert "Unsupported" in capsys.readouterr().err
@@ -0,0 +1,117 @@
+import pytest
+import json
+from unittest.mock import AsyncMock, patch
+from app.services.context_budget import count_tokens, compress_text, prepare_ticket
+from app.services.llm_engine import analyze_with_llm
+from app.models import Ticket
+
+
+FILLER = "The customer asked about the invoice layout again. "
+
+
+class TestCountTokens:
+    """Test local token estimation."""
+
+    def test_count_tokens_empty(self):
+        """Test empty text has no tokens."""
+        assert count_tokens("") == 0
+
+    def test_count_tokens_words_and_punctuation(self):
+        """Test short words and punctuation count one token each."""
+        assert count_tokens("I want help!") == 4
+
+    def test_count_tokens_long_words(self):
+        """Test long words count one token per 4 characters."""
+        assert count_tokens("cancellation") == 3
+
+
+class TestCompressText:
+    """Test extractive compression."""
+
+    def test_text_within_budget_unchanged(self):
+        """Test text that fits is returned as-is."""
+        text = "Short message."
+        assert compress_text(text, 100) == text
+
+    def test_compressed_text_fits_budget(self):
+        """Test compressed output respects the budget."""
+        text = FILLER * 50
+        result = compress_text(text, 60)
+        assert count_tokens(result) <= 60
+        assert len(result) > 0
+
+    def test_risk_sentences_kept(self):
+        """Test sentences with risk keywords survive compression."""
+        text = FILLER * 20 + "Vou abrir reclamação no procon amanhã. " + FILLER * 20
+        result = compress_text(text, 40)
+        assert "procon" in result
+        assert count_tokens(result) <= 40
+
+    def test_keep_tail_prefers_latest_sentences(self):
+        """Test keep_tail keeps the most recent content."""
+        text = "First sentence here. " + FILLER * 30 + "Latest update from customer."
+        result = compress_text(text, 20, keep_tail=True)
+        assert result.endswith("Latest update from customer.")
+
+    def test_single_oversized_sentence_truncated(self):
+        """Test a sentence larger than the budget is hard-cut."""
+        text = "word " * 500
+        result = compress_text(text, 10)
+        assert 0 < count_tokens(result) <= 10
+
+    def test_zero_budget(self):
+        """Test zero budget yields empty text."""
+        assert compress_text("Anything at all.", 0) == ""
+
+
+class TestPrepareTicket:
+    """Test ticket preprocessing before the LLM."""
+
+    def test_short_ticket_untouched(self, sample_ticket_low_risk):
+        """Test tickets within budget are returned unchanged."""
+        assert prepare_ticket(sample_ticket_low_risk, budget=500) is sample_ticket_low_risk
+
+    def test_long_ticket_compressed_to_budget(self):
+        """Test long histories are compressed to the token budget."""
+        ticket = Ticket(
+            id="TICKET-LONG",
+            customer="Test",
+            channel="email",
+            last_message=FILLER * 100 + "Se não resolverem vou cancelar.",
+            conversation_summary=FILLER * 100 + "Cliente citou advogado.",
+            sla_hours_open=30,
+            language="pt-BR",
+        )
+        prepared = prepare_ticket(ticket, budget=120)
+        total = count_tokens(prepared.last_message) + count_tokens(prepared.conversation_summary)
+        assert total <= 120
+        assert "cancelar" in prepared.last_message
+        assert "advogado" in prepared.conversation_summary
+        assert prepared.id == ticket.id
+
+    @pytest.mark.asyncio
+    async def test_llm_prompt_uses_compressed_ticket(self):
+        """Test analyze_with_llm sends the compressed text upstream."""
+        ticket = Ticket(
+            id="TICKET-LONG",
+            customer="Test",
+            channel="email",
+            last_message=FILLER * 300,
+            conversation_summary="Summary",
+            sla_hours_open=5,
+        )
+        mock_response = {
+            "risk_score": 10,
+            "risk_label": "LOW",
+            "reason": "Test",
+            "suggested_action": "Test",
+            "confidence": 80
+        }
+
+        with patch('app.services.llm_engine.openai_chat', new_callable=AsyncMock) as mock_chat:
+            mock_chat.return_value = json.dumps(mock_response)
+
+            await analyze_with_llm(ticket)
+
+            user_prompt = mock_chat.call_args.kwargs['user']
+            assert len(user_prompt) < len(ticket.last_message)
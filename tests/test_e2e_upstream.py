@@ -0,0 +1,170 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from app.main import app
+from app.services.tenancy import TENANT_MAX_CONCURRENCY
+from app.tools.fake_upstream import TRIAGE_RESPONSE, FakeUpstream
+
+
+def _tickets(count: int, message: str = "Preciso de ajuda com a fatura") -> dict:
+    return {"tickets": [
+        {"id": f"E2E-{i}", "customer": "Acme", "channel": "email", "last_message": f"{message} #{i}",
+         "conversation_summary": "", "sla_hours_open": 2, "language": "pt-BR"}
+        for i in range(count)
+    ]}
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=30)
+
+
+@pytest.fixture(autouse=True)
+def cheap_tier_only():
+    """Keep one upstream call per ticket (no strong-tier re-runs)."""
+    with patch('app.services.risk_orchestrator.STRONG_MODEL', ""):
+        yield
+
+
+class TestFakeUpstream:
+    """Test the fake upstream's scripted behavior through the real SDK client."""
+
+    @pytest.mark.asyncio
+    async def test_scripted_rate_limit_is_retried(self):
+        """Test a scripted 429 is retried by the SDK and the next call succeeds."""
+        upstream = FakeUpstream().script("rate_limit", "ok")
+        async with upstream.serve(max_retries=1) as provider:
+            content = await provider.chat(system="triage", user="hello", model="fake")
+        assert json.loads(content) == TRIAGE_RESPONSE
+        assert upstream.outcomes() == ["rate_limit", "ok"]
+
+    @pytest.mark.asyncio
+    async def test_seeded_failures_are_reproducible(self):
+        """Test two upstreams with the same seed fail the same calls."""
+        runs = []
+        for _ in range(2):
+            upstream = FakeUpstream(failure_rate=0.3, rate_limit_rate=0.2, seed=42)
+            async with upstream.serve() as provider:
+                for _ in range(20):
+                    try:
+                        await provider.chat(system="s", user="u", model="fake")
+                    except Exception:
+                        pass
+            runs.append(upstream.outcomes())
+        assert runs[0] == runs[1]
+        assert {"ok", "error", "rate_limit"} == set(runs[0])
+
+    @pytest.mark.asyncio
+    async def test_streaming(self):
+        """Test streamed answers reassemble to the full content, and partial streams stop early."""
+        upstream = FakeUpstream().script("ok", "partial")
+        async with upstream.serve() as provider:
+            texts = []
+            for _ in range(2):
+                stream = await provider.client.chat.completions.create(
+                    model="fake", messages=[{"role": "user", "content": "hi"}], stream=True)
+                texts.append("".join([chunk.choices[0].delta.content or "" async for chunk in stream]))
+        assert json.loads(texts[0]) == TRIAGE_RESPONSE
+        assert texts[1] == texts[0][:len(texts[0]) // 2]
+        assert all(call["stream"] for call in upstream.calls)
+
+
+class TestEndToEnd:
+    """Test the API against the fake upstream: concurrency, fallbacks and event-loop health."""
+
+    @pytest.mark.asyncio
+    async def test_analyze_through_upstream(self, fake_upstream):
+        """Test a ticket is refined by the upstream answer over real HTTP semantics."""
+        async with _client() as client:
+            response = await client.post("/tickets/analyze", json=_tickets(1))
+        result = response.json()["results"][0]
+        assert result["reason"] == TRIAGE_RESPONSE["reason"]
+        assert "llm_signal:fake_upstream" in result["debug_signals"]
+        assert fake_upstream.outcomes() == ["ok"]
+
+    @pytest.mark.asyncio
+    async def test_batch_throughput(self, fake_upstream):
+        """Test a batch is refined concurrently, up to the tenant's concurrency cap."""
+        fake_upstream.latency = 0.05
+        async with _client() as client:
+            response = await client.post("/tickets/analyze", json=_tickets(64))
+        assert len(response.json()["results"]) == 64
+        assert len(fake_upstream.calls) == 64
+        # One tenant: its cap is the binding limit, and it is reached but never exceeded
+        assert fake_upstream.max_in_flight == TENANT_MAX_CONCURRENCY
+
+    @pytest.mark.asyncio
+    async def test_fallback_latency_on_errors(self, fake_upstream):
+        """Test upstream 500s fall back to the heuristic result after a single concurrent attempt."""
+        fake_upstream.failure_rate = 1.0
+        async with _client() as client:
+            response = await client.post("/tickets/analyze", json=_tickets(8, "Vou no procon"))
+        results = response.json()["results"]
+        assert all("llm_error:InternalServerError" in r["debug_signals"] for r in results)
+        assert all(r["risk_label"] == "MEDIUM" for r in results)
+        # No retries and no serialization behind failing calls
+        assert len(fake_upstream.calls) == 8
+        assert fake_upstream.max_in_flight > 1
+
+    @pytest.mark.asyncio
+    async def test_partial_json_falls_back(self, fake_upstream):
+        """Test a truncated JSON answer is treated as an LLM error."""
+        fake_upstream.script("partial")
+        async with _client() as client:
+            response = await client.post("/tickets/analyze", json=_tickets(1))
+        signals = response.json()["results"][0]["debug_signals"]
+        assert any(s.startswith("llm_error:") for s in signals)
+
+    @pytest.mark.asyncio
+    async def test_timeout_falls_back(self, fake_upstream):
+        """Test a hanging upstream is cut off by the request timeout, not awaited."""
+        fake_upstream.script("hang")
+        async with fake_upstream.serve(timeout=0.2):
+            async with _client() as client:
+                start = time.perf_counter()
+                response = await client.post("/tickets/analyze", json=_tickets(1))
+                elapsed = time.perf_counter() - start
+        assert "llm_error:APITimeoutError" in response.json()["results"][0]["debug_signals"]
+        assert elapsed < 2.0
+
+    @pytest.mark.asyncio
+    async def test_reply_through_upstream(self, fake_upstream):
+        """Test reply suggestion parses the upstream reply JSON."""
+        payload = {"ticket_id": "E2E-R", "customer": "Acme", "channel": "email", "last_message": "Help",
+                   "conversation_summary": "", "risk_label": "MEDIUM", "company_tone": "friendly",
+                   "language": "en-US"}
+        async with _client() as client:
+            response = await client.post("/replies/suggest-reply", json=payload)
+        data = response.json()
+        assert data["source"] == "llm"
+        assert data["suggested_reply"].startswith("Thank you for reaching out")
+
+    @pytest.mark.asyncio
+    async def test_event_loop_not_blocked(self, fake_upstream):
+        """Test the loop keeps ticking while a large batch is analyzed."""
+        fake_upstream.latency = 0.02
+        lags = []
+        progress = []
+        done = asyncio.Event()
+
+        async def ticker():
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.005)
+                lags.append(time.perf_counter() - start - 0.005)
+                progress.append(len(fake_upstream.calls))
+
+        task = asyncio.create_task(ticker())
+        async with _client() as client:
+            start = time.perf_counter()
+            response = await client.post("/tickets/analyze", json=_tickets(200))
+            elapsed = time.perf_counter() - start
+        done.set()
+        await task
+        assert len(response.json()["results"]) == 200
+        # The ticker ran between upstream rounds throughout the batch, not only before or after it
+        assert len(set(progress)) >= 10
+        # A stage blocking the loop would stall it for a large share of the request
+        assert max(lags) < elapsed / 2
@@ -2,7 +2,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi.testclient import TestClient
 from app.main import app
-from app.models import RiskLabel
+from app.models import RiskLabel, MAX_TICKET_TEXT_LENGTH
 import json
 
 
@@ -77,14 +77,14 @@ class TestTicketsEndpoint:
         assert response.status_code == 422  # Validation error
     
     def test_analyze_ticket_message_too_long(self):
-        """Test message exceeding 255 character limit."""
+        """Test message exceeding the ticket text limit."""
         payload = {
             "tickets": [
                 {
                     "id": "TICKET-001",
                     "customer": "John Doe",
                     "channel": "email",
-                    "last_message": "x" * 256,  # Exceeds 255
+                    "last_message": "x" * (MAX_TICKET_TEXT_LENGTH + 1),
                     "conversation_summary": "Valid",
                     "sla_hours_open": 5
                 }
@@ -239,10 +239,10 @@ class TestRepliesEndpoint:
 class TestHealthEndpoint:
     """Test health check endpoint."""
     
-    @patch('app.routes.health.client.models.list')
+    @patch('app.services.llm_providers.OpenAICompatibleProvider.health_check', new_callable=AsyncMock)
     def test_health_check_healthy(self, mock_models):
         """Test health endpoint when OpenAI is available."""
-        mock_models.return_value = MagicMock()
+        mock_models.return_value = True
         
         response = client.get("/health")
         
@@ -254,7 +254,7 @@ class TestHealthEndpoint:
         assert "timestamp" in data
         assert isinstance(data["openai_available"], bool)
     
-    @patch('app.routes.health.client.models.list')
+    @patch('app.services.llm_providers.OpenAICompatibleProvider.health_check', new_callable=AsyncMock)
     def test_health_check_degraded(self, mock_models):
         """Test health endpoint when OpenAI is unavailable."""
         mock_models.side_effect = Exception("OpenAI Error")
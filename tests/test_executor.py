@@ -0,0 +1,101 @@
+import asyncio
+import pytest
+from app.models import Ticket
+from app.services.executor import StageExecutor
+from app.services.metrics import metrics
+from app.services.risk_analyzer import assess_ticket, assess_tickets_heuristic
+from app.services.text_normalization import normalize
+
+
+def _fail(item):
+    raise ValueError(item)
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+class TestStageExecutor:
+    """Test offloading CPU-bound stages."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["inline", "thread"])
+    async def test_map_preserves_order(self, mode):
+        """Test results come back in input order across batches."""
+        executor = StageExecutor(mode=mode, workers=2, batch_size=3)
+        try:
+            items = [f"Texto {i} Ação" for i in range(10)]
+            assert await executor.map("normalize", normalize, items) == [normalize(i) for i in items]
+        finally:
+            executor.shutdown()
+        assert metrics.counter("stage_items", stage="normalize") == 10
+        assert metrics.counter("stage_batches", stage="normalize") == 4
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("mode", ["inline", "thread"])
+    async def test_map_batched(self, mode):
+        """Test a batch function gets whole chunks and results match the per-item stage."""
+        executor = StageExecutor(mode=mode, workers=2, batch_size=4)
+        tickets = [Ticket(id=f"T-{i}", customer="c", channel="email", last_message=message,
+                          conversation_summary="", sla_hours_open=i * 7, language="en-US")
+                   for i, message in enumerate(["I want to cancel", "Thanks!", "Terrible, I will sue"] * 3)]
+        try:
+            results = await executor.map("heuristic", assess_tickets_heuristic, tickets, batched=True)
+        finally:
+            executor.shutdown()
+        assert results == [assess_ticket(t) for t in tickets]
+        assert metrics.counter("stage_items", stage="heuristic") == 9
+        assert metrics.counter("stage_batches", stage="heuristic") == 3
+
+    @pytest.mark.asyncio
+    async def test_process_pool(self):
+        """Test stages run in worker processes and report their cost."""
+        executor = StageExecutor(mode="process", workers=1, batch_size=8)
+        try:
+            assert await executor.map("normalize", normalize, ["Péssimo!"] * 5) == [" pessimo "] * 5
+        finally:
+            executor.shutdown()
+        assert metrics.counter("stage_compute_seconds", stage="normalize") > 0
+        assert metrics.counter("stage_overhead_seconds", stage="normalize") > 0
+
+    @pytest.mark.asyncio
+    async def test_submit_micro_batches_concurrent_calls(self):
+        """Test concurrent single submissions share one dispatch."""
+        executor = StageExecutor(mode="thread", workers=1, batch_size=100, batch_window_ms=20)
+        try:
+            results = await asyncio.gather(*(executor.submit("normalize", normalize, f"A{i}") for i in range(20)))
+        finally:
+            executor.shutdown()
+        assert results == [f" a{i} " for i in range(20)]
+        assert metrics.counter("stage_batches", stage="normalize") == 1
+
+    @pytest.mark.asyncio
+    async def test_submit_flushes_full_batch(self):
+        """Test a full batch is dispatched without waiting for the window."""
+        executor = StageExecutor(mode="thread", workers=1, batch_size=2, batch_window_ms=10_000)
+        try:
+            results = await asyncio.wait_for(
+                asyncio.gather(*(executor.submit("normalize", normalize, "x") for _ in range(4))), timeout=5
+            )
+        finally:
+            executor.shutdown()
+        assert results == [" x "] * 4
+        assert metrics.counter("stage_batches", stage="normalize") == 2
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate(self):
+        """Test an exception in the stage reaches every caller of the batch."""
+        executor = StageExecutor(mode="thread", workers=1)
+        try:
+            with pytest.raises(ValueError):
+                await executor.submit("fail", _fail, "boom")
+        finally:
+            executor.shutdown()
+
+    def test_unknown_mode(self):
+        """Test invalid modes are rejected."""
+        with pytest.raises(ValueError):
+            StageExecutor(mode="gpu")
@@ -0,0 +1,267 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from app.main import app
+from app.models import Ticket
+from app.services.ingestion import (
+    CallbackNotAllowed, IngestionBacklogFull, MicroBatcher, PublicCallbackTransport, validate_callback_url,
+)
+from app.services.metrics import metrics
+from app.services.tenancy import current_tenant
+from app.tools.webhook_receiver import WebhookReceiver
+
+CALLBACK = "http://receiver/callback"
+
+
+def _ticket(i: int, message: str = "Vou abrir reclamação no procon") -> Ticket:
+    return Ticket(id=f"T-{i}", customer="Acme", channel="email", last_message=message,
+                  conversation_summary="", sla_hours_open=30, language="pt-BR")
+
+
+def _batcher(receiver: WebhookReceiver, **kwargs) -> MicroBatcher:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=receiver.app))
+    return MicroBatcher(client=client, backoff=0, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def local_models():
+    """Serve LLM refinement from the local classifier."""
+    with patch('app.services.risk_orchestrator.CHEAP_MODEL', "local:risk-nb"), \
+            patch('app.services.risk_orchestrator.STRONG_MODEL', "local:risk-nb"):
+        yield
+
+
+class TestMicroBatcher:
+    """Test batching by size and time and callback delivery."""
+
+    @pytest.mark.asyncio
+    async def test_flush_on_size(self):
+        """Test a full batch is analyzed and delivered in one callback."""
+        receiver = WebhookReceiver()
+        batcher = _batcher(receiver, batch_size=3, batch_window_ms=10_000)
+        for i in range(3):
+            batcher.add(_ticket(i), CALLBACK)
+        await batcher.drain()
+        assert len(receiver.deliveries) == 1
+        assert [r["id"] for r in receiver.results] == ["T-0", "T-1", "T-2"]
+        assert receiver.results[0]["risk_label"] == "HIGH"
+        assert batcher.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_on_window(self):
+        """Test a partial batch is flushed once the time window elapses."""
+        metrics.reset()
+        receiver = WebhookReceiver()
+        batcher = _batcher(receiver, batch_size=50, batch_window_ms=10)
+        batcher.add(_ticket(1), CALLBACK)
+        batcher.add(_ticket(2), CALLBACK)
+        await asyncio.sleep(0.05)
+        await batcher.drain()
+        assert len(receiver.deliveries) == 1
+        assert len(receiver.results) == 2
+        assert metrics.counter("webhook_batches") == 1
+
+    @pytest.mark.asyncio
+    async def test_batches_split_by_tenant_and_callback(self):
+        """Test tickets of different tenants or callbacks never share a batch."""
+        receiver = WebhookReceiver()
+        batcher = _batcher(receiver, batch_size=50, batch_window_ms=10_000)
+        batcher.add(_ticket(1), CALLBACK)
+        batcher.add(_ticket(2), CALLBACK + "?hook=2")
+        token = current_tenant.set("globex")
+        try:
+            batcher.add(_ticket(3), CALLBACK)
+        finally:
+            current_tenant.reset(token)
+        await batcher.drain()
+        assert len(receiver.deliveries) == 3
+
+    @pytest.mark.asyncio
+    async def test_backlog_bound(self):
+        """Test tickets beyond max_pending are refused."""
+        batcher = _batcher(WebhookReceiver(), batch_size=50, batch_window_ms=10_000, max_pending=2)
+        batcher.add(_ticket(1), CALLBACK)
+        batcher.add(_ticket(2), CALLBACK)
+        with pytest.raises(IngestionBacklogFull):
+            batcher.add(_ticket(3), CALLBACK)
+        await batcher.drain()
+
+
+class TestDelivery:
+    """Test callback retries."""
+
+    @pytest.mark.asyncio
+    async def test_retries_until_delivered(self):
+        """Test transient receiver failures are retried."""
+        metrics.reset()
+        receiver = WebhookReceiver(fail_first=2)
+        assert await _batcher(receiver).deliver(CALLBACK, b'{"results": []}')
+        assert receiver.attempts == 3
+        assert metrics.counter("webhook_deliveries", status="retry") == 2
+        assert metrics.counter("webhook_deliveries", status="ok") == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_retries(self):
+        """Test delivery stops after the configured retries."""
+        metrics.reset()
+        receiver = WebhookReceiver(fail_first=10)
+        assert not await _batcher(receiver, retries=2).deliver(CALLBACK, b'{"results": []}')
+        assert receiver.attempts == 3
+        assert metrics.counter("webhook_deliveries", status="failed") == 1
+
+    @pytest.mark.asyncio
+    async def test_client_errors_not_retried(self):
+        """Test a 4xx other than 429 is final."""
+        receiver = WebhookReceiver(fail_first=10, fail_status=404)
+        assert not await _batcher(receiver).deliver(CALLBACK, b'{"results": []}')
+        assert receiver.attempts == 1
+
+
+class TestCallbackValidation:
+    """Test caller-supplied callback URLs are limited to allowed public targets."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("url", [
+        "http://169.254.169.254/latest/meta-data/",
+        "http://127.0.0.1:8000/admin",
+        "http://localhost/callback",
+        "http://10.0.0.5/hook",
+        "ftp://hooks.acme.com/x",
+        "not a url",
+    ])
+    async def test_refused_without_allowlist(self, url):
+        """Test nothing but WEBHOOK_CALLBACK_URL is accepted when no allowlist is configured."""
+        with pytest.raises(CallbackNotAllowed):
+            await validate_callback_url(url, allowlist=())
+
+    @pytest.mark.asyncio
+    async def test_default_callback_always_allowed(self):
+        """Test the operator-configured callback needs no allowlist."""
+        with patch('app.services.ingestion.WEBHOOK_CALLBACK_URL', "http://127.0.0.1:9000/hook"):
+            assert await validate_callback_url("http://127.0.0.1:9000/hook", allowlist=()) == \
+                "http://127.0.0.1:9000/hook"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("addresses, allowed", [
+        (["93.184.216.34"], True),
+        (["93.184.216.34", "10.1.2.3"], False),
+        (["169.254.169.254"], False),
+        (["::1"], False),
+    ])
+    async def test_wildcard_hosts_must_resolve_public(self, addresses, allowed):
+        """Test allowlisted wildcard hosts are refused when they resolve to internal addresses."""
+        with patch('app.services.ingestion._resolve', return_value=addresses):
+            if allowed:
+                await validate_callback_url("https://tenant1.hooks.acme.com/cb", allowlist=("*.hooks.acme.com",))
+            else:
+                with pytest.raises(CallbackNotAllowed):
+                    await validate_callback_url("https://tenant1.hooks.acme.com/cb",
+                                                allowlist=("*.hooks.acme.com",))
+
+    @pytest.mark.asyncio
+    async def test_wildcard_does_not_match_suffix_lookalike(self):
+        """Test *.acme.com does not match evilacme.com."""
+        with pytest.raises(CallbackNotAllowed):
+            await validate_callback_url("https://evilacme.com/cb", allowlist=("*.acme.com",))
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("path", ["/tickets/ingest", "/tickets/analyze?mode=fast"])
+    async def test_endpoints_refuse_internal_callbacks(self, path):
+        """Test ingestion and fast mode answer 400 for a metadata-service callback."""
+        body = _ticket(1).model_dump() if path == "/tickets/ingest" else {"tickets": [_ticket(1).model_dump()]}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.post(path, params={"callback_url": "http://169.254.169.254/"}, json=body)
+        assert response.status_code == 400
+
+
+class TestDeliveryTransport:
+    """Test callback hosts are re-checked when results are delivered."""
+
+    @staticmethod
+    def _client(seen: list, allowlist: tuple[str, ...] = ()) -> httpx.AsyncClient:
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200)
+        transport = PublicCallbackTransport(httpx.MockTransport(handler), allowlist=allowlist)
+        return httpx.AsyncClient(transport=transport)
+
+    @pytest.mark.asyncio
+    async def test_rebound_host_refused_without_retries(self):
+        """Test a host that resolves to a private address at delivery time is not called."""
+        seen = []
+        batcher = MicroBatcher(client=self._client(seen), backoff=0, retries=3)
+        with patch('app.services.ingestion._resolve', return_value=["10.0.0.5"]) as resolve:
+            assert not await batcher.deliver("https://tenant1.hooks.acme.com/cb", b"{}")
+        assert seen == []
+        assert resolve.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_connects_to_checked_address(self):
+        """Test delivery goes to the address that was checked, keeping Host and the TLS server name."""
+        seen = []
+        batcher = MicroBatcher(client=self._client(seen), backoff=0)
+        with patch('app.services.ingestion._resolve', return_value=["93.184.216.34"]):
+            assert await batcher.deliver("https://tenant1.hooks.acme.com:8443/cb?x=1", b"{}")
+        [request] = seen
+        assert str(request.url) == "https://93.184.216.34:8443/cb?x=1"
+        assert request.headers["host"] == "tenant1.hooks.acme.com:8443"
+        assert request.extensions["sni_hostname"] == "tenant1.hooks.acme.com"
+
+    @pytest.mark.asyncio
+    async def test_exact_allowlist_entry_trusted(self):
+        """Test exact allowlist entries may resolve to internal addresses, as at submit time."""
+        seen = []
+        batcher = MicroBatcher(client=self._client(seen, allowlist=("receiver",)), backoff=0)
+        with patch('app.services.ingestion._resolve') as resolve:
+            assert await batcher.deliver(CALLBACK, b"{}")
+        resolve.assert_not_called()
+        assert str(seen[0].url) == CALLBACK
+
+
+class TestIngestEndpoint:
+    """Test the webhook ingestion route."""
+
+    @pytest.fixture(autouse=True)
+    def allow_receiver(self):
+        """Allow the in-process receiver host as a callback target."""
+        with patch('app.services.ingestion._ALLOWLIST', ("receiver",)):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_accepts_and_delivers(self):
+        """Test tickets are acknowledged with 202 and delivered by callback."""
+        receiver = WebhookReceiver()
+        batcher = _batcher(receiver, batch_size=2, batch_window_ms=10_000)
+        transport = httpx.ASGITransport(app=app)
+        with patch('app.routes.tickets.get_batcher', return_value=batcher):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for i in range(2):
+                    response = await client.post("/tickets/ingest", params={"callback_url": CALLBACK},
+                                                 json=_ticket(i).model_dump())
+                    assert response.status_code == 202
+                    assert response.json() == {"ticket_id": f"T-{i}", "status": "accepted"}
+        await batcher.drain()
+        assert [r["id"] for r in receiver.results] == ["T-0", "T-1"]
+
+    @pytest.mark.asyncio
+    async def test_callback_required(self):
+        """Test a ticket without a callback URL is rejected."""
+        transport = httpx.ASGITransport(app=app)
+        with patch('app.routes.tickets.WEBHOOK_CALLBACK_URL', None):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/tickets/ingest", json=_ticket(1).model_dump())
+        assert response.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_backlog_full(self):
+        """Test a full backlog answers 429 with Retry-After."""
+        batcher = _batcher(WebhookReceiver(), max_pending=0)
+        transport = httpx.ASGITransport(app=app)
+        with patch('app.routes.tickets.get_batcher', return_value=batcher):
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/tickets/ingest", params={"callback_url": CALLBACK},
+                                             json=_ticket(1).model_dump())
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
@@ -0,0 +1,146 @@
+import pytest
+import asyncio
+import json
+import threading
+import httpx
+from app.services.llm_providers import (
+    LLMProvider, LocalClassifierProvider, NaiveBayesRiskClassifier,
+    OpenAICompatibleProvider, UnsupportedTaskError, get_provider, register_provider,
+)
+from app.services.llm_engine import analyze_with_llm
+from app.services.reply_suggester import SYSTEM_PROMPT as REPLY_PROMPT
+from app.models import AIAnalysis, RiskLabel
+
+
+class SlowProvider(LLMProvider):
+    """Provider that records its peak parallelism."""
+
+    name = "slow"
+
+    def __init__(self, max_concurrency):
+        super().__init__(max_concurrency)
+        self.peak = 0
+
+    async def _chat(self, system, user, model, temperature):
+        self.peak = max(self.peak, self.in_flight)
+        await asyncio.sleep(0.01)
+        return "{}"
+
+
+class TestProviderResolution:
+    """Test provider selection by model name."""
+
+    def test_local_prefix_selects_local_provider(self):
+        """Test "local:" prefix resolves to the in-process classifier."""
+        provider, model = get_provider("local:risk-nb")
+        assert isinstance(provider, LocalClassifierProvider)
+        assert model == "risk-nb"
+
+    def test_plain_model_uses_default_provider(self):
+        """Test unprefixed model names use LLM_PROVIDER (openai)."""
+        provider, model = get_provider("gpt-4o-mini")
+        assert isinstance(provider, OpenAICompatibleProvider)
+        assert model == "gpt-4o-mini"
+
+    def test_concurrent_first_use_builds_one_provider(self):
+        """Test warm-up and requests racing on first use share one provider and model."""
+        previous = register_provider("local", None)
+        barrier = threading.Barrier(8)
+        found = []
+
+        def resolve():
+            barrier.wait()
+            provider = get_provider("local:risk-nb")[0]
+            found.append((provider, provider.model))
+
+        try:
+            threads = [threading.Thread(target=resolve) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            assert len({id(p) for p, _ in found}) == 1
+            assert len({id(m) for _, m in found}) == 1
+        finally:
+            register_provider("local", previous)
+
+
+class TestConcurrencyLimits:
+    """Test providers enforce their declared concurrency."""
+
+    @pytest.mark.asyncio
+    async def test_max_concurrency_respected(self):
+        """Test no more than max_concurrency calls run at once."""
+        provider = SlowProvider(max_concurrency=3)
+        await asyncio.gather(*(provider.chat("s", "u", "m") for _ in range(10)))
+        assert provider.peak == 3
+        assert provider.in_flight == 0
+
+
+class TestLocalClassifier:
+    """Test the CPU-only local backend (no mocks)."""
+
+    def test_naive_bayes_roundtrip(self, tmp_path):
+        """Test a trained model can be saved and reloaded."""
+        model = NaiveBayesRiskClassifier().fit(
+            ["quero cancelar agora", "obrigado pela ajuda"], ["HIGH", "LOW"]
+        )
+        path = tmp_path / "model.json"
+        model.save(str(path))
+        loaded = NaiveBayesRiskClassifier.load(str(path))
+        assert loaded.predict_proba("cancelar") == model.predict_proba("cancelar")
+
+    @pytest.mark.asyncio
+    async def test_analyze_with_local_backend(self, sample_ticket_high_risk):
+        """Test analyze_with_llm works end-to-end on the local classifier."""
+        result = await analyze_with_llm(sample_ticket_high_risk, model="local:risk-nb")
+        assert isinstance(result, AIAnalysis)
+        assert result.risk_label == RiskLabel.HIGH
+        assert 0 <= result.confidence <= 100
+
+    @pytest.mark.asyncio
+    async def test_low_risk_ticket_on_local_backend(self, sample_ticket_low_risk):
+        """Test routine tickets are classified LOW."""
+        result = await analyze_with_llm(sample_ticket_low_risk, model="local:risk-nb")
+        assert result.risk_label == RiskLabel.LOW
+
+    @pytest.mark.asyncio
+    async def test_reply_prompt_unsupported(self):
+        """Test the local backend refuses non-triage prompts."""
+        provider = LocalClassifierProvider()
+        with pytest.raises(UnsupportedTaskError):
+            await provider.chat(REPLY_PROMPT, "Generate a customer support reply", "risk-nb")
+
+
+class TestOpenAICompatibleProvider:
+    """Test the HTTP backend against an OpenAI-compatible endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_chat_against_compatible_endpoint(self):
+        """Test requests hit /chat/completions on the configured base_url."""
+        seen = {}
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen["url"] = str(request.url)
+            seen["body"] = json.loads(request.content)
+            return httpx.Response(200, json={
+                "id": "cmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": "llama3",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "pong"},
+                }],
+            })
+
+        provider = OpenAICompatibleProvider(
+            base_url="http://selfhosted.local/v1",
+            api_key="test",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        assert await provider.chat("system", "ping", "llama3") == "pong"
+        assert seen["url"] == "http://selfhosted.local/v1/chat/completions"
+        assert seen["body"]["model"] == "llama3"
+        await provider.aclose()
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import AIAnalysis, RiskLabel, Ticket
+from app.services.admission import AdmissionController, degraded_request
+from app.services.ingestion import MicroBatcher
+from app.services.refinement import RefinementStore, SharedResults
+from app.tools.webhook_receiver import WebhookReceiver
+
+CALLBACK = "http://receiver/callback"
+
+
+def _ticket(i: int) -> Ticket:
+    return Ticket(id=f"T-{i}", customer="Acme", channel="email", last_message="Vou abrir reclamação no procon",
+                  conversation_summary="", sla_hours_open=30, language="pt-BR")
+
+
+def _payload(count: int) -> dict:
+    return {"tickets": [_ticket(i).model_dump() for i in range(count)]}
+
+
+@pytest.fixture
+def gate():
+    """LLM refinement that blocks until the returned event is set."""
+    release = asyncio.Event()
+
+    async def fake_llm(ticket, model):
+        await release.wait()
+        return AIAnalysis(risk_score=40, risk_label=RiskLabel.MEDIUM, reason="LLM", suggested_action="LLM",
+                          confidence=90)
+
+    with patch('app.services.risk_orchestrator.analyze_with_llm', fake_llm), \
+            patch('app.services.risk_orchestrator.STRONG_MODEL', ""):
+        yield release
+
+
+class TestRefinementStore:
+    """Test provisional results and background refinement."""
+
+    @pytest.mark.asyncio
+    async def test_provisional_before_llm(self, gate):
+        """Test heuristic results are returned, flagged provisional, while the LLM is pending."""
+        store = RefinementStore()
+        job = await store.start([_ticket(1), _ticket(2)])
+
+        results = job.response().results
+        assert [r.provisional for r in results] == [True, True]
+        assert results[0].risk_label == RiskLabel.HIGH
+        assert job.pending == 2
+
+        gate.set()
+        assert await job.wait(1)
+        results = job.response().results
+        assert [r.provisional for r in results] == [False, False]
+        assert results[0].reason == "LLM"
+        assert store.get(job.id) is job
+
+    @pytest.mark.asyncio
+    async def test_updates_include_results_landed_earlier(self, gate):
+        """Test a late subscriber still receives every refined result once."""
+        store = RefinementStore()
+        job = await store.start([_ticket(i) for i in range(3)])
+        gate.set()
+        await asyncio.sleep(0.05)
+
+        refined = [result.id async for result in job.updates()]
+
+        assert sorted(refined) == ["T-0", "T-1", "T-2"]
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_refine_is_done(self, gate):
+        """Test a degraded request has no provisional results and is done at once."""
+        token = degraded_request.set(True)
+        try:
+            job = await RefinementStore().start([_ticket(1)])
+        finally:
+            degraded_request.reset(token)
+        assert job.done.is_set()
+        assert not job.response().results[0].provisional
+
+    @pytest.mark.asyncio
+    async def test_refined_results_called_back(self, gate):
+        """Test the refined response is POSTed to the callback URL."""
+        receiver = WebhookReceiver()
+        batcher = MicroBatcher(client=httpx.AsyncClient(transport=httpx.ASGITransport(app=receiver.app)), backoff=0)
+        store = RefinementStore()
+        with patch('app.services.refinement.get_batcher', return_value=batcher):
+            job = await store.start([_ticket(1)], CALLBACK)
+            gate.set()
+            await store.drain()
+
+        assert len(receiver.deliveries) == 1
+        assert receiver.deliveries[0]["result_id"] == job.id
+        assert receiver.results[0]["provisional"] is False
+
+    @pytest.mark.asyncio
+    async def test_expired_jobs(self, gate):
+        """Test jobs past max_jobs are dropped oldest first."""
+        store = RefinementStore(max_jobs=1)
+        first = await store.start([_ticket(1)])
+        second = await store.start([_ticket(2)])
+        gate.set()
+        await store.drain()
+        assert store.get(first.id) is None
+        assert store.get(second.id) is second
+
+
+class TestSharedResults:
+    """Test fetching fast-mode results from another worker through the shared store."""
+
+    @pytest.mark.asyncio
+    async def test_other_worker_fetches_results(self, gate, tmp_path):
+        """Test a second store (worker) sees the provisional, then the refined response."""
+        shared = SharedResults(str(tmp_path / "refinements.sqlite"))
+        issuing, other = RefinementStore(shared=shared), RefinementStore(shared=SharedResults(shared.path))
+        job = await issuing.start([_ticket(1)])
+
+        provisional = await other.fetch(job.id)
+        assert provisional.results[0].provisional is True
+        assert provisional.result_id == job.id
+
+        gate.set()
+        refined = await other.fetch(job.id, wait=2)
+        assert refined.results[0].provisional is False
+        assert refined.results[0].reason == "LLM"
+        assert await other.fetch("nope") is None
+
+    @pytest.mark.asyncio
+    async def test_expired_rows_not_served(self, gate, tmp_path):
+        """Test shared results are not served past the TTL."""
+        shared = SharedResults(str(tmp_path / "refinements.sqlite"))
+        job = await RefinementStore(shared=shared).start([_ticket(1)])
+        assert await RefinementStore(ttl_seconds=0, shared=shared).fetch(job.id) is None
+        gate.set()
+
+
+class TestFastModeEndpoints:
+    """Test /tickets/analyze?mode=fast|stream and /tickets/results."""
+
+    @pytest.mark.asyncio
+    async def test_fast_then_fetch(self, gate):
+        """Test mode=fast answers provisionally and the refined results can be fetched."""
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/tickets/analyze?mode=fast", json=_payload(2))
+            assert response.status_code == 200
+            data = response.json()
+            assert all(r["provisional"] for r in data["results"])
+
+            gate.set()
+            fetched = await client.get(f"/tickets/results/{data['result_id']}?wait=1")
+
+        assert fetched.status_code == 200
+        assert [r["provisional"] for r in fetched.json()["results"]] == [False, False]
+        assert fetched.json()["results"][0]["reason"] == "LLM"
+
+    @pytest.mark.asyncio
+    async def test_unknown_result_id(self):
+        """Test an unknown result id is a 404."""
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/tickets/results/nope")
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_stream(self, gate):
+        """Test mode=stream sends the provisional response, then one line per refined ticket."""
+        gate.set()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.post("/tickets/analyze?mode=stream", json=_payload(3))
+
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert len(lines) == 4
+        assert all(r["provisional"] for r in lines[0]["results"])
+        assert sorted(line["id"] for line in lines[1:]) == ["T-0", "T-1", "T-2"]
+        assert not any(line["provisional"] for line in lines[1:])
+
+    @pytest.mark.asyncio
+    async def test_refinement_holds_admission_slot(self, gate):
+        """Test a fast request keeps its admission slot until refined, so the next one is degraded."""
+        controller = AdmissionController(capacity=1, max_wait=0.01)
+        with patch('app.services.admission.get_admission_controller', return_value=controller):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                first = await client.post("/tickets/analyze?mode=fast", json=_payload(1))
+                assert controller.in_flight == 1
+                second = await client.post("/tickets/analyze?mode=fast", json=_payload(1))
+
+                gate.set()
+                await client.get(f"/tickets/results/{first.json()['result_id']}?wait=1")
+                await asyncio.sleep(0)
+                assert controller.in_flight == 0
+                third = await client.post("/tickets/analyze?mode=fast", json=_payload(1))
+
+        assert first.json()["results"][0]["provisional"] is True
+        assert second.headers["x-degraded"] == "true"
+        assert third.json()["results"][0]["degraded"] is False
+
+    def test_full_mode_unchanged(self, gate):
+        """Test the default mode still waits for the LLM."""
+        gate.set()
+        response = TestClient(app).post("/tickets/analyze", json=_payload(1))
+        data = response.json()
+        assert data["result_id"] is None
+        assert data["results"][0]["provisional"] is False
+        assert data["results"][0]["reason"] == "LLM"
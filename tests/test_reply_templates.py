@@ -0,0 +1,245 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.models import ReplySuggestionRequest, ReplySuggestionResponse, RiskLabel
+from app.services.reply_suggester import FEW_SHOT_PROMPT_VERSION, PROMPT_VERSION, suggest_reply_with_llm
+from app.services.reply_templates import ReplyTemplateIndex, TemplateRejected, reply_templates
+from app.services.tenancy import current_tenant
+
+client = TestClient(app)
+
+
+def make_request(ticket_id="TICKET-001", customer="John Doe", message="How do I reset my password?",
+                 risk=RiskLabel.LOW, tone="friendly", language="en-US", channel="email"):
+    return ReplySuggestionRequest(
+        ticket_id=ticket_id,
+        customer=customer,
+        channel=channel,
+        last_message=message,
+        conversation_summary="Customer asked for account help.",
+        risk_label=risk,
+        company_tone=tone,
+        language=language,
+    )
+
+
+def make_reply(ticket_id="TICKET-001", text="Hi {customer}, use the reset link on the login page. Ref {ticket_id}.",
+               subject="Password reset for {customer}"):
+    return ReplySuggestionResponse(
+        ticket_id=ticket_id,
+        suggested_reply=text,
+        confidence=90,
+        language="en-US",
+        subject=subject,
+        next_steps=["Confirm the reset worked"],
+        do_not_say=["It's your fault"],
+    )
+
+
+@pytest.fixture(autouse=True)
+def tenant():
+    """Run as one API-key tenant, so tickets of different customers share templates."""
+    token = current_tenant.set("acme")
+    yield "acme"
+    current_tenant.reset(token)
+
+
+LLM_REPLY = json.dumps({"reply_text": "Generated reply", "confidence": 80, "subject": "",
+                        "next_steps": [], "do_not_say": []})
+
+
+class TestReplyTemplateIndex:
+    """Test indexing and retrieval of approved replies."""
+
+    def test_match_adapts_placeholders(self):
+        """Test a matched template is filled in with the new ticket's customer and id."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(), make_reply())
+
+        reply = index.match(make_request(ticket_id="TICKET-777", customer="Ana Lima",
+                                         message="Hi, how do I reset my password?"))
+
+        assert reply.source == "template"
+        assert reply.ticket_id == "TICKET-777"
+        assert reply.suggested_reply == "Hi Ana Lima, use the reset link on the login page. Ref TICKET-777."
+        assert reply.subject == "Password reset for Ana Lima"
+        assert reply.next_steps == ["Confirm the reset worked"]
+        assert 0 < reply.confidence <= 90
+
+    @pytest.mark.parametrize("approved, asked", [
+        ("I was charged twice, please refund", "I was not charged, please refund"),
+        ("How do I update my card?", "How do I cancel my card?"),
+        ("Where is my March invoice?", "Where is my April invoice?"),
+        ("Refund order 1234 please", "Refund order 1235 please"),
+        ("I can log in on the app", "I can't log in on the app"),
+    ])
+    def test_no_match_for_opposite_intent(self, approved, asked):
+        """Test close-looking messages with another intent, negation or number get no template."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(message=approved), make_reply())
+        assert index.match(make_request(message=asked)) is None
+        assert index.match(make_request(message=approved)) is not None
+
+    def test_free_text_is_never_rewritten(self):
+        """Test only the placeholders are filled in, not substrings of the customer or id."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(ticket_id="1", customer="Al", message="How do I export my data?"),
+                      make_reply(text="Hi {customer}. Also, exports take 1 minute.", subject="Exports"))
+
+        reply = index.match(make_request(ticket_id="TCK-42", customer="Globex Corporation",
+                                         message="How do I export my data?"))
+
+        assert reply.suggested_reply == "Hi Globex Corporation. Also, exports take 1 minute."
+
+    @pytest.mark.parametrize("text, subject", [
+        ("Hi John Doe, use the reset link.", "Password reset"),
+        ("Hi {customer}, use the reset link.", "About TICKET-001"),
+    ])
+    def test_reply_naming_the_ticket_is_rejected(self, text, subject):
+        """Test a reply still carrying the ticket's customer name or id is not indexed."""
+        index = ReplyTemplateIndex(path=None)
+        with pytest.raises(TemplateRejected):
+            index.approve(make_request(), make_reply(text=text, subject=subject))
+        assert len(index) == 0
+
+    def test_templates_are_per_tenant(self):
+        """Test a tenant's templates are neither served nor shown as examples to another tenant."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(), make_reply(), tenant="acme")
+        index.approve(make_request(risk=RiskLabel.HIGH), make_reply(), tenant="acme")
+
+        token = current_tenant.set("globex")
+        try:
+            assert index.match(make_request()) is None
+            assert index.examples(make_request(risk=RiskLabel.HIGH)) == []
+        finally:
+            current_tenant.reset(token)
+        token = current_tenant.set("acme")
+        try:
+            assert index.match(make_request()) is not None
+        finally:
+            current_tenant.reset(token)
+
+    @pytest.mark.parametrize("changes", [
+        {"risk": RiskLabel.MEDIUM},
+        {"tone": "formal"},
+        {"language": "pt-BR"},
+        {"channel": "chat"},
+        {"message": "My invoice shows a double charge this month"},
+    ])
+    def test_no_match_outside_partition_or_when_dissimilar(self, changes):
+        """Test risk, tone, language and channel must all match and the text must be close."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(), make_reply())
+
+        assert index.match(make_request(**changes)) is None
+
+    def test_examples_ignore_channel(self):
+        """Test few-shot examples come from any channel of the same risk, tone and language."""
+        index = ReplyTemplateIndex(path=None)
+        index.approve(make_request(risk=RiskLabel.HIGH), make_reply())
+        index.approve(make_request(risk=RiskLabel.HIGH, language="pt-BR"), make_reply(text="Olá"))
+
+        examples = index.examples(make_request(risk=RiskLabel.HIGH, channel="chat", customer="Ana Lima"))
+
+        assert len(examples) == 1
+        assert examples[0]["reply_text"].startswith("Hi Ana Lima")
+
+    def test_partition_keeps_most_recent(self):
+        """Test a partition drops its oldest template past per_partition."""
+        index = ReplyTemplateIndex(path=None, per_partition=2)
+        for n in range(3):
+            index.approve(make_request(), make_reply(text=f"Reply {n}"))
+
+        assert len(index) == 2
+        texts = {t["reply"] for _, t in index.search(make_request(), k=5)}
+        assert texts == {"Reply 1", "Reply 2"}
+
+    def test_persisted_approvals_are_reloaded(self, tmp_path):
+        """Test approvals appended to the JSONL file are loaded by a new index."""
+        path = tmp_path / "templates.jsonl"
+        ReplyTemplateIndex(path=str(path)).approve(make_request(), make_reply())
+
+        reloaded = ReplyTemplateIndex(path=str(path))
+
+        assert len(reloaded) == 1
+        assert reloaded.match(make_request(customer="Ana Lima")).suggested_reply.startswith("Hi Ana Lima")
+
+
+class TestTemplateReplies:
+    """Test reply suggestion with approved templates."""
+
+    @pytest.mark.asyncio
+    async def test_low_risk_match_skips_llm(self):
+        """Test a LOW-risk ticket close to a template is answered without an LLM call."""
+        reply_templates.approve(make_request(), make_reply())
+
+        with patch('app.services.reply_suggester.openai_chat', new_callable=AsyncMock) as mock_chat:
+            result = await suggest_reply_with_llm(make_request(ticket_id="TICKET-9", customer="Ana Lima"))
+
+        mock_chat.assert_not_called()
+        assert result.source == "template"
+        assert "Ana Lima" in result.suggested_reply
+
+    @pytest.mark.asyncio
+    async def test_high_risk_uses_templates_as_examples(self):
+        """Test a HIGH-risk ticket is generated with the approved reply in the prompt."""
+        reply_templates.approve(make_request(risk=RiskLabel.HIGH), make_reply())
+
+        with patch('app.services.reply_suggester.openai_chat', new_callable=AsyncMock) as mock_chat:
+            mock_chat.return_value = LLM_REPLY
+            result = await suggest_reply_with_llm(make_request(risk=RiskLabel.HIGH, customer="Ana Lima"))
+
+        assert result.source == "llm"
+        kwargs = mock_chat.call_args.kwargs
+        assert kwargs["prompt_version"] == FEW_SHOT_PROMPT_VERSION
+        assert "Hi Ana Lima, use the reset link" in kwargs["user"]
+
+    @pytest.mark.asyncio
+    async def test_no_templates_keeps_original_prompt(self):
+        """Test the prompt and its version are unchanged when nothing is indexed."""
+        with patch('app.services.reply_suggester.openai_chat', new_callable=AsyncMock) as mock_chat:
+            mock_chat.return_value = LLM_REPLY
+            await suggest_reply_with_llm(make_request())
+
+        kwargs = mock_chat.call_args.kwargs
+        assert kwargs["prompt_version"] == PROMPT_VERSION
+        assert "Approved replies" not in kwargs["user"]
+
+    def test_approve_endpoint(self):
+        """Test POST /replies/approve indexes the reply for the API key's tenant."""
+        body = {"ticket": make_request().model_dump(mode="json"), "reply": make_reply().model_dump(mode="json")}
+        with patch.dict('app.services.tenancy._API_KEYS', {"k1": "acme"}):
+            response = client.post("/replies/approve", json=body, headers={"X-API-Key": "k1"})
+
+            assert response.status_code == 200
+            assert response.json()["templates"] == 1
+
+            with patch('app.services.reply_suggester.openai_chat', new_callable=AsyncMock) as mock_chat:
+                mock_chat.return_value = LLM_REPLY
+                request = make_request(customer="Ana Lima").model_dump(mode="json")
+                suggested = client.post("/replies/suggest-reply", json=request, headers={"X-API-Key": "k1"})
+                other = client.post("/replies/suggest-reply", json=request)
+
+        assert mock_chat.call_count == 1
+        assert suggested.json()["source"] == "template"
+        assert other.json()["source"] == "llm"
+
+    @pytest.mark.parametrize("headers", [{}, {"X-API-Key": "unknown"}])
+    def test_approve_requires_configured_key(self, headers):
+        """Test approvals without a key listed in TENANT_API_KEYS are refused."""
+        body = {"ticket": make_request().model_dump(mode="json"), "reply": make_reply().model_dump(mode="json")}
+        with patch.dict('app.services.tenancy._API_KEYS', {"k1": "acme"}):
+            response = client.post("/replies/approve", json=body, headers=headers)
+        assert response.status_code == 403
+        assert len(reply_templates) == 0
+
+    def test_approve_rejects_ticket_values(self):
+        """Test an approval naming the ticket's customer is a 422."""
+        body = {"ticket": make_request().model_dump(mode="json"),
+                "reply": make_reply(text="Hi John Doe").model_dump(mode="json")}
+        with patch.dict('app.services.tenancy._API_KEYS', {"k1": "acme"}):
+            response = client.post("/replies/approve", json=body, headers={"X-API-Key": "k1"})
+        assert response.status_code == 422
@@ -0,0 +1,192 @@
+import os
+import pytest
+import threading
+from unittest.mock import patch
+from app.services.response_store import ResponseStore, ResponseNotRecorded, make_key
+from app.services.llm_providers import LLMProvider, register_provider
+from app.services.openai_client import openai_chat
+
+
+class CountingProvider(LLMProvider):
+    """Provider returning a fixed answer and counting calls."""
+
+    name = "counting"
+
+    def __init__(self):
+        super().__init__(max_concurrency=4)
+        self.calls = 0
+
+    async def _chat(self, system, user, model, temperature):
+        self.calls += 1
+        return f"answer-{self.calls}"
+
+
+class TestResponseStore:
+    """Test the SQLite response store."""
+
+    def test_lazy_open(self, tmp_path):
+        """Test the database file is only created on first access."""
+        path = tmp_path / "store.db"
+        store = ResponseStore(str(path))
+        assert not path.exists()
+        assert store.get("m", "v1", "s", "u") is None
+        assert path.exists()
+        store.close()
+
+    def test_put_and_get(self, tmp_path):
+        """Test stored responses are served back."""
+        store = ResponseStore(str(tmp_path / "store.db"))
+        store.put("m", "v1", "system", "user", "response")
+        assert store.get("m", "v1", "system", "user") == "response"
+        store.close()
+
+    def test_key_includes_model_and_prompt_version(self, tmp_path):
+        """Test a new model or prompt version does not reuse old responses."""
+        store = ResponseStore(str(tmp_path / "store.db"))
+        store.put("m", "v1", "system", "user", "response")
+        assert store.get("m", "v2", "system", "user") is None
+        assert store.get("other", "v1", "system", "user") is None
+        assert make_key("m", "v1", "s", "u") != make_key("m", "v1", "su", "")
+        store.close()
+
+    def test_persists_across_instances(self, tmp_path):
+        """Test responses survive a restart (warm start)."""
+        path = str(tmp_path / "store.db")
+        store = ResponseStore(path)
+        store.put("m", "v1", "s", "u", "kept")
+        store.close()
+
+        reopened = ResponseStore(path)
+        assert reopened.get("m", "v1", "s", "u") == "kept"
+        reopened.close()
+
+    def test_compaction_keeps_most_recent(self, tmp_path):
+        """Test compaction drops least recently used rows past the limit."""
+        store = ResponseStore(str(tmp_path / "store.db"), max_entries=5)
+        for i in range(20):
+            store.put("m", "v1", "s", f"user-{i}", f"r{i}")
+        store.compact(vacuum=True)
+        assert len(store) == 5
+        assert store.get("m", "v1", "s", "user-19") == "r19"
+        assert store.get("m", "v1", "s", "user-0") is None
+        store.close()
+
+    def test_size_limit_enforced_between_compactions(self, tmp_path):
+        """Test the byte budget triggers compaction well before the entry limit."""
+        path = tmp_path / "store.db"
+        store = ResponseStore(str(path), max_mb=1)
+        for i in range(500):
+            if store.put("m", "v1", "s", f"user-{i}", "x" * 10_000):
+                store.compact()
+        assert store.size_bytes() <= 1024 * 1024
+        assert store.get("m", "v1", "s", "user-499") is not None
+        assert store.get("m", "v1", "s", "user-0") is None
+        store.close()
+        assert os.path.getsize(path) < 2 * 1024 * 1024
+
+    def test_replace_not_counted_twice(self, tmp_path):
+        """Test re-recording the same prompt does not grow the count or trigger compaction."""
+        store = ResponseStore(str(tmp_path / "store.db"), max_entries=5)
+        assert not any(store.put("m", "v1", "s", "u", f"r{i}") for i in range(50))
+        assert len(store) == 1
+        assert store.get("m", "v1", "s", "u") == "r49"
+        store.close()
+
+    def test_compaction_holds_lock_per_batch(self, tmp_path):
+        """Test compaction picks rows without the lock and deletes them in short batches."""
+        store = ResponseStore(str(tmp_path / "store.db"), max_entries=10)
+        for i in range(60):
+            store.put("m", "v1", "s", f"user-{i}", "r")
+        oldest = store._oldest
+
+        def scan_then_touch(*args):
+            rows = oldest(*args)
+            assert not store._lock.locked()
+            store.get("m", "v1", "s", "user-0")  # used again while compaction runs
+            return rows
+
+        with patch.object(store, "_oldest", scan_then_touch), \
+                patch('app.services.response_store._DELETE_BATCH', 7):
+            assert store.compact() == 49
+        assert store.get("m", "v1", "s", "user-0") == "r"
+        assert store.get("m", "v1", "s", "user-1") is None
+        assert len(store) == 11
+        store.close()
+
+    def test_incremental_vacuum_shrinks_file(self, tmp_path):
+        """Test compact(vacuum=True) returns free pages without a full VACUUM."""
+        path = tmp_path / "store.db"
+        store = ResponseStore(str(path), max_entries=5)
+        for i in range(200):
+            store.put("m", "v1", "s", f"user-{i}", "x" * 4000)
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        before = os.path.getsize(path)
+        store.compact(vacuum=True)
+        store.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        assert store.conn.execute("PRAGMA freelist_count").fetchone()[0] == 0
+        assert os.path.getsize(path) < before / 5
+        store.close()
+
+    def test_compaction_due_reported_once(self, tmp_path):
+        """Test only one caller is asked to compact until compaction ran."""
+        store = ResponseStore(str(tmp_path / "store.db"), max_entries=1)
+        due = [store.put("m", "v1", "s", f"user-{i}", "r") for i in range(5)]
+        assert due == [False, True, False, False, False]
+        assert store.compact() == 4
+        assert store.put("m", "v1", "s", "user-5", "r") is True
+        store.close()
+
+
+class TestOpenAIChatStore:
+    """Test openai_chat with the response store enabled."""
+
+    @pytest.mark.asyncio
+    async def test_second_call_served_from_store(self, tmp_path):
+        """Test identical prompts hit the store instead of the provider."""
+        provider = CountingProvider()
+        register_provider("counting", provider)
+        store = ResponseStore(str(tmp_path / "store.db"))
+
+        with patch('app.services.openai_client.get_response_store', return_value=store):
+            first = await openai_chat("system", "user", model="counting:m")
+            second = await openai_chat("system", "user", model="counting:m")
+
+        assert first == second == "answer-1"
+        assert provider.calls == 1
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_compaction_runs_off_event_loop(self, tmp_path):
+        """Test openai_chat compacts the store in a worker thread."""
+        register_provider("counting", CountingProvider())
+        store = ResponseStore(str(tmp_path / "store.db"), max_entries=1)
+        compact = store.compact
+        threads = []
+
+        def tracking_compact():
+            threads.append(threading.get_ident())
+            return compact()
+
+        with patch('app.services.openai_client.get_response_store', return_value=store), \
+                patch.object(store, "compact", tracking_compact):
+            for i in range(3):
+                await openai_chat("system", f"user-{i}", model="counting:m")
+
+        assert threads and threading.get_ident() not in threads
+        assert len(store) <= 2
+        store.close()
+
+    @pytest.mark.asyncio
+    async def test_replay_mode_fails_on_miss(self, tmp_path):
+        """Test replay mode never calls the provider."""
+        provider = CountingProvider()
+        register_provider("counting", provider)
+        store = ResponseStore(str(tmp_path / "store.db"))
+
+        with patch('app.services.openai_client.get_response_store', return_value=store), \
+                patch('app.services.openai_client.RESPONSE_STORE_MODE', "replay"):
+            with pytest.raises(ResponseNotRecorded):
+                await openai_chat("system", "unrecorded", model="counting:m")
+
+        assert provider.calls == 0
+        store.close()
@@ -0,0 +1,58 @@
+import json
+from unittest.mock import patch
+from fastapi.encoders import jsonable_encoder
+from app.responses import PydanticJSONResponse, model_response
+from app.models import TicketResult, TicketAnalyzeResponse, RiskLabel
+
+
+def _response() -> TicketAnalyzeResponse:
+    return TicketAnalyzeResponse(results=[
+        TicketResult(
+            id="TICKET-001",
+            risk_score=85,
+            risk_label=RiskLabel.HIGH,
+            reason="Cliente ameaçou escalar.",
+            suggested_action="Escalate",
+            debug_signals=["escalation: procon"],
+            risk_breakdown={"escalation": 40, "churn": 0, "sla": 35, "sentiment": 0},
+            language="pt-BR",
+        )
+    ])
+
+
+class TestFastJSONResponse:
+    """Test the fast serialization path."""
+
+    def test_same_json_as_default_encoder(self):
+        """Test fast output matches FastAPI's jsonable_encoder output."""
+        model = _response()
+        fast = json.loads(PydanticJSONResponse(model).body)
+        assert fast == jsonable_encoder(model)
+
+    def test_enum_serialized_as_value(self):
+        """Test RiskLabel is rendered as its string value."""
+        body = json.loads(PydanticJSONResponse(_response()).body)
+        assert body["results"][0]["risk_label"] == "HIGH"
+
+    def test_media_type(self):
+        """Test responses are served as application/json."""
+        assert PydanticJSONResponse(_response()).media_type == "application/json"
+
+    def test_disabled_returns_model(self):
+        """Test the default FastAPI path is used when disabled."""
+        model = _response()
+        with patch('app.responses.FAST_JSON_RESPONSES', False):
+            assert model_response(model) is model
+
+    def test_disabled_keeps_status_and_headers(self):
+        """Test the default path still answers with the requested status code and headers."""
+        model = _response()
+        with patch('app.responses.FAST_JSON_RESPONSES', False):
+            response = model_response(model, status_code=202, headers={"x-request-id": "req-1"})
+        assert response.status_code == 202
+        assert response.headers["x-request-id"] == "req-1"
+        assert json.loads(response.body) == jsonable_encoder(model)
+
+    def test_enabled_returns_response(self):
+        """Test the fast path wraps the model in a response."""
+        assert isinstance(model_response(_response()), PydanticJSONResponse)
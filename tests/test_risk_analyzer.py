@@ -127,3 +127,44 @@ class TestRiskAnalyzer:
         result = analyze_ticket(ticket)
         assert result.risk_label == RiskLabel.LOW
         assert result.reason == "No critical risk detected."
+
+
+class TestLanguageLexicons:
+    """Test lexicon selection by ticket language."""
+
+    def _ticket(self, message: str, language: str) -> Ticket:
+        return Ticket(id="LANG-1", customer="Test", channel="email", last_message=message,
+                      conversation_summary="", sla_hours_open=0, language=language)
+
+    def test_accent_variants_match(self):
+        """Test unaccented spellings match accented keywords."""
+        result = analyze_ticket(self._ticket("Atendimento PESSIMO, nao renovo", "pt-BR"))
+        assert result.risk_breakdown["churn"] == 35
+        assert result.risk_breakdown["sentiment"] == 15
+        assert "churn: não renovo" in result.debug_signals
+
+    def test_only_ticket_language_scanned(self):
+        """Test another language's keywords do not fire."""
+        result = analyze_ticket(self._ticket("Falei com o advogado", "en-US"))
+        assert result.risk_breakdown["escalation"] == 0
+
+    def test_english_lexicon(self):
+        """Test English keywords match inflected forms."""
+        result = analyze_ticket(self._ticket("I want this cancelled, it's unacceptable", "en-US"))
+        assert result.risk_breakdown["churn"] == 35
+        assert result.risk_breakdown["sentiment"] == 15
+
+    def test_common_lexicon_in_every_language(self):
+        """Test shared keywords (procon) apply regardless of language."""
+        for language in ("pt-BR", "en-US", "es-ES"):
+            assert analyze_ticket(self._ticket("Reclame Aqui", language)).risk_breakdown["escalation"] == 40
+
+    def test_primary_language_fallback(self):
+        """Test regional variants use the lexicon of their primary language."""
+        result = analyze_ticket(self._ticket("Quero cancelar", "pt-PT"))
+        assert result.risk_breakdown["churn"] == 35
+
+    def test_unknown_language_scans_all_lexicons(self):
+        """Test unknown languages fall back to every lexicon."""
+        result = analyze_ticket(self._ticket("advogado lawyer", "fr-FR"))
+        assert result.risk_breakdown["escalation"] == 40
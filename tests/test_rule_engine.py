@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+import pytest
+from app.models import RiskLabel, Ticket
+from app.services.rule_engine import (
+    RISK_RULES_PATH, RuleSet, RuleValidationError, compile_rules, validate_rules,
+)
+from app.tools.check_rules import main as check_rules_main
+
+
+def _document() -> dict:
+    with open(RISK_RULES_PATH, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def _write(path, document: dict, mtime_ns: int | None = None) -> None:
+    path.write_text(json.dumps(document), encoding="utf-8")
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def _ticket(text: str, sla: int = 0) -> Ticket:
+    return Ticket(id="T-1", customer="c", channel="email", last_message=text,
+                  conversation_summary="", sla_hours_open=sla, language="pt-BR")
+
+
+class TestCompileRules:
+    """Test validation and compilation of rules documents."""
+
+    def test_shipped_rules_compile(self):
+        """Test the default rules file passes its own examples and benchmark."""
+        rules, eval_us = compile_rules(_document())
+        assert rules.version == _document()["version"]
+        assert eval_us > 0
+
+    def test_scoring(self):
+        """Test weights, SLA bands and the escalation + SLA override."""
+        rules, _ = compile_rules(_document())
+        result = rules.assess(_ticket("vou no procon", sla=24))
+        assert (result.escalation, result.sla) == (40, 25)
+        assert result.risk_score == 65
+        assert result.risk_label == RiskLabel.HIGH
+        assert result.reason == "Customer threatened escalation and ticket open for 24h."
+        assert result.signals == ["escalation: procon", "sla: >=24h"]
+
+    def test_weights_come_from_document(self):
+        """Test changing a weight changes the score without code changes."""
+        document = _document()
+        document["categories"]["churn"]["weight"] = 10
+        document["examples"] = []
+        rules, _ = compile_rules(document)
+        assert rules.assess(_ticket("quero cancelar")).risk_score == 10
+
+    @pytest.mark.parametrize("mutate, message", [
+        (lambda d: d["categories"].update(spam={"weight": 1, "keywords": {}}), "unknown category"),
+        (lambda d: d["categories"]["churn"].update(weight=500), "weight"),
+        (lambda d: d["categories"]["churn"].update(keywords=["cancelar"]), "keywords"),
+        (lambda d: d["labels"].append({"label": "CRITICAL", "min_score": 90, "action": "x"}), "unknown label"),
+        (lambda d: d["labels"].pop(), "min_score 0"),
+        (lambda d: d["overrides"].append({"label": "HIGH", "when": {"tone": 1}}), "breakdown keys"),
+        (lambda d: d["examples"].append({"label": "HIGH"}), r"example \d+: text"),
+        (lambda d: d["examples"].append({"text": "x", "label": "LOW", "sla_hours_open": "2"}), "sla_hours_open"),
+        (lambda d: d.update(categories=[d["categories"]]), "'categories'"),
+        (lambda d: d["categories"].update(churn="cancelar"), "category 'churn' must be an object"),
+        (lambda d: d["sla_bands"].append(">=72h"), "'sla_bands'"),
+        (lambda d: d["labels"].append("HIGH"), "'labels'"),
+    ])
+    def test_invalid_documents(self, mutate, message):
+        """Test malformed documents are rejected with a clear message."""
+        document = _document()
+        mutate(document)
+        with pytest.raises(RuleValidationError, match=message):
+            validate_rules(document)
+
+    def test_failing_example_rejected(self):
+        """Test a document whose examples no longer hold is rejected."""
+        document = _document()
+        document["labels"][0]["min_score"] = 95
+        document["overrides"] = []
+        with pytest.raises(RuleValidationError, match="expected HIGH"):
+            compile_rules(document)
+
+    def test_benchmark_budget(self):
+        """Test rules slower than the per-ticket budget are rejected."""
+        with pytest.raises(RuleValidationError, match="budget"):
+            compile_rules(_document(), max_eval_us=1e-6)
+
+
+class TestLookupTables:
+    """Test precomputed SLA, label and reason tables against the rules they come from."""
+
+    @pytest.mark.parametrize("hours", [-5, 0, 11, 12, 23, 24, 47, 48, 500, 720, 721, 10_000])
+    def test_sla_entry_matches_bands(self, hours):
+        """Test the SLA table (and the scan past its end) picks the first band reached."""
+        document = _document()
+        rules, _ = compile_rules(document)
+        band = next((b for b in sorted(document["sla_bands"], key=lambda b: -b["min_hours"])
+                     if hours >= b["min_hours"]), None)
+        score, signal, reason = rules.sla_entry(hours)
+        if band is None:
+            assert (score, signal, reason) == (0, None, None)
+        else:
+            assert (score, signal) == (band["score"], band["signal"])
+            assert reason == band.get("reason", "ticket aging").format(hours=hours)
+
+    def test_label_table_matches_thresholds(self):
+        """Test every score maps to the highest label whose min_score it reaches."""
+        document = _document()
+        rules, _ = compile_rules(document)
+        labels = sorted(document["labels"], key=lambda l: -l["min_score"])
+        for score in range(rules.max_score + 1):
+            expected = next(l for l in labels if score >= l["min_score"])
+            assert rules.label_table[score] == (RiskLabel(expected["label"]), expected["action"])
+
+    @pytest.mark.parametrize("text, sla, reason", [
+        ("tudo certo", 0, "No critical risk detected."),
+        ("tudo certo", 12, "Ticket aging."),
+        ("quero cancelar, péssimo", 0, "Customer signaled cancellation intent and negative tone."),
+        ("vou no procon, quero cancelar", 900,
+         "Customer threatened escalation and customer signaled cancellation intent and ticket open for 900h."),
+    ])
+    def test_reasons(self, text, sla, reason):
+        """Test reasons join category and SLA reasons in breakdown order, in and past the table."""
+        rules, _ = compile_rules(_document())
+        assert rules.assess(_ticket(text, sla=sla)).reason == reason
+
+    def test_strings_shared_across_results(self):
+        """Test results of equal tickets share one reason and action string."""
+        rules, _ = compile_rules(_document())
+        first, second = rules.assess_many([_ticket("quero cancelar", sla=30), _ticket("quero cancelar", sla=30)])
+        assert first.reason is second.reason
+        assert first.suggested_action is second.suggested_action
+
+    def test_assess_many_matches_assess(self):
+        """Test the batch form scores exactly like assess() one ticket at a time."""
+        rules, _ = compile_rules(_document())
+        tickets = [_ticket(text, sla=sla) for text in ("oi", "vou no procon", "quero cancelar, péssimo")
+                   for sla in (0, 12, 30, 100)]
+        assert rules.assess_many(tickets) == [rules.assess(ticket) for ticket in tickets]
+
+    def test_assess_many_mixed_batch(self):
+        """Test lookups shared within a batch keep per-ticket languages, ages past the table and signals apart."""
+        rules, _ = compile_rules(_document())
+        tickets = [_ticket(text, sla=sla) for text in ("quero cancelar", "I want to cancel", "vou no procon")
+                   for sla in (30, 30, 900, 5000)]
+        tickets += [t.model_copy(update={"language": language}) for t in tickets[:4] for language in ("en", None)]
+        results = rules.assess_many(tickets)
+        assert results == [rules.assess(ticket) for ticket in tickets]
+        assert results[0].signals is not results[1].signals
+
+    def test_rescore_sla_matches_assess(self):
+        """Test rescoring for a new SLA age equals a full assessment with that age."""
+        rules, _ = compile_rules(_document())
+        baseline = rules.assess(_ticket("vou no procon", sla=0))
+        for sla in (5, 12, 24, 60, 1000):
+            assert rules.rescore_sla(baseline, sla) == rules.assess(_ticket("vou no procon", sla=sla))
+
+
+class TestHotReload:
+    """Test mtime-based reloading of the rules file."""
+
+    def test_reload_on_change(self, tmp_path):
+        """Test a modified file replaces the active rules."""
+        path = tmp_path / "rules.json"
+        document = _document()
+        _write(path, document, mtime_ns=1_000_000_000)
+        rule_set = RuleSet(str(path), reload_interval=0)
+        first = rule_set.current()
+
+        original = document["version"]
+        document["version"] = original + 1
+        _write(path, document, mtime_ns=2_000_000_000)
+        assert rule_set.current() is first  # compiled off the request path
+        rule_set.wait_for_reload(timeout=5)
+        assert rule_set.current().version == original + 1
+        assert first.version == original  # references held by in-flight requests are untouched
+
+    def test_invalid_reload_keeps_previous(self, tmp_path):
+        """Test a broken file is ignored and the previous rules stay active."""
+        path = tmp_path / "rules.json"
+        _write(path, _document(), mtime_ns=1_000_000_000)
+        rule_set = RuleSet(str(path), reload_interval=0)
+        active = rule_set.current()
+
+        path.write_text("{not json", encoding="utf-8")
+        os.utime(path, ns=(2_000_000_000, 2_000_000_000))
+        assert rule_set.reload() is False
+        assert rule_set.current() is active
+
+    @pytest.mark.parametrize("mutate", [
+        lambda d: d["examples"].append({"label": "HIGH"}),
+        lambda d: d.update(categories=list(d["categories"])),
+        lambda d: d["sla_bands"].append("48"),
+        lambda d: d["sla_bands"][0].update(reason="open {days}d"),
+        lambda d: d["examples"].append({"text": "x", "label": "LOW", "language": 1}),
+    ])
+    def test_malformed_reload_keeps_previous(self, tmp_path, mutate):
+        """Test any malformed document is rejected on reload instead of raising into requests."""
+        path = tmp_path / "rules.json"
+        _write(path, _document(), mtime_ns=1_000_000_000)
+        rule_set = RuleSet(str(path), reload_interval=0)
+        active = rule_set.current()
+
+        document = _document()
+        mutate(document)
+        _write(path, document, mtime_ns=2_000_000_000)
+        assert rule_set.reload() is False
+        assert rule_set.current() is active
+
+    def test_invalid_initial_file_raises(self, tmp_path):
+        """Test startup fails loudly when there are no valid rules at all."""
+        path = tmp_path / "rules.json"
+        path.write_text("[]", encoding="utf-8")
+        with pytest.raises(RuleValidationError):
+            RuleSet(str(path)).current()
+
+    def test_concurrent_reads_during_reload(self, tmp_path):
+        """Test scoring keeps working while the file is swapped repeatedly."""
+        path = tmp_path / "rules.json"
+        document = _document()
+        _write(path, document, mtime_ns=1_000_000_000)
+        rule_set = RuleSet(str(path), reload_interval=0)
+        errors = []
+
+        def score():
+            try:
+                for _ in range(200):
+                    assert rule_set.current().assess(_ticket("procon", sla=48)).risk_label == RiskLabel.HIGH
+            except Exception as e:  # noqa: BLE001
+                errors.append(e)
+
+        threads = [threading.Thread(target=score) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for version in range(2, 12):
+            document["version"] = version
+            _write(path, document, mtime_ns=version * 1_000_000_000)
+        for t in threads:
+            t.join()
+        assert errors == []
+
+
+class TestCheckRulesTool:
+    """Test the rules validation CLI."""
+
+    def test_valid_file(self, capsys):
+        """Test the shipped file is reported as valid."""
+        assert check_rules_main([RISK_RULES_PATH]) == 0
+        assert capsys.readouterr().out.startswith(f"ok: v{_document()['version']}")
+
+    def test_invalid_file(self, tmp_path):
+        """Test an invalid file exits non-zero."""
+        path = tmp_path / "rules.json"
+        path.write_text("{}", encoding="utf-8")
+        assert check_rules_main([str(path)]) == 1
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from app.models import RiskLabel, Ticket
+from app.services.assessment import RiskAssessment
+from app.services.scheduler import PriorityScheduler
+from app.services.tenancy import TenantGate, TenantQuotaExceeded, _gates, tenant_slot
+
+
+def _ticket(ticket_id: str, sla: int = 0, customer: str = "c") -> Ticket:
+    return Ticket(id=ticket_id, customer=customer, channel="email", last_message="m",
+                  conversation_summary="s", sla_hours_open=sla)
+
+
+def _baseline(ticket_id: str, score: int) -> RiskAssessment:
+    label = RiskLabel.HIGH if score >= 70 else RiskLabel.MEDIUM if score >= 35 else RiskLabel.LOW
+    return RiskAssessment(id=ticket_id, risk_score=score, risk_label=label)
+
+
+class _Recorder:
+    """Refine function recording the order tickets are refined in."""
+
+    def __init__(self, delay: float = 0):
+        self.order: list[str] = []
+        self.delay = delay
+
+    async def __call__(self, ticket: Ticket, baseline: RiskAssessment) -> RiskAssessment:
+        self.order.append(ticket.id)
+        await asyncio.sleep(self.delay)
+        return baseline
+
+
+class TestPriorityScheduler:
+    """Test priority dispatch of LLM refinement."""
+
+    @pytest.mark.asyncio
+    async def test_priority_within_batch(self):
+        """Test higher baseline score, then older SLA, is refined first."""
+        refine = _Recorder()
+        tickets = [_ticket("low", 5), _ticket("high-new", 1), _ticket("medium", 30), _ticket("high-old", 72)]
+        baselines = [_baseline("low", 10), _baseline("high-new", 75), _baseline("medium", 40),
+                     _baseline("high-old", 75)]
+
+        results = await PriorityScheduler(workers=1).run_batch(tickets, baselines, refine)
+
+        assert refine.order == ["high-old", "high-new", "medium", "low"]
+        assert [r.id for r in results] == ["low", "high-new", "medium", "high-old"]
+
+    @pytest.mark.asyncio
+    async def test_high_risk_across_requests(self):
+        """Test a HIGH ticket of a later request overtakes queued LOW work."""
+        refine = _Recorder(delay=0.001)
+        scheduler = PriorityScheduler(workers=1)
+        lows = [_ticket(f"low-{i}") for i in range(5)]
+        first = asyncio.create_task(scheduler.run_batch(lows, [_baseline(t.id, 0) for t in lows], refine))
+        await asyncio.sleep(0)
+        await scheduler.run_batch([_ticket("urgent", 72)], [_baseline("urgent", 90)], refine)
+        await first
+
+        assert refine.order.index("urgent") <= 1
+
+    @pytest.mark.asyncio
+    async def test_round_robin_between_requests(self):
+        """Test concurrent requests of the same class are interleaved."""
+        refine = _Recorder()
+        scheduler = PriorityScheduler(workers=1)
+        a = [_ticket(f"a{i}") for i in range(3)]
+        b = [_ticket(f"b{i}") for i in range(3)]
+        await asyncio.gather(
+            scheduler.run_batch(a, [_baseline(t.id, 0) for t in a], refine),
+            scheduler.run_batch(b, [_baseline(t.id, 0) for t in b], refine),
+        )
+        assert refine.order == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+    @pytest.mark.asyncio
+    async def test_cancelled_request_jobs_skipped(self):
+        """Test jobs of a cancelled request are not sent to the LLM."""
+        refine = _Recorder(delay=0.01)
+        scheduler = PriorityScheduler(workers=1)
+        tickets = [_ticket(f"t{i}") for i in range(5)]
+        task = asyncio.create_task(scheduler.run_batch(tickets, [_baseline(t.id, 0) for t in tickets], refine))
+        await asyncio.sleep(0.005)
+        task.cancel()
+        await asyncio.sleep(0.05)
+        assert len(refine.order) == 1
+        assert scheduler.depth == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_limit(self):
+        """Test at most `workers` refinements run concurrently."""
+        running = peak = 0
+
+        async def refine(ticket, baseline):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.001)
+            running -= 1
+            return baseline
+
+        tickets = [_ticket(f"t{i}") for i in range(10)]
+        await PriorityScheduler(workers=3).run_batch(tickets, [_baseline(t.id, 0) for t in tickets], refine)
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_caller(self):
+        """Test a failing refinement fails the request that owns it."""
+        async def refine(ticket, baseline):
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            await PriorityScheduler().run_batch([_ticket("t")], [_baseline("t", 0)], refine)
+
+
+class TestTenantAwareDispatch:
+    """Test workers are not tied up by tenants the tenant gate would not admit."""
+
+    @pytest.fixture
+    async def gate(self):
+        loop = asyncio.get_running_loop()
+        gate = _gates[loop] = TenantGate(capacity=16, tenant_concurrency=2, max_wait=0.1)
+        yield gate
+        del _gates[loop]
+
+    @pytest.mark.asyncio
+    async def test_capped_tenant_does_not_block_others(self, gate):
+        """Test another tenant's ticket runs right away and queued bulk work waits instead of failing."""
+        finished: dict[str, float] = {}
+
+        async def refine(ticket, baseline):
+            async with tenant_slot(ticket.customer, 10):
+                await asyncio.sleep(0.02)
+            finished[ticket.id] = loop.time()
+            return baseline
+
+        loop = asyncio.get_running_loop()
+        scheduler = PriorityScheduler(workers=4, gate=gate)
+        bulk = [_ticket(f"a{i}", customer="A") for i in range(20)]
+        first = asyncio.create_task(scheduler.run_batch(bulk, [_baseline(t.id, 0) for t in bulk], refine))
+        await asyncio.sleep(0.005)
+        start = loop.time()
+        await scheduler.run_batch([_ticket("b", customer="B")], [_baseline("b", 0)], refine)
+        results = await first
+
+        assert finished["b"] - start < 0.05
+        assert len(results) == 20
+        # 20 calls at 2 at a time take ~0.2s, longer than max_wait, yet none was rejected
+        assert max(finished.values()) - start > gate.max_wait
+
+    @pytest.mark.asyncio
+    async def test_direct_calls_still_time_out(self, gate):
+        """Test calls outside the scheduler keep the gate's deadline."""
+        await gate.acquire("A", 10)
+        await gate.acquire("A", 10)
+        with pytest.raises(TenantQuotaExceeded):
+            await gate.acquire("A", 10)
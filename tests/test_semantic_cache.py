@@ -0,0 +1,212 @@
+import pytest
+import json
+import os
+from unittest.mock import AsyncMock, patch
+from app.services.semantic_cache import SemanticCache, embed, cosine, sla_bucket, guard_signature
+from app.services.rule_engine import RISK_RULES_PATH, compile_rules
+from app.services.llm_engine import analyze_with_llm
+from app.models import Ticket, AIAnalysis, RiskLabel
+
+
+def _ticket(message: str, sla_hours_open: int = 5, language: str = "en-US", customer: str = "Test") -> Ticket:
+    return Ticket(
+        id="TICKET-1",
+        customer=customer,
+        channel="email",
+        last_message=message,
+        conversation_summary="Customer wants to leave.",
+        sla_hours_open=sla_hours_open,
+        language=language,
+    )
+
+
+def _rules(version: int, bands: tuple[int, ...]):
+    with open(RISK_RULES_PATH, encoding="utf-8") as fh:
+        document = json.load(fh)
+    document["version"] = version
+    document["sla_bands"] = [
+        {"min_hours": h, "score": 10, "signal": f"sla: >={h}h", "reason": "ticket aging"} for h in bands
+    ]
+    document["examples"] = []
+    return compile_rules(document)[0]
+
+
+ANALYSIS = AIAnalysis(
+    risk_score=80,
+    risk_label=RiskLabel.HIGH,
+    reason="Cancellation intent",
+    suggested_action="Escalate",
+    confidence=90,
+    signals=["churn"],
+)
+
+
+class TestEmbedding:
+    """Test the hashing vectorizer."""
+
+    def test_identical_texts_similarity_one(self):
+        """Test identical texts have cosine 1."""
+        assert cosine(embed("cancel my plan"), embed("cancel my plan")) == pytest.approx(1.0)
+
+    def test_near_duplicates_closer_than_unrelated(self):
+        """Test near-duplicates score higher than unrelated texts."""
+        base = embed("I want to cancel my plan now")
+        near = embed("i want to cancel my plan now!!")
+        far = embed("How do I download my invoice?")
+        assert cosine(base, near) > 0.95
+        assert cosine(base, far) < 0.5
+
+    def test_accents_folded(self):
+        """Test accent variants embed identically."""
+        assert cosine(embed("não renovo"), embed("nao renovo")) == pytest.approx(1.0)
+
+    def test_guard_signature(self):
+        """Test negations (including contractions) and numbers make up the guard."""
+        assert guard_signature("I don't want 2 plans") == (("t",), ("2",))
+        assert guard_signature("Não quero cancelar") == (("nao",), ())
+        assert guard_signature("I want to cancel") == ((), ())
+
+    def test_sla_bucket(self):
+        """Test SLA buckets follow heuristic thresholds."""
+        assert [sla_bucket(h) for h in (0, 12, 30, 72)] == [0, 12, 24, 48]
+
+    def test_sla_bucket_follows_rules(self):
+        """Test SLA buckets come from the active ruleset's SLA bands."""
+        rules = _rules(7, (72, 8))
+        assert [sla_bucket(h, rules) for h in (0, 8, 30, 72)] == [0, 8, 8, 72]
+
+
+class TestSemanticCache:
+    """Test the in-memory vector index."""
+
+    def test_hit_on_near_duplicate(self):
+        """Test a near-duplicate ticket reuses the cached analysis."""
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now"), "gpt-4o-mini", ANALYSIS)
+        hit = cache.lookup(_ticket("I want to cancel my plan now!"), "gpt-4o-mini")
+        assert hit == ANALYSIS
+
+    def test_miss_on_different_sla_bucket(self):
+        """Test results are not shared across SLA buckets."""
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now", sla_hours_open=2), "gpt-4o-mini", ANALYSIS)
+        assert cache.lookup(_ticket("I want to cancel my plan now", sla_hours_open=50), "gpt-4o-mini") is None
+
+    def test_miss_after_rules_reload(self):
+        """Test entries written under an older ruleset are not served after a reload."""
+        cache = SemanticCache(threshold=0.9)
+        ticket = _ticket("I want to cancel my plan now")
+        with patch("app.services.semantic_cache.get_rules", return_value=_rules(1, (48, 24, 12))):
+            cache.store(ticket, "gpt-4o-mini", ANALYSIS)
+            assert cache.lookup(ticket, "gpt-4o-mini") == ANALYSIS
+        with patch("app.services.semantic_cache.get_rules", return_value=_rules(2, (48, 24, 12))):
+            assert cache.lookup(ticket, "gpt-4o-mini") is None
+
+    def test_miss_on_different_model(self):
+        """Test results are not shared across models."""
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now"), "gpt-4o-mini", ANALYSIS)
+        assert cache.lookup(_ticket("I want to cancel my plan now"), "gpt-4o") is None
+
+    def test_miss_on_negation(self):
+        """Test a negated message never reuses the analysis of the affirmative one."""
+        cache = SemanticCache()
+        cache.store(_ticket("I want to cancel my plan now"), "m", ANALYSIS)
+        assert cosine(embed("I do not want to cancel my plan now"), embed("I want to cancel my plan now")) > 0.9
+        assert cache.lookup(_ticket("I do not want to cancel my plan now"), "m") is None
+        assert cache.lookup(_ticket("I don't want to cancel my plan now"), "m") is None
+        assert cache.lookup(_ticket("Não quero cancelar", language="pt-BR"), "m") is None
+
+    def test_miss_on_different_number(self):
+        """Test messages differing only in a number are not shared."""
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I was charged twice, order 1234 for 30 dollars"), "m", ANALYSIS)
+        assert cache.lookup(_ticket("I was charged twice, order 1234 for 300 dollars"), "m") is None
+        assert cache.lookup(_ticket("I was charged twice, order 1234 for 30 dollars!"), "m") == ANALYSIS
+
+    def test_miss_on_different_tenant(self):
+        """Test results are not shared across tenants."""
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now", customer="acme"), "m", ANALYSIS)
+        assert cache.lookup(_ticket("I want to cancel my plan now", customer="globex"), "m") is None
+        assert cache.lookup(_ticket("I want to cancel my plan now", customer="acme"), "m") == ANALYSIS
+
+    def test_partition_size_bounds_scan(self):
+        """Test a partition keeps its most recently used entries only."""
+        cache = SemanticCache(threshold=0.99, partition_size=2)
+        cache.store(_ticket("first message about billing"), "m", ANALYSIS)
+        cache.store(_ticket("second message about login"), "m", ANALYSIS)
+        assert cache.lookup(_ticket("first message about billing"), "m") is not None
+        cache.store(_ticket("third message about exports"), "m", ANALYSIS)
+        cache.store(_ticket("other partition", sla_hours_open=50), "m", ANALYSIS)
+        assert len(cache) == 3
+        assert cache.lookup(_ticket("second message about login"), "m") is None
+        assert cache.lookup(_ticket("first message about billing"), "m") is not None
+
+    def test_lru_eviction(self):
+        """Test the oldest entries are evicted past max_entries."""
+        cache = SemanticCache(threshold=0.99, max_entries=2)
+        for msg in ("first message about billing", "second message about login", "third message about exports"):
+            cache.store(_ticket(msg), "m", ANALYSIS)
+        assert len(cache) == 2
+        assert cache.lookup(_ticket("first message about billing"), "m") is None
+        assert cache.lookup(_ticket("third message about exports"), "m") is not None
+
+    def test_ttl_expiry(self):
+        """Test expired entries are not served."""
+        cache = SemanticCache(threshold=0.9, ttl_seconds=-1)
+        cache.store(_ticket("I want to cancel"), "m", ANALYSIS)
+        assert cache.lookup(_ticket("I want to cancel"), "m") is None
+        assert len(cache) == 0
+
+    def test_snapshot_restore(self, tmp_path):
+        """Test the index survives a snapshot/restore round trip."""
+        path = str(tmp_path / "cache.json")
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now"), "m", ANALYSIS)
+        assert cache.snapshot(path) == 1
+
+        restored = SemanticCache(threshold=0.9)
+        assert restored.restore(path) == 1
+        assert restored.lookup(_ticket("I want to cancel my plan now"), "m") == ANALYSIS
+
+    def test_snapshot_uses_own_temp_file(self, tmp_path):
+        """Test a snapshot never writes the shared <path>.tmp another worker may be writing."""
+        path = tmp_path / "cache.json"
+        (tmp_path / "cache.json.tmp").write_text("other worker", encoding="utf-8")
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now"), "m", ANALYSIS)
+        assert cache.snapshot(str(path)) == 1
+        assert (tmp_path / "cache.json.tmp").read_text(encoding="utf-8") == "other worker"
+        assert sorted(os.listdir(tmp_path)) == ["cache.json", "cache.json.tmp"]
+
+    def test_restore_ignores_old_layout(self, tmp_path):
+        """Test snapshots without the negation/number guard are not restored."""
+        path = tmp_path / "cache.json"
+        cache = SemanticCache(threshold=0.9)
+        cache.store(_ticket("I want to cancel my plan now"), "m", ANALYSIS)
+        cache.snapshot(str(path))
+        data = json.loads(path.read_text(encoding="utf-8"))
+        del data["version"]
+        path.write_text(json.dumps(data), encoding="utf-8")
+        assert SemanticCache().restore(str(path)) == 0
+
+    def test_restore_missing_file(self, tmp_path):
+        """Test restoring a missing snapshot is a no-op."""
+        assert SemanticCache().restore(str(tmp_path / "missing.json")) == 0
+
+
+class TestLLMEngineCache:
+    """Test the semantic cache in front of analyze_with_llm."""
+
+    @pytest.mark.asyncio
+    async def test_second_near_duplicate_skips_llm(self):
+        """Test repeated tickets do not call the LLM again."""
+        with patch('app.services.llm_engine.openai_chat', new_callable=AsyncMock) as mock_chat:
+            mock_chat.return_value = json.dumps(ANALYSIS.model_dump(mode="json"))
+
+            first = await analyze_with_llm(_ticket("I want to cancel my plan now"))
+            second = await analyze_with_llm(_ticket("I want to cancel my plan now!"))
+
+            assert mock_chat.call_count == 1
+            assert second == first
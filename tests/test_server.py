@@ -0,0 +1,118 @@
+import os
+import pytest
+import asyncio
+from unittest.mock import patch
+from app.server import main, server_options, default_workers, cpu_count, cpu_quota
+from app.services.llm_providers import LLMProvider, register_provider, drain_providers
+
+
+class BlockingProvider(LLMProvider):
+    """Provider whose calls last a fixed time."""
+
+    name = "blocking"
+
+    def __init__(self, delay):
+        super().__init__(max_concurrency=8)
+        self.delay = delay
+
+    async def _chat(self, system, user, model, temperature):
+        await asyncio.sleep(self.delay)
+        return "done"
+
+
+class TestServerOptions:
+    """Test the production launcher profile."""
+
+    def test_workers_default_to_cpu_count(self, monkeypatch):
+        """Test worker count follows CPUs unless WEB_CONCURRENCY is set."""
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        assert default_workers() == cpu_count()
+        monkeypatch.setenv("WEB_CONCURRENCY", "3")
+        assert default_workers() == 3
+
+    @pytest.mark.parametrize("cpu_max, expected", [("max 100000", None), ("50000 100000", 0.5),
+                                                   ("150000 100000", 1.5), ("400000 100000", 4.0)])
+    def test_cgroup_v2_quota(self, tmp_path, cpu_max, expected):
+        """Test the CPU quota is read from cgroup v2 cpu.max."""
+        path = tmp_path / "cpu.max"
+        path.write_text(cpu_max + "\n")
+        with patch('app.server.CGROUP_CPU_MAX', str(path)):
+            assert cpu_quota() == expected
+
+    def test_cgroup_v1_quota(self, tmp_path):
+        """Test the cgroup v1 quota/period files are used when cpu.max is missing."""
+        quota, period = tmp_path / "cpu.cfs_quota_us", tmp_path / "cpu.cfs_period_us"
+        period.write_text("100000\n")
+        with patch('app.server.CGROUP_CPU_MAX', str(tmp_path / "missing")), \
+                patch('app.server.CGROUP_V1_QUOTA', str(quota)), \
+                patch('app.server.CGROUP_V1_PERIOD', str(period)):
+            quota.write_text("-1\n")
+            assert cpu_quota() is None
+            quota.write_text("200000\n")
+            assert cpu_quota() == 2.0
+
+    @pytest.mark.parametrize("quota, expected", [(None, 8), (0.5, 1), (1.5, 1), (2.5, 2), (32.0, 8)])
+    def test_cpu_count_capped_by_quota(self, quota, expected):
+        """Test a fractional CPU quota (e.g. a free plan) defaults to one worker."""
+        with patch('app.server.os.sched_getaffinity', return_value=set(range(8))), \
+                patch('app.server.cpu_quota', return_value=quota):
+            assert cpu_count() == expected
+
+    def test_fast_loop_and_parser_when_available(self):
+        """Test uvloop/httptools are selected only when installed."""
+        with patch('app.server._has', return_value=True):
+            options = server_options(4, "0.0.0.0", 8000)
+        assert options["loop"] == "uvloop"
+        assert options["http"] == "httptools"
+        assert options["workers"] == 4
+
+        with patch('app.server._has', return_value=False):
+            options = server_options(1, "0.0.0.0", 8000)
+        assert options["loop"] == "asyncio"
+        assert options["http"] == "h11"
+
+    def test_graceful_shutdown_configured(self):
+        """Test uvicorn waits for in-flight requests on shutdown."""
+        options = server_options(2, "0.0.0.0", 8000)
+        assert options["timeout_graceful_shutdown"] > 0
+        assert options["lifespan"] == "on"
+
+
+    @pytest.mark.parametrize("workers, shared", [(1, False), (2, True)])
+    def test_shared_refinement_store_for_several_workers(self, monkeypatch, workers, shared):
+        """Test several workers get a shared fast-mode result store by default."""
+        monkeypatch.delenv("REFINE_STORE_PATH", raising=False)
+        with patch('app.server.uvicorn.run'):
+            main(["--workers", str(workers)])
+        assert bool(os.environ.get("REFINE_STORE_PATH")) is shared
+        monkeypatch.delenv("REFINE_STORE_PATH", raising=False)
+
+
+class TestDrain:
+    """Test draining in-flight LLM calls on shutdown."""
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_in_flight_calls(self):
+        """Test drain returns once pending calls complete."""
+        provider = BlockingProvider(delay=0.1)
+        register_provider("blocking", provider)
+        try:
+            task = asyncio.create_task(provider.chat("s", "u", "m"))
+            await asyncio.sleep(0.01)
+            assert await drain_providers(timeout=2) is True
+            assert task.done() and task.result() == "done"
+        finally:
+            register_provider("blocking", None)
+
+    @pytest.mark.asyncio
+    async def test_drain_times_out(self):
+        """Test drain gives up after the timeout."""
+        provider = BlockingProvider(delay=1)
+        register_provider("blocking", provider)
+        try:
+            task = asyncio.create_task(provider.chat("s", "u", "m"))
+            await asyncio.sleep(0.01)
+            assert await drain_providers(timeout=0.05) is False
+            task.cancel()
+        finally:
+            register_provider("blocking", None)
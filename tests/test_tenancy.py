@@ -0,0 +1,127 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.metrics import metrics
+from app.services.tenancy import TenantGate, TenantQuotaExceeded, tenant_for_api_key
+
+
+PAYLOAD = {
+    "tickets": [
+        {
+            "id": "TICKET-001",
+            "customer": "Acme",
+            "channel": "email",
+            "last_message": "Vou cancelar e abrir reclamação no procon",
+            "conversation_summary": "Cliente irritado",
+            "sla_hours_open": 30,
+            "language": "pt-BR"
+        }
+    ]
+}
+
+
+async def _hold(gate: TenantGate, tenant: str, order: list, interactive: bool = False, cost: int = 10,
+                duration: float = 0.001):
+    await gate.acquire(tenant, cost, interactive=interactive)
+    order.append(tenant if not interactive else f"{tenant}:interactive")
+    await asyncio.sleep(duration)
+    gate.release(tenant, cost)
+
+
+class TestTenantGate:
+    """Test per-tenant fairness, caps and budgets."""
+
+    @pytest.mark.asyncio
+    async def test_tenant_concurrency_cap(self):
+        """Test one tenant never exceeds its concurrency cap."""
+        gate = TenantGate(capacity=10, tenant_concurrency=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            await gate.acquire("acme", 10)
+            peak = max(peak, gate.tenant_in_flight("acme"))
+            await asyncio.sleep(0.001)
+            gate.release("acme", 10)
+
+        await asyncio.gather(*(call() for _ in range(8)))
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_fair_share_against_bulk_tenant(self):
+        """Test a small tenant is not stuck behind another tenant's backlog."""
+        gate = TenantGate(capacity=1, tenant_concurrency=1)
+        order: list[str] = []
+        bulk = [asyncio.create_task(_hold(gate, "bulk", order)) for _ in range(20)]
+        await asyncio.sleep(0)
+        await asyncio.gather(*(_hold(gate, "small", order) for _ in range(2)))
+        await asyncio.gather(*bulk)
+
+        assert order.index("small") <= 2
+        assert len(order) - 1 - order[::-1].index("small") <= 4
+
+    @pytest.mark.asyncio
+    async def test_weights(self):
+        """Test a heavier tenant gets proportionally more slots."""
+        gate = TenantGate(capacity=1, tenant_concurrency=1, weights={"gold": 3.0})
+        order: list[str] = []
+        tasks = [asyncio.create_task(_hold(gate, t, order)) for _ in range(8) for t in ("gold", "basic")]
+        await asyncio.gather(*tasks)
+        assert order[:8].count("gold") >= 5
+
+    @pytest.mark.asyncio
+    async def test_interactive_skips_own_backlog(self):
+        """Test an interactive call is not queued behind its tenant's bulk calls."""
+        gate = TenantGate(capacity=1, tenant_concurrency=1)
+        order: list[str] = []
+        bulk = [asyncio.create_task(_hold(gate, "acme", order)) for _ in range(10)]
+        await asyncio.sleep(0)
+        await _hold(gate, "acme", order, interactive=True)
+        await asyncio.gather(*bulk)
+        assert order.index("acme:interactive") <= 2
+
+    @pytest.mark.asyncio
+    async def test_token_budget_exhausted(self):
+        """Test a tenant over its token budget is rejected after max_wait."""
+        gate = TenantGate(capacity=4, tenant_concurrency=4, tokens_per_minute=100, max_wait=0.05)
+        await gate.acquire("acme", 150)
+        gate.release("acme", 150)
+        with pytest.raises(TenantQuotaExceeded):
+            await gate.acquire("acme", 10)
+        # Other tenants are unaffected
+        await gate.acquire("globex", 10)
+
+    @pytest.mark.asyncio
+    async def test_token_budget_refills(self):
+        """Test waiting calls are granted once the budget refills."""
+        gate = TenantGate(capacity=4, tenant_concurrency=4, tokens_per_minute=60_000, max_wait=1)
+        await gate.acquire("acme", 60_010)
+        gate.release("acme", 60_010)
+        await asyncio.wait_for(gate.acquire("acme", 10), timeout=1)
+
+
+class TestTenantResolution:
+    """Test tenant identification and usage metrics."""
+
+    def test_api_key_tenant(self):
+        """Test unknown keys map to a stable anonymous tenant."""
+        assert tenant_for_api_key(None) is None
+        assert tenant_for_api_key("secret") == tenant_for_api_key("secret")
+        assert tenant_for_api_key("secret").startswith("key-")
+        assert "secret" not in tenant_for_api_key("secret")
+
+    @pytest.mark.parametrize("headers, tenant", [
+        ({}, "Acme"),
+        ({"X-API-Key": "k1"}, tenant_for_api_key("k1")),
+    ])
+    def test_usage_attributed(self, headers, tenant):
+        """Test LLM calls are charged to the API key's tenant, else to the ticket customer."""
+        metrics.reset()
+        with patch('app.services.risk_orchestrator.CHEAP_MODEL', "local:risk-nb"), \
+                patch('app.services.risk_orchestrator.STRONG_MODEL', "local:risk-nb"):
+            response = TestClient(app).post("/tickets/analyze", json=PAYLOAD, headers=headers)
+        assert response.status_code == 200
+        assert metrics.counter("tenant_llm_requests", tenant=tenant) == 1
+        assert metrics.counter("tenant_tokens", tenant=tenant) > 0
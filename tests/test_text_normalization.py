@@ -0,0 +1,25 @@
+from app.services.text_normalization import fold, normalize, tokenize
+
+
+class TestTextNormalization:
+    """Test Unicode folding and tokenization."""
+
+    def test_fold_strips_accents_and_case(self):
+        """Test accent and case variants fold to the same text."""
+        assert fold("Não RENOVO") == fold("nao renovo") == "nao renovo"
+
+    def test_fold_compatibility_forms(self):
+        """Test compatibility characters (ligatures, full-width) are decomposed."""
+        assert fold("ﬁnal") == "final"
+        assert fold("ＰＲＯＣＯＮ") == "procon"
+
+    def test_tokenize_drops_punctuation(self):
+        """Test punctuation is not part of tokens."""
+        assert tokenize(fold("Péssimo!!! Vou cancelar, ok?")) == ["pessimo", "vou", "cancelar", "ok"]
+
+    def test_normalize_padded(self):
+        """Test normalized text is space-delimited and padded for word-start matching."""
+        normalized = normalize("Issue: vou  CANCELAR.")
+        assert normalized == " issue vou cancelar "
+        assert " cancel" in normalized
+        assert " sue" not in normalized
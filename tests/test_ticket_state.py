@@ -0,0 +1,149 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.models import AIAnalysis, RiskLabel, Ticket
+from app.services.metrics import metrics
+from app.services.risk_orchestrator import assess_tickets
+from app.services.rule_engine import get_rules
+from app.services.ticket_state import TicketStateStore, ticket_state
+
+
+def _ticket(message: str = "Quero cancelar, atendimento pessimo", sla: int = 0, customer: str = "Acme",
+            ticket_id: str = "TICKET-001") -> Ticket:
+    return Ticket(id=ticket_id, customer=customer, channel="email", last_message=message,
+                  conversation_summary="", sla_hours_open=sla, language="pt-BR")
+
+
+def _ai(label: RiskLabel = RiskLabel.MEDIUM, score: int = 50) -> AIAnalysis:
+    return AIAnalysis(risk_score=score, risk_label=label, reason="LLM reason", suggested_action="LLM action",
+                      confidence=90, signals=["churn intent"])
+
+
+class TestRescoreSla:
+    """Test SLA-only re-scoring of heuristic baselines."""
+
+    @pytest.mark.parametrize("message", ["Quero cancelar, atendimento pessimo", "Vou abrir reclamação no procon",
+                                         "Obrigado pela ajuda"])
+    @pytest.mark.parametrize("sla", [0, 12, 30, 72])
+    def test_matches_full_assessment(self, message, sla):
+        """Test rescore_sla gives the same result as assessing the ticket again."""
+        rules = get_rules()
+        baseline = rules.assess(_ticket(message, sla=5))
+        assert rules.rescore_sla(baseline, sla) == rules.assess(_ticket(message, sla=sla))
+
+    def test_baseline_not_modified(self):
+        """Test the stored baseline is left untouched."""
+        rules = get_rules()
+        baseline = rules.assess(_ticket(sla=5))
+        before = list(baseline.signals)
+        rules.rescore_sla(baseline, 72)
+        assert baseline.signals == before
+        assert baseline.sla == 0
+
+
+class TestIncrementalAnalysis:
+    """Test re-submitted tickets skip work they do not need."""
+
+    @pytest.mark.asyncio
+    async def test_unchanged_ticket_reused(self):
+        """Test an identical re-submission does not call the LLM again."""
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=_ai())) as llm:
+            first = (await assess_tickets([_ticket()]))[0]
+            second = (await assess_tickets([_ticket()]))[0]
+        assert llm.await_count == 1
+        assert second == first
+
+    @pytest.mark.asyncio
+    async def test_sla_only_change(self):
+        """Test an SLA tick updates the SLA component and label without an LLM call."""
+        metrics.reset()
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=_ai())) as llm:
+            first = (await assess_tickets([_ticket(sla=0)]))[0]
+            second = (await assess_tickets([_ticket(sla=72)]))[0]
+        assert llm.await_count == 1
+        assert first.sla == 0 and second.sla == 35
+        assert second.risk_score == first.risk_score + 35
+        assert second.risk_label == RiskLabel.HIGH
+        assert second.reason == "LLM reason"
+        assert "llm_signal:churn intent" in second.signals
+        assert "sla: >=48h" in second.signals
+        assert metrics.counter("ticket_state", outcome="sla_only") == 1
+
+    @pytest.mark.asyncio
+    async def test_sla_tick_preserves_llm_label(self):
+        """Test an SLA tick within the same band keeps the LLM's label and action."""
+        ai = AIAnalysis(risk_score=45, risk_label=RiskLabel.HIGH, reason="LLM reason",
+                        suggested_action="Escalate to legal", confidence=90, signals=["legal threat"])
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=ai)) as llm, \
+                patch('app.services.risk_orchestrator.STRONG_MODEL', ""):
+            first = (await assess_tickets([_ticket(sla=2)]))[0]
+            second = (await assess_tickets([_ticket(sla=3)]))[0]
+        assert llm.await_count == 1
+        assert first.risk_label == RiskLabel.HIGH
+        assert (second.risk_score, second.risk_label, second.suggested_action) == \
+            (45, RiskLabel.HIGH, "Escalate to legal")
+
+    @pytest.mark.asyncio
+    async def test_small_text_change_skips_llm(self):
+        """Test a new message that barely moves the heuristics is carried forward."""
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=_ai())) as llm:
+            await assess_tickets([_ticket("Quero cancelar, atendimento pessimo")])
+            result = (await assess_tickets([_ticket("Quero cancelar, atendimento pessimo. Alguem responde?")]))[0]
+        assert llm.await_count == 1
+        assert result.reason == "LLM reason"
+
+    @pytest.mark.asyncio
+    async def test_large_text_change_calls_llm(self):
+        """Test a message that moves the heuristic score past the threshold is refined again."""
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=_ai())) as llm, \
+                patch('app.services.risk_orchestrator.STRONG_MODEL', ""):
+            await assess_tickets([_ticket("Obrigado pela ajuda")])
+            await assess_tickets([_ticket("Vou abrir reclamação no procon")])
+        assert llm.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_refinement_retried(self):
+        """Test a ticket whose LLM call failed is not remembered."""
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(side_effect=TimeoutError)) as llm:
+            await assess_tickets([_ticket()])
+            await assess_tickets([_ticket()])
+        assert llm.await_count == 2
+        assert len(ticket_state) == 0
+
+    @pytest.mark.asyncio
+    async def test_ticket_ids_scoped_by_tenant(self):
+        """Test the same ticket id from another tenant is analyzed on its own."""
+        with patch('app.services.risk_orchestrator.analyze_with_llm', AsyncMock(return_value=_ai())) as llm:
+            await assess_tickets([_ticket(customer="Acme")])
+            await assess_tickets([_ticket(customer="Globex")])
+        assert llm.await_count == 2
+
+
+class TestTicketStateStore:
+    """Test invalidation and bounds of the store."""
+
+    def test_rules_reload_invalidates(self):
+        """Test results produced under other rules are not reused."""
+        store = TicketStateStore()
+        rules = get_rules()
+        ticket = _ticket()
+        baseline = rules.assess(ticket)
+        store.put("Acme", ticket, baseline, baseline, rules)
+        assert store.lookup("Acme", ticket, rules) == baseline
+
+        reloaded = type(rules).__new__(type(rules))
+        for slot in type(rules).__slots__:
+            setattr(reloaded, slot, getattr(rules, slot))
+        assert store.lookup("Acme", ticket, reloaded) is None
+        assert len(store) == 0
+
+    def test_lru_bound(self):
+        """Test the least recently used tickets are evicted past max_entries."""
+        store = TicketStateStore(max_entries=2)
+        rules = get_rules()
+        for ticket_id in ("A", "B", "C"):
+            ticket = _ticket(ticket_id=ticket_id)
+            baseline = rules.assess(ticket)
+            store.put("Acme", ticket, baseline, baseline, rules)
+        assert len(store) == 2
+        assert store.lookup("Acme", _ticket(ticket_id="A"), rules) is None
+        assert store.lookup("Acme", _ticket(ticket_id="C"), rules) is not None
@@ -0,0 +1,167 @@
+import pytest
+import httpx
+import json
+import os
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services import traffic_recorder
+from app.services.traffic_recorder import REDACTED, TrafficRecorder, recording_files
+from app.services.semantic_cache import semantic_cache
+from app.tools.replay import load_recording, replay, replay_in_process
+
+
+PAYLOAD = {
+    "tickets": [
+        {
+            "id": "TICKET-001",
+            "customer": "John Doe",
+            "channel": "email",
+            "last_message": "Vou cancelar e abrir reclamação no procon",
+            "conversation_summary": "Cliente irritado",
+            "sla_hours_open": 30,
+            "language": "pt-BR"
+        }
+    ]
+}
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    """Install a recorder sampling every request."""
+    rec = TrafficRecorder(str(tmp_path / "traffic.jsonl"), sample_rate=1.0)
+    traffic_recorder._recorder = rec
+    yield rec
+    traffic_recorder.close_recorder()
+
+
+@pytest.fixture
+def local_models():
+    """Serve LLM tiers from the in-process classifier so no network is needed."""
+    with patch('app.services.risk_orchestrator.CHEAP_MODEL', "local:risk-nb"), \
+            patch('app.services.risk_orchestrator.STRONG_MODEL', "local:risk-nb"):
+        yield
+
+
+class TestTrafficRecorder:
+    """Test request/upstream capture."""
+
+    def test_records_request_and_upstream(self, recorder, local_models):
+        """Test a sampled request is logged with its upstream exchange."""
+        response = TestClient(app).post("/tickets/analyze", json=PAYLOAD)
+        assert response.status_code == 200
+        recorder.close()
+
+        records = [json.loads(line) for line in open(recorder.path)]
+        request = next(r for r in records if r["type"] == "request")
+        upstream = [r for r in records if r["type"] == "upstream"]
+        assert request["path"] == "/tickets/analyze"
+        assert request["status"] == 200
+        assert json.loads(request["body"]) == PAYLOAD
+        assert request["duration_ms"] > 0
+        assert len(upstream) == 1
+        assert upstream[0]["request_id"] == request["id"]
+        assert upstream[0]["model"] == "local:risk-nb"
+
+    def test_query_and_headers_recorded(self, recorder, local_models):
+        """Test the query string and allowlisted headers are kept, with the API key redacted."""
+        headers = {"x-api-key": "secret-key", "x-priority": "high", "x-request-id": "req-1", "x-other": "x"}
+        with patch('app.services.tenancy._API_KEYS', {"secret-key": "acme"}):
+            TestClient(app).post("/tickets/analyze?mode=stream", json=PAYLOAD, headers=headers)
+        recorder.close()
+
+        request = next(r for r in map(json.loads, open(recorder.path)) if r["type"] == "request")
+        assert request["query"] == "mode=stream"
+        assert request["headers"]["x-api-key"] == REDACTED
+        assert request["headers"]["x-priority"] == "high"
+        assert request["headers"]["x-request-id"] == "req-1"
+        assert "x-other" not in request["headers"]
+        assert request["tenant"] == "acme"
+        assert "secret-key" not in open(recorder.path).read()
+
+    def test_one_file_per_worker(self, tmp_path):
+        """Test each process writes its own file and replay finds them from the base path."""
+        base = str(tmp_path / "traffic.jsonl.gz")
+        recorder = TrafficRecorder(base, sample_rate=1.0)
+        recorder.write({"type": "request", "ts": 1})
+        recorder.close()
+        (tmp_path / "traffic.99999.jsonl.gz").write_bytes(open(recorder.path, "rb").read())
+
+        assert recorder.path == str(tmp_path / f"traffic.{os.getpid()}.jsonl.gz")
+        assert recording_files(base) == sorted([recorder.path, str(tmp_path / "traffic.99999.jsonl.gz")])
+        requests, _ = load_recording(base)
+        assert len(requests) == 2
+
+    def test_unrecorded_paths_ignored(self, recorder):
+        """Test only analyze/suggest-reply are captured."""
+        TestClient(app).get("/metrics")
+        recorder.close()
+        assert not os.path.exists(recorder.path)
+
+    def test_sampling_rate_zero(self, tmp_path, local_models):
+        """Test nothing is written when the sample rate is zero."""
+        rec = TrafficRecorder(str(tmp_path / "none.jsonl"), sample_rate=0.0)
+        traffic_recorder._recorder = rec
+        try:
+            TestClient(app).post("/tickets/analyze", json=PAYLOAD)
+        finally:
+            traffic_recorder.close_recorder()
+        assert recording_files(str(tmp_path / "none.jsonl")) == []
+
+    def test_gzip_log(self, tmp_path, local_models):
+        """Test .gz paths produce a readable compressed log."""
+        path = str(tmp_path / "traffic.jsonl.gz")
+        traffic_recorder._recorder = TrafficRecorder(path, sample_rate=1.0)
+        try:
+            TestClient(app).post("/tickets/analyze", json=PAYLOAD)
+        finally:
+            traffic_recorder.close_recorder()
+        requests, exchanges = load_recording(path)
+        assert len(requests) == 1
+        assert len(exchanges) == 1
+
+
+class TestReplay:
+    """Test re-driving recorded traffic."""
+
+    @pytest.mark.asyncio
+    async def test_replay_serves_upstream_from_recording(self, recorder, local_models):
+        """Test replay reproduces responses and reports latency/throughput."""
+        client = TestClient(app)
+        for i in range(3):
+            payload = json.loads(json.dumps(PAYLOAD))
+            payload["tickets"][0]["last_message"] += f" pedido {i}"
+            client.post("/tickets/analyze", json=payload)
+        recorder.close()
+        traffic_recorder._recorder = None
+        semantic_cache.clear()
+
+        report = await replay_in_process(recorder.path, speed=0, latency_scale=0)
+
+        assert report["replayed"]["requests"] == 3
+        assert report["errors"] == 0
+        assert report["upstream_misses"] == 0
+        assert "/tickets/analyze" in report["paths"]
+        assert report["recorded"]["p50_ms"] > 0
+
+    @pytest.mark.asyncio
+    async def test_replay_sends_query_and_headers(self, recorder, local_models):
+        """Test replayed requests carry the recorded query, headers and the tenant's key."""
+        with patch('app.services.tenancy._API_KEYS', {"secret-key": "acme"}):
+            TestClient(app).post("/tickets/analyze?mode=fast", json=PAYLOAD,
+                                 headers={"x-api-key": "secret-key", "x-priority": "low"})
+        recorder.close()
+        traffic_recorder._recorder = None
+        requests, _ = load_recording(recorder.path)
+        sent = []
+
+        async def handler(request):
+            sent.append(request)
+            return httpx.Response(200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://replay") as client:
+            await replay(requests, client, speed=0, api_keys={"acme": "replay-key"})
+
+        assert sent[0].url.query == b"mode=fast"
+        assert sent[0].headers["x-priority"] == "low"
+        assert sent[0].headers["x-api-key"] == "replay-key"
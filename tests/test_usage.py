@@ -0,0 +1,183 @@
+import httpx
+import pytest
+from unittest.mock import patch
+from app.main import app
+from app.services.context_budget import count_tokens
+from app.services.llm_providers import LLMProvider, UnsupportedTaskError, register_provider
+from app.services.metrics import metrics
+from app.services.openai_client import openai_chat
+from app.services.tenancy import get_tenant_gate
+from app.services.usage import UsageLedger, estimate_cost, ticket_usage, usage_ledger
+
+PAYLOAD = {"tickets": [
+    {"id": f"U-{i}", "customer": "Acme", "channel": "email", "last_message": "Preciso de ajuda com a fatura " * (i + 1),
+     "conversation_summary": "", "sla_hours_open": 2, "language": "pt-BR"}
+    for i in range(3)
+]}
+
+
+class FailingProvider(LLMProvider):
+    name = "failing"
+
+    def __init__(self, error: Exception):
+        super().__init__(max_concurrency=4)
+        self.error = error
+
+    async def _chat(self, system: str, user: str, model: str, temperature: float) -> str:
+        raise self.error
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=30)
+
+
+@pytest.fixture(autouse=True)
+def cheap_tier_only():
+    """Keep one upstream call per ticket (no strong-tier re-runs)."""
+    with patch('app.services.risk_orchestrator.STRONG_MODEL', ""), \
+            patch('app.services.risk_orchestrator.CHEAP_MODEL', "gpt-4o-mini"):
+        yield
+
+
+class TestUsageLedger:
+    """Test the rolling usage aggregate."""
+
+    def test_cost_from_price_table(self):
+        """Test costs use the per-million token prices, ignoring a provider prefix."""
+        assert estimate_cost("gpt-4o-mini", 1_000_000, 0) == pytest.approx(0.15)
+        assert estimate_cost("openai:gpt-4o-mini", 0, 1_000_000) == pytest.approx(0.6)
+        assert estimate_cost("local:risk-nb", 1000, 1000) == 0
+
+    def test_groups_and_top_tickets(self):
+        """Test calls are summed per group and the most expensive tickets are listed first."""
+        ledger = UsageLedger(window_seconds=600)
+        with ticket_usage("A"):
+            ledger.record("gpt-4o-mini", "v1", 100, 10, "acme", now=1000)
+            ledger.record("gpt-4o-mini", "v1", 100, 10, "acme", now=1001)
+        with ticket_usage("B"):
+            ledger.record("gpt-4o", "v2", 500, 50, "globex", now=1002)
+
+        snapshot = ledger.snapshot(("model",), now=1003)
+
+        assert snapshot["totals"]["calls"] == 3
+        assert snapshot["totals"]["total_tokens"] == 770
+        assert [g["model"] for g in snapshot["groups"]] == ["gpt-4o", "gpt-4o-mini"]
+        assert snapshot["groups"][1]["avg_prompt_tokens"] == 100
+        assert [t["ticket_id"] for t in snapshot["top_tickets"]] == ["B", "A"]
+        assert snapshot["top_tickets"][1]["calls"] == 2
+
+    def test_window_expiry(self):
+        """Test calls older than the window drop out of the aggregate."""
+        ledger = UsageLedger(window_seconds=120)
+        with ticket_usage("old"):
+            ledger.record("gpt-4o-mini", "v1", 100, 10, "acme", now=0)
+        ledger.record("gpt-4o-mini", "v1", 7, 3, "acme", now=300)
+
+        snapshot = ledger.snapshot(now=310)
+
+        assert snapshot["totals"]["total_tokens"] == 10
+        assert snapshot["top_tickets"] == []
+
+    def test_unknown_group(self):
+        """Test an unknown group_by dimension is rejected."""
+        with pytest.raises(ValueError):
+            UsageLedger().snapshot(("customer",))
+
+
+class TestUsageThroughUpstream:
+    """Test usage reported by the upstream is attributed and exposed."""
+
+    @pytest.mark.asyncio
+    async def test_usage_attributed_to_endpoint_and_tickets(self, fake_upstream):
+        """Test reported tokens land in metrics, the ledger and the tenant budget."""
+        metrics.reset()
+        async with _client() as client:
+            await client.post("/tickets/analyze", json=PAYLOAD)
+            response = await client.get("/usage?group_by=endpoint,prompt_version,tenant")
+
+        data = response.json()
+        assert data["totals"]["calls"] == 3
+        group = data["groups"][0]
+        assert (group["endpoint"], group["prompt_version"], group["tenant"]) == \
+            ("/tickets/analyze", "risk-triage-v1", "Acme")
+        labels = {"endpoint": "/tickets/analyze", "model": "gpt-4o-mini", "prompt_version": "risk-triage-v1"}
+        assert metrics.counter("llm_tokens", kind="prompt", **labels) == data["totals"]["prompt_tokens"]
+        assert metrics.counter("llm_tokens", kind="completion", **labels) == data["totals"]["completion_tokens"]
+        assert metrics.counter("llm_cost_usd", **labels) == pytest.approx(data["totals"]["cost_usd"], abs=1e-6)
+        # Tenant budget is charged the reported usage, not the up-front estimate
+        assert metrics.counter("tenant_tokens", tenant="Acme") == data["totals"]["total_tokens"]
+        # The longest ticket has the most prompt tokens
+        assert data["top_tickets"][0]["ticket_id"] == "U-2"
+        assert get_tenant_gate().tenant_in_flight("Acme") == 0
+
+    @pytest.mark.asyncio
+    async def test_usage_headers_on_request(self, fake_upstream):
+        """Test X-LLM-* headers are added when asked for, with the request's own totals."""
+        async with _client() as client:
+            response = await client.post("/tickets/analyze", json=PAYLOAD,
+                                         headers={"X-LLM-Usage": "true", "X-Request-ID": "req-1"})
+            plain = await client.post("/tickets/analyze", json=PAYLOAD)
+
+        assert "x-llm-calls" not in plain.headers
+        assert response.headers["x-request-id"] == "req-1"
+        assert response.headers["x-llm-calls"] == "3"
+        assert int(response.headers["x-llm-prompt-tokens"]) > 0
+        assert float(response.headers["x-llm-cost-usd"]) > 0
+        tickets = usage_ledger.snapshot()["top_tickets"]
+        assert {t["request_id"] for t in tickets} == {"req-1"}
+
+    @pytest.mark.asyncio
+    async def test_reply_prompt_version(self, fake_upstream):
+        """Test reply suggestions are accounted under the reply endpoint and prompt version."""
+        payload = {"ticket_id": "U-R", "customer": "Acme", "channel": "email", "last_message": "Help",
+                   "conversation_summary": "", "risk_label": "MEDIUM", "company_tone": "friendly",
+                   "language": "en-US"}
+        async with _client() as client:
+            await client.post("/replies/suggest-reply", json=payload)
+            response = await client.get("/usage?group_by=endpoint,prompt_version&top=1")
+
+        data = response.json()
+        assert data["groups"] == [{**data["groups"][0], "endpoint": "/replies/suggest-reply",
+                                   "prompt_version": "reply-v1"}]
+        assert data["top_tickets"][0]["ticket_id"] == "U-R"
+
+    @pytest.mark.asyncio
+    async def test_bad_group_by(self):
+        """Test an unknown dimension is a 422."""
+        async with _client() as client:
+            response = await client.get("/usage?group_by=customer")
+        assert response.status_code == 422
+
+
+class TestFailedCalls:
+    """Test upstream calls are accounted even when they fail."""
+
+    @pytest.fixture(autouse=True)
+    def no_store(self):
+        """Call the provider directly and unregister it afterwards."""
+        with patch('app.services.openai_client.get_response_store', return_value=None):
+            yield
+        register_provider("failing", None)
+
+    @pytest.mark.asyncio
+    async def test_failed_call_charged_prompt_estimate(self):
+        """Test a call failing upstream is recorded with its estimated prompt tokens."""
+        metrics.reset()
+        register_provider("failing", FailingProvider(TimeoutError("upstream timed out")))
+        with pytest.raises(TimeoutError):
+            await openai_chat("system prompt", "user prompt", model="failing:m", prompt_version="p-fail")
+        labels = {"endpoint": "background", "model": "failing:m", "prompt_version": "p-fail"}
+        assert metrics.counter("llm_calls", **labels) == 1
+        assert metrics.counter("llm_tokens", kind="prompt", **labels) == \
+            count_tokens("system prompt") + count_tokens("user prompt")
+        assert metrics.counter("llm_tokens", kind="completion", **labels) == 0
+
+    @pytest.mark.asyncio
+    async def test_unsupported_prompt_not_charged(self):
+        """Test a prompt the provider refuses before any model runs is not accounted."""
+        metrics.reset()
+        register_provider("failing", FailingProvider(UnsupportedTaskError("no")))
+        with pytest.raises(UnsupportedTaskError):
+            await openai_chat("system", "user", model="failing:m", prompt_version="p-unsupported")
+        assert metrics.counter("llm_calls", endpoint="background", model="failing:m",
+                               prompt_version="p-unsupported") == 0